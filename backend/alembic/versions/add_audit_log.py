@@ -0,0 +1,40 @@
+"""Add audit log table
+
+Revision ID: add_audit_log
+Revises: add_item_vendor_sku_unique
+Create Date: 2025-07-22 00:00:00.000000
+
+"""
+from alembic import op #type: ignore
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_audit_log'
+down_revision = 'add_item_vendor_sku_unique'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'auditlog',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('action', sa.String(length=64), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('ip_address', sa.String(length=45), nullable=True),
+        sa.Column('correlation_id', sa.String(length=64), nullable=True),
+        sa.Column('details', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_auditlog_created_at', 'auditlog', ['created_at'])
+    op.create_index('ix_auditlog_user_id_created_at', 'auditlog', ['user_id', 'created_at'])
+    op.create_index('ix_auditlog_action_created_at', 'auditlog', ['action', 'created_at'])
+
+
+def downgrade():
+    op.drop_index('ix_auditlog_action_created_at', table_name='auditlog')
+    op.drop_index('ix_auditlog_user_id_created_at', table_name='auditlog')
+    op.drop_index('ix_auditlog_created_at', table_name='auditlog')
+    op.drop_table('auditlog')
@@ -0,0 +1,37 @@
+"""Add change log for delta sync
+
+Revision ID: add_change_log
+Revises: add_replica_heartbeat
+Create Date: 2025-08-02 00:00:00.000000
+
+"""
+from alembic import op #type: ignore
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_change_log'
+down_revision = 'add_replica_heartbeat'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'changelog',
+        sa.Column('seq', sa.Integer(), nullable=False),
+        sa.Column('entity', sa.String(length=32), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('operation', sa.String(length=8), nullable=False),
+        sa.Column('location_id', sa.Integer(), nullable=True),
+        sa.Column('to_location_id', sa.Integer(), nullable=True),
+        sa.Column('changed_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('seq'),
+        sqlite_autoincrement=True
+    )
+    op.create_index('ix_changelog_entity_entity_id_seq', 'changelog', ['entity', 'entity_id', 'seq'])
+
+
+def downgrade():
+    op.drop_index('ix_changelog_entity_entity_id_seq', table_name='changelog')
+    op.drop_table('changelog')
@@ -0,0 +1,29 @@
+"""Partition count by month on counted_at (PostgreSQL, opt-in)
+
+Revision ID: add_count_partitioning
+Revises: add_hot_path_indexes
+Create Date: 2025-07-30 00:00:00.000000
+
+"""
+from alembic import op #type: ignore
+
+from app.core.config import settings
+from app.services.count_partitions import convert_to_partitioned, revert_to_unpartitioned
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_count_partitioning'
+down_revision = 'add_hot_path_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Opt-in: with COUNT_PARTITIONING_ENABLED set the table is converted here. Databases upgraded
+    # without it are converted later with `python manage_partitions.py --convert`; other dialects are left as they are
+    if settings.COUNT_PARTITIONING_ENABLED:
+        convert_to_partitioned(op.get_bind(), settings.COUNT_PARTITION_MONTHS_AHEAD)
+
+
+def downgrade():
+    revert_to_unpartitioned(op.get_bind())
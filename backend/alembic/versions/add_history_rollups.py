@@ -0,0 +1,58 @@
+"""Add monthly rollups of archived counts and transfers
+
+Revision ID: add_history_rollups
+Revises: add_count_partitioning
+Create Date: 2025-07-31 00:00:00.000000
+
+"""
+from alembic import op #type: ignore
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_history_rollups'
+down_revision = 'add_count_partitioning'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'countrollup',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('location_id', sa.Integer(), nullable=False),
+        sa.Column('item_id', sa.Integer(), nullable=False),
+        sa.Column('month', sa.Date(), nullable=False),
+        sa.Column('counts', sa.Integer(), nullable=False),
+        sa.Column('total_quantity', sa.Float(), nullable=False),
+        sa.Column('last_quantity', sa.Float(), nullable=False),
+        sa.Column('last_counted_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['item_id'], ['inventoryitem.id']),
+        sa.ForeignKeyConstraint(['location_id'], ['location.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_countrollup_location_id_month_item_id', 'countrollup',
+                    ['location_id', 'month', 'item_id'], unique=True)
+    op.create_table(
+        'transferrollup',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('from_location_id', sa.Integer(), nullable=False),
+        sa.Column('to_location_id', sa.Integer(), nullable=False),
+        sa.Column('item_id', sa.Integer(), nullable=False),
+        sa.Column('month', sa.Date(), nullable=False),
+        sa.Column('transfers', sa.Integer(), nullable=False),
+        sa.Column('total_quantity', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['from_location_id'], ['location.id']),
+        sa.ForeignKeyConstraint(['item_id'], ['inventoryitem.id']),
+        sa.ForeignKeyConstraint(['to_location_id'], ['location.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_transferrollup_from_location_id_month_to_location_id_item_id', 'transferrollup',
+                    ['from_location_id', 'month', 'to_location_id', 'item_id'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_transferrollup_from_location_id_month_to_location_id_item_id', table_name='transferrollup')
+    op.drop_table('transferrollup')
+    op.drop_index('ix_countrollup_location_id_month_item_id', table_name='countrollup')
+    op.drop_table('countrollup')
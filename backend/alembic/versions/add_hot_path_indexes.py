@@ -0,0 +1,58 @@
+"""Add composite indexes for the hot query shapes
+
+Revision ID: add_hot_path_indexes
+Revises: add_audit_log
+Create Date: 2025-07-23 00:00:00.000000
+
+"""
+from alembic import op #type: ignore
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_hot_path_indexes'
+down_revision = 'add_audit_log'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns): equality columns first, then the column results are ordered or ranged by
+INDEXES = [
+    # Latest counts per location, history per item, counts per user
+    ('ix_count_location_id_counted_at', 'count', ['location_id', 'counted_at']),
+    ('ix_count_item_id_counted_at', 'count', ['item_id', 'counted_at']),
+    ('ix_count_user_id_counted_at', 'count', ['user_id', 'counted_at']),
+    # Transfers per location pair, and incoming transfers per location
+    ('ix_transfer_from_location_id_to_location_id_transferred_at', 'transfer',
+     ['from_location_id', 'to_location_id', 'transferred_at']),
+    ('ix_transfer_to_location_id_transferred_at', 'transfer', ['to_location_id', 'transferred_at']),
+    # Upcoming schedules per location and overall
+    ('ix_schedule_location_id_scheduled_for', 'schedule', ['location_id', 'scheduled_for']),
+    ('ix_schedule_scheduled_for', 'schedule', ['scheduled_for']),
+    # Items by category
+    ('ix_inventoryitem_category_id', 'inventoryitem', ['category_id']),
+]
+
+
+def _create(name, table, columns, concurrently=''):
+    # IF NOT EXISTS: databases created with create_all() already have them from the models
+    op.execute(f'CREATE INDEX {concurrently}IF NOT EXISTS {name} ON "{table}" ({", ".join(columns)})')
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        # CONCURRENTLY keeps the tables writable while the indexes build, but cannot run in a transaction
+        with op.get_context().autocommit_block():
+            for name, table, columns in INDEXES:
+                _create(name, table, columns, concurrently='CONCURRENTLY ')
+    else:
+        for name, table, columns in INDEXES:
+            _create(name, table, columns)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name, _, _ in reversed(INDEXES):
+                op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    else:
+        for name, _, _ in reversed(INDEXES):
+            op.execute(f"DROP INDEX IF EXISTS {name}")
@@ -0,0 +1,25 @@
+"""Add claim token to idempotency keys so only the claiming request settles them
+
+Revision ID: add_idempotency_claim_token
+Revises: add_user_permissions_version
+Create Date: 2025-08-07 00:00:00.000000
+
+"""
+from alembic import op #type: ignore
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_idempotency_claim_token'
+down_revision = 'add_user_permissions_version'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('idempotencykey', sa.Column('claim_token', sa.String(length=32), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('idempotencykey') as batch_op:
+        batch_op.drop_column('claim_token')
@@ -0,0 +1,41 @@
+"""Add item import jobs
+
+Revision ID: add_item_import_jobs
+Revises: add_table_stamps
+Create Date: 2025-08-05 00:00:00.000000
+
+"""
+from alembic import op #type: ignore
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_item_import_jobs'
+down_revision = 'add_table_stamps'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'itemimportjob',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('filename', sa.String(length=255), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('total_rows', sa.Integer(), nullable=True),
+        sa.Column('processed_rows', sa.Integer(), nullable=False),
+        sa.Column('created', sa.Integer(), nullable=False),
+        sa.Column('updated', sa.Integer(), nullable=False),
+        sa.Column('failed', sa.Integer(), nullable=False),
+        sa.Column('errors', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_itemimportjob_expires_at', 'itemimportjob', ['expires_at'])
+
+
+def downgrade():
+    op.drop_index('ix_itemimportjob_expires_at', table_name='itemimportjob')
+    op.drop_table('itemimportjob')
@@ -0,0 +1,74 @@
+"""Add full-text search indexes for inventory items
+
+Revision ID: add_item_search_indexes
+Revises: add_color_to_category
+Create Date: 2025-07-20 00:00:00.000000
+
+"""
+from alembic import op #type: ignore
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_item_search_indexes'
+down_revision = 'add_color_to_category'
+branch_labels = None
+depends_on = None
+
+# Must match PG_SEARCH_DOCUMENT in app/services/search.py so the planner can use the index
+PG_SEARCH_DOCUMENT = (
+    "to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(vendor, '') "
+    "|| ' ' || coalesce(sku, ''))"
+)
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        # Trigram indexes power fuzzy/prefix matching, the tsvector index ranked word search
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute("CREATE INDEX IF NOT EXISTS ix_inventoryitem_name_trgm ON inventoryitem USING gin (name gin_trgm_ops)")
+        op.execute("CREATE INDEX IF NOT EXISTS ix_inventoryitem_sku_trgm ON inventoryitem USING gin (sku gin_trgm_ops)")
+        op.execute(f"CREATE INDEX IF NOT EXISTS ix_inventoryitem_search ON inventoryitem USING gin ({PG_SEARCH_DOCUMENT})")
+
+    elif dialect == 'sqlite':
+        # External-content FTS5 table kept in sync with inventoryitem by triggers
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS inventoryitem_fts USING fts5("
+            "name, vendor, sku, content='inventoryitem', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS inventoryitem_fts_insert AFTER INSERT ON inventoryitem BEGIN "
+            "INSERT INTO inventoryitem_fts(rowid, name, vendor, sku) VALUES (new.id, new.name, new.vendor, new.sku); "
+            "END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS inventoryitem_fts_delete AFTER DELETE ON inventoryitem BEGIN "
+            "INSERT INTO inventoryitem_fts(inventoryitem_fts, rowid, name, vendor, sku) "
+            "VALUES ('delete', old.id, old.name, old.vendor, old.sku); "
+            "END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS inventoryitem_fts_update AFTER UPDATE ON inventoryitem BEGIN "
+            "INSERT INTO inventoryitem_fts(inventoryitem_fts, rowid, name, vendor, sku) "
+            "VALUES ('delete', old.id, old.name, old.vendor, old.sku); "
+            "INSERT INTO inventoryitem_fts(rowid, name, vendor, sku) VALUES (new.id, new.name, new.vendor, new.sku); "
+            "END"
+        )
+        op.execute("INSERT INTO inventoryitem_fts(inventoryitem_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_inventoryitem_search")
+        op.execute("DROP INDEX IF EXISTS ix_inventoryitem_sku_trgm")
+        op.execute("DROP INDEX IF EXISTS ix_inventoryitem_name_trgm")
+
+    elif dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS inventoryitem_fts_update")
+        op.execute("DROP TRIGGER IF EXISTS inventoryitem_fts_delete")
+        op.execute("DROP TRIGGER IF EXISTS inventoryitem_fts_insert")
+        op.execute("DROP TABLE IF EXISTS inventoryitem_fts")
@@ -0,0 +1,41 @@
+"""Add unique (vendor, sku) index for item imports
+
+Revision ID: add_item_vendor_sku_unique
+Revises: add_item_search_indexes
+Create Date: 2025-07-21 00:00:00.000000
+
+"""
+from alembic import op #type: ignore
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_item_vendor_sku_unique'
+down_revision = 'add_item_search_indexes'
+branch_labels = None
+depends_on = None
+
+# Must match VENDOR_SKU_INDEX in app/services/item_import.py
+VENDOR_SKU_INDEX = 'ux_inventoryitem_vendor_sku'
+
+
+def upgrade():
+    bind = op.get_bind()
+    duplicates = bind.execute(sa.text(
+        "SELECT vendor, sku, COUNT(*) FROM inventoryitem "
+        "WHERE vendor IS NOT NULL AND sku IS NOT NULL "
+        "GROUP BY vendor, sku HAVING COUNT(*) > 1 ORDER BY vendor, sku"
+    )).all()
+    if duplicates:
+        # Existing data is never rewritten here; item imports upsert with ON CONFLICT on this index
+        examples = ", ".join(f"({vendor!r}, {sku!r}) x{count}" for vendor, sku, count in duplicates[:5])
+        raise RuntimeError(
+            f"Cannot create {VENDOR_SKU_INDEX}: {len(duplicates)} (vendor, sku) pairs are shared by "
+            f"several items, e.g. {examples}. Merge or re-SKU those items, then run the upgrade again."
+        )
+
+    op.create_index(VENDOR_SKU_INDEX, 'inventoryitem', ['vendor', 'sku'], unique=True)
+
+
+def downgrade():
+    op.execute(f"DROP INDEX IF EXISTS {VENDOR_SKU_INDEX}")
@@ -0,0 +1,29 @@
+"""Add replica heartbeat table
+
+Revision ID: add_replica_heartbeat
+Revises: add_history_rollups
+Create Date: 2025-08-01 00:00:00.000000
+
+"""
+from alembic import op #type: ignore
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_replica_heartbeat'
+down_revision = 'add_history_rollups'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'replicaheartbeat',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('beat_at', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('replicaheartbeat')
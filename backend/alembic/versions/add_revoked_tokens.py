@@ -0,0 +1,32 @@
+"""Add revoked tokens shared by all workers
+
+Revision ID: add_revoked_tokens
+Revises: add_item_import_jobs
+Create Date: 2025-08-06 00:00:00.000000
+
+"""
+from alembic import op #type: ignore
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_revoked_tokens'
+down_revision = 'add_item_import_jobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'revokedtoken',
+        sa.Column('token_hash', sa.String(length=32), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('revoked_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('token_hash')
+    )
+    op.create_index('ix_revokedtoken_expires_at', 'revokedtoken', ['expires_at'])
+
+
+def downgrade():
+    op.drop_index('ix_revokedtoken_expires_at', table_name='revokedtoken')
+    op.drop_table('revokedtoken')
@@ -0,0 +1,35 @@
+"""Add per-table modification stamps for cached reference tables
+
+Revision ID: add_table_stamps
+Revises: add_idempotency_keys
+Create Date: 2025-08-04 00:00:00.000000
+
+"""
+from datetime import datetime
+
+from alembic import op #type: ignore
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_table_stamps'
+down_revision = 'add_idempotency_keys'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    stamps = op.create_table(
+        'tablestamp',
+        sa.Column('name', sa.String(length=32), nullable=False),
+        sa.Column('modified_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+    now = datetime.utcnow()
+    op.bulk_insert(stamps, [
+        {'name': name, 'modified_at': now} for name in ('categories', 'items', 'locations', 'roles')
+    ])
+
+
+def downgrade():
+    op.drop_table('tablestamp')
@@ -0,0 +1,25 @@
+"""Add per-user permissions version for token permission claims
+
+Revision ID: add_user_permissions_version
+Revises: add_revoked_tokens
+Create Date: 2025-08-07 00:00:00.000000
+
+"""
+from alembic import op #type: ignore
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_user_permissions_version'
+down_revision = 'add_revoked_tokens'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('user', sa.Column('permissions_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_column('permissions_version')
@@ -8,6 +8,9 @@ from .transfer import router as transfer_router
 from .schedule import router as schedule_router
 from .auth import router as auth_router
 from .rbac import router as rbac_router
+from .system import router as system_router
+from .audit import router as audit_router
+from .sync import router as sync_router
 
 all_routers = [
     auth_router,
@@ -20,4 +23,7 @@ all_routers = [
     count_router,
     transfer_router,
     schedule_router,
+    system_router,
+    audit_router,
+    sync_router,
 ] 
\ No newline at end of file
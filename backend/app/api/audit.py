@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlmodel import Session, select
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+from app.models.audit_log import AuditLog
+from app.schemas.audit_log import AuditLogRead
+from app.core.database import get_session
+from app.core.rbac import rbac_deps
+
+router = APIRouter(prefix="/audit-logs", tags=["Audit"])
+
+@router.get("/", response_model=List[AuditLogRead])
+def list_audit_logs(
+    user_id: Optional[int] = Query(None, description="Filter by user ID"),
+    action: Optional[str] = Query(None, description="Filter by action, e.g. user_login"),
+    since: Optional[datetime] = Query(None, description="Only events at or after this time (UTC)"),
+    until: Optional[datetime] = Query(None, description="Only events before this time (UTC)"),
+    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    limit: int = Query(100, ge=1, le=1000, description="Number of records to return"),
+    claims: Dict[str, Any] = Depends(rbac_deps.authorize("system:admin")),
+    session: Session = Depends(get_session)
+):
+    """List audit events, newest first.
+
+    Filtering by user or action with a time range is served by the
+    ``(user_id, created_at)`` and ``(action, created_at)`` indexes.
+    """
+    if since and until and since >= until:
+        raise HTTPException(status_code=400, detail="'since' must be earlier than 'until'")
+    query = select(AuditLog)
+    if user_id is not None:
+        query = query.where(AuditLog.user_id == user_id)
+    if action:
+        query = query.where(AuditLog.action == action)
+    if since:
+        query = query.where(AuditLog.created_at >= since)
+    if until:
+        query = query.where(AuditLog.created_at < until)
+    query = query.order_by(AuditLog.created_at.desc(), AuditLog.id.desc()).offset(skip).limit(limit)
+    return session.exec(query).all()
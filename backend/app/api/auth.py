@@ -1,4 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from starlette.concurrency import run_in_threadpool
 from sqlmodel import Session, select
 from typing import Optional
 from datetime import datetime, timedelta
@@ -8,7 +10,10 @@ from app.core.database import get_session
 from app.core.security import AuthenticationManager
 from app.core.config import settings
 from app.core.dependencies import get_current_user
+from app.core.principal import principal_cache
+from app.core.rbac import permission_claims
 from app.core.security_utils import SecurityUtils
+from app.core.audit import audit_writer
 from pydantic import BaseModel, Field
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
@@ -64,7 +69,7 @@ async def login(
         )
     
     # Verify password
-    if not auth_manager.verify_password(password, user.hashed_password):
+    if not await auth_manager.verify_password_async(password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid username or password"
@@ -77,10 +82,22 @@ async def login(
             detail="User account is inactive"
         )
     
+    # Upgrade hashes made with an older cost factor while the plaintext is at hand
+    if auth_manager.password_needs_rehash(user.hashed_password):
+        try:
+            user.hashed_password = await auth_manager.hash_password_async(password)
+            session.add(user)
+            # Off the event loop: a commit may queue for the SQLite writer and its group commit
+            await run_in_threadpool(session.commit)
+            session.refresh(user)
+        except HTTPException:
+            pass  # Pool is busy; the hash is upgraded on a later login
+    
     # Create tokens
     access_token_expires = timedelta(minutes=settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = auth_manager.create_access_token(
-        data={"sub": str(user.id), "username": user.username, "role_id": user.role_id},
+        data={"sub": str(user.id), "username": user.username, "role_id": user.role_id,
+              **permission_claims(user, session)},
         expires_delta=access_token_expires
     )
     refresh_token = auth_manager.create_refresh_token(
@@ -88,7 +105,7 @@ async def login(
     )
     
     # Create audit log
-    SecurityUtils.create_audit_log(
+    await audit_writer.record_async(
         action="user_login",
         user_id=user.id,
         details={
@@ -141,7 +158,7 @@ async def register(
         )
     
     # Hash password using enhanced security
-    hashed_password = auth_manager.hash_password(password)
+    hashed_password = await auth_manager.hash_password_async(password)
     
     # Create user
     user = User(
@@ -153,13 +170,14 @@ async def register(
     )
     
     session.add(user)
-    session.commit()
+    await run_in_threadpool(session.commit)
     session.refresh(user)
     
     # Create tokens
     access_token_expires = timedelta(minutes=settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = auth_manager.create_access_token(
-        data={"sub": str(user.id), "username": user.username, "role_id": user.role_id},
+        data={"sub": str(user.id), "username": user.username, "role_id": user.role_id,
+              **permission_claims(user, session)},
         expires_delta=access_token_expires
     )
     refresh_token = auth_manager.create_refresh_token(
@@ -167,7 +185,7 @@ async def register(
     )
     
     # Create audit log
-    SecurityUtils.create_audit_log(
+    await audit_writer.record_async(
         action="user_registered",
         user_id=user.id,
         details={
@@ -227,12 +245,13 @@ async def refresh_token(
     # Create new access token
     access_token_expires = timedelta(minutes=settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = auth_manager.create_access_token(
-        data={"sub": str(user.id), "username": user.username, "role_id": user.role_id},
+        data={"sub": str(user.id), "username": user.username, "role_id": user.role_id,
+              **permission_claims(user, session)},
         expires_delta=access_token_expires
     )
     
     # Create audit log
-    SecurityUtils.create_audit_log(
+    await audit_writer.record_async(
         action="token_refreshed",
         user_id=user.id,
         details={
@@ -253,12 +272,17 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
 
 
 @router.post("/logout")
-async def logout():
-    """Logout user (client-side token removal)."""
+async def logout(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False))
+):
+    """Logout user, revoking the presented access token."""
+    # Revoking writes to the database
+    payload = await run_in_threadpool(auth_manager.revoke_token, credentials.credentials) if credentials else None
+    
     # Create audit log
-    SecurityUtils.create_audit_log(
+    await audit_writer.record_async(
         action="user_logout",
-        user_id=None,  # Will be set by middleware if available
+        user_id=payload.get("sub") if payload else None,
         details={}
     )
     
@@ -278,7 +302,7 @@ async def change_password(
 ):
     """Change user password."""
     # Verify current password
-    if not auth_manager.verify_password(password_request.current_password, current_user.hashed_password):
+    if not await auth_manager.verify_password_async(password_request.current_password, current_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Current password is incorrect"
@@ -293,15 +317,16 @@ async def change_password(
         )
     
     # Hash new password
-    new_hashed_password = auth_manager.hash_password(password_request.new_password)
+    new_hashed_password = await auth_manager.hash_password_async(password_request.new_password)
     
     # Update user password
     current_user.hashed_password = new_hashed_password
     session.add(current_user)
-    session.commit()
+    await run_in_threadpool(session.commit)
+    principal_cache.invalidate(current_user.id)
     
     # Create audit log
-    SecurityUtils.create_audit_log(
+    await audit_writer.record_async(
         action="password_changed",
         user_id=current_user.id,
         details={
@@ -351,11 +376,12 @@ async def update_profile(
         current_user.is_active = profile_request.is_active
     
     session.add(current_user)
-    session.commit()
+    await run_in_threadpool(session.commit)
     session.refresh(current_user)
+    principal_cache.invalidate(current_user.id)
     
     # Create audit log
-    SecurityUtils.create_audit_log(
+    await audit_writer.record_async(
         action="profile_updated",
         user_id=current_user.id,
         details={
@@ -1,26 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from datetime import datetime
 from sqlmodel import Session, select
+from sqlalchemy import func
 from typing import List, Optional
 from app.models.category import Category
 from app.schemas.category import CategoryRead, CategoryCreate, CategoryUpdate
 from app.core.database import get_session
+from app.core.cache import catalog_cache, CATEGORIES
+from app.core.http_cache import conditional_get, CACHE_POLICY_CATEGORIES
 
 router = APIRouter(prefix="/categories", tags=["Categories"])
 
 @router.get("/", response_model=List[CategoryRead])
 def list_categories(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Number of records to return"),
     search: Optional[str] = Query(None, description="Search term for category name"),
     session: Session = Depends(get_session)
 ):
     """List categories with pagination and search."""
+    snapshot = catalog_cache.get(CATEGORIES, session)
+    not_modified = conditional_get(request, response, snapshot.etag, snapshot.last_modified, CACHE_POLICY_CATEGORIES)
+    if not_modified:
+        return not_modified
+    
+    if not search:
+        return snapshot.rows[skip:skip + limit]
+    
     query = select(Category)
     
-    # Add search filter if provided (simplified for now)
+    # Case-insensitive substring match; the category list is small enough to scan
     if search:
-        # For now, just filter by exact name match
-        query = query.where(Category.name == search)
+        query = query.where(func.lower(Category.name).contains(search.strip().lower(), autoescape=True))
+        query = query.order_by(Category.name)
     
     # Add pagination
     query = query.offset(skip).limit(limit)
@@ -28,11 +42,15 @@ def list_categories(
     return session.exec(query).all()
 
 @router.get("/{category_id}", response_model=CategoryRead)
-def get_category(category_id: int, session: Session = Depends(get_session)):
-    category = session.get(Category, category_id)
+def get_category(category_id: int, request: Request, response: Response, session: Session = Depends(get_session)):
+    category = catalog_cache.get_by_id(CATEGORIES, category_id, session)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
-    return category
+    not_modified = conditional_get(
+        request, response, f"category-{category.id}-{category.updated_at.isoformat()}",
+        category.updated_at, CACHE_POLICY_CATEGORIES
+    )
+    return not_modified or category
 
 @router.post("/", response_model=CategoryRead, status_code=status.HTTP_201_CREATED)
 def create_category(category: CategoryCreate, session: Session = Depends(get_session)):
@@ -50,6 +68,7 @@ def create_category(category: CategoryCreate, session: Session = Depends(get_ses
     session.add(db_category)
     session.commit()
     session.refresh(db_category)
+    catalog_cache.invalidate(CATEGORIES)
     return db_category
 
 @router.put("/{category_id}", response_model=CategoryRead)
@@ -72,9 +91,11 @@ def update_category(category_id: int, category: CategoryUpdate, session: Session
     category_data = category.dict(exclude_unset=True)
     for key, value in category_data.items():
         setattr(db_category, key, value)
+    db_category.updated_at = datetime.utcnow()
     session.add(db_category)
     session.commit()
     session.refresh(db_category)
+    catalog_cache.invalidate(CATEGORIES)
     return db_category
 
 @router.delete("/{category_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -84,4 +105,5 @@ def delete_category(category_id: int, session: Session = Depends(get_session)):
         raise HTTPException(status_code=404, detail="Category not found")
     session.delete(db_category)
     session.commit()
+    catalog_cache.invalidate(CATEGORIES)
     return None 
\ No newline at end of file
@@ -1,44 +1,122 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy.orm import selectinload
 from sqlmodel import Session, select
-from typing import List, Optional
-from datetime import date
+from typing import FrozenSet, List, Optional
+from datetime import date, datetime, time, timedelta
+from types import SimpleNamespace
 from app.models.count import Count
-from app.schemas.count import CountRead, CountCreate, CountUpdate
+from app.models.inventory_item import InventoryItem
+from app.models.location import Location
+from app.models.user import User
+from app.schemas.count import CountRead, CountReadExpanded, CountCreate, CountUpdate
 from app.core.database import get_session
+from app.core.dependencies import expand_relations
+from app.core.serialization import row_serializer, trusted_response
+from app.services.archive import COUNTS, history_archive, merge_archived
 
 router = APIRouter(prefix="/counts", tags=["Counts"])
 
-@router.get("/", response_model=List[CountRead])
+def expand_options(expand: FrozenSet[str]) -> list:
+    """Eager-load options for the requested relations, one SELECT ... IN per relation."""
+    options = []
+    if "item" in expand:
+        item_option = selectinload(Count.item)
+        if "category" in expand:
+            item_option = item_option.selectinload(InventoryItem.category)
+        options.append(item_option)
+    if "location" in expand:
+        options.append(selectinload(Count.location))
+    if "user" in expand:
+        options.append(selectinload(Count.user))
+    return options
+
+def count_rows(expand: FrozenSet[str]):
+    """Select whole ``Count`` objects when relations are embedded, otherwise just the read columns."""
+    if expand:
+        return select(Count).options(*expand_options(expand))
+    return select(*(getattr(Count, name) for name in CountRead.__fields__))
+
+def expand_archived(session: Session, rows: list, expand: FrozenSet[str]) -> None:
+    """Attach the requested relations to archived counts, one SELECT ... IN per relation."""
+    relations = []
+    if "item" in expand:
+        item_query = select(InventoryItem)
+        if "category" in expand:
+            item_query = item_query.options(selectinload(InventoryItem.category))
+        relations.append(("item", "item_id", InventoryItem, item_query))
+    if "location" in expand:
+        relations.append(("location", "location_id", Location, select(Location)))
+    if "user" in expand:
+        relations.append(("user", "user_id", User, select(User)))
+    for name, key, model, query in relations:
+        loaded = {obj.id: obj for obj in session.exec(query.where(model.id.in_({getattr(row, key) for row in rows})))}
+        for row in rows:
+            setattr(row, name, loaded.get(getattr(row, key)))
+
+@router.get("/", response_model=List[CountReadExpanded], response_model_exclude_unset=True)
 def list_counts(
+    response: Response,
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Number of records to return"),
     user_id: Optional[int] = Query(None, description="Filter by user ID"),
     item_id: Optional[int] = Query(None, description="Filter by inventory item ID"),
+    location_id: Optional[int] = Query(None, description="Filter by location ID"),
     count_date: Optional[str] = Query(None, description="Filter by count date (YYYY-MM-DD)"),
+    since: Optional[datetime] = Query(None, description="Counts made at or after this time"),
+    until: Optional[datetime] = Query(None, description="Counts made before this time"),
+    expand: FrozenSet[str] = Depends(expand_relations("category", "item", "location", "user")),
     session: Session = Depends(get_session)
 ):
-    """List counts with pagination and filtering."""
-    query = select(Count)
+    """List counts with pagination and filtering.
+
+    ``expand`` embeds related records using a fixed number of queries whatever
+    the page size; ``category`` is embedded inside ``item`` and implies it.
+    Filtering by date (``count_date``, ``since``, ``until``) returns counts
+    newest first and includes counts already moved to the history archive.
+    """
+    if "category" in expand:
+        expand = expand | {"item"}
+    query = count_rows(expand)
     
     # Add filters if provided
     if user_id is not None:
         query = query.where(Count.user_id == user_id)
     if item_id is not None:
         query = query.where(Count.item_id == item_id)
+    if location_id is not None:
+        query = query.where(Count.location_id == location_id)
     if count_date:
         try:
-            # Convert date string to date object for comparison
             target_date = date.fromisoformat(count_date)
-            # Filter by date (simplified - just check if counted_at starts with the date)
-            # In a real implementation, you'd want to use proper date comparison
-            pass  # For now, we'll skip date filtering to avoid complexity
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+        since = max(since, datetime.combine(target_date, time.min)) if since else datetime.combine(target_date, time.min)
+        day_end = datetime.combine(target_date + timedelta(days=1), time.min)
+        until = min(until, day_end) if until else day_end
+    if since is not None:
+        query = query.where(Count.counted_at >= since)
+    if until is not None:
+        query = query.where(Count.counted_at < until)
+    dated = since is not None or until is not None
+    if dated:
+        query = query.order_by(Count.counted_at.desc(), Count.id.desc())
     
-    # Add pagination
-    query = query.offset(skip).limit(limit)
+    # Archived counts may interleave with live ones, so merge both in order before paging
+    if dated and history_archive.has_files(COUNTS, location_id=location_id, since=since, until=until):
+        live = list(session.exec(query.limit(skip + limit)).all())
+        archived = history_archive.read(
+            COUNTS, location_id=location_id, since=since, until=until, user_id=user_id, item_id=item_id
+        )
+        still_live = lambda ids: session.exec(select(Count.id).where(Count.id.in_(ids))).all()
+        rows = merge_archived(COUNTS, live, archived, skip + limit, still_live)[skip:]
+        if expand:
+            expand_archived(session, [row for row in rows if isinstance(row, SimpleNamespace)], expand)
+    else:
+        rows = list(session.exec(query.offset(skip).limit(limit)).all())
     
-    return session.exec(query).all()
+    # Rows come from our own table and archive, so skip response_model validation
+    serializer = row_serializer(CountReadExpanded, expand)
+    return trusted_response(serializer.many(rows), response)
 
 @router.get("/{count_id}", response_model=CountRead)
 def get_count(count_id: int, session: Session = Depends(get_session)):
@@ -1,47 +1,144 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlmodel import Session, select
-from typing import List, Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, status, Query, Request, Response, UploadFile
+from datetime import datetime
+from sqlmodel import Session
+from typing import FrozenSet, Iterable, List, Optional, Tuple
 from app.models.inventory_item import InventoryItem
-from app.schemas.inventory_item import InventoryItemRead, InventoryItemCreate, InventoryItemUpdate
+from app.schemas.category import CategoryRead
+from app.schemas.inventory_item import (
+    InventoryItemRead, InventoryItemReadExpanded, InventoryItemCreate, InventoryItemUpdate, ItemImportJobRead
+)
 from app.core.database import get_session
+from app.core.dependencies import expand_relations
+from app.core.cache import catalog_cache, CATEGORIES, ITEMS, TableSnapshot
+from app.core.http_cache import conditional_get, CACHE_POLICY_ITEMS
+from app.core.serialization import row_serializer, trusted_response
+from app.services.search import item_search
+from app.services.item_import import item_import, ItemImportError, ImportFileTooLarge
 
 router = APIRouter(prefix="/items", tags=["Inventory Items"])
 
-@router.get("/", response_model=List[InventoryItemRead])
+def expand_items(items: Iterable, expand: FrozenSet[str], session: Session) -> List[dict]:
+    """Build item responses with the requested relations embedded.
+
+    Categories come from the catalog cache, so embedding them costs no queries
+    and never lazy-loads ``InventoryItem.category`` row by row. Rows are
+    trusted, so they are converted straight to dicts without validation.
+    """
+    categories = catalog_cache.get(CATEGORIES, session).by_id if "category" in expand else None
+    item_fields, category_fields = row_serializer(InventoryItemRead), row_serializer(CategoryRead)
+    results = []
+    for item in items:
+        data = item_fields.to_dict(item)
+        if categories is not None:
+            category = categories.get(item.category_id)
+            data["category"] = category_fields.to_dict(category) if category else None
+        results.append(data)
+    return results
+
+def item_validators(snapshot: TableSnapshot, expand: FrozenSet[str], session: Session) -> Tuple[str, Optional[datetime]]:
+    """Combine the item snapshot validators with those of any embedded table."""
+    if "category" not in expand:
+        return snapshot.etag, snapshot.last_modified
+    categories = catalog_cache.get(CATEGORIES, session)
+    stamps = [stamp for stamp in (snapshot.last_modified, categories.last_modified) if stamp]
+    return f"{snapshot.etag}|{categories.etag}", max(stamps, default=None)
+
+@router.get("/", response_model=List[InventoryItemReadExpanded], response_model_exclude_unset=True)
 def list_items(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Number of records to return"),
     category_id: Optional[int] = Query(None, description="Filter by category ID"),
-    search: Optional[str] = Query(None, description="Search term for item name"),
+    search: Optional[str] = Query(None, description="Search term for item name, vendor or SKU"),
+    expand: FrozenSet[str] = Depends(expand_relations("category")),
     session: Session = Depends(get_session)
 ):
     """List inventory items with pagination and filtering."""
-    query = select(InventoryItem)
+    snapshot = catalog_cache.get(ITEMS, session)
+    tag, last_modified = item_validators(snapshot, expand, session)
+    not_modified = conditional_get(request, response, tag, last_modified, CACHE_POLICY_ITEMS)
+    if not_modified:
+        return not_modified
+    
+    # Search results are ranked by relevance instead of insertion order
+    if search:
+        items = item_search.search(session, search, skip=skip, limit=limit, category_id=category_id)
+        return trusted_response(expand_items(items, expand, session), response)
+    
+    items = snapshot.rows
     
     # Add filters if provided
     if category_id is not None:
-        query = query.where(InventoryItem.category_id == category_id)
-    if search:
-        # For now, just filter by exact name match
-        query = query.where(InventoryItem.name == search)
+        items = [item for item in items if item.category_id == category_id]
     
     # Add pagination
-    query = query.offset(skip).limit(limit)
+    items = items[skip:skip + limit]
+    return trusted_response(expand_items(items, expand, session), response)
+
+@router.get("/search", response_model=List[InventoryItemReadExpanded], response_model_exclude_unset=True)
+def search_items(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=100, description="Search term (prefixes match as you type)"),
+    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    limit: int = Query(10, ge=1, le=100, description="Number of records to return"),
+    category_id: Optional[int] = Query(None, description="Filter by category ID"),
+    expand: FrozenSet[str] = Depends(expand_relations("category")),
+    session: Session = Depends(get_session)
+):
+    """Typeahead search over item name, vendor and SKU, best matches first."""
+    snapshot = catalog_cache.get(ITEMS, session)
+    tag, last_modified = item_validators(snapshot, expand, session)
+    not_modified = conditional_get(request, response, tag, last_modified, CACHE_POLICY_ITEMS)
+    if not_modified:
+        return not_modified
+    items = item_search.search(session, q, skip=skip, limit=limit, category_id=category_id)
+    return trusted_response(expand_items(items, expand, session), response)
+
+@router.post("/import", response_model=ItemImportJobRead, status_code=status.HTTP_202_ACCEPTED)
+def import_items(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(..., description="CSV or XLSX item master"),
+    session: Session = Depends(get_session)
+):
+    """Bulk create or update items from a CSV/XLSX file, matched by vendor and SKU.
+
+    The file is processed in the background; poll ``GET /items/import/{job_id}``
+    for progress and row errors.
+    """
+    try:
+        path = item_import.save_upload(file.file, file.filename)
+    except ImportFileTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except ItemImportError as e:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(e))
     
-    return session.exec(query).all()
+    job = item_import.create_job(session, file.filename)
+    background_tasks.add_task(item_import.run, job, path, session.get_bind())
+    return job
+
+@router.get("/import/{job_id}", response_model=ItemImportJobRead)
+def get_import_job(job_id: str, session: Session = Depends(get_session)):
+    job = item_import.get_job(session, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
 
 @router.get("/{item_id}", response_model=InventoryItemRead)
-def get_item(item_id: int, session: Session = Depends(get_session)):
-    item = session.get(InventoryItem, item_id)
+def get_item(item_id: int, request: Request, response: Response, session: Session = Depends(get_session)):
+    item = catalog_cache.get_by_id(ITEMS, item_id, session)
     if not item:
         raise HTTPException(status_code=404, detail="Inventory item not found")
-    return item
+    not_modified = conditional_get(
+        request, response, f"item-{item.id}-{item.updated_at.isoformat()}", item.updated_at, CACHE_POLICY_ITEMS
+    )
+    return not_modified or item
 
 @router.post("/", response_model=InventoryItemRead, status_code=status.HTTP_201_CREATED)
 def create_item(item: InventoryItemCreate, session: Session = Depends(get_session)):
     # Check if category exists
-    from app.models.category import Category
-    category = session.get(Category, item.category_id)
+    category = catalog_cache.get_by_id(CATEGORIES, item.category_id, session)
     if not category:
         raise HTTPException(status_code=422, detail="Category not found")
     
@@ -49,6 +146,8 @@ def create_item(item: InventoryItemCreate, session: Session = Depends(get_sessio
     session.add(db_item)
     session.commit()
     session.refresh(db_item)
+    item_search.invalidate()
+    catalog_cache.invalidate(ITEMS)
     return db_item
 
 @router.put("/{item_id}", response_model=InventoryItemRead)
@@ -59,17 +158,19 @@ def update_item(item_id: int, item: InventoryItemUpdate, session: Session = Depe
     
     # Check if category exists if category_id is being updated
     if item.category_id is not None:
-        from app.models.category import Category
-        category = session.get(Category, item.category_id)
+        category = catalog_cache.get_by_id(CATEGORIES, item.category_id, session)
         if not category:
             raise HTTPException(status_code=422, detail="Category not found")
     
     item_data = item.dict(exclude_unset=True)
     for key, value in item_data.items():
         setattr(db_item, key, value)
+    db_item.updated_at = datetime.utcnow()
     session.add(db_item)
     session.commit()
     session.refresh(db_item)
+    item_search.invalidate()
+    catalog_cache.invalidate(ITEMS)
     return db_item
 
 @router.delete("/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -79,4 +180,6 @@ def delete_item(item_id: int, session: Session = Depends(get_session)):
         raise HTTPException(status_code=404, detail="Inventory item not found")
     session.delete(db_item)
     session.commit()
+    item_search.invalidate()
+    catalog_cache.invalidate(ITEMS)
     return None 
\ No newline at end of file
@@ -1,22 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
+from datetime import datetime
+from sqlmodel import Session
 from typing import List
 from app.models.location import Location
 from app.schemas.location import LocationRead, LocationCreate, LocationUpdate
 from app.core.database import get_session
+from app.core.cache import catalog_cache, LOCATIONS
+from app.core.http_cache import conditional_get, CACHE_POLICY_LOCATIONS
 
 router = APIRouter(prefix="/locations", tags=["Locations"])
 
 @router.get("/", response_model=List[LocationRead])
-def list_locations(session: Session = Depends(get_session)):
-    return session.exec(select(Location)).all()
+def list_locations(request: Request, response: Response, session: Session = Depends(get_session)):
+    snapshot = catalog_cache.get(LOCATIONS, session)
+    not_modified = conditional_get(request, response, snapshot.etag, snapshot.last_modified, CACHE_POLICY_LOCATIONS)
+    return not_modified or snapshot.rows
 
 @router.get("/{location_id}", response_model=LocationRead)
-def get_location(location_id: int, session: Session = Depends(get_session)):
-    location = session.get(Location, location_id)
+def get_location(location_id: int, request: Request, response: Response, session: Session = Depends(get_session)):
+    location = catalog_cache.get_by_id(LOCATIONS, location_id, session)
     if not location:
         raise HTTPException(status_code=404, detail="Location not found")
-    return location
+    not_modified = conditional_get(
+        request, response, f"location-{location.id}-{location.updated_at.isoformat()}",
+        location.updated_at, CACHE_POLICY_LOCATIONS
+    )
+    return not_modified or location
 
 @router.post("/", response_model=LocationRead, status_code=status.HTTP_201_CREATED)
 def create_location(location: LocationCreate, session: Session = Depends(get_session)):
@@ -24,6 +33,7 @@ def create_location(location: LocationCreate, session: Session = Depends(get_ses
     session.add(db_location)
     session.commit()
     session.refresh(db_location)
+    catalog_cache.invalidate(LOCATIONS)
     return db_location
 
 @router.put("/{location_id}", response_model=LocationRead)
@@ -34,9 +44,11 @@ def update_location(location_id: int, location: LocationUpdate, session: Session
     location_data = location.dict(exclude_unset=True)
     for key, value in location_data.items():
         setattr(db_location, key, value)
+    db_location.updated_at = datetime.utcnow()
     session.add(db_location)
     session.commit()
     session.refresh(db_location)
+    catalog_cache.invalidate(LOCATIONS)
     return db_location
 
 @router.delete("/{location_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -46,4 +58,5 @@ def delete_location(location_id: int, session: Session = Depends(get_session)):
         raise HTTPException(status_code=404, detail="Location not found")
     session.delete(db_location)
     session.commit()
+    catalog_cache.invalidate(LOCATIONS)
     return None 
\ No newline at end of file
@@ -1,12 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlmodel import Session, select
-from typing import List, Dict, Set
+from typing import Any, List, Dict, Set
 from app.models.user import User
 from app.models.role import Role
 from app.schemas.role import RoleCreate, RoleUpdate, RoleRead
 from app.core.database import get_session
-from app.core.rbac import RolePermissions, RBACMiddleware, rbac_deps
+from app.core.cache import catalog_cache, ROLES
+from app.core.rbac import RolePermissions, RBACMiddleware, bump_permissions_version, rbac_deps
 from app.core.dependencies import get_current_user
+from app.core.principal import principal_cache
 from pydantic import BaseModel
 from datetime import datetime
 
@@ -34,7 +36,7 @@ class UserRoleInfo(BaseModel):
 
 @router.get("/permissions", response_model=List[PermissionInfo])
 async def get_all_permissions(
-    current_user: User = Depends(rbac_deps.require_permission("roles:read"))
+    claims: Dict[str, Any] = Depends(rbac_deps.authorize("roles:read"))
 ):
     """Get all available permissions in the system."""
     permissions = []
@@ -48,7 +50,7 @@ async def get_all_permissions(
 
 @router.get("/roles", response_model=List[RoleInfo])
 async def get_all_roles(
-    current_user: User = Depends(rbac_deps.require_permission("roles:read")),
+    claims: Dict[str, Any] = Depends(rbac_deps.authorize("roles:read")),
     session: Session = Depends(get_session)
 ):
     """Get all roles with their permissions."""
@@ -69,7 +71,7 @@ async def get_all_roles(
 @router.get("/roles/{role_name}", response_model=RoleInfo)
 async def get_role_info(
     role_name: str,
-    current_user: User = Depends(rbac_deps.require_permission("roles:read"))
+    claims: Dict[str, Any] = Depends(rbac_deps.authorize("roles:read"))
 ):
     """Get information about a specific role."""
     if role_name not in RolePermissions.ROLE_PERMISSIONS:
@@ -89,7 +91,7 @@ async def get_role_info(
 @router.get("/users/{user_id}/permissions", response_model=List[str])
 async def get_user_permissions(
     user_id: int,
-    current_user: User = Depends(rbac_deps.require_permission("users:read")),
+    claims: Dict[str, Any] = Depends(rbac_deps.authorize("users:read")),
     session: Session = Depends(get_session)
 ):
     """Get all permissions for a specific user."""
@@ -107,7 +109,7 @@ async def get_user_permissions(
 @router.get("/users/{user_id}/role", response_model=UserRoleInfo)
 async def get_user_role_info(
     user_id: int,
-    current_user: User = Depends(rbac_deps.require_permission("users:read")),
+    claims: Dict[str, Any] = Depends(rbac_deps.authorize("users:read")),
     session: Session = Depends(get_session)
 ):
     """Get role information for a specific user."""
@@ -120,7 +122,7 @@ async def get_user_role_info(
     
     role = None
     if user.role_id:
-        role = session.get(Role, user.role_id)
+        role = catalog_cache.get_by_id(ROLES, user.role_id, session)
     
     permissions = rbac.get_user_permissions(user, session)
     
@@ -163,13 +165,16 @@ async def assign_role_to_user(
         session.add(role)
         session.commit()
         session.refresh(role)
+        catalog_cache.invalidate(ROLES)
     
     # Assign role to user
+    bump_permissions_version(user)
     user.role_id = role.id
     user.updated_at = datetime.utcnow()
     
     session.add(user)
     session.commit()
+    principal_cache.invalidate(user_id)
     
     return {"message": f"Role '{role_name}' assigned to user '{user.username}'"}
 
@@ -188,11 +193,13 @@ async def remove_role_from_user(
             detail="User not found"
         )
     
+    bump_permissions_version(user)
     user.role_id = None
     user.updated_at = datetime.utcnow()
     
     session.add(user)
     session.commit()
+    principal_cache.invalidate(user_id)
     
     return {"message": f"Role removed from user '{user.username}'"}
 
@@ -215,7 +222,7 @@ async def get_my_role_info(
     """Get current user's role information."""
     role = None
     if current_user.role_id:
-        role = session.get(Role, current_user.role_id)
+        role = catalog_cache.get_by_id(ROLES, current_user.role_id, session)
     
     permissions = rbac.get_user_permissions(current_user, session)
     
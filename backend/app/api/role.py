@@ -1,19 +1,23 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select
+from sqlmodel import Session
 from typing import List
+from datetime import datetime
 from app.models.role import Role
 from app.schemas.role import RoleRead, RoleCreate, RoleUpdate
 from app.core.database import get_session
+from app.core.cache import catalog_cache, ROLES
+from app.core.principal import principal_cache
+from app.core.rbac import bump_role_members
 
 router = APIRouter(prefix="/roles", tags=["Roles"])
 
 @router.get("/", response_model=List[RoleRead])
 def list_roles(session: Session = Depends(get_session)):
-    return session.exec(select(Role)).all()
+    return catalog_cache.get(ROLES, session).rows
 
 @router.get("/{role_id}", response_model=RoleRead)
 def get_role(role_id: int, session: Session = Depends(get_session)):
-    role = session.get(Role, role_id)
+    role = catalog_cache.get_by_id(ROLES, role_id, session)
     if not role:
         raise HTTPException(status_code=404, detail="Role not found")
     return role
@@ -24,6 +28,7 @@ def create_role(role: RoleCreate, session: Session = Depends(get_session)):
     session.add(db_role)
     session.commit()
     session.refresh(db_role)
+    catalog_cache.invalidate(ROLES)
     return db_role
 
 @router.put("/{role_id}", response_model=RoleRead)
@@ -32,11 +37,17 @@ def update_role(role_id: int, role: RoleUpdate, session: Session = Depends(get_s
     if not db_role:
         raise HTTPException(status_code=404, detail="Role not found")
     role_data = role.dict(exclude_unset=True)
+    # Permissions follow the role name, so a rename changes every member's access
+    if role_data.get("name", db_role.name) != db_role.name:
+        bump_role_members(session, role_id)
     for key, value in role_data.items():
         setattr(db_role, key, value)
+    db_role.updated_at = datetime.utcnow()
     session.add(db_role)
     session.commit()
     session.refresh(db_role)
+    catalog_cache.invalidate(ROLES)
+    principal_cache.clear()
     return db_role
 
 @router.delete("/{role_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -44,6 +55,9 @@ def delete_role(role_id: int, session: Session = Depends(get_session)):
     db_role = session.get(Role, role_id)
     if not db_role:
         raise HTTPException(status_code=404, detail="Role not found")
+    bump_role_members(session, role_id)
     session.delete(db_role)
     session.commit()
+    catalog_cache.invalidate(ROLES)
+    principal_cache.clear()
     return None 
\ No newline at end of file
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends, Query, Response
+from sqlmodel import Session
+from typing import Optional
+from app.core.database import get_session
+from app.core.serialization import trusted_response
+from app.services.sync import changes_since
+
+router = APIRouter(prefix="/sync", tags=["Sync"])
+
+@router.get("/")
+def sync_changes(
+    response: Response,
+    since: int = Query(0, ge=0, description="The 'next' cursor of the previous sync; 0 for everything"),
+    location_id: Optional[int] = Query(None, description="Only changes for this location, plus catalog changes"),
+    limit: int = Query(1000, ge=1, le=5000, description="Most changes and tombstones per page"),
+    session: Session = Depends(get_session)
+):
+    """Items, categories, counts, transfers and schedules changed after ``since``.
+
+    Each row appears once, with its current data or as a tombstone if it was
+    deleted. Store ``next`` once the page is applied and request again while
+    ``has_more`` is true. ``reset`` means the cursor is unknown to this
+    database and the client must discard its copy and sync from 0.
+    """
+    return trusted_response(changes_since(session, since, location_id, limit), response)
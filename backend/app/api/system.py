@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, Query
+from typing import Any, Dict, Optional
+from app.core.audit import audit_writer
+from app.core.cache import catalog_cache
+from app.core.password_pool import password_hasher
+from app.core.pool_monitor import pool_monitor
+from app.core.principal import principal_cache
+from app.core.rbac import rbac_deps
+from app.core.token_cache import token_cache
+
+router = APIRouter(prefix="/system", tags=["System"])
+
+
+@router.get("/cache-stats")
+async def get_cache_stats(
+    claims: Dict[str, Any] = Depends(rbac_deps.authorize("system:admin"))
+) -> Dict[str, Any]:
+    """Hit/miss counters for the in-process caches and pools of this worker."""
+    return {
+        "catalog": catalog_cache.stats(),
+        "tokens": token_cache.stats(),
+        "principals": principal_cache.stats(),
+        "password_pool": password_hasher.stats(),
+        "audit": audit_writer.stats(),
+    }
+
+
+@router.get("/db-pool")
+async def get_db_pool_stats(
+    held_over: Optional[float] = Query(None, ge=0, description="List connections held at least this many seconds (default: the leak threshold)"),
+    claims: Dict[str, Any] = Depends(rbac_deps.authorize("system:admin"))
+) -> Dict[str, Any]:
+    """Connection pool configuration, usage, wait times and long-held connections of this worker."""
+    return pool_monitor.stats(min_held_seconds=held_over)
@@ -1,15 +1,52 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlmodel import Session, select
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 from app.models.transfer import Transfer
 from app.schemas.transfer import TransferRead, TransferCreate, TransferUpdate
 from app.core.database import get_session
+from app.services.archive import TRANSFERS, history_archive, merge_archived
 
 router = APIRouter(prefix="/transfers", tags=["Transfers"])
 
 @router.get("/", response_model=List[TransferRead])
-def list_transfers(session: Session = Depends(get_session)):
-    return session.exec(select(Transfer)).all()
+def list_transfers(
+    from_location_id: Optional[int] = Query(None, description="Filter by sending location ID"),
+    to_location_id: Optional[int] = Query(None, description="Filter by receiving location ID"),
+    item_id: Optional[int] = Query(None, description="Filter by inventory item ID"),
+    since: Optional[datetime] = Query(None, description="Transfers made at or after this time"),
+    until: Optional[datetime] = Query(None, description="Transfers made before this time"),
+    session: Session = Depends(get_session)
+):
+    """List transfers.
+
+    Filtering by ``since`` or ``until`` returns transfers newest first and
+    includes transfers already moved to the history archive.
+    """
+    query = select(Transfer)
+    if from_location_id is not None:
+        query = query.where(Transfer.from_location_id == from_location_id)
+    if to_location_id is not None:
+        query = query.where(Transfer.to_location_id == to_location_id)
+    if item_id is not None:
+        query = query.where(Transfer.item_id == item_id)
+    if since is not None:
+        query = query.where(Transfer.transferred_at >= since)
+    if until is not None:
+        query = query.where(Transfer.transferred_at < until)
+    if since is None and until is None:
+        return session.exec(query).all()
+
+    transfers = list(session.exec(query.order_by(Transfer.transferred_at.desc(), Transfer.id.desc())).all())
+    archived = history_archive.read(
+        TRANSFERS, location_id=from_location_id, since=since, until=until,
+        to_location_id=to_location_id, item_id=item_id,
+    )
+    if not archived:
+        return transfers
+    # Archived transfers may interleave with live ones
+    still_live = lambda ids: session.exec(select(Transfer.id).where(Transfer.id.in_(ids))).all()
+    return merge_archived(TRANSFERS, transfers, archived, len(transfers) + len(archived), still_live)
 
 @router.get("/{transfer_id}", response_model=TransferRead)
 def get_transfer(transfer_id: int, session: Session = Depends(get_session)):
@@ -1,16 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlmodel import Session, select
-from typing import List
+from typing import Any, Dict, List
 from app.models.user import User
 from app.schemas.user import UserRead, UserCreate, UserUpdate
 from app.core.database import get_session
-from app.core.rbac import rbac_deps
+from app.core.rbac import bump_permissions_version, rbac_deps
+from app.core.principal import principal_cache
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
 @router.get("/", response_model=List[UserRead])
 def list_users(
-    current_user: User = Depends(rbac_deps.require_permission("users:read")),
+    claims: Dict[str, Any] = Depends(rbac_deps.authorize("users:read")),
     session: Session = Depends(get_session)
 ):
     return session.exec(select(User)).all()
@@ -18,7 +19,7 @@ def list_users(
 @router.get("/{user_id}", response_model=UserRead)
 def get_user(
     user_id: int,
-    current_user: User = Depends(rbac_deps.require_permission("users:read")),
+    claims: Dict[str, Any] = Depends(rbac_deps.authorize("users:read")),
     session: Session = Depends(get_session)
 ):
     user = session.get(User, user_id)
@@ -72,12 +73,17 @@ def update_user(
         user_data['hashed_password'] = hashed_password
         del user_data['password']
     
+    # Tokens carrying this user's permissions must be refreshed when access changes
+    if "role_id" in user_data or "is_active" in user_data:
+        bump_permissions_version(db_user)
+    
     for key, value in user_data.items():
         setattr(db_user, key, value)
     
     session.add(db_user)
     session.commit()
     session.refresh(db_user)
+    principal_cache.invalidate(user_id)
     return db_user
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -91,4 +97,5 @@ def delete_user(
         raise HTTPException(status_code=404, detail="User not found")
     session.delete(db_user)
     session.commit()
+    principal_cache.invalidate(user_id)
     return None 
\ No newline at end of file
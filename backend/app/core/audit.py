@@ -0,0 +1,199 @@
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy.engine import Engine
+from starlette.concurrency import run_in_threadpool
+
+from .config import settings
+from .logging import get_correlation_id, get_logger
+from .profiling import background_thread
+
+logger = get_logger(__name__)
+
+# Queued after the last event to tell the writer thread to finish
+_STOP = object()
+
+
+class AuditQueueFull(Exception):
+    """Raised when the audit queue stayed full for the whole enqueue timeout."""
+
+
+class AuditWriter:
+    """Collects audit events in memory and writes them to ``AuditLog`` in batches.
+
+    Enqueueing costs requests microseconds rather than a database round trip. A
+    writer thread inserts a batch once ``batch_size`` events are waiting or
+    ``flush_interval`` seconds after the first one. Events are never discarded:
+    when the queue is full, callers wait up to ``enqueue_timeout`` for the
+    writer to make room, and are refused after that. ``async`` endpoints use
+    :meth:`record_async`, which waits off the event loop and answers 503.
+    :meth:`shutdown` drains the queue before returning.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float, queue_limit: int, enqueue_timeout: float):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.engine: Optional[Engine] = None
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_limit)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.written = 0
+        self.batches = 0
+        self.rejected = 0
+        self.failed = 0
+
+    def record(
+        self,
+        action: str,
+        user_id: Optional[Any] = None,
+        details: Optional[Dict[str, Any]] = None,
+        ip_address: Optional[str] = None,
+    ) -> None:
+        """Queue an audit event, waiting for room; raises :class:`AuditQueueFull` on timeout.
+
+        Blocks the calling thread, so ``async`` code uses :meth:`record_async`.
+        """
+        event = self._event(action, user_id, details, ip_address)
+        self._ensure_started()
+        try:
+            self._queue.put(event, timeout=self.enqueue_timeout)
+        except queue.Full:
+            raise self._rejected(action)
+
+    async def record_async(
+        self,
+        action: str,
+        user_id: Optional[Any] = None,
+        details: Optional[Dict[str, Any]] = None,
+        ip_address: Optional[str] = None,
+    ) -> None:
+        """Queue an audit event without blocking the event loop; answers 503 if no room frees up."""
+        event = self._event(action, user_id, details, ip_address)
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(event)
+            return
+        except queue.Full:
+            pass
+        try:
+            # Wait for the writer on a worker thread so other requests keep running
+            await run_in_threadpool(self._queue.put, event, True, self.enqueue_timeout)
+        except queue.Full:
+            logger.error(str(self._rejected(action)))
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Audit log is busy, please retry",
+                headers={"Retry-After": "1"}
+            )
+
+    @staticmethod
+    def _event(
+        action: str, user_id: Optional[Any], details: Optional[Dict[str, Any]], ip_address: Optional[str]
+    ) -> Dict[str, Any]:
+        try:
+            user_id = int(user_id) if user_id is not None else None
+        except (TypeError, ValueError):
+            details = {**(details or {}), "user_id": user_id}
+            user_id = None
+        return {
+            "action": action,
+            "user_id": user_id,
+            "ip_address": ip_address,
+            "correlation_id": get_correlation_id(),
+            "details": details,
+            "created_at": datetime.utcnow(),
+        }
+
+    def _rejected(self, action: str) -> AuditQueueFull:
+        with self._lock:
+            self.rejected += 1
+        return AuditQueueFull(f"Audit queue still full after {self.enqueue_timeout}s, refused '{action}' event")
+
+    def flush(self) -> None:
+        """Block until every event queued so far has been written."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def shutdown(self) -> None:
+        """Write everything still queued and stop the writer; a later event restarts it."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "written": self.written,
+                "batches": self.batches,
+                "rejected": self.rejected,
+                "failed": self.failed,
+            }
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = background_thread("audit-writer", self._run)
+                self._thread.start()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch: List[Dict[str, Any]] = []
+            first = self._queue.get()
+            if first is _STOP:
+                self._queue.task_done()
+                break
+            batch.append(first)
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    event = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if event is _STOP:
+                    self._queue.task_done()
+                    stopping = True
+                    break
+                batch.append(event)
+            self._write(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        # Imported here so the writer can be configured before the models load
+        from app.models.audit_log import AuditLog
+        from .database import begin_write
+
+        try:
+            with begin_write(self.engine) as connection:
+                connection.execute(AuditLog.__table__.insert(), batch)
+        except Exception as e:
+            with self._lock:
+                self.failed += len(batch)
+            logger.error(f"Failed to write {len(batch)} audit events: {e}")
+            return
+        with self._lock:
+            self.written += len(batch)
+            self.batches += 1
+
+
+# Shared audit writer
+audit_writer = AuditWriter(
+    batch_size=settings.AUDIT_BATCH_SIZE,
+    flush_interval=settings.AUDIT_FLUSH_INTERVAL_SECONDS,
+    queue_limit=settings.AUDIT_QUEUE_LIMIT,
+    enqueue_timeout=settings.AUDIT_ENQUEUE_TIMEOUT_SECONDS,
+)
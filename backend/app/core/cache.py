@@ -0,0 +1,310 @@
+import json
+import threading
+import time
+import uuid
+from collections import namedtuple
+from dataclasses import dataclass
+from datetime import datetime
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple, Type
+
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session, SQLModel
+
+from .config import settings
+from .logging import get_logger
+from .profiling import background_thread
+from .replicas import on_primary
+from app.models.category import Category
+from app.models.inventory_item import InventoryItem
+from app.models.location import Location
+from app.models.role import Role
+from app.models.table_stamp import TableStamp
+
+logger = get_logger(__name__)
+
+# Cached reference tables
+CATEGORIES = "categories"
+ITEMS = "items"
+LOCATIONS = "locations"
+ROLES = "roles"
+
+CATALOG_MODELS: Dict[str, Type[SQLModel]] = {
+    CATEGORIES: Category,
+    ITEMS: InventoryItem,
+    LOCATIONS: Location,
+    ROLES: Role,
+}
+
+CATALOG_TABLES: Dict[Type[SQLModel], str] = {model: table for table, model in CATALOG_MODELS.items()}
+
+
+def _row_type(model: Type[SQLModel]):
+    """Build a compact immutable row type holding a model's columns."""
+    return namedtuple(f"{model.__name__}Row", model.__table__.columns.keys())
+
+
+@dataclass(frozen=True)
+class TableSnapshot:
+    """Immutable in-memory copy of one reference table."""
+    table: str
+    version: int
+    rows: Tuple[Any, ...]
+    by_id: Mapping[int, Any]
+    loaded_at: float
+    # Cache validators derived from the rows, identical in every worker for the same data
+    etag: str
+    last_modified: Optional[datetime]
+
+
+class InvalidationBus:
+    """Publishes cache invalidations to other workers (no-op for a single process)."""
+
+    def publish(self, tables: Iterable[str]) -> None:
+        pass
+
+    def start(self, on_invalidate: Callable[[Iterable[str]], None]) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class RedisInvalidationBus(InvalidationBus):
+    """Redis pub/sub bus so every worker drops its snapshots when one of them writes.
+
+    The listener reconnects with exponential backoff (up to
+    ``RECONNECT_MAX_SECONDS``) when Redis goes away. Messages published while
+    it was disconnected are lost, so every reconnect drops all snapshots.
+    """
+
+    RECONNECT_MAX_SECONDS = 30.0
+
+    def __init__(self, url: str, channel: str):
+        import redis  # Optional dependency, only needed for multi-worker deployments
+
+        self.client = redis.Redis.from_url(url, password=settings.REDIS_PASSWORD, db=settings.REDIS_DB)
+        self.channel = channel
+        self.origin = uuid.uuid4().hex
+        self._pubsub = None
+        self._closed = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def publish(self, tables: Iterable[str]) -> None:
+        message = json.dumps({"origin": self.origin, "tables": list(tables)})
+        try:
+            self.client.publish(self.channel, message)
+        except Exception as e:
+            logger.warning(f"Failed to publish cache invalidation: {e}")
+
+    def start(self, on_invalidate: Callable[[Iterable[str]], None]) -> None:
+        self._closed.clear()
+        self._thread = background_thread("catalog-cache-invalidation", self._listen, on_invalidate)
+        self._thread.start()
+
+    def _listen(self, on_invalidate: Callable[[Iterable[str]], None]) -> None:
+        backoff = 1.0
+        reconnecting = False
+        while not self._closed.is_set():
+            try:
+                self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                self._pubsub.subscribe(self.channel)
+                if reconnecting:
+                    logger.info("Cache invalidation listener reconnected to Redis")
+                    on_invalidate(list(CATALOG_MODELS))
+                    reconnecting = False
+                backoff = 1.0
+                for message in self._pubsub.listen():
+                    try:
+                        payload = json.loads(message["data"])
+                    except (TypeError, ValueError):
+                        continue
+                    if payload.get("origin") != self.origin:
+                        on_invalidate(payload.get("tables", []))
+            except Exception as e:
+                if self._closed.is_set():
+                    return
+                logger.error(f"Cache invalidation listener lost its Redis connection, retrying in {backoff:.0f}s: {e}")
+            reconnecting = True
+            self._closed.wait(backoff)
+            backoff = min(backoff * 2, self.RECONNECT_MAX_SECONDS)
+
+    def close(self) -> None:
+        self._closed.set()
+        if self._pubsub is not None:
+            self._pubsub.close()
+
+
+def create_invalidation_bus() -> InvalidationBus:
+    """Use Redis pub/sub when configured, otherwise keep invalidation in-process."""
+    if not settings.REDIS_URL:
+        return InvalidationBus()
+    try:
+        return RedisInvalidationBus(settings.REDIS_URL, settings.CATALOG_CACHE_CHANNEL)
+    except ImportError:
+        logger.warning("REDIS_URL is set but the redis package is not installed; "
+                       "catalog cache invalidation stays in-process")
+    except Exception as e:
+        logger.warning(f"Could not connect to Redis for cache invalidation: {e}")
+    return InvalidationBus()
+
+
+def _stamp_tables(session: OrmSession, flush_context) -> None:
+    # new, dirty and deleted still describe the flush that just ran
+    changed = {
+        CATALOG_TABLES[type(obj)]
+        for obj in (*session.new, *session.dirty, *session.deleted)
+        if type(obj) in CATALOG_TABLES
+    }
+    if not changed:
+        return
+    stamps = TableStamp.__table__
+    connection = session.connection()
+    now = datetime.utcnow()
+    for name in sorted(changed):
+        if not connection.execute(update(stamps).where(stamps.c.name == name).values(modified_at=now)).rowcount:
+            connection.execute(insert(stamps).values(name=name, modified_at=now))
+
+
+def track_table_stamps(session_class: Type[OrmSession] = OrmSession) -> None:
+    """Stamp a reference table in the same transaction as every ORM write to it, so deletes move Last-Modified."""
+    if event.contains(session_class, "after_flush", _stamp_tables):
+        return
+    event.listen(session_class, "after_flush", _stamp_tables)
+
+
+class CatalogCache:
+    """Versioned read-through cache of the reference tables.
+
+    Each table is held as an immutable :class:`TableSnapshot`. Writers call
+    :meth:`invalidate` after committing, which bumps the table version and drops
+    the snapshot under one lock; a load that raced with the write is discarded
+    because its version no longer matches. Snapshots also expire after
+    ``CATALOG_CACHE_TTL_SECONDS`` as a safety net for missed invalidations.
+    Snapshots are always loaded from the primary, even for replica-bound
+    sessions.
+    """
+
+    def __init__(self, ttl_seconds: int, bus: Optional[InvalidationBus] = None):
+        self.ttl_seconds = ttl_seconds
+        self.bus = bus or InvalidationBus()
+        self._lock = threading.Lock()
+        self._versions: Dict[str, int] = {table: 0 for table in CATALOG_MODELS}
+        self._snapshots: Dict[str, TableSnapshot] = {}
+        self._row_types = {table: _row_type(model) for table, model in CATALOG_MODELS.items()}
+        self._subscribers: List[Callable[[Iterable[str]], None]] = []
+        self.hits = 0
+        self.misses = 0
+
+    def subscribe(self, on_invalidate: Callable[[Iterable[str]], None]) -> None:
+        """Also pass every message from other workers to ``on_invalidate``, for caches sharing the bus."""
+        self._subscribers.append(on_invalidate)
+
+    def start(self) -> None:
+        """Start listening for invalidations published by other workers."""
+        self.bus.start(self._received)
+
+    def _received(self, names: Iterable[str]) -> None:
+        names = list(names)
+        self.invalidate(*names, publish=False)
+        for on_invalidate in self._subscribers:
+            on_invalidate(names)
+
+    def get(self, table: str, session: Session) -> TableSnapshot:
+        """Return the current snapshot of a table, loading it on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            snapshot = self._snapshots.get(table)
+            version = self._versions[table]
+            if snapshot is not None and now - snapshot.loaded_at < self.ttl_seconds:
+                self.hits += 1
+                return snapshot
+            self.misses += 1
+
+        snapshot = self._load(table, version, session)
+
+        with self._lock:
+            # Only install the snapshot if no write happened while it was loading
+            if self._versions[table] == version:
+                self._snapshots[table] = snapshot
+        return snapshot
+
+    def get_by_id(self, table: str, row_id: Optional[int], session: Session) -> Optional[Any]:
+        """Look up one row, falling back to the database for rows newer than the snapshot."""
+        if row_id is None:
+            return None
+        row = self.get(table, session).by_id.get(row_id)
+        if row is not None:
+            return row
+
+        db_obj = session.get(CATALOG_MODELS[table], row_id)
+        if db_obj is None:
+            return None
+        row_type = self._row_types[table]
+        return row_type(*(getattr(db_obj, column) for column in row_type._fields))
+
+    def invalidate(self, *tables: str, publish: bool = True) -> None:
+        """Drop snapshots of the given tables after a write."""
+        tables = tuple(table for table in tables if table in CATALOG_MODELS)
+        if not tables:
+            return
+        with self._lock:
+            for table in tables:
+                self._versions[table] += 1
+                self._snapshots.pop(table, None)
+        if publish:
+            self.bus.publish(tables)
+
+    def clear(self) -> None:
+        """Drop every snapshot."""
+        self.invalidate(*CATALOG_MODELS, publish=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the state of each table."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "tables": {
+                    table: {
+                        "version": self._versions[table],
+                        "rows": len(self._snapshots[table].rows) if table in self._snapshots else None,
+                    }
+                    for table in CATALOG_MODELS
+                },
+            }
+
+    def _load(self, table: str, version: int, session: Session) -> TableSnapshot:
+        model = CATALOG_MODELS[table]
+        row_type = self._row_types[table]
+        columns = [model.__table__.c[name] for name in row_type._fields]
+        try:
+            # Shared by every request, so never loaded from a replica that may predate the invalidation
+            with on_primary(session) as primary:
+                result = primary.execute(select(*columns).order_by(model.__table__.c.id)).all()
+                stamps = TableStamp.__table__
+                # Deletes leave no updated_at behind; the table's stamp covers them
+                stamped = primary.execute(select(stamps.c.modified_at).where(stamps.c.name == table)).scalar()
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to load {table} into catalog cache: {e}")
+            raise
+
+        rows = tuple(row_type(*row) for row in result)
+        last_modified = max([row.updated_at for row in rows] + ([stamped] if stamped else []), default=None)
+        max_id = rows[-1].id if rows else 0
+        stamp = last_modified.isoformat() if last_modified else "empty"
+        return TableSnapshot(
+            table=table,
+            version=version,
+            rows=rows,
+            by_id=MappingProxyType({row.id: row for row in rows}),
+            loaded_at=time.monotonic(),
+            etag=f"{table}-{len(rows)}-{max_id}-{stamp}",
+            last_modified=last_modified,
+        )
+
+
+# Shared catalog cache instance
+catalog_cache = CatalogCache(settings.CATALOG_CACHE_TTL_SECONDS, create_invalidation_bus())
@@ -0,0 +1,146 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple, Type
+
+from sqlalchemy import event, insert, inspect, text
+from sqlalchemy.orm import Session
+
+from app.models.category import Category
+from app.models.change_log import ChangeLog
+from app.models.count import Count
+from app.models.inventory_item import InventoryItem
+from app.models.schedule import Schedule
+from app.models.transfer import Transfer
+
+UPSERT = "upsert"
+DELETE = "delete"
+
+# Synced models and the columns placing a row at a location; rows without one go to every location
+SYNCED: Dict[Type, Tuple[Optional[str], Optional[str]]] = {
+    InventoryItem: (None, None),
+    Category: (None, None),
+    Count: ("location_id", None),
+    Transfer: ("from_location_id", "to_location_id"),
+    Schedule: ("location_id", None),
+}
+
+# PostgreSQL advisory locks ordering change-log writes: catalog writes, which reach every
+# location, hold SEQUENCE_LOCK_KEY exclusively; other writes share it and also lock
+# (LOCATION_LOCK_CLASS, location id) for each location they touch
+SEQUENCE_LOCK_KEY = 7300490
+LOCATION_LOCK_CLASS = 7300491
+
+_PENDING = "change_log_pending"
+_MOVED = "change_log_moved"
+
+Change = Tuple[str, Optional[int], Optional[int]]
+
+
+def note_changes(
+    session: Session, model: Type, ids: Iterable[int], operation: str = UPSERT,
+    location_id: Optional[int] = None, to_location_id: Optional[int] = None,
+) -> None:
+    """Record changes made without ORM objects (bulk inserts, core statements) for the session's next commit."""
+    pending = session.info.setdefault(_PENDING, {})
+    for entity_id in ids:
+        pending[(model.__tablename__, entity_id)] = (operation, location_id, to_location_id)
+
+
+def _note(pending: Dict[Tuple[str, int], Change], obj, operation: str) -> None:
+    columns = SYNCED.get(type(obj))
+    if columns is None or obj.id is None:
+        return
+    location, to_location = (getattr(obj, name) if name else None for name in columns)
+    pending[(obj.__tablename__, obj.id)] = (operation, location, to_location)
+
+
+def _note_move(session: Session, obj) -> None:
+    """Remember the locations a row has just left, so their devices get a tombstone for it."""
+    state = inspect(obj)
+    moved = False
+    old = []
+    for name in SYNCED[type(obj)]:
+        value = getattr(obj, name) if name else None
+        if name:
+            # Still the history of the flush that just ran
+            previous = state.attrs[name].history.deleted
+            if previous and previous[0] != value:
+                value, moved = previous[0], True
+        old.append(value)
+    if moved:
+        session.info.setdefault(_MOVED, []).append((obj.__tablename__, obj.id, *old))
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    # new, dirty and deleted still describe the flush that just ran; ids are assigned
+    pending = session.info.setdefault(_PENDING, {})
+    for obj in session.new:
+        _note(pending, obj, UPSERT)
+    for obj in session.dirty:
+        if type(obj) in SYNCED and session.is_modified(obj, include_collections=False):
+            _note_move(session, obj)
+            _note(pending, obj, UPSERT)
+    for obj in session.deleted:
+        _note(pending, obj, DELETE)
+
+
+def _before_commit(session: Session) -> None:
+    # Commit flushes after this hook, so flush now to catch its changes too
+    session.flush()
+    pending = session.info.pop(_PENDING, None)
+    moved = session.info.pop(_MOVED, None)
+    if not pending and not moved:
+        return
+    now = datetime.utcnow()
+    # A moved row is deleted for its old location before the upsert that places it at the new one;
+    # sync filtered on the old location then ends with the tombstone
+    changes = [(entity, entity_id, DELETE, location_id, to_location_id)
+               for entity, entity_id, location_id, to_location_id in moved or ()]
+    changes += [(entity, entity_id, *change) for (entity, entity_id), change in (pending or {}).items()]
+    if session.get_bind().dialect.name == "postgresql":
+        _lock_sequence(session, changes)
+    # SQLite has a single writer, so insertion order already is commit order
+    session.execute(insert(ChangeLog.__table__), [
+        {
+            "entity": entity, "entity_id": entity_id, "operation": operation,
+            "location_id": location_id, "to_location_id": to_location_id, "changed_at": now,
+        }
+        for entity, entity_id, operation, location_id, to_location_id in changes
+    ])
+
+
+def _lock_sequence(session: Session, changes: List[Tuple[str, int, str, Optional[int], Optional[int]]]) -> None:
+    """Take sequence numbers in commit order for every location the changes are synced to.
+
+    The locks are held until commit, so a client that has seen number N for
+    its location can never later miss a smaller one committed after it. Writes
+    at different locations do not wait for each other; catalog writes wait for
+    every other write.
+    """
+    if any(location_id is None for _, _, _, location_id, _ in changes):
+        session.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SEQUENCE_LOCK_KEY})
+        return
+    session.execute(text("SELECT pg_advisory_xact_lock_shared(:key)"), {"key": SEQUENCE_LOCK_KEY})
+    locations = {
+        location for _, _, _, location_id, to_location_id in changes
+        for location in (location_id, to_location_id) if location is not None
+    }
+    # Always in the same order, so two writers never wait for each other's locations
+    for location in sorted(locations):
+        session.execute(
+            text("SELECT pg_advisory_xact_lock(:class, :location)"),
+            {"class": LOCATION_LOCK_CLASS, "location": location},
+        )
+
+
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING, None)
+    session.info.pop(_MOVED, None)
+
+
+def track_changes(session_class: Type[Session] = Session) -> None:
+    """Write a change-log entry, in the same transaction, for every synced row a session changes."""
+    if event.contains(session_class, "after_flush", _after_flush):
+        return
+    event.listen(session_class, "after_flush", _after_flush)
+    event.listen(session_class, "before_commit", _before_commit)
+    event.listen(session_class, "after_rollback", _after_rollback)
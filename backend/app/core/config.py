@@ -12,6 +12,36 @@ class Settings(pydantic.BaseSettings):
         default="sqlite:///./wingstop_inventory.db",
         description="Database connection URL"
     )
+    DATABASE_REPLICA_URLS: List[str] = Field(
+        default=[],
+        description="Read replica URLs; GET requests and report queries read from them"
+    )
+    REPLICA_MAX_LAG_SECONDS: float = Field(default=5.0, ge=0, description="Replicas further behind than this are skipped")
+    REPLICA_CHECK_INTERVAL_SECONDS: float = Field(default=1.0, gt=0, description="How often replica health and lag are measured")
+    
+    # Database Connection Pool (unset sizes fall back to the environment defaults)
+    DB_POOL_SIZE: Optional[int] = Field(default=None, ge=1, description="Connections each pool keeps open")
+    DB_MAX_OVERFLOW: Optional[int] = Field(default=None, ge=0, description="Extra connections opened under load beyond DB_POOL_SIZE")
+    DB_POOL_TIMEOUT_SECONDS: float = Field(default=30.0, gt=0, description="How long a checkout waits for a free connection before failing")
+    DB_POOL_RECYCLE_SECONDS: Optional[int] = Field(default=None, ge=-1, description="Replace connections older than this (-1 never)")
+    DB_POOL_PRE_PING: bool = Field(default=True, description="Test connections on checkout and replace dead ones")
+    DB_POOL_ADAPTIVE: bool = Field(default=False, description="Cap each worker's pool by its thread count and its share of DB_MAX_CONNECTIONS")
+    DB_MAX_CONNECTIONS: int = Field(default=100, ge=1, description="Connections the database server allows all workers together")
+    DB_POOL_LEAK_SECONDS: float = Field(default=30.0, ge=0, description="Report connections held longer than this, with the stack that checked them out (0 disables)")
+    DB_POOL_CAPTURE_STACKS: bool = Field(default=False, description="Record the stack of every checkout for leak reports; costs a stack walk per checkout")
+    WEB_CONCURRENCY: int = Field(default=1, ge=1, description="Worker processes serving the app, as passed to uvicorn/gunicorn")
+    THREADPOOL_SIZE: int = Field(default=40, ge=1, description="Threads per worker running sync endpoints and dependencies")
+    
+    # SQLite Production Mode (small single-store deployments)
+    SQLITE_PRODUCTION_MODE: bool = Field(default=False, description="Read connection pool, tuned pragmas and one group-committing writer")
+    SQLITE_READ_POOL_SIZE: int = Field(default=8, ge=1, description="Read connections kept open")
+    SQLITE_MMAP_SIZE_MB: int = Field(default=256, ge=0, description="Memory-mapped I/O size per connection")
+    SQLITE_CACHE_SIZE_MB: int = Field(default=64, ge=1, description="Page cache size per connection")
+    SQLITE_BUSY_TIMEOUT_MS: int = Field(default=5000, ge=0, description="How long a connection waits for a lock, and a session for the writer")
+    SQLITE_GROUP_COMMIT_MAX_BATCH: int = Field(default=64, ge=1, description="Most transactions committed together")
+    SQLITE_GROUP_COMMIT_MAX_DELAY_MS: float = Field(default=2.0, ge=0, description="Longest a finished transaction waits for others to join its commit")
+    SQLITE_CHECKPOINT_INTERVAL_SECONDS: float = Field(default=30.0, gt=0, description="How often the writer checkpoints the WAL")
+    SQLITE_CHECKPOINT_TRUNCATE_PAGES: int = Field(default=10000, ge=0, description="Truncate the WAL once it holds more pages than this (0 never truncates)")
     
     # Security Configuration
     SECRET_KEY: str = Field(
@@ -55,6 +85,9 @@ class Settings(pydantic.BaseSettings):
     # File Upload Configuration
     MAX_FILE_SIZE: int = Field(default=10485760, ge=1024, description="Max file size in bytes (10MB)")
     UPLOAD_DIR: str = Field(default="./uploads", description="Upload directory")
+    IMPORT_JOB_TTL_SECONDS: int = Field(
+        default=604800, ge=60, description="How long item import job results stay available (default 7 days)"
+    )
     ALLOWED_FILE_TYPES: List[str] = Field(
         default=[".csv", ".xlsx", ".xls", ".pdf", ".jpg", ".png"],
         description="Allowed file types for upload"
@@ -64,7 +97,11 @@ class Settings(pydantic.BaseSettings):
     REDIS_URL: Optional[str] = Field(default=None, description="Redis connection URL")
     REDIS_PASSWORD: Optional[str] = Field(default=None, description="Redis password")
     REDIS_DB: int = Field(default=0, ge=0, le=15, description="Redis database number")
-    
+
+    # Catalog Cache Configuration
+    CATALOG_CACHE_TTL_SECONDS: int = Field(default=300, ge=0, description="Max age of cached reference-data snapshots")
+    CATALOG_CACHE_CHANNEL: str = Field(default="wingstop:catalog-invalidate", description="Redis channel for cache invalidation")
+
     # External API Configuration
     WINGSTOP_API_URL: Optional[str] = Field(default=None, description="Wingstop API URL")
     WINGSTOP_API_KEY: Optional[str] = Field(default=None, description="Wingstop API key")
@@ -75,10 +112,56 @@ class Settings(pydantic.BaseSettings):
     LOG_FORMAT: str = Field(default="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
     LOG_MAX_SIZE: int = Field(default=10485760, description="Max log file size (10MB)")
     LOG_BACKUP_COUNT: int = Field(default=5, description="Number of log backups")
+    LOG_QUEUE_SIZE: int = Field(default=10000, ge=1, description="Log records buffered for the writer thread before new ones are dropped")
+    LOG_SAMPLE_RATE_2XX: float = Field(default=1.0, ge=0, le=1, description="Fraction of successful request logs written; errors are always logged")
+    METRICS_ENABLED: bool = Field(default=True, description="Serve Prometheus metrics at /metrics")
+    METRICS_DIR: Optional[str] = Field(default=None, description="Directory where workers share metric snapshots; unset keeps metrics per worker")
+    METRICS_FLUSH_INTERVAL_SECONDS: float = Field(default=5.0, gt=0, description="How often each worker writes its snapshot to METRICS_DIR")
+    
+    # Query Budgets and Slow-Query Log (0 disables each check)
+    QUERY_BUDGET_COUNT: int = Field(default=50, ge=0, description="Warn when a request runs more SQL statements than this")
+    QUERY_BUDGET_SECONDS: float = Field(default=0.5, ge=0, description="Warn when a request spends longer than this in SQL")
+    N_PLUS_ONE_THRESHOLD: int = Field(default=10, ge=0, description="Warn when one statement runs this many times in a request with different parameters")
+    SLOW_QUERY_SECONDS: float = Field(default=0.2, ge=0, description="Log statements slower than this to app.slow_queries")
+    SLOW_QUERY_EXPLAIN: bool = Field(default=True, description="Include the EXPLAIN plan of slow SELECT statements")
+    QUERY_SHAPES_FILE: Optional[str] = Field(default=None, description="Append each distinct SELECT and sample parameters here for index_advisor.py")
+    
+    # Request Profiling (X-Profile: 1; only system:admin in production)
+    PROFILING_ENABLED: bool = Field(default=False, description="Allow requests to be profiled")
+    PROFILE_DIR: str = Field(default="./profiles", description="Directory profiles are written to")
+    PROFILE_FORMAT: str = Field(default="speedscope", description="Output format: speedscope or collapsed")
+    PROFILE_INTERVAL_SECONDS: float = Field(default=0.005, gt=0, description="Stack sampling interval")
+    PROFILE_SAMPLE_EVERY: int = Field(default=0, ge=0, description="Also profile 1 in N requests into an aggregate profile (0 disables)")
+    
+    # Count Partitioning (PostgreSQL only; applied by the add_count_partitioning migration)
+    COUNT_PARTITIONING_ENABLED: bool = Field(default=False, description="Range-partition the count table by month on counted_at (PostgreSQL; convert existing databases with manage_partitions.py --convert)")
+    COUNT_PARTITION_MONTHS_AHEAD: int = Field(default=3, ge=0, description="Monthly partitions kept created ahead of the current month")
+    COUNT_PARTITION_RETAIN_MONTHS: int = Field(default=0, ge=0, description="Detach partitions older than this many months (0 keeps all)")
+    COUNT_PARTITION_ARCHIVE_SCHEMA: str = Field(default="count_archive", description="Schema detached partitions are moved to")
+    COUNT_PARTITION_CHECK_INTERVAL_SECONDS: float = Field(default=3600.0, gt=0, description="How often partitions are created and detached")
+    
+    # History Archive (counts and transfers moved out of the OLTP tables)
+    ARCHIVE_ENABLED: bool = Field(default=False, description="Periodically move old counts and transfers to archive files")
+    ARCHIVE_DIR: str = Field(default="./archive", description="Directory of the monthly per-location archive files; shared storage when several hosts run the API")
+    ARCHIVE_AFTER_DAYS: int = Field(default=365, ge=1, description="Archive counts and transfers older than this")
+    ARCHIVE_BATCH_SIZE: int = Field(default=5000, ge=1, description="Rows moved per transaction")
+    ARCHIVE_INTERVAL_SECONDS: float = Field(default=86400.0, gt=0, description="How often the archive job runs")
+    
+    # Delta Sync
+    SYNC_COMPACT_INTERVAL_SECONDS: float = Field(default=3600.0, gt=0, description="How often change-log entries superseded by later changes are deleted")
+    
+    # Idempotency Keys (Idempotency-Key header on POST, PUT, PATCH and DELETE)
+    IDEMPOTENCY_ENABLED: bool = Field(default=True, description="Run each keyed write once and replay its response to retries")
+    IDEMPOTENCY_TTL_SECONDS: int = Field(default=86400, ge=1, description="How long a key and its stored response are kept")
+    IDEMPOTENCY_LOCK_SECONDS: float = Field(default=60.0, gt=0, description="How long an unfinished request holds its key before a retry may take it over")
+    IDEMPOTENCY_WAIT_SECONDS: float = Field(default=5.0, ge=0, description="How long a concurrent duplicate waits for the original before returning 409")
+    IDEMPOTENCY_MAX_RESPONSE_BYTES: int = Field(default=1048576, ge=0, description="Larger responses are not stored, so their key can be retried")
+    IDEMPOTENCY_PURGE_INTERVAL_SECONDS: float = Field(default=3600.0, gt=0, description="How often expired keys are deleted")
     
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: int = Field(default=60, ge=1, description="Requests per minute")
     RATE_LIMIT_BURST: int = Field(default=100, ge=1, description="Burst requests allowed")
+    RATE_LIMIT_MAX_KEYS: int = Field(default=100000, ge=1, description="Max clients tracked per worker by the in-process rate limiter")
     
     # Security Configuration
     SECURITY_HEADERS_ENABLED: bool = Field(default=True, description="Enable security headers")
@@ -92,6 +175,29 @@ class Settings(pydantic.BaseSettings):
         description="Public endpoints that don't require authentication"
     )
     
+    # Password Hashing
+    BCRYPT_ROUNDS: int = Field(default=12, ge=4, le=31, description="bcrypt cost factor; older hashes are upgraded on login")
+    PASSWORD_HASH_WORKERS: int = Field(default=4, ge=1, description="Threads dedicated to password hashing")
+    PASSWORD_HASH_QUEUE_LIMIT: int = Field(default=32, ge=0, description="Password operations allowed to wait before returning 503")
+    
+    # Verified-token cache (0 disables)
+    TOKEN_CACHE_SIZE: int = Field(default=10000, ge=0, description="Max verified JWTs kept in memory per worker")
+    TOKEN_REVOCATION_SYNC_SECONDS: float = Field(
+        default=5.0, gt=0, description="How often each worker loads tokens revoked by the others"
+    )
+    
+    # Authenticated principal cache
+    PRINCIPAL_CACHE_TTL_SECONDS: int = Field(default=30, ge=0, description="How long a resolved user, role and permission set is reused")
+    
+    # Audit Log Writer
+    AUDIT_BATCH_SIZE: int = Field(default=500, ge=1, description="Max audit events per bulk insert")
+    AUDIT_FLUSH_INTERVAL_SECONDS: float = Field(default=1.0, gt=0, description="Max delay before queued audit events are written")
+    AUDIT_QUEUE_LIMIT: int = Field(default=10000, ge=1, description="Audit events held in memory before producers wait for the writer")
+    AUDIT_ENQUEUE_TIMEOUT_SECONDS: float = Field(default=2.0, ge=0, description="How long a request waits for audit queue space before it is refused with 503")
+    
+    # Stateless permission claims
+    TOKEN_PERMISSION_CLAIMS: bool = Field(default=False, description="Embed a permission bitmask and role version in access tokens")
+    
     # Session Configuration
     SESSION_TIMEOUT_MINUTES: int = Field(default=30, ge=1, description="Session timeout in minutes")
     MAX_SESSIONS_PER_USER: int = Field(default=5, ge=1, description="Max sessions per user")
@@ -116,7 +222,7 @@ class Settings(pydantic.BaseSettings):
             v = secrets.token_urlsafe(32)
         return v
     
-    @validator("ALLOWED_HOSTS", "ALLOWED_ORIGINS", pre=True)
+    @validator("ALLOWED_HOSTS", "ALLOWED_ORIGINS", "DATABASE_REPLICA_URLS", pre=True)
     def validate_cors_settings(cls, v):
         if isinstance(v, str):
             import json
@@ -174,22 +280,57 @@ class Settings(pydantic.BaseSettings):
         return self.REFRESH_TOKEN_EXPIRE_DAYS
     
     def get_database_config(self) -> Dict[str, Any]:
-        """Get database configuration based on environment."""
+        """Get database pool configuration based on environment, overridden by the DB_POOL_* settings."""
         if self.is_production:
-            return {
+            config = {
                 "pool_size": 20,
                 "max_overflow": 30,
-                "pool_pre_ping": True,
                 "pool_recycle": 3600,
             }
         else:
-            return {
+            config = {
                 "pool_size": 5,
                 "max_overflow": 10,
-                "pool_pre_ping": True,
                 "pool_recycle": 300,
             }
-    
+        if self.DB_POOL_SIZE is not None:
+            config["pool_size"] = self.DB_POOL_SIZE
+        if self.DB_MAX_OVERFLOW is not None:
+            config["max_overflow"] = self.DB_MAX_OVERFLOW
+        if self.DB_POOL_RECYCLE_SECONDS is not None:
+            config["pool_recycle"] = self.DB_POOL_RECYCLE_SECONDS
+        config["pool_timeout"] = self.DB_POOL_TIMEOUT_SECONDS
+        config["pool_pre_ping"] = self.DB_POOL_PRE_PING
+        if self.DB_POOL_ADAPTIVE:
+            # A thread holds one connection at a time, so more than the threads (plus background
+            # jobs) can never be used; and all workers together must stay under the server limit
+            limit = min(
+                self.THREADPOOL_SIZE + self.background_connections(),
+                max(1, self.DB_MAX_CONNECTIONS // self.WEB_CONCURRENCY)
+            )
+            config["pool_size"] = min(config["pool_size"], limit)
+            config["max_overflow"] = limit - config["pool_size"]
+        return config
+    
+    def background_connections(self) -> int:
+        """Primary connections the background jobs started in main.py can hold at once.
+
+        Work done on behalf of a request (catalog loads, item imports) runs on
+        the threadpool and is covered by THREADPOOL_SIZE.
+        """
+        postgresql = self.DATABASE_URL.startswith("postgresql")
+        jobs = [
+            True,  # audit writer
+            True,  # token revocation sync
+            True,  # change log compactor
+            self.IDEMPOTENCY_ENABLED,  # idempotency key purge
+            bool(self.DATABASE_REPLICA_URLS),  # replica heartbeat
+            self.COUNT_PARTITIONING_ENABLED and postgresql,  # partition maintenance
+            self.ARCHIVE_ENABLED,  # history archive
+            self.ARCHIVE_ENABLED and postgresql,  # the archive job's advisory lock session
+        ]
+        return sum(jobs)
+
     def get_cors_config(self) -> Dict[str, Any]:
         """Get CORS configuration based on environment."""
         if self.is_production:
@@ -2,52 +2,195 @@ from sqlmodel import SQLModel, create_engine, Session
 from sqlalchemy.pool import StaticPool, QueuePool
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine
+from fastapi import Request, Response
 import logging
-from typing import Generator, Optional
+from typing import ContextManager, Generator, Optional
 from contextlib import contextmanager
+from .change_log import track_changes
+from .cache import track_table_stamps
 from .config import settings
+from .metrics import instrument_engine
+from .pool_monitor import pool_monitor
+from .query_monitor import query_monitor
+from .replicas import CONSISTENCY_HEADER, ReplicaSet
+from .sqlite_writer import SQLiteWriter, sqlite_pragmas
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Database event listeners
+def set_sqlite_pragma(dbapi_connection, connection_record):
+    """Set SQLite pragmas for better performance."""
+    if settings.SQLITE_PRODUCTION_MODE:
+        pragmas = sqlite_pragmas(
+            mmap_size=settings.SQLITE_MMAP_SIZE_MB * 1024 * 1024,
+            cache_size_kb=settings.SQLITE_CACHE_SIZE_MB * 1024,
+            busy_timeout_ms=settings.SQLITE_BUSY_TIMEOUT_MS,
+            manage_checkpoints=True,
+        )
+    else:
+        pragmas = ["PRAGMA foreign_keys=ON", "PRAGMA journal_mode=WAL"]
+    cursor = dbapi_connection.cursor()
+    for pragma in pragmas:
+        cursor.execute(pragma)
+    cursor.close()
+
 # Database engine configuration
-def create_database_engine():
+def create_database_engine(url: Optional[str] = None):
     """Create and configure the database engine based on environment."""
-    if settings.DATABASE_URL.startswith("sqlite"):
+    url = url or settings.DATABASE_URL
+    if url.startswith("sqlite") and settings.SQLITE_PRODUCTION_MODE:
+        # A pool of connections for concurrent reads; session writes go through the SQLite writer
+        engine = create_engine(
+            url,
+            connect_args={"check_same_thread": False},
+            poolclass=QueuePool,
+            pool_size=settings.SQLITE_READ_POOL_SIZE,
+            max_overflow=0,
+            echo=settings.DEBUG,
+        )
+    elif url.startswith("sqlite"):
         # SQLite configuration for development
         engine = create_engine(
-            settings.DATABASE_URL,
+            url,
             connect_args={"check_same_thread": False},
             poolclass=StaticPool,
             echo=settings.DEBUG,  # Log SQL queries in debug mode
         )
     else:
-        # PostgreSQL configuration for production
+        # PostgreSQL configuration for production; sizes, timeout and recycle from the DB_POOL_* settings
         engine = create_engine(
-            settings.DATABASE_URL,
+            url,
             poolclass=QueuePool,
-            pool_size=10,
-            max_overflow=20,
-            pool_pre_ping=True,
-            pool_recycle=300,
             echo=settings.DEBUG,
+            **settings.get_database_config(),
         )
     
+    if url.startswith("sqlite"):
+        event.listen(engine, "connect", set_sqlite_pragma)
     return engine
 
+def create_sqlite_writer(url: Optional[str] = None) -> Optional[SQLiteWriter]:
+    """The single write connection of SQLite production mode, or None."""
+    url = url or settings.DATABASE_URL
+    if not (url.startswith("sqlite") and settings.SQLITE_PRODUCTION_MODE):
+        return None
+    write_engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+        echo=settings.DEBUG,
+    )
+    event.listen(write_engine, "connect", set_sqlite_pragma)
+    return SQLiteWriter(
+        write_engine,
+        max_batch=settings.SQLITE_GROUP_COMMIT_MAX_BATCH,
+        max_delay=settings.SQLITE_GROUP_COMMIT_MAX_DELAY_MS / 1000,
+        lease_timeout=settings.SQLITE_BUSY_TIMEOUT_MS / 1000,
+        checkpoint_interval=settings.SQLITE_CHECKPOINT_INTERVAL_SECONDS,
+        truncate_pages=settings.SQLITE_CHECKPOINT_TRUNCATE_PAGES,
+    )
+
 # Create the engine
 engine = create_database_engine()
+sqlite_writer = create_sqlite_writer()
+# Read replicas, checked for health and lag in the background
+replica_engines = [create_database_engine(url) for url in settings.DATABASE_REPLICA_URLS]
+pool_engines = {"primary": engine, **{f"replica-{i}": replica for i, replica in enumerate(replica_engines, 1)}}
+if sqlite_writer:
+    pool_engines["sqlite-writer"] = sqlite_writer.engine
+for pool_name, database_engine in pool_engines.items():
+    # All three observe one set of engine and pool listeners (see engine_hooks)
+    # Query timing, pool wait and pool usage for /metrics
+    instrument_engine(database_engine, pool_name)
+    # Per-request query budgets, N+1 detection and the slow-query log
+    query_monitor.watch(database_engine)
+    # Checkout telemetry and leak detection; the SQLite writer holds its connection on purpose
+    pool_monitor.watch(database_engine, pool_name, track_leaks=pool_name != "sqlite-writer")
+
+# Change-log entries for delta sync, written in the transaction of every synced write
+track_changes()
+# Last-Modified stamps for the cached reference tables, moved by deletes too
+track_table_stamps()
+
+# Requests that only read may be served by a replica
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+class RoutingSession(Session):
+    """Session that reads from a replica until it may write, then stays on the primary.
+
+    Only plain SELECTs go to the replica. Flushes, DML and raw SQL go to the
+    primary and pin the session there, so later reads see the request's own
+    writes. With a SQLite writer, writing transactions run on the writer's
+    connection instead, and ``commit()`` returns once their group commit has.
+    """
+    
+    def __init__(
+        self, primary: Engine, replica: Optional[Engine] = None, writer: Optional[SQLiteWriter] = None, **kwargs
+    ):
+        super().__init__(primary, **kwargs)
+        self.replica = replica
+        self.writer = writer
+        self.wrote = False
+        self._write_ticket = None
+        if writer is not None:
+            event.listen(self, "after_commit", writer.committed)
+            event.listen(self, "after_transaction_end", self._release_writer)
+    
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        is_select = getattr(clause, "is_select", False)
+        writing = self._flushing or (clause is not None and not is_select)
+        if writing:
+            self.replica = None
+            self.wrote = True
+        if self.writer is not None and (writing or self.writer.holds(self)):
+            return self.writer.acquire(self)
+        if self.replica is not None and is_select:
+            return self.replica
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+    
+    def commit(self):
+        super().commit()
+        ticket, self._write_ticket = self._write_ticket, None
+        if ticket is not None:
+            ticket.wait()
+    
+    def _release_writer(self, session, transaction):
+        if transaction.parent is None:
+            self._write_ticket = self.writer.release(self) or self._write_ticket
 
 # Database session management
 class DatabaseManager:
     """Manages database connections and sessions."""
     
-    def __init__(self, engine):
+    def __init__(self, engine, replicas: Optional[ReplicaSet] = None, writer: Optional[SQLiteWriter] = None):
         self.engine = engine
+        self.replicas = replicas or ReplicaSet(engine, [], max_lag=0, interval=1)
+        self.writer = writer
+    
+    def read_session(self, consistency_token: Optional[str] = None) -> RoutingSession:
+        """Session that reads from a replica when one is caught up; for reports and read-only jobs."""
+        return RoutingSession(self.engine, self.replicas.choose(consistency_token), self.writer)
     
-    def get_session(self) -> Generator[Session, None, None]:
-        """Dependency for FastAPI to get database sessions."""
-        session = Session(self.engine)
+    def get_session(
+        self, request: Optional[Request] = None, response: Optional[Response] = None
+    ) -> Generator[Session, None, None]:
+        """Dependency for FastAPI to get database sessions.
+
+        Read-only requests read from a replica unless they carry a consistency
+        token no replica has reached. Committed writes return a new token in
+        the response so the client can read them back on its next request.
+        """
+        if request is not None and request.method in READ_METHODS:
+            session = self.read_session(request.headers.get(CONSISTENCY_HEADER))
+        else:
+            session = RoutingSession(self.engine, writer=self.writer)
+        if response is not None and self.replicas:
+            @event.listens_for(session, "after_commit")
+            def issue_consistency_token(committed):
+                if committed.wrote:
+                    response.headers[CONSISTENCY_HEADER] = self.replicas.token_after_write()
         try:
             yield session
         except SQLAlchemyError as e:
@@ -60,7 +203,7 @@ class DatabaseManager:
     @contextmanager
     def get_session_context(self):
         """Context manager for database sessions."""
-        session = Session(self.engine)
+        session = RoutingSession(self.engine, writer=self.writer)
         try:
             yield session
             session.commit()
@@ -102,12 +245,29 @@ class DatabaseManager:
             return False
 
 # Create database manager instance
-db_manager = DatabaseManager(engine)
+db_manager = DatabaseManager(engine, ReplicaSet(
+    engine, replica_engines,
+    max_lag=settings.REPLICA_MAX_LAG_SECONDS,
+    interval=settings.REPLICA_CHECK_INTERVAL_SECONDS,
+), sqlite_writer)
 
 # FastAPI dependency for database sessions
-def get_session() -> Generator[Session, None, None]:
-    """FastAPI dependency for database sessions."""
-    return db_manager.get_session()
+def get_session(request: Request, response: Response) -> Generator[Session, None, None]:
+    """FastAPI dependency for database sessions, routed to a replica for reads."""
+    yield from db_manager.get_session(request, response)
+
+# Writes outside request sessions
+def begin_write(bind: Optional[Engine] = None) -> ContextManager[Connection]:
+    """``bind.begin()`` for Core writes, through the SQLite writer when ``bind`` is the primary it serves."""
+    bind = bind or engine
+    if sqlite_writer is not None and bind is engine:
+        return sqlite_writer.begin()
+    return bind.begin()
+
+def write_session(bind: Optional[Engine] = None) -> Session:
+    """Session for background jobs that write, through the SQLite writer when ``bind`` is the primary it serves."""
+    bind = bind or engine
+    return RoutingSession(bind, writer=sqlite_writer if bind is engine else None)
 
 # Database utilities
 def get_db_session() -> Session:
@@ -133,10 +293,15 @@ def check_database_health() -> dict:
     """Check database health and return status."""
     try:
         is_connected = db_manager.check_connection()
+        replicas = db_manager.replicas.status()
+        status = "healthy" if is_connected else "unhealthy"
+        if is_connected and not all(replica["healthy"] for replica in replicas):
+            status = "degraded"
         return {
-            "status": "healthy" if is_connected else "unhealthy",
+            "status": status,
             "connected": is_connected,
             "database_url": settings.DATABASE_URL.split("@")[-1] if "@" in settings.DATABASE_URL else "sqlite",
+            "replicas": replicas,
         }
     except Exception as e:
         logger.error(f"Database health check failed: {e}")
@@ -156,16 +321,6 @@ def get_metadata():
     """Get SQLModel metadata for Alembic."""
     return SQLModel.metadata
 
-# Database event listeners
-@event.listens_for(engine, "connect")
-def set_sqlite_pragma(dbapi_connection, connection_record):
-    """Set SQLite pragmas for better performance."""
-    if settings.DATABASE_URL.startswith("sqlite"):
-        cursor = dbapi_connection.cursor()
-        cursor.execute("PRAGMA foreign_keys=ON")
-        cursor.execute("PRAGMA journal_mode=WAL")
-        cursor.close()
-
 # Database initialization
 def init_database():
     """Initialize the database with tables and basic data."""
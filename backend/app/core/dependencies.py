@@ -1,10 +1,12 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlmodel import Session, select
-from typing import Optional
+from typing import FrozenSet, Optional
 from app.models.user import User
 from app.models.role import Role
 from app.core.database import get_session
+from app.core.cache import catalog_cache, ROLES
+from app.core.principal import principal_cache
 from app.core.security import AuthenticationManager
 from app.core.config import settings
 
@@ -32,18 +34,18 @@ async def get_current_user(
             detail="Invalid token"
         )
     
-    user = session.get(User, user_id)
-    if user is None:
+    principal = principal_cache.get(user_id, session)
+    if principal is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
-    if not user.is_active:
+    if not principal.user.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User is inactive"
         )
-    return user
+    return principal_cache.attach(principal, session)
 
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
@@ -63,10 +65,21 @@ async def get_current_user_with_role(
     """Get current user with their role information."""
     role = None
     if current_user.role_id:
-        role = session.get(Role, current_user.role_id)
+        role = catalog_cache.get_by_id(ROLES, current_user.role_id, session)
     return current_user, role
 
 
+def _role_name(user_id: int, session: Session) -> Optional[str]:
+    """Role name of an authenticated user, who may have been deleted since the token was checked."""
+    principal = principal_cache.get(user_id, session)
+    if principal is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found"
+        )
+    return principal.role_name
+
+
 def require_role(required_role: str):
     """Dependency factory to require a specific role."""
     async def _require_role(
@@ -79,14 +92,14 @@ def require_role(required_role: str):
                 detail="User has no role assigned"
             )
         
-        role = session.get(Role, current_user.role_id)
-        if not role:
+        role_name = _role_name(current_user.id, session)
+        if not role_name:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="User role not found"
             )
         
-        if role.name != required_role:
+        if role_name != required_role:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Access denied. Required role: {required_role}"
@@ -109,14 +122,14 @@ def require_any_role(required_roles: list[str]):
                 detail="User has no role assigned"
             )
         
-        role = session.get(Role, current_user.role_id)
-        if not role:
+        role_name = _role_name(current_user.id, session)
+        if not role_name:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="User role not found"
             )
         
-        if role.name not in required_roles:
+        if role_name not in required_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Access denied. Required one of roles: {', '.join(required_roles)}"
@@ -127,6 +140,27 @@ def require_any_role(required_roles: list[str]):
     return _require_any_role
 
 
+def expand_relations(*allowed: str):
+    """Dependency factory parsing a comma-separated ``?expand=`` list of relations to embed."""
+    description = f"Comma-separated related records to embed: {', '.join(allowed)}"
+
+    def _expand_relations(
+        expand: Optional[str] = Query(None, description=description)
+    ) -> FrozenSet[str]:
+        if not expand:
+            return frozenset()
+        requested = frozenset(name.strip().lower() for name in expand.split(",") if name.strip())
+        unknown = requested.difference(allowed)
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Cannot expand {', '.join(sorted(unknown))}. Allowed: {', '.join(allowed)}"
+            )
+        return requested
+    
+    return _expand_relations
+
+
 # Predefined role-based dependencies
 require_admin = require_role("admin")
 require_manager = require_role("manager")
@@ -0,0 +1,101 @@
+import time
+import weakref
+from typing import Any, Callable, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Called with (conn, cursor, statement, parameters, executemany, duration) after each statement
+QueryObserver = Callable[[Any, Any, str, Any, bool, float], None]
+# Called with (seconds waited, error raised or None) after each pool checkout attempt
+ConnectObserver = Callable[[float, Optional[BaseException]], None]
+# Called with the connection record when a connection leaves or returns to the pool
+PoolObserver = Callable[[Any], None]
+
+_hooks: "weakref.WeakKeyDictionary[Engine, EngineHooks]" = weakref.WeakKeyDictionary()
+
+
+class EngineHooks:
+    """One set of SQLAlchemy listeners on an engine and its pool, fanned out to observers.
+
+    Metrics, the query monitor and the pool monitor all time the same
+    statements and checkouts. Registering their own listeners meant three
+    timers per statement and ``Pool.connect`` wrapped three times; here each
+    statement and each checkout is timed once and the result handed to every
+    observer.
+    """
+
+    def __init__(self, engine: Engine):
+        self.query_observers: List[QueryObserver] = []
+        self.connect_observers: List[ConnectObserver] = []
+        self.checkout_observers: List[PoolObserver] = []
+        self.return_observers: List[PoolObserver] = []
+
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+        event.listen(engine, "handle_error", self._error)
+
+        pool = engine.pool
+        event.listen(pool, "checkout", self._checkout)
+        event.listen(pool, "checkin", self._returned)
+        event.listen(pool, "detach", self._returned)
+
+        # Pool.connect blocks while the pool is exhausted; the engine looks it up per call
+        connect = pool.connect
+
+        def observed_connect():
+            started = time.perf_counter()
+            error = None
+            try:
+                return connect()
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                waited = time.perf_counter() - started
+                for observer in self.connect_observers:
+                    observer(waited, error)
+
+        pool.connect = observed_connect
+
+    def on_query(self, observer: QueryObserver) -> None:
+        self.query_observers.append(observer)
+
+    def on_connect(self, observer: ConnectObserver) -> None:
+        self.connect_observers.append(observer)
+
+    def on_checkout(self, observer: PoolObserver) -> None:
+        self.checkout_observers.append(observer)
+
+    def on_return(self, observer: PoolObserver) -> None:
+        self.return_observers.append(observer)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info["query_started"].pop()
+        for observer in self.query_observers:
+            observer(conn, cursor, statement, parameters, executemany, duration)
+
+    def _error(self, context):
+        if context.connection is not None:
+            stack = context.connection.info.get("query_started")
+            if stack:
+                stack.pop()
+
+    def _checkout(self, dbapi_connection, connection_record, connection_proxy):
+        for observer in self.checkout_observers:
+            observer(connection_record)
+
+    def _returned(self, dbapi_connection, connection_record):
+        for observer in self.return_observers:
+            observer(connection_record)
+
+
+def engine_hooks(engine: Engine) -> EngineHooks:
+    """The listeners of ``engine``, registered on first use."""
+    hooks = _hooks.get(engine)
+    if hooks is None:
+        hooks = _hooks[engine] = EngineHooks(engine)
+    return hooks
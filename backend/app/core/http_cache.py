@@ -0,0 +1,75 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response, status
+
+# Cache-Control policies per endpoint family. Catalog clients must revalidate, but
+# a revalidation that ends in 304 costs no body and no serialization.
+CACHE_POLICY_ITEMS = "private, max-age=0, must-revalidate"
+CACHE_POLICY_CATEGORIES = "private, max-age=60, must-revalidate"
+CACHE_POLICY_LOCATIONS = "private, max-age=300, must-revalidate"
+
+
+def make_etag(tag: str, request: Request) -> str:
+    """Build a weak ETag from a data version and the query that shaped the response."""
+    raw = f"{tag}|{request.url.path}|{request.url.query}"
+    return f'W/"{hashlib.blake2b(raw.encode("utf-8"), digest_size=12).hexdigest()}"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/ prefixes are ignored on both sides
+    candidates = {candidate.strip().replace("W/", "", 1) for candidate in if_none_match.split(",")}
+    return etag.replace("W/", "", 1) in candidates
+
+
+def _not_modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    # HTTP dates have whole-second precision
+    return last_modified.replace(microsecond=0) <= since
+
+
+def conditional_get(
+    request: Request,
+    response: Response,
+    tag: str,
+    last_modified: Optional[datetime],
+    cache_control: str,
+) -> Optional[Response]:
+    """Apply validators to a GET response and short-circuit when the client is current.
+
+    ``tag`` must change whenever the underlying data changes (a table version or
+    snapshot stamp), so no payload has to be serialized to compute the ETag.
+    Returns a bodiless 304 response when ``If-None-Match`` (or, failing that,
+    ``If-Modified-Since``) shows the client's copy is still valid; otherwise sets
+    the headers on ``response`` and returns ``None``.
+    """
+    etag = make_etag(tag, request)
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        # Timestamps are stored as naive UTC
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        not_modified = _etag_matches(if_none_match, etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        not_modified = bool(
+            if_modified_since and last_modified and _not_modified_since(if_modified_since, last_modified)
+        )
+
+    if not_modified:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
+    return None
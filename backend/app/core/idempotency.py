@@ -0,0 +1,197 @@
+import hashlib
+import re
+import threading
+from datetime import datetime, timedelta
+from typing import ContextManager, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+
+from .config import settings
+from .logging import get_logger
+from .profiling import background_thread
+
+logger = get_logger(__name__)
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+REPLAYED_HEADER = b"idempotent-replayed"
+
+# Requests that change data; only these are deduplicated
+WRITE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+
+# Client-generated keys, typically UUIDs; stored prefixed with the caller, within the 255-character column
+KEY_PATTERN = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+# Responses the same request might not get again (auth, conflicts, throttling, server errors);
+# their key is released so a retry runs the request again
+UNSTORED_STATUSES = frozenset({401, 403, 408, 409, 425, 429})
+
+# Key states, and outcomes of a claim
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+CLAIMED = "claimed"
+REPLAY = "replay"
+MISMATCH = "mismatch"
+
+Headers = List[Tuple[bytes, bytes]]
+
+
+class StoredResponse:
+    """The response of the first request made with a key."""
+
+    __slots__ = ("status_code", "headers", "body")
+
+    def __init__(self, status_code: int, headers: Headers, body: bytes):
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+
+
+def request_fingerprint(method: str, path: str, query_string: bytes, body: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in (method.encode("latin-1"), path.encode("utf-8"), query_string, body):
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def should_store(status_code: int) -> bool:
+    return status_code < 500 and status_code not in UNSTORED_STATUSES
+
+
+class IdempotencyStore:
+    """Idempotency keys and the responses they produced, kept in the ``idempotencykey`` table.
+
+    :meth:`claim` inserts the key before the request runs; the primary key
+    makes exactly one of several concurrent duplicates, in any worker, the
+    owner. The others see the key in progress and wait for the owner to
+    :meth:`complete` it with its response, which they then replay. An owner
+    that fails :meth:`release`\\ s the key so a retry runs again; one that died
+    leaves the key locked only until ``lock_seconds`` have passed. Each claim
+    stores the caller's ``claim_token``, so an owner that was only slow cannot
+    complete or release a key a retry has since taken over. Keys expire
+    ``ttl`` seconds after they were claimed and are deleted by a background
+    thread every ``purge_interval`` seconds.
+    """
+
+    def __init__(
+        self, ttl: float, lock_seconds: float, wait_seconds: float, max_response_bytes: int, purge_interval: float
+    ):
+        self.ttl = ttl
+        self.lock_seconds = lock_seconds
+        self.wait_seconds = wait_seconds
+        self.max_response_bytes = max_response_bytes
+        self.purge_interval = purge_interval
+        self.engine: Optional[Engine] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _begin(self) -> ContextManager[Connection]:
+        # Imported here so the store can be configured before the database module loads
+        from .database import begin_write
+        return begin_write(self.engine)
+
+    def claim(self, key: str, fingerprint: str, claim_token: str) -> Tuple[str, Optional[StoredResponse]]:
+        """Take ``key`` for a new request, or report why not: ``REPLAY``, ``IN_PROGRESS`` or ``MISMATCH``.
+
+        ``claim_token`` is unique to the calling request and must be passed to
+        :meth:`complete` or :meth:`release`.
+        """
+        from app.models.idempotency_key import IdempotencyKey
+        table = IdempotencyKey.__table__
+        now = datetime.utcnow()
+        claimed = {
+            "fingerprint": fingerprint, "state": IN_PROGRESS, "claim_token": claim_token,
+            "status_code": None, "headers": None, "body": None,
+            "created_at": now, "locked_until": now + timedelta(seconds=self.lock_seconds),
+            "expires_at": now + timedelta(seconds=self.ttl),
+        }
+        # A key deleted or taken over between our statements just means another round
+        for _ in range(3):
+            try:
+                with self._begin() as connection:
+                    connection.execute(insert(table), {"key": key, **claimed})
+                return CLAIMED, None
+            except IntegrityError:
+                pass
+            with self._begin() as connection:
+                row = connection.execute(select(table).where(table.c.key == key)).first()
+                if row is None:
+                    continue
+                if row.expires_at <= now or (row.state == IN_PROGRESS and row.locked_until <= now):
+                    # Compare-and-set on the values we read, so only one retry takes an abandoned key over
+                    taken = connection.execute(update(table).where(
+                        table.c.key == key, table.c.state == row.state, table.c.locked_until == row.locked_until
+                    ).values(**claimed)).rowcount
+                    if taken:
+                        return CLAIMED, None
+                    continue
+            if row.fingerprint != fingerprint:
+                return MISMATCH, None
+            if row.state == COMPLETED:
+                headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in row.headers]
+                return REPLAY, StoredResponse(row.status_code, headers, row.body)
+            return IN_PROGRESS, None
+        return IN_PROGRESS, None
+
+    def complete(self, key: str, claim_token: str, response: StoredResponse) -> bool:
+        """Store the response of the request that claimed ``key``; ``False`` if the claim was taken over."""
+        from app.models.idempotency_key import IdempotencyKey
+        table = IdempotencyKey.__table__
+        headers = [[name.decode("latin-1"), value.decode("latin-1")] for name, value in response.headers]
+        with self._begin() as connection:
+            return bool(connection.execute(update(table).where(
+                table.c.key == key, table.c.state == IN_PROGRESS, table.c.claim_token == claim_token
+            ).values(
+                state=COMPLETED, status_code=response.status_code, headers=headers, body=response.body,
+            )).rowcount)
+
+    def release(self, key: str, claim_token: str) -> bool:
+        """Forget a claimed key whose request failed, so a retry runs it again; ``False`` if it was taken over."""
+        from app.models.idempotency_key import IdempotencyKey
+        table = IdempotencyKey.__table__
+        with self._begin() as connection:
+            return bool(connection.execute(delete(table).where(
+                table.c.key == key, table.c.state == IN_PROGRESS, table.c.claim_token == claim_token
+            )).rowcount)
+
+    def purge(self) -> int:
+        """Delete expired keys."""
+        from app.models.idempotency_key import IdempotencyKey
+        table = IdempotencyKey.__table__
+        with self._begin() as connection:
+            deleted = connection.execute(delete(table).where(table.c.expires_at <= datetime.utcnow())).rowcount
+        if deleted:
+            logger.info(f"Purged {deleted} expired idempotency keys")
+        return deleted
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = background_thread("idempotency-purge", self._run)
+        self._thread.start()
+
+    def stop(self) -> None:
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.purge_interval):
+            try:
+                self.purge()
+            except Exception as e:
+                logger.error(f"Idempotency key purge failed: {e}")
+
+
+# Shared idempotency store
+idempotency_store = IdempotencyStore(
+    ttl=settings.IDEMPOTENCY_TTL_SECONDS,
+    lock_seconds=settings.IDEMPOTENCY_LOCK_SECONDS,
+    wait_seconds=settings.IDEMPOTENCY_WAIT_SECONDS,
+    max_response_bytes=settings.IDEMPOTENCY_MAX_RESPONSE_BYTES,
+    purge_interval=settings.IDEMPOTENCY_PURGE_INTERVAL_SECONDS,
+)
@@ -1,12 +1,15 @@
+import atexit
 import logging
+import queue
+import random
 import sys
-import json
 import uuid
 from datetime import datetime
 from pathlib import Path
 from typing import Optional, Dict, Any
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from contextvars import ContextVar
+import orjson
 from .config import settings
 
 # Context variable for correlation ID
@@ -26,23 +29,26 @@ class StructuredFormatter(logging.Formatter):
     def format(self, record: logging.LogRecord) -> str:
         # Create structured log entry
         log_entry = {
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": datetime.utcfromtimestamp(record.created).isoformat(),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
-            "correlation_id": get_correlation_id(),
+            # Captured when the record was made; this may run on the log writer thread
+            "correlation_id": getattr(record, "correlation_id", None) or get_correlation_id(),
         }
         
         # Add exception info if present
         if record.exc_info:
             log_entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            log_entry["exception"] = record.exc_text
         
         # Add extra fields if present
         extra_fields = getattr(record, 'extra_fields', None)
         if extra_fields:
             log_entry.update(extra_fields)
         
-        return json.dumps(log_entry)
+        return orjson.dumps(log_entry, default=str).decode("utf-8")
 
 class CorrelationFilter(logging.Filter):
     """Filter to add correlation ID to log records."""
@@ -51,6 +57,64 @@ class CorrelationFilter(logging.Filter):
         record.correlation_id = get_correlation_id()
         return True
 
+class DroppingQueueHandler(QueueHandler):
+    """Hands records to the log writer thread; drops them rather than block when it falls behind."""
+    
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]"):
+        super().__init__(log_queue)
+        self.dropped = 0
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve everything that depends on the calling thread or on mutable
+        # arguments now; formatting itself happens on the writer thread
+        record = logging.makeLogRecord(record.__dict__)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+    
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogWriter(QueueListener):
+    """Writes queued records to the handlers on a background thread that profiles leave out."""
+    
+    def start(self) -> None:
+        # Imported here because app.core.profiling imports this module
+        from .profiling import background_thread
+        self._thread = background_thread("log-writer", self._monitor)
+        self._thread.start()
+
+
+# Background log writer; replaced whenever setup_logging runs
+_listener: Optional[QueueListener] = None
+
+
+def shutdown_logging() -> None:
+    """Stop the log writer thread after it has written every queued record."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
+def sample_request_log(status_code: int) -> bool:
+    """Whether to log a completed request: 2xx at LOG_SAMPLE_RATE_2XX, everything else always."""
+    if not 200 <= status_code < 300 or settings.LOG_SAMPLE_RATE_2XX >= 1:
+        return True
+    return random.random() < settings.LOG_SAMPLE_RATE_2XX
+
+
 def setup_logging(
     log_level: Optional[str] = None,
     log_file: Optional[str] = None,
@@ -59,6 +123,9 @@ def setup_logging(
     """
     Setup logging configuration for the application.
     
+    Loggers only put records on a bounded queue; a listener thread formats them
+    and does the console and file I/O, so logging never blocks a request.
+    
     Args:
         log_level: Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
         log_file: Path to log file
@@ -78,12 +145,9 @@ def setup_logging(
     root_logger.setLevel(getattr(logging, log_level.upper()))
     
     # Clear existing handlers
+    shutdown_logging()
     root_logger.handlers.clear()
     
-    # Add correlation filter
-    correlation_filter = CorrelationFilter()
-    root_logger.addFilter(correlation_filter)
-    
     # Console handler with structured logging
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(getattr(logging, log_level.upper()))
@@ -99,7 +163,7 @@ def setup_logging(
         )
     
     console_handler.setFormatter(console_formatter)
-    root_logger.addHandler(console_handler)
+    handlers = [console_handler]
     
     # File handler with rotation
     if log_file:
@@ -119,7 +183,17 @@ def setup_logging(
             )
         
         file_handler.setFormatter(file_formatter)
-        root_logger.addHandler(file_handler)
+        handlers.append(file_handler)
+    
+    # Handler-level filters see propagated records too, and run in the calling
+    # thread, where the correlation ID is still set
+    queue_handler = DroppingQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+    queue_handler.addFilter(CorrelationFilter())
+    root_logger.addHandler(queue_handler)
+    
+    global _listener
+    _listener = LogWriter(queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
     
     # Set specific logger levels
     logging.getLogger("uvicorn").setLevel(logging.INFO)
@@ -0,0 +1,413 @@
+import glob
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+from sqlalchemy.engine import Engine
+
+from .config import settings
+from .engine_hooks import engine_hooks
+from .logging import get_logger
+from .profiling import background_thread
+
+logger = get_logger(__name__)
+
+# Upper bounds in seconds, as used by the Prometheus client libraries
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Route label for requests that matched no route, so scanners cannot blow up cardinality
+UNMATCHED_ROUTE = "unmatched"
+
+# Route label for queries issued outside a request (background threads, startup)
+BACKGROUND_ROUTE = "background"
+
+Labels = Tuple[str, ...]
+
+
+class Metric:
+    """Name, type, help text and label names of one metric family."""
+
+    def __init__(self, name: str, kind: str, help_text: str, labels: Labels = (), buckets: Tuple[float, ...] = ()):
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+        self.labels = labels
+        self.buckets = buckets
+
+
+HTTP_REQUESTS = Metric("http_requests_total", "counter", "Requests served", ("method", "route", "status"))
+HTTP_DURATION = Metric(
+    "http_request_duration_seconds", "histogram", "Request latency", ("method", "route"), DEFAULT_BUCKETS
+)
+HTTP_IN_FLIGHT = Metric("http_requests_in_flight", "gauge", "Requests currently being served")
+DB_QUERIES = Metric("db_queries_total", "counter", "SQL statements executed", ("route",))
+DB_DURATION = Metric(
+    "db_query_duration_seconds", "histogram", "SQL statement execution time", ("route",), DEFAULT_BUCKETS
+)
+DB_POOL_WAIT = Metric(
+    "db_pool_checkout_wait_seconds", "histogram", "Time spent waiting for a pooled connection", (),
+    (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+)
+DB_POOL_SIZE = Metric("db_pool_size", "gauge", "Connections the pool keeps open", ("pool",))
+DB_POOL_CHECKED_OUT = Metric("db_pool_checked_out", "gauge", "Connections currently in use", ("pool",))
+DB_POOL_OVERFLOW = Metric("db_pool_overflow", "gauge", "Connections opened beyond the pool size", ("pool",))
+DB_POOL_CHECKOUTS = Metric("db_pool_checkouts_total", "counter", "Connections checked out of the pool", ("pool",))
+DB_POOL_TIMEOUTS = Metric(
+    "db_pool_timeouts_total", "counter", "Checkouts that gave up waiting for a free connection", ("pool",)
+)
+DB_POOL_LONG_HOLDS = Metric(
+    "db_pool_long_holds_total", "counter", "Connections returned after being held longer than the leak threshold",
+    ("pool",)
+)
+DB_POOL_HELD_TOO_LONG = Metric(
+    "db_pool_held_too_long", "gauge", "Connections currently held longer than the leak threshold", ("pool",)
+)
+CACHE_HITS = Metric("cache_hits_total", "counter", "Cache lookups served from memory", ("cache",))
+CACHE_MISSES = Metric("cache_misses_total", "counter", "Cache lookups that had to load", ("cache",))
+CACHE_HIT_RATIO = Metric("cache_hit_ratio", "gauge", "Share of lookups served from memory", ("cache",))
+
+METRICS = {
+    metric.name: metric
+    for metric in (
+        HTTP_REQUESTS, HTTP_DURATION, HTTP_IN_FLIGHT, DB_QUERIES, DB_DURATION, DB_POOL_WAIT,
+        DB_POOL_SIZE, DB_POOL_CHECKED_OUT, DB_POOL_OVERFLOW, DB_POOL_CHECKOUTS, DB_POOL_TIMEOUTS,
+        DB_POOL_LONG_HOLDS, DB_POOL_HELD_TOO_LONG, CACHE_HITS, CACHE_MISSES, CACHE_HIT_RATIO,
+    )
+}
+
+
+class _Shard:
+    """Counters and histograms written by a single thread."""
+
+    def __init__(self):
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        # Per-bucket counts (non-cumulative), then the +Inf bucket, then the sum
+        self.histograms: Dict[Tuple[str, Labels], List[float]] = {}
+
+
+class MetricsRegistry:
+    """In-process metric storage that never takes a lock on the hot path.
+
+    Each thread writes to its own shard, so :meth:`inc` and :meth:`observe` are
+    a dict lookup and an addition. :meth:`snapshot` merges the shards and adds
+    gauges from registered collectors, which are called only at scrape time.
+    With ``directory`` set, every worker writes its snapshot to
+    ``metrics-<pid>.json`` there every ``flush_interval`` seconds and
+    :meth:`render` merges all files, so any worker can answer a scrape for the
+    whole server. Counters from workers that have exited are kept so totals
+    never go backwards; their gauges are dropped.
+    """
+
+    def __init__(self, directory: Optional[str] = None, flush_interval: float = 5.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.in_flight = 0
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        self._shards_lock = threading.Lock()
+        self._collectors: List[Callable[[], Iterable[Tuple[Metric, Labels, float]]]] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _shard(self) -> _Shard:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = _Shard()
+            with self._shards_lock:
+                self._shards.append(shard)
+            return shard
+
+    def inc(self, metric: Metric, labels: Labels = (), value: float = 1) -> None:
+        counters = self._shard().counters
+        key = (metric.name, labels)
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, metric: Metric, labels: Labels, value: float) -> None:
+        histograms = self._shard().histograms
+        key = (metric.name, labels)
+        counts = histograms.get(key)
+        if counts is None:
+            counts = histograms[key] = [0.0] * (len(metric.buckets) + 2)
+        counts[bisect_left(metric.buckets, value)] += 1
+        counts[-1] += value
+
+    def add_collector(self, collector: Callable[[], Iterable[Tuple[Metric, Labels, float]]]) -> None:
+        """Register a callable yielding ``(metric, labels, value)`` gauge samples at scrape time."""
+        self._collectors.append(collector)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Merge all shards and collectors into a JSON-serialisable snapshot."""
+        counters: Dict[str, Dict[str, float]] = {}
+        histograms: Dict[str, Dict[str, List[float]]] = {}
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            # dict() copies in one step under the GIL, so a concurrent insert cannot break iteration
+            for (name, labels), value in dict(shard.counters).items():
+                series = counters.setdefault(name, {})
+                key = _label_key(labels)
+                series[key] = series.get(key, 0) + value
+            for (name, labels), counts in dict(shard.histograms).items():
+                series = histograms.setdefault(name, {})
+                key = _label_key(labels)
+                merged = series.get(key)
+                series[key] = list(counts) if merged is None else [a + b for a, b in zip(merged, counts)]
+
+        gauges: Dict[str, Dict[str, float]] = {HTTP_IN_FLIGHT.name: {"": self.in_flight}}
+        for collector in self._collectors:
+            try:
+                for metric, labels, value in collector():
+                    target = counters if metric.kind == "counter" else gauges
+                    target.setdefault(metric.name, {})[_label_key(labels)] = value
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {e}")
+        return {"pid": os.getpid(), "counters": counters, "histograms": histograms, "gauges": gauges}
+
+    def render(self) -> str:
+        """Text exposition of this worker, or of every worker sharing ``directory``."""
+        snapshots = [self.snapshot()]
+        if self.directory:
+            self.flush(snapshots[0])
+            snapshots = self._read_all()
+        return _render(_merge(snapshots))
+
+    def flush(self, snapshot: Optional[Dict[str, Any]] = None) -> None:
+        """Atomically replace this worker's snapshot file."""
+        if not self.directory:
+            return
+        snapshot = snapshot or self.snapshot()
+        path = os.path.join(self.directory, f"metrics-{snapshot['pid']}.json")
+        temporary = f"{path}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temporary, "wb") as f:
+                f.write(orjson.dumps(snapshot))
+            os.replace(temporary, path)
+        except OSError as e:
+            logger.warning(f"Failed to write metrics snapshot: {e}")
+
+    def start(self) -> None:
+        """Start writing snapshots to ``directory`` in the background."""
+        if not self.directory or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = background_thread("metrics-flush", self._run)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background writer after one final snapshot."""
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+        self.flush()
+
+    def reset(self) -> None:
+        """Forget everything recorded so far (tests)."""
+        with self._shards_lock:
+            for shard in self._shards:
+                shard.counters.clear()
+                shard.histograms.clear()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def _read_all(self) -> List[Dict[str, Any]]:
+        snapshots = []
+        for path in glob.glob(os.path.join(self.directory, "metrics-*.json")):
+            try:
+                with open(path, "rb") as f:
+                    snapshot = orjson.loads(f.read())
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable metrics snapshot {path}: {e}")
+                continue
+            if snapshot["pid"] != os.getpid() and not _pid_alive(snapshot["pid"]):
+                snapshot["gauges"] = {}
+            snapshots.append(snapshot)
+        return snapshots
+
+
+def _label_key(labels: Labels) -> str:
+    return "\x1f".join(labels)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _merge(snapshots: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Sum counters, histograms and gauges across worker snapshots."""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for snapshot in snapshots:
+        for section in ("counters", "gauges"):
+            for name, series in snapshot[section].items():
+                target = merged.setdefault(name, {})
+                for key, value in series.items():
+                    target[key] = target.get(key, 0) + value
+        for name, series in snapshot["histograms"].items():
+            target = merged.setdefault(name, {})
+            for key, counts in series.items():
+                existing = target.get(key)
+                target[key] = list(counts) if existing is None else [a + b for a, b in zip(existing, counts)]
+
+    # Ratios cannot be summed across workers, so derive them from the merged counters
+    hits, misses = merged.get(CACHE_HITS.name, {}), merged.get(CACHE_MISSES.name, {})
+    ratios = {}
+    for key in hits:
+        total = hits[key] + misses.get(key, 0)
+        ratios[key] = hits[key] / total if total else 0.0
+    if ratios:
+        merged[CACHE_HIT_RATIO.name] = ratios
+    return merged
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Labels, key: str, extra: str = "") -> str:
+    values = key.split("\x1f") if names else []
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _render(merged: Dict[str, Dict[str, Any]]) -> str:
+    lines = []
+    for name, metric in METRICS.items():
+        series = merged.get(name)
+        if not series:
+            continue
+        lines.append(f"# HELP {name} {metric.help}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for key in sorted(series):
+            value = series[key]
+            if metric.kind != "histogram":
+                lines.append(f"{name}{_format_labels(metric.labels, key)} {_format_value(value)}")
+                continue
+            cumulative = 0.0
+            for bound, count in zip(metric.buckets + (float("inf"),), value[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{name}_bucket{_format_labels(metric.labels, key, le)} {_format_value(cumulative)}")
+            labels = _format_labels(metric.labels, key)
+            lines.append(f"{name}_sum{labels} {_format_value(value[-1])}")
+            lines.append(f"{name}_count{labels} {_format_value(cumulative)}")
+    return "\n".join(lines) + "\n"
+
+
+class RequestMetrics:
+    """Queries timed during one request.
+
+    The route is only known once routing has run, so query timings are held
+    here and recorded under the route template when the request finishes.
+    """
+
+    __slots__ = ("query_durations",)
+
+    def __init__(self):
+        self.query_durations: List[float] = []
+
+
+# Metrics of the request being served, read by the query timing hooks
+_current_request: ContextVar[Optional[RequestMetrics]] = ContextVar("request_metrics", default=None)
+
+
+def route_label(scope: Dict[str, Any]) -> str:
+    """The matched route template (``/api/v1/items/{item_id}``), never the raw path."""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    # Plain Starlette routes (docs, openapi.json) have no parameters, so their path is bounded
+    return scope["path"] if "endpoint" in scope else UNMATCHED_ROUTE
+
+
+def begin_request() -> RequestMetrics:
+    """Mark the start of a request.
+
+    Called only from the event loop thread, so ``in_flight`` needs no lock.
+    """
+    request = RequestMetrics()
+    _current_request.set(request)
+    metrics.in_flight += 1
+    return request
+
+
+def end_request(request: RequestMetrics, method: str, route: str, status_code: int, duration: float) -> None:
+    """Record a finished request and its queries under ``route``."""
+    metrics.in_flight -= 1
+    metrics.inc(HTTP_REQUESTS, (method, route, str(status_code)))
+    metrics.observe(HTTP_DURATION, (method, route), duration)
+    if request.query_durations:
+        labels = (route,)
+        metrics.inc(DB_QUERIES, labels, len(request.query_durations))
+        for query_duration in request.query_durations:
+            metrics.observe(DB_DURATION, labels, query_duration)
+
+
+def instrument_engine(engine: Engine, pool_name: str = "primary") -> None:
+    """Time SQL statements and pool checkouts on ``engine`` and report pool usage under ``pool_name``."""
+
+    hooks = engine_hooks(engine)
+
+    def record_query(conn, cursor, statement, parameters, executemany, duration):
+        request = _current_request.get()
+        if request is not None:
+            request.query_durations.append(duration)
+        else:
+            metrics.inc(DB_QUERIES, (BACKGROUND_ROUTE,))
+            metrics.observe(DB_DURATION, (BACKGROUND_ROUTE,), duration)
+
+    def record_wait(waited, error):
+        metrics.observe(DB_POOL_WAIT, (), waited)
+
+    hooks.on_query(record_query)
+    hooks.on_connect(record_wait)
+    pool = engine.pool
+
+    def pool_usage():
+        # Only queue-style pools report a size; StaticPool (SQLite) has none
+        if hasattr(pool, "checkedout") and hasattr(pool, "size"):
+            labels = (pool_name,)
+            yield DB_POOL_SIZE, labels, pool.size()
+            yield DB_POOL_CHECKED_OUT, labels, pool.checkedout()
+            yield DB_POOL_OVERFLOW, labels, max(pool.overflow(), 0)
+
+    metrics.add_collector(pool_usage)
+
+
+def cache_stats():
+    """Hit and miss counters of the in-process caches."""
+    # Imported here because the caches import database, which instruments itself with this module
+    from .cache import catalog_cache
+    from .principal import principal_cache
+    from .token_cache import token_cache
+
+    for name, cache in (("catalog", catalog_cache), ("principals", principal_cache), ("tokens", token_cache)):
+        stats = cache.stats()
+        yield CACHE_HITS, (name,), stats["hits"]
+        yield CACHE_MISSES, (name,), stats["misses"]
+
+
+# Shared metrics registry
+metrics = MetricsRegistry(directory=settings.METRICS_DIR, flush_interval=settings.METRICS_FLUSH_INTERVAL_SECONDS)
+metrics.add_collector(cache_stats)
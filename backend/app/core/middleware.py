@@ -1,302 +1,390 @@
+import asyncio
+import json
+import re
 import time
 import uuid
-from typing import Callable
-from fastapi import Request, Response
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from sqlalchemy.exc import SQLAlchemyError
 from pydantic import ValidationError as PydanticValidationError
 
-from .logging import get_logger, set_correlation_id, get_correlation_id, log_with_context
-from .exceptions import BaseAppException, convert_to_http_exception
-from .config import settings
+from .logging import get_logger, set_correlation_id, get_correlation_id, log_with_context, sample_request_log
+from .exceptions import BaseAppException
+from .config import settings, config_manager
+from .rate_limit import RateLimiter, client_key, rate_limiter
+from .idempotency import (
+    IDEMPOTENCY_HEADER, IN_PROGRESS, KEY_PATTERN, MISMATCH, REPLAY, REPLAYED_HEADER, WRITE_METHODS,
+    IdempotencyStore, StoredResponse, idempotency_store, request_fingerprint, should_store,
+)
+from .metrics import begin_request, end_request, route_label
+from .query_monitor import QueryMonitor, query_monitor as default_query_monitor
+from .profiling import Profiler, can_profile, profiler as default_profiler
+from .security import SecurityConfig
 
 logger = get_logger(__name__)
 
+Headers = List[Tuple[bytes, bytes]]
 
-class CorrelationMiddleware(BaseHTTPMiddleware):
-    """Middleware to add correlation IDs to requests."""
-    
-    def __init__(self, app: ASGIApp):
-        super().__init__(app)
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        # Generate correlation ID for this request
-        correlation_id = str(uuid.uuid4())
-        set_correlation_id(correlation_id)
-        
-        # Add correlation ID to request headers
-        request.state.correlation_id = correlation_id
-        
-        # Add correlation ID to response headers
-        response = await call_next(request)
-        response.headers["X-Correlation-ID"] = correlation_id
-        
-        return response
-
-
-class LoggingMiddleware(BaseHTTPMiddleware):
-    """Middleware to log request and response information."""
-    
-    def __init__(self, app: ASGIApp):
-        super().__init__(app)
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        # Start timing
-        start_time = time.time()
-        
-        # Log request
-        log_with_context(
-            logger,
-            "info",
-            "Request started",
-            method=request.method,
-            url=str(request.url),
-            client_ip=request.client.host if request.client else None,
-            user_agent=request.headers.get("user-agent"),
-            correlation_id=get_correlation_id()
+# Incoming correlation IDs are reused only if they look like one of ours
+CORRELATION_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+# Interactive docs load scripts from a CDN, which the API's CSP would block
+DOCS_PATHS = ("/docs", "/redoc")
+
+# How often a duplicate request checks whether the original has finished
+IDEMPOTENCY_POLL_SECONDS = 0.1
+
+# Content types accepted for request bodies
+ALLOWED_CONTENT_TYPES = ("application/json", "multipart/form-data", "application/x-www-form-urlencoded")
+
+
+def encode_headers(headers: Dict[str, str]) -> Headers:
+    """Encode headers once for reuse on every response; empty values are skipped."""
+    return [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers.items() if value]
+
+
+def error_body(message: str, code: str, details: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """The error envelope used by every response the pipeline produces itself."""
+    return {
+        "error": {
+            "message": message,
+            "code": code,
+            "details": details or {},
+            "correlation_id": get_correlation_id()
+        }
+    }
+
+
+def map_exception(exc: Exception) -> Tuple[int, Dict[str, Any]]:
+    """Map an exception that escaped the app to a status code and error envelope."""
+    if isinstance(exc, BaseAppException):
+        log_with_context(logger, "error", f"Application error: {exc.message}",
+                         error_code=exc.error_code, status_code=exc.status_code, details=exc.details)
+        return exc.status_code, error_body(exc.message, exc.error_code, exc.details)
+
+    if isinstance(exc, PydanticValidationError):
+        log_with_context(logger, "error", f"Validation error: {exc}",
+                         error_code="VALIDATION_ERROR", status_code=422)
+        return 422, error_body("Validation error", "VALIDATION_ERROR", {"errors": exc.errors()})
+
+    if isinstance(exc, SQLAlchemyError):
+        log_with_context(logger, "error", f"Database error: {exc}",
+                         error_code="DATABASE_ERROR", status_code=500)
+        details = {} if settings.is_production else {"database_error": str(exc)}
+        return 500, error_body("Database operation failed", "DATABASE_ERROR", details)
+
+    logger.exception(f"Unexpected error: {exc}")
+    # In production, don't expose internal errors
+    if settings.is_production:
+        return 500, error_body("Internal server error", "INTERNAL_SERVER_ERROR")
+    return 500, error_body(str(exc), "INTERNAL_SERVER_ERROR", {"unexpected_error": str(exc)})
+
+
+class RequestPipeline:
+    """All cross-cutting request handling in one pure ASGI middleware.
+
+    In a single pass per request it assigns a correlation ID, rejects oversized
+    or mistyped bodies, applies rate limits, maps escaped exceptions to the JSON
+    error envelope, adds security headers (encoded once at startup), runs
+    writes sent with an ``Idempotency-Key`` at most once, records request
+    metrics, checks query budgets, profiles requests that opt in and logs the
+    outcome with its duration. Unlike stacked ``BaseHTTPMiddleware`` layers
+    it adds no extra task or response stream per request.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        security_headers: Optional[Dict[str, str]] = None,
+        limiter: Optional[RateLimiter] = None,
+        rate_limiting: Optional[bool] = None,
+        max_body_size: Optional[int] = None,
+        profiler: Optional[Profiler] = None,
+        monitor: Optional[QueryMonitor] = None,
+        idempotency: Optional[IdempotencyStore] = None,
+    ):
+        self.app = app
+        self.idempotency = idempotency or (idempotency_store if settings.IDEMPOTENCY_ENABLED else None)
+        self.profiler = profiler or default_profiler
+        self.monitor = monitor or default_query_monitor
+        self.limiter = limiter or rate_limiter
+        self.rate_limiting = (
+            config_manager.get_environment_config()["rate_limiting"] if rate_limiting is None else rate_limiting
         )
-        
-        # Process request
+        self.max_body_size = settings.MAX_FILE_SIZE if max_body_size is None else max_body_size
+
+        if security_headers is None:
+            security_headers = SecurityConfig.get_security_headers()
+            security_headers["Content-Security-Policy"] = SecurityConfig.get_csp_policy()
+        self.api_headers = encode_headers(security_headers)
+        self.docs_headers = encode_headers(
+            {name: value for name, value in security_headers.items() if name != "Content-Security-Policy"}
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        request_metrics = begin_request()
+        headers = {name: value for name, value in scope["headers"]}
+        path = scope["path"]
+
+        correlation_id = headers.get(b"x-correlation-id", b"").decode("latin-1")
+        if not CORRELATION_ID_PATTERN.match(correlation_id):
+            correlation_id = uuid.uuid4().hex
+        set_correlation_id(correlation_id)
+        request_queries = self.monitor.begin_request()
+
+        extra_headers = self.docs_headers if path.startswith(DOCS_PATHS) else self.api_headers
+        extra_headers = extra_headers + [(b"x-correlation-id", correlation_id.encode("latin-1"))]
+        profile = None
+        status_code = 500
+        response_started = False
+
+        async def send_with_headers(message: Message) -> None:
+            nonlocal status_code, response_started
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                response_started = True
+                message = {**message, "headers": list(message.get("headers", [])) + extra_headers}
+            await send(message)
+
         try:
-            response = await call_next(request)
-            
-            # Calculate duration
-            duration = time.time() - start_time
-            
-            # Log response
-            log_with_context(
-                logger,
-                "info",
-                "Request completed",
-                method=request.method,
-                url=str(request.url),
-                status_code=response.status_code,
-                duration=duration,
-                correlation_id=get_correlation_id()
-            )
-            
-            return response
-            
-        except Exception as e:
-            # Calculate duration
-            duration = time.time() - start_time
-            
-            # Log error
-            log_with_context(
-                logger,
-                "error",
-                "Request failed",
-                method=request.method,
-                url=str(request.url),
-                error=str(e),
-                duration=duration,
-                correlation_id=get_correlation_id()
+            if self.profiler.enabled:
+                profile = await self._start_profile(scope, headers)
+                if profile is not None and profile.path:
+                    extra_headers = extra_headers + [(b"x-profile-path", profile.path.encode("latin-1"))]
+            rejection = self._validate(scope, headers)
+            if rejection is None and self.rate_limiting:
+                rejection, limit_headers = await self._rate_limit(scope, headers)
+                extra_headers = extra_headers + limit_headers
+            idempotency_key = headers.get(IDEMPOTENCY_HEADER)
+            if rejection is not None:
+                await self._respond(send_with_headers, *rejection)
+            elif idempotency_key is not None and self.idempotency and scope["method"] in WRITE_METHODS:
+                await self._idempotent(scope, receive, send_with_headers, headers, idempotency_key)
+            else:
+                await self.app(scope, receive, send_with_headers)
+        except Exception as exc:
+            if response_started:
+                raise
+            await self._respond(send_with_headers, *map_exception(exc))
+        finally:
+            duration = time.perf_counter() - started
+            route = route_label(scope)
+            end_request(request_metrics, scope["method"], route, status_code, duration)
+            self.monitor.end_request(request_queries, route)
+            if profile is not None:
+                # Writing the profile is file I/O; the response has already been sent
+                await run_in_threadpool(profile.finish, route)
+            if sample_request_log(status_code):
+                log_with_context(
+                    logger,
+                    "info" if status_code < 500 else "error",
+                    "Request completed",
+                    method=scope["method"],
+                    path=path,
+                    status_code=status_code,
+                    duration_ms=round(duration * 1000, 2),
+                    client_ip=scope["client"][0] if scope.get("client") else None,
+                )
+
+    async def _start_profile(self, scope: Scope, headers: Dict[bytes, bytes]):
+        """Profile requests sent with ``X-Profile: 1`` by an allowed caller, plus 1 in N for the aggregate."""
+        requested = headers.get(b"x-profile") == b"1"
+        if requested:
+            authorization = headers.get(b"authorization")
+            requested = await run_in_threadpool(
+                can_profile, authorization.decode("latin-1") if authorization else None
             )
-            
-            raise
+        return self.profiler.begin(scope["method"], requested, self.profiler.should_sample())
+
+    def _validate(self, scope: Scope, headers: Dict[bytes, bytes]) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """Reject oversized bodies and body content types the API does not accept."""
+        content_length = headers.get(b"content-length")
+        if content_length is not None:
+            try:
+                size = int(content_length)
+            except ValueError:
+                return 400, error_body("Invalid Content-Length header", "BAD_REQUEST")
+            if size > self.max_body_size:
+                log_with_context(logger, "warning", f"Request too large: {size} bytes", path=scope["path"])
+                return 413, error_body("Request too large", "REQUEST_TOO_LARGE", {"max_bytes": self.max_body_size})
+        else:
+            size = 0
+
+        has_body = size > 0 or b"transfer-encoding" in headers
+        if has_body and scope["method"] in ("POST", "PUT", "PATCH"):
+            content_type = headers.get(b"content-type", b"").decode("latin-1")
+            if not content_type.startswith(ALLOWED_CONTENT_TYPES):
+                log_with_context(logger, "warning", f"Invalid content type: {content_type}", path=scope["path"])
+                return 415, error_body("Unsupported media type", "UNSUPPORTED_MEDIA_TYPE")
+        return None
+
+    async def _rate_limit(
+        self, scope: Scope, headers: Dict[bytes, bytes]
+    ) -> Tuple[Optional[Tuple[int, Dict[str, Any]]], Headers]:
+        """Count the request against its bucket; returns a rejection and headers to add."""
+        authorization = headers.get(b"authorization")
+        client = scope.get("client")
+        client_host = client[0] if client else None
+        if authorization:
+            # Verifying the token may run the JWT signature check, so keep it off the event loop
+            key = await run_in_threadpool(client_key, authorization.decode("latin-1"), client_host)
+        else:
+            key = client_key(None, client_host)
+        if self.limiter.blocking:
+            # A shared store is a network round trip
+            result = await run_in_threadpool(self.limiter.check, key, scope["path"])
+        else:
+            result = self.limiter.check(key, scope["path"])
+        if result is None:
+            return None, []
+        limit_headers = encode_headers(result.headers())
+        if result.allowed:
+            return None, limit_headers
+        log_with_context(logger, "warning", f"Rate limit exceeded for {key}", client_key=key, path=scope["path"])
+        details = {"retry_after": result.headers()["Retry-After"]}
+        return (429, error_body("Rate limit exceeded", "RATE_LIMIT_ERROR", details)), limit_headers
+
+    async def _idempotent(
+        self, scope: Scope, receive: Receive, send: Send, headers: Dict[bytes, bytes], idempotency_key: bytes
+    ) -> None:
+        """Run a write once per ``Idempotency-Key`` and replay its response, verbatim, to every retry.
 
+        Keys are scoped to the caller (user, or IP when anonymous). A retry
+        arriving while the first request still runs waits for it up to
+        ``IDEMPOTENCY_WAIT_SECONDS`` and gets 409 after that. If the store's
+        database is unavailable the request runs without deduplication rather
+        than failing.
+        """
+        store = self.idempotency
+        key = idempotency_key.decode("latin-1")
+        if not KEY_PATTERN.match(key):
+            await self._respond(send, 400, error_body("Invalid Idempotency-Key header", "BAD_REQUEST"))
+            return
 
-class ErrorHandlingMiddleware(BaseHTTPMiddleware):
-    """Middleware to handle and format errors."""
-    
-    def __init__(self, app: ASGIApp):
-        super().__init__(app)
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        # The fingerprint needs the whole body, so read it here and hand it to the app afterwards
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            size += len(chunks[-1])
+            if size > self.max_body_size:
+                await self._respond(
+                    send, 413, error_body("Request too large", "REQUEST_TOO_LARGE", {"max_bytes": self.max_body_size})
+                )
+                return
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+        body_sent = False
+
+        async def receive_body() -> Message:
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        authorization = headers.get(b"authorization")
+        client = scope.get("client")
+        caller = await run_in_threadpool(
+            client_key, authorization.decode("latin-1") if authorization else None, client[0] if client else None
+        )
+        key = f"{caller}:{key}"
+        fingerprint = request_fingerprint(scope["method"], scope["path"], scope["query_string"], body)
+        claim_token = uuid.uuid4().hex
         try:
-            response = await call_next(request)
-            return response
-            
-        except BaseAppException as e:
-            # Handle custom application exceptions
-            log_with_context(
-                logger,
-                "error",
-                f"Application error: {e.message}",
-                error_code=e.error_code,
-                status_code=e.status_code,
-                details=e.details,
-                correlation_id=get_correlation_id()
-            )
-            
-            return JSONResponse(
-                status_code=e.status_code,
-                content={
-                    "error": {
-                        "message": e.message,
-                        "code": e.error_code,
-                        "details": e.details,
-                        "correlation_id": get_correlation_id()
-                    }
-                }
-            )
-            
-        except PydanticValidationError as e:
-            # Handle Pydantic validation errors
-            log_with_context(
-                logger,
-                "error",
-                f"Validation error: {str(e)}",
-                error_code="VALIDATION_ERROR",
-                status_code=422,
-                details={"errors": e.errors()},
-                correlation_id=get_correlation_id()
-            )
-            
-            return JSONResponse(
-                status_code=422,
-                content={
-                    "error": {
-                        "message": "Validation error",
-                        "code": "VALIDATION_ERROR",
-                        "details": {"errors": e.errors()},
-                        "correlation_id": get_correlation_id()
-                    }
-                }
-            )
-            
-        except SQLAlchemyError as e:
-            # Handle database errors
-            log_with_context(
-                logger,
-                "error",
-                f"Database error: {str(e)}",
-                error_code="DATABASE_ERROR",
-                status_code=500,
-                details={"database_error": str(e)},
-                correlation_id=get_correlation_id()
-            )
-            
-            return JSONResponse(
-                status_code=500,
-                content={
-                    "error": {
-                        "message": "Database operation failed",
-                        "code": "DATABASE_ERROR",
-                        "details": {"database_error": str(e)},
-                        "correlation_id": get_correlation_id()
-                    }
-                }
-            )
-            
-        except Exception as e:
-            # Handle unexpected errors
-            log_with_context(
-                logger,
-                "error",
-                f"Unexpected error: {str(e)}",
-                error_code="INTERNAL_SERVER_ERROR",
-                status_code=500,
-                details={"unexpected_error": str(e)},
-                correlation_id=get_correlation_id()
-            )
-            
-            # In production, don't expose internal errors
-            if settings.is_production:
-                error_message = "Internal server error"
-                error_details = {}
-            else:
-                error_message = str(e)
-                error_details = {"unexpected_error": str(e)}
-            
-            return JSONResponse(
-                status_code=500,
-                content={
-                    "error": {
-                        "message": error_message,
-                        "code": "INTERNAL_SERVER_ERROR",
-                        "details": error_details,
-                        "correlation_id": get_correlation_id()
-                    }
-                }
+            outcome, stored = await run_in_threadpool(store.claim, key, fingerprint, claim_token)
+            deadline = time.monotonic() + store.wait_seconds
+            while outcome == IN_PROGRESS and time.monotonic() < deadline:
+                await asyncio.sleep(IDEMPOTENCY_POLL_SECONDS)
+                outcome, stored = await run_in_threadpool(store.claim, key, fingerprint, claim_token)
+        except SQLAlchemyError as exc:
+            logger.error(f"Idempotency store unavailable, running request without it: {exc}")
+            await self.app(scope, receive_body, send)
+            return
+
+        if outcome == REPLAY:
+            await send({
+                "type": "http.response.start",
+                "status": stored.status_code,
+                "headers": stored.headers + [(REPLAYED_HEADER, b"true")],
+            })
+            await send({"type": "http.response.body", "body": stored.body})
+            return
+        if outcome == MISMATCH:
+            await self._respond(send, 422, error_body(
+                "Idempotency-Key was already used for a different request", "IDEMPOTENCY_KEY_REUSED"
+            ))
+            return
+        if outcome == IN_PROGRESS:
+            await self._respond(
+                send, 409,
+                error_body("A request with this Idempotency-Key is still being processed", "IDEMPOTENCY_KEY_IN_PROGRESS"),
+                [(b"retry-after", b"1")],
             )
+            return
 
+        # Claimed: run the request, keeping the response as the app sent it (before our headers are added)
+        status_code = 500
+        response_headers: Headers = []
+        response_body: List[bytes] = []
+        response_size = 0
 
-class SecurityMiddleware(BaseHTTPMiddleware):
-    """Middleware to add security headers."""
-    
-    def __init__(self, app: ASGIApp):
-        super().__init__(app)
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        response = await call_next(request)
-        
-        # Add security headers
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        
-        # Add CORS headers if not already present
-        if "Access-Control-Allow-Origin" not in response.headers:
-            response.headers["Access-Control-Allow-Origin"] = "*"
-        
-        return response
-
-
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Simple rate limiting middleware."""
-    
-    def __init__(self, app: ASGIApp):
-        super().__init__(app)
-        self.request_counts = {}
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        # Get client IP
-        client_ip = request.client.host if request.client else "unknown"
-        
-        # Simple in-memory rate limiting (not suitable for production)
-        current_time = time.time()
-        window_start = current_time - 60  # 1 minute window
-        
-        # Clean old entries
-        self.request_counts = {
-            ip: count for ip, count in self.request_counts.items()
-            if count["timestamp"] > window_start
-        }
-        
-        # Check rate limit
-        if client_ip in self.request_counts:
-            count_info = self.request_counts[client_ip]
-            if count_info["timestamp"] > window_start:
-                if count_info["count"] >= settings.RATE_LIMIT_PER_MINUTE:
-                    log_with_context(
-                        logger,
-                        "warning",
-                        f"Rate limit exceeded for IP: {client_ip}",
-                        client_ip=client_ip,
-                        correlation_id=get_correlation_id()
-                    )
-                    
-                    return JSONResponse(
-                        status_code=429,
-                        content={
-                            "error": {
-                                "message": "Rate limit exceeded",
-                                "code": "RATE_LIMIT_ERROR",
-                                "details": {"retry_after": 60},
-                                "correlation_id": get_correlation_id()
-                            }
-                        }
+        async def send_and_keep(message: Message) -> None:
+            nonlocal status_code, response_headers, response_size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                response_headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+                if response_size <= store.max_response_bytes:
+                    response_body.append(message.get("body", b""))
+            await send(message)
+
+        completed = False
+        try:
+            await self.app(scope, receive_body, send_and_keep)
+            completed = should_store(status_code) and response_size <= store.max_response_bytes
+        finally:
+            try:
+                if completed:
+                    recorded = await run_in_threadpool(
+                        store.complete, key, claim_token,
+                        StoredResponse(status_code, response_headers, b"".join(response_body)),
                     )
                 else:
-                    count_info["count"] += 1
-            else:
-                self.request_counts[client_ip] = {"count": 1, "timestamp": current_time}
-        else:
-            self.request_counts[client_ip] = {"count": 1, "timestamp": current_time}
-        
-        return await call_next(request)
-
-
-def setup_middleware(app: ASGIApp) -> ASGIApp:
-    """Setup all middleware for the application."""
-    # Note: Order matters - middleware is applied in reverse order
-    app = RateLimitMiddleware(app)
-    app = SecurityMiddleware(app)
-    app = ErrorHandlingMiddleware(app)
-    app = LoggingMiddleware(app)
-    app = CorrelationMiddleware(app)
-    
-    return app 
\ No newline at end of file
+                    # Failed, or a response a retry should not get again: the next attempt runs afresh
+                    recorded = await run_in_threadpool(store.release, key, claim_token)
+                if not recorded:
+                    logger.warning("Idempotency key was taken over by a retry while its request ran")
+            except SQLAlchemyError as exc:
+                logger.error(f"Could not record idempotency key outcome: {exc}")
+
+    @staticmethod
+    async def _respond(send: Send, status_code: int, body: Dict[str, Any], headers: Optional[Headers] = None) -> None:
+        content = json.dumps(body).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(content)).encode("latin-1")),
+            ] + (headers or []),
+        })
+        await send({"type": "http.response.body", "body": content})
+
+
+def setup_middleware(app: FastAPI) -> None:
+    """Install the request pipeline; add it before CORS so CORS stays outermost."""
+    app.add_middleware(RequestPipeline)
@@ -0,0 +1,244 @@
+import threading
+import time
+import traceback
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from .config import settings
+from .engine_hooks import engine_hooks
+from .logging import get_logger
+from .profiling import background_thread
+from .metrics import (
+    DB_POOL_CHECKOUTS, DB_POOL_HELD_TOO_LONG, DB_POOL_LONG_HOLDS, DB_POOL_TIMEOUTS, Labels, Metric, metrics,
+)
+
+logger = get_logger(__name__)
+
+# Frames from these paths are dropped from checkout stacks so the application code shows
+LIBRARY_PATHS = ("/sqlalchemy/", "/sqlmodel/", "/starlette/", "/fastapi/", "/anyio/", "/threading.py", "/contextlib.py")
+
+# Connections listed per pool in a timeout report
+TIMEOUT_REPORT_CONNECTIONS = 3
+
+
+class Checkout:
+    """Where and when a connection was checked out."""
+
+    __slots__ = ("started", "thread", "stack", "reported")
+
+    def __init__(self, stack: Optional[traceback.StackSummary]):
+        self.started = time.monotonic()
+        self.thread = threading.current_thread().name
+        self.stack = stack
+        self.reported = False
+
+    def held(self, now: Optional[float] = None) -> float:
+        return (now or time.monotonic()) - self.started
+
+    def format_stack(self) -> str:
+        if self.stack is None:
+            return "(stack not captured; set DB_POOL_CAPTURE_STACKS)"
+        frames = [frame for frame in self.stack if not any(path in frame.filename for path in LIBRARY_PATHS)]
+        return "".join(traceback.format_list(frames or self.stack)).rstrip()
+
+    def describe(self, now: Optional[float] = None) -> Dict[str, Any]:
+        return {"held_seconds": round(self.held(now), 3), "thread": self.thread, "stack": self.format_stack()}
+
+
+class PoolStats:
+    """Checkout counters of one pool and the connections it has lent out."""
+
+    def __init__(self, name: str, engine: Engine, track_leaks: bool):
+        self.name = name
+        self.engine = engine
+        self.track_leaks = track_leaks
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.long_holds = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.peak_checked_out = 0
+        self.peak_overflow = 0
+        self.held: Dict[int, Checkout] = {}
+
+    def config(self) -> Dict[str, Any]:
+        pool = self.engine.pool
+        return {
+            "class": type(pool).__name__,
+            "size": pool.size() if hasattr(pool, "size") else None,
+            "max_overflow": getattr(pool, "_max_overflow", None),
+            "timeout_seconds": pool.timeout() if hasattr(pool, "timeout") else None,
+            "recycle_seconds": pool._recycle,
+            "pre_ping": pool._pre_ping,
+        }
+
+    def usage(self) -> Tuple[Optional[int], Optional[int]]:
+        """Connections checked out and opened beyond the pool size; None for pools without a size."""
+        pool = self.engine.pool
+        if not hasattr(pool, "checkedout"):
+            return None, None
+        return pool.checkedout(), max(pool.overflow(), 0)
+
+    def longest(self, limit: Optional[int] = None, min_seconds: float = 0.0) -> List[Checkout]:
+        now = time.monotonic()
+        with self.lock:
+            held = [checkout for checkout in self.held.values() if checkout.held(now) >= min_seconds]
+        held.sort(key=lambda checkout: checkout.started)
+        return held[:limit] if limit is not None else held
+
+
+class PoolMonitor:
+    """Checkout telemetry and leak detection for the database connection pools.
+
+    Pool events record every checkout with its thread and, optionally, its
+    stack. A connection returned after more than ``leak_seconds`` is logged
+    with the stack that took it; one still out after that long is logged once
+    by the background check, so leaks show up before they exhaust the pool.
+    A checkout that times out (``QueuePool limit ... reached``) logs the
+    connections that have been held longest and where they were taken.
+    """
+
+    def __init__(self, leak_seconds: float, capture_stacks: bool):
+        self.leak_seconds = leak_seconds
+        self.capture_stacks = capture_stacks
+        self.pools: Dict[str, PoolStats] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self, engine: Engine, name: str, track_leaks: bool = True) -> None:
+        """Record checkouts of ``engine``'s pool under ``name``.
+
+        ``track_leaks=False`` is for pools whose connections are held on
+        purpose, like the SQLite writer's.
+        """
+        stats = self.pools[name] = PoolStats(name, engine, track_leaks)
+        hooks = engine_hooks(engine)
+
+        def record_checkout(connection_record):
+            stack = traceback.extract_stack() if self.capture_stacks and track_leaks else None
+            checked_out, overflow = stats.usage()
+            with stats.lock:
+                stats.checkouts += 1
+                stats.held[id(connection_record)] = Checkout(stack)
+                if checked_out is not None:
+                    stats.peak_checked_out = max(stats.peak_checked_out, checked_out)
+                    stats.peak_overflow = max(stats.peak_overflow, overflow)
+
+        def record_wait(seconds, error):
+            if isinstance(error, PoolTimeoutError):
+                with stats.lock:
+                    stats.timeouts += 1
+                self._report_timeout(stats)
+            with stats.lock:
+                stats.wait_total += seconds
+                stats.wait_max = max(stats.wait_max, seconds)
+
+        hooks.on_checkout(record_checkout)
+        hooks.on_return(lambda connection_record: self._returned(stats, connection_record))
+        hooks.on_connect(record_wait)
+
+    def _returned(self, stats: PoolStats, connection_record) -> None:
+        with stats.lock:
+            checkout = stats.held.pop(id(connection_record), None)
+        if checkout is None or not stats.track_leaks or not self.leak_seconds:
+            return
+        held = checkout.held()
+        if held >= self.leak_seconds:
+            with stats.lock:
+                stats.long_holds += 1
+            if not checkout.reported:
+                logger.warning(
+                    f"Connection from pool {stats.name} returned after {held:.1f}s "
+                    f"(thread {checkout.thread}), checked out at:\n{checkout.format_stack()}"
+                )
+
+    def _report_timeout(self, stats: PoolStats) -> None:
+        checked_out, overflow = stats.usage()
+        lines = [
+            f"Timed out waiting for a connection from pool {stats.name}: "
+            f"{checked_out} checked out ({overflow} overflow); longest held:"
+        ]
+        for checkout in stats.longest(TIMEOUT_REPORT_CONNECTIONS):
+            lines.append(f"- {checkout.held():.1f}s by thread {checkout.thread} at:\n{checkout.format_stack()}")
+        logger.error("\n".join(lines))
+
+    def check(self) -> List[Tuple[str, Checkout]]:
+        """Log connections held past ``leak_seconds`` that have not been reported yet."""
+        if not self.leak_seconds:
+            return []
+        found = []
+        for stats in self.pools.values():
+            if not stats.track_leaks:
+                continue
+            for checkout in stats.longest(min_seconds=self.leak_seconds):
+                if checkout.reported:
+                    continue
+                checkout.reported = True
+                found.append((stats.name, checkout))
+                logger.warning(
+                    f"Possible connection leak: pool {stats.name} connection held for {checkout.held():.1f}s "
+                    f"by thread {checkout.thread}, checked out at:\n{checkout.format_stack()}"
+                )
+        return found
+
+    def stats(self, min_held_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """Per-pool configuration, usage and counters, with the connections held longer than ``min_held_seconds``."""
+        threshold = self.leak_seconds if min_held_seconds is None else min_held_seconds
+        report = {}
+        for name, stats in self.pools.items():
+            checked_out, overflow = stats.usage()
+            held = stats.longest(min_seconds=threshold) if stats.track_leaks else []
+            with stats.lock:
+                report[name] = {
+                    "config": stats.config(),
+                    "checked_out": checked_out,
+                    "overflow": overflow,
+                    "peak_checked_out": stats.peak_checked_out,
+                    "peak_overflow": stats.peak_overflow,
+                    "checkouts": stats.checkouts,
+                    "timeouts": stats.timeouts,
+                    "wait_seconds_total": round(stats.wait_total, 6),
+                    "wait_seconds_max": round(stats.wait_max, 6),
+                    "long_holds": stats.long_holds,
+                    "held_over_threshold": [checkout.describe() for checkout in held],
+                }
+        return {"leak_threshold_seconds": threshold, "pools": report}
+
+    def collect(self) -> Iterator[Tuple[Metric, Labels, float]]:
+        """Checkout counters for /metrics."""
+        for name, stats in self.pools.items():
+            labels = (name,)
+            yield DB_POOL_CHECKOUTS, labels, stats.checkouts
+            yield DB_POOL_TIMEOUTS, labels, stats.timeouts
+            yield DB_POOL_LONG_HOLDS, labels, stats.long_holds
+            if stats.track_leaks and self.leak_seconds:
+                yield DB_POOL_HELD_TOO_LONG, labels, len(stats.longest(min_seconds=self.leak_seconds))
+
+    def start(self) -> None:
+        if not self.leak_seconds or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = background_thread("pool-leak-check", self._run)
+        self._thread.start()
+
+    def stop(self) -> None:
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+
+    def _run(self) -> None:
+        # A leaked connection is reported at most one threshold after it crosses it
+        while not self._stop.wait(self.leak_seconds):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Connection leak check failed: {e}")
+
+
+# Shared pool monitor, reporting through /metrics and /api/v1/system/db-pool
+pool_monitor = PoolMonitor(settings.DB_POOL_LEAK_SECONDS, settings.DB_POOL_CAPTURE_STACKS)
+metrics.add_collector(pool_monitor.collect)
@@ -0,0 +1,167 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+
+from sqlalchemy.orm import make_transient_to_detached
+from sqlmodel import Session, select
+
+from .cache import ROLES, InvalidationBus, catalog_cache
+from .config import settings
+from .logging import get_logger
+from .replicas import on_primary
+from app.models.role import Role
+from app.models.user import User
+
+logger = get_logger(__name__)
+
+# Invalidation bus messages: one user changed, or every principal is stale
+PRINCIPAL_PREFIX = "principal:"
+ALL_PRINCIPALS = "principals"
+
+
+@dataclass(frozen=True)
+class Principal:
+    """An authenticated user with their role and effective permissions resolved."""
+    user: User
+    role_name: Optional[str]
+    permissions: FrozenSet[str]
+    permission_mask: int
+    expires_at: float
+
+    @property
+    def user_id(self) -> int:
+        return self.user.id
+
+
+class PrincipalCache:
+    """Per-user cache of :class:`Principal` objects with a short TTL.
+
+    A miss loads the user and role name with one joined query. The cached user is
+    a detached copy; :meth:`attach` merges it into a request session without a
+    SELECT, so handlers still get a session-bound ``User``. Routers that change
+    users or roles call :meth:`invalidate` / :meth:`clear`, which are published
+    on the invalidation bus; the TTL bounds how long other workers may see
+    stale data if a message is lost. Principals are loaded from the primary,
+    never a replica.
+
+    Each user's permissions version and active flag are also kept, without a
+    TTL, until the user is invalidated, so :meth:`access` answers permission
+    claim checks from memory after the first load.
+    """
+
+    def __init__(self, ttl_seconds: int, bus: Optional[InvalidationBus] = None):
+        self.ttl_seconds = ttl_seconds
+        self.bus = bus or InvalidationBus()
+        self._lock = threading.Lock()
+        self._principals: Dict[int, Principal] = {}
+        self._access: Dict[int, Tuple[int, bool]] = {}
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int, session: Session) -> Optional[Principal]:
+        """Return the principal for a user id, or ``None`` if the user does not exist."""
+        now = time.monotonic()
+        with self._lock:
+            principal = self._principals.get(user_id)
+            generation = self._generation
+            if principal is not None and principal.expires_at > now:
+                self.hits += 1
+                return principal
+            self.misses += 1
+
+        principal = self._load(user_id, session, now)
+        if principal is None:
+            return None
+        with self._lock:
+            # Discard loads that raced with an invalidation
+            if self._generation == generation:
+                self._principals[user_id] = principal
+                self._access[user_id] = (principal.user.permissions_version or 0, principal.user.is_active)
+        return principal
+
+    def access(self, user_id: int, session: Session) -> Optional[Tuple[int, bool]]:
+        """A user's permissions version and active flag, or ``None`` if the user does not exist."""
+        with self._lock:
+            access = self._access.get(user_id)
+        if access is not None:
+            return access
+        principal = self.get(user_id, session)
+        if principal is None:
+            return None
+        return principal.user.permissions_version or 0, principal.user.is_active
+
+    @staticmethod
+    def attach(principal: Principal, session: Session) -> User:
+        """Return the principal's user bound to ``session``, without querying."""
+        return session.merge(principal.user, load=False)
+
+    def invalidate(self, user_id: int, publish: bool = True) -> None:
+        """Drop one user's principal after the user changed."""
+        with self._lock:
+            self._generation += 1
+            self._principals.pop(user_id, None)
+            self._access.pop(user_id, None)
+        if publish:
+            self.bus.publish([f"{PRINCIPAL_PREFIX}{user_id}"])
+
+    def clear(self, publish: bool = True) -> None:
+        """Drop every principal, e.g. after a role changed."""
+        with self._lock:
+            self._generation += 1
+            self._principals.clear()
+            self._access.clear()
+        if publish:
+            self.bus.publish([ALL_PRINCIPALS])
+
+    def on_invalidate(self, names: Iterable[str]) -> None:
+        """Apply invalidations published by other workers."""
+        for name in names:
+            # Roles are in every message sent after the bus reconnects, when others may have been lost
+            if name in (ALL_PRINCIPALS, ROLES):
+                self.clear(publish=False)
+                return
+            if name.startswith(PRINCIPAL_PREFIX) and name[len(PRINCIPAL_PREFIX):].isdigit():
+                self.invalidate(int(name[len(PRINCIPAL_PREFIX):]), publish=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._principals), "versions": len(self._access), "hits": self.hits, "misses": self.misses,
+            }
+
+    def _load(self, user_id: int, session: Session, now: float) -> Optional[Principal]:
+        # Imported here because app.core.rbac imports the dependencies that use this cache
+        from app.core.rbac import RolePermissions
+
+        # Plain column select: the cached copy must not be attached to this session
+        columns = [User.__table__.c[name] for name in User.__table__.columns.keys()]
+        # From the primary: a replica may not have the change that invalidated this user yet
+        with on_primary(session) as primary:
+            row = primary.execute(
+                select(*columns, Role.name.label("role_name"))
+                .select_from(User)
+                .outerjoin(Role, User.role_id == Role.id)
+                .where(User.id == user_id)
+            ).first()
+        if row is None:
+            return None
+
+        values = row._mapping
+        user = User(**{name: values[name] for name in User.__table__.columns.keys()})
+        make_transient_to_detached(user)
+        role_name = values["role_name"]
+        permissions = frozenset(RolePermissions.get_permissions_for_role(role_name)) if role_name else frozenset()
+        return Principal(
+            user=user,
+            role_name=role_name,
+            permissions=permissions,
+            permission_mask=RolePermissions.to_mask(permissions),
+            expires_at=now + self.ttl_seconds,
+        )
+
+
+# Shared principal cache instance, invalidated across workers on the catalog cache's bus
+principal_cache = PrincipalCache(settings.PRINCIPAL_CACHE_TTL_SECONDS, catalog_cache.bus)
+catalog_cache.subscribe(principal_cache.on_invalidate)
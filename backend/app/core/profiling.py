@@ -0,0 +1,268 @@
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from itertools import count
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import orjson
+
+from .config import settings
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+# Only stacks passing through our own code are kept; idle pool and loop threads have none
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Our background threads run app code too, but never on behalf of a request; they are
+# started with background_thread() and left out of profiles by this name prefix
+BACKGROUND_THREAD_PREFIX = "background:"
+
+PROFILE_FORMATS = ("speedscope", "collapsed")
+
+Frame = Tuple[str, str, int]
+
+
+def background_thread(name: str, target: Callable[..., Any], *args: Any) -> threading.Thread:
+    """A daemon thread for work done outside requests, named so profiles leave it out."""
+    return threading.Thread(target=target, args=args, name=BACKGROUND_THREAD_PREFIX + name, daemon=True)
+
+
+class StackSampler:
+    """Samples the Python stacks of request threads while it runs.
+
+    A daemon thread reads ``sys._current_frames()`` every ``interval`` seconds
+    and keeps each stack that passes through the ``app`` package, so both the
+    event loop and threadpool workers running sync handlers are covered. There
+    is no tracing overhead on the profiled code itself; concurrent requests can
+    show up in the same profile, so profile on a quiet instance.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples: List[Tuple[Tuple[Frame, ...], float]] = []
+        self.started = 0.0
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self.started = time.perf_counter()
+        self._thread = background_thread("profile-sampler", self._run)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        names = {}
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            weight, last = now - last, now
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                name = names.get(ident)
+                if name is None:
+                    thread = threading._active.get(ident)
+                    name = names[ident] = thread.name if thread else ""
+                if name.startswith(BACKGROUND_THREAD_PREFIX):
+                    continue
+                stack = _stack(frame)
+                if stack is not None:
+                    self.samples.append((stack, weight))
+
+
+def _stack(frame) -> Optional[Tuple[Frame, ...]]:
+    """Root-first stack of ``frame``, or ``None`` if no frame is our code."""
+    frames = []
+    ours = False
+    while frame is not None:
+        code = frame.f_code
+        frames.append((code.co_name, code.co_filename, frame.f_lineno))
+        ours = ours or code.co_filename.startswith(APP_DIR)
+        frame = frame.f_back
+    if not ours:
+        return None
+    frames.reverse()
+    return tuple(frames)
+
+
+def _frame_name(frame: Frame) -> str:
+    name, filename, line = frame
+    if filename.startswith(APP_DIR):
+        filename = os.path.relpath(filename, os.path.dirname(APP_DIR))
+    return f"{name} ({filename}:{line})"
+
+
+def collapsed(samples: List[Tuple[Tuple[Frame, ...], float]], root: str = "") -> Counter:
+    """Fold samples into ``"root;caller;callee" -> sample count`` (Brendan Gregg's collapsed format)."""
+    folded: Counter = Counter()
+    prefix = [root] if root else []
+    for stack, _ in samples:
+        folded[";".join(prefix + [_frame_name(frame) for frame in stack])] += 1
+    return folded
+
+
+def format_collapsed(folded: Counter) -> str:
+    return "".join(f"{stack} {samples}\n" for stack, samples in sorted(folded.items()))
+
+
+def speedscope(samples: List[Tuple[Tuple[Frame, ...], float]], name: str, elapsed: float) -> Dict:
+    """A sampled profile in speedscope's file format (https://www.speedscope.app)."""
+    frames: List[Dict] = []
+    index: Dict[Frame, int] = {}
+    stacks = []
+    for stack, _ in samples:
+        ids = []
+        for frame in stack:
+            if frame not in index:
+                index[frame] = len(frames)
+                function, filename, line = frame
+                frames.append({"name": function, "file": filename, "line": line})
+            ids.append(index[frame])
+        stacks.append(ids)
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": name,
+            "unit": "seconds",
+            "startValue": 0,
+            "endValue": elapsed,
+            "samples": stacks,
+            "weights": [weight for _, weight in samples],
+        }],
+        "name": name,
+        "exporter": "wingstop-inventory",
+    }
+
+
+class RequestProfile:
+    """One profiled request; the output path is fixed up front so it can go in a header."""
+
+    def __init__(self, profiler: "Profiler", method: str, path: Optional[str], aggregate: bool):
+        self.profiler = profiler
+        self.method = method
+        self.path = path
+        self.aggregate = aggregate
+        self.sampler = StackSampler(profiler.interval)
+        self.sampler.start()
+
+    def finish(self, route: str) -> None:
+        """Stop sampling and write the profile and/or add it to the aggregate."""
+        self.sampler.stop()
+        root = f"{self.method} {route}"
+        if self.path:
+            self.profiler.write(self.path, self.sampler, root)
+        if self.aggregate:
+            self.profiler.add_to_aggregate(self.sampler, root)
+
+
+class Profiler:
+    """Opt-in sampling profiler for single requests and a 1-in-N aggregate.
+
+    A request sent with ``X-Profile: 1`` is sampled on its own and written to
+    ``directory`` as a speedscope JSON or collapsed-stack file; the pipeline
+    returns the path in ``X-Profile-Path``. With ``sample_every`` set, every
+    Nth request is also sampled and folded into ``aggregate-<pid>.folded``,
+    a running flamegraph of where the worker spends its time.
+    """
+
+    def __init__(self, enabled: bool, directory: str, output_format: str, interval: float, sample_every: int):
+        if output_format not in PROFILE_FORMATS:
+            raise ValueError(f"Unknown profile format: {output_format}")
+        self.enabled = enabled
+        self.directory = directory
+        self.output_format = output_format
+        self.interval = interval
+        self.sample_every = sample_every
+        self._requests = count(1)
+        self._aggregate: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def should_sample(self) -> bool:
+        """Whether the next request belongs to the 1-in-N aggregate."""
+        return self.enabled and self.sample_every > 0 and next(self._requests) % self.sample_every == 0
+
+    def begin(self, method: str, requested: bool, sampled: bool) -> Optional[RequestProfile]:
+        """Start profiling a request that asked for it, was sampled, or both."""
+        if not (requested or sampled):
+            return None
+        output = None
+        if requested:
+            extension = "speedscope.json" if self.output_format == "speedscope" else "folded"
+            output = os.path.join(self.directory, f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}.{extension}")
+        return RequestProfile(self, method, output, sampled)
+
+    def write(self, path: str, sampler: StackSampler, root: str) -> None:
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            if self.output_format == "speedscope":
+                content = orjson.dumps(speedscope(sampler.samples, root, sampler.elapsed))
+            else:
+                content = format_collapsed(collapsed(sampler.samples, root)).encode("utf-8")
+            with open(path, "wb") as f:
+                f.write(content)
+        except OSError as e:
+            logger.error(f"Failed to write profile {path}: {e}")
+            return
+        logger.info(f"Wrote profile of {root} ({len(sampler.samples)} samples) to {path}")
+
+    def add_to_aggregate(self, sampler: StackSampler, root: str) -> None:
+        """Fold a sampled request into this worker's aggregate profile file."""
+        with self._lock:
+            self._aggregate.update(collapsed(sampler.samples, root))
+            content = format_collapsed(self._aggregate)
+        path = os.path.join(self.directory, f"aggregate-{os.getpid()}.folded")
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+                f.write(content)
+            os.replace(f"{path}.tmp", path)
+        except OSError as e:
+            logger.error(f"Failed to write aggregate profile {path}: {e}")
+
+
+def can_profile(authorization: Optional[str]) -> bool:
+    """On-demand profiles are open outside production; in production only to ``system:admin``.
+
+    Blocking (it may load the principal), so call it from a worker thread.
+    """
+    if not settings.is_production:
+        return True
+    if not authorization or authorization[:7].lower() != "bearer ":
+        return False
+    # Imported here so the request pipeline does not pull in the database and models at import time
+    from sqlmodel import Session
+    from .database import engine
+    from .principal import principal_cache
+    from .rbac import RolePermissions
+    from .security import AuthenticationManager
+
+    try:
+        user_id = int(AuthenticationManager().verify_token(authorization[7:])["sub"])
+    except Exception:
+        return False
+    with Session(engine) as session:
+        principal = principal_cache.get(user_id, session)
+    required = RolePermissions.PERMISSION_BITS["system:admin"]
+    return principal is not None and principal.user.is_active and bool(principal.permission_mask & required)
+
+
+# Shared profiler
+profiler = Profiler(
+    enabled=settings.PROFILING_ENABLED,
+    directory=settings.PROFILE_DIR,
+    output_format=settings.PROFILE_FORMAT,
+    interval=settings.PROFILE_INTERVAL_SECONDS,
+    sample_every=settings.PROFILE_SAMPLE_EVERY,
+)
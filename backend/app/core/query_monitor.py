@@ -0,0 +1,244 @@
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+import orjson
+from sqlalchemy.engine import Engine
+
+from .config import settings
+from .engine_hooks import engine_hooks
+from .logging import get_correlation_id, get_logger, log_with_context
+
+logger = get_logger(__name__)
+
+# Slow statements get their own logger so they can be routed or filtered separately
+slow_query_logger = get_logger("app.slow_queries")
+
+# Statement text is truncated in log records; EXPLAIN output is not
+MAX_STATEMENT_LENGTH = 2000
+
+# Distinct SELECT shapes recorded per worker for the index advisor
+MAX_CAPTURED_SHAPES = 5000
+
+# Wraps EXPLAIN inside the request's transaction, so its failure cannot abort it
+EXPLAIN_SAVEPOINT = "query_monitor_explain"
+
+
+class RequestQueries:
+    """Every statement one request executed, keyed by its SQL text."""
+
+    __slots__ = ("correlation_id", "route", "count", "total_seconds", "statements", "_parameters")
+
+    def __init__(self, correlation_id: Optional[str]):
+        self.correlation_id = correlation_id
+        self.route: Optional[str] = None
+        self.count = 0
+        self.total_seconds = 0.0
+        self.statements: Counter = Counter()
+        self._parameters: Dict[str, Set[str]] = {}
+
+    def record(self, statement: str, parameters: Any, duration: float) -> None:
+        self.count += 1
+        self.total_seconds += duration
+        self.statements[statement] += 1
+        self._parameters.setdefault(statement, set()).add(repr(parameters))
+
+    def repeated(self, threshold: int) -> Dict[str, int]:
+        """Statements run at least ``threshold`` times with different parameters: the N+1 signature."""
+        return {
+            statement: runs
+            for statement, runs in self.statements.items()
+            if runs >= threshold and len(self._parameters[statement]) > 1
+        }
+
+
+class CapturedQueries:
+    """Queries of the requests completed inside :meth:`QueryMonitor.capture`."""
+
+    def __init__(self):
+        self.requests: List[RequestQueries] = []
+
+    @property
+    def count(self) -> int:
+        return sum(request.count for request in self.requests)
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(request.total_seconds for request in self.requests)
+
+    def assert_budget(self, max_queries: int, max_seconds: Optional[float] = None) -> None:
+        """Fail with the statements run if any captured request went over budget."""
+        for request in self.requests:
+            over_count = request.count > max_queries
+            over_time = max_seconds is not None and request.total_seconds > max_seconds
+            if over_count or over_time:
+                statements = "\n".join(f"  {runs}x {sql}" for sql, runs in request.statements.most_common())
+                raise AssertionError(
+                    f"{request.route}: {request.count} queries in {request.total_seconds * 1000:.1f} ms, "
+                    f"budget {max_queries} queries"
+                    + (f" / {max_seconds * 1000:.1f} ms" if max_seconds is not None else "")
+                    + f"\n{statements}"
+                )
+
+
+class QueryMonitor:
+    """Per-request SQL accounting: query budgets, N+1 detection and a slow-query log.
+
+    The request pipeline opens a :class:`RequestQueries` per request; engine
+    events recorded with :meth:`watch` add every statement to it. When the
+    request ends, exceeding ``max_queries`` or ``max_seconds`` logs a warning,
+    as does any statement repeated ``n_plus_one_threshold`` times with
+    different parameters. Independently of requests, a statement slower than
+    ``slow_seconds`` is written to the ``app.slow_queries`` logger with its
+    ``EXPLAIN`` plan. All records carry the request's correlation ID. With
+    ``shapes_file`` set, the first execution of each distinct SELECT is appended
+    there with its parameters, for ``index_advisor.py`` to replay.
+    """
+
+    def __init__(
+        self,
+        max_queries: int,
+        max_seconds: float,
+        n_plus_one_threshold: int,
+        slow_seconds: float,
+        explain: bool,
+        shapes_file: Optional[str] = None,
+    ):
+        self.max_queries = max_queries
+        self.max_seconds = max_seconds
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.slow_seconds = slow_seconds
+        self.explain = explain
+        self.shapes_file = shapes_file
+        self._shapes: Set[str] = set()
+        self._current: ContextVar[Optional[RequestQueries]] = ContextVar("request_queries", default=None)
+        self._captures: List[CapturedQueries] = []
+        self._lock = threading.Lock()
+
+    def begin_request(self) -> RequestQueries:
+        queries = RequestQueries(get_correlation_id())
+        self._current.set(queries)
+        return queries
+
+    def end_request(self, queries: RequestQueries, route: str) -> None:
+        """Check the finished request against its budgets and hand it to active captures."""
+        queries.route = route
+        if self._captures:
+            with self._lock:
+                for capture in self._captures:
+                    capture.requests.append(queries)
+        if not queries.count:
+            return
+
+        over_count = self.max_queries and queries.count > self.max_queries
+        over_time = self.max_seconds and queries.total_seconds > self.max_seconds
+        if over_count or over_time:
+            log_with_context(
+                logger, "warning", f"Query budget exceeded on {route}",
+                route=route, queries=queries.count, db_ms=round(queries.total_seconds * 1000, 2),
+                max_queries=self.max_queries, max_db_ms=round(self.max_seconds * 1000, 2),
+            )
+        if self.n_plus_one_threshold:
+            for statement, runs in queries.repeated(self.n_plus_one_threshold).items():
+                log_with_context(
+                    logger, "warning", f"Possible N+1 on {route}: statement ran {runs} times",
+                    route=route, runs=runs, statement=statement[:MAX_STATEMENT_LENGTH],
+                )
+
+    @contextmanager
+    def capture(self) -> Iterator[CapturedQueries]:
+        """Collect the queries of every request completed inside the block (tests)."""
+        captured = CapturedQueries()
+        with self._lock:
+            self._captures.append(captured)
+        try:
+            yield captured
+        finally:
+            with self._lock:
+                self._captures.remove(captured)
+
+    def watch(self, engine: Engine) -> None:
+        """Record the statements executed on ``engine``."""
+
+        engine_hooks(engine).on_query(self._record)
+
+    def _record(self, conn, cursor, statement: str, parameters: Any, executemany: bool, duration: float) -> None:
+        queries = self._current.get()
+        if queries is not None:
+            queries.record(statement, parameters, duration)
+        if self.slow_seconds and duration >= self.slow_seconds:
+            self._log_slow(conn, cursor, statement, parameters, executemany, duration)
+        if self.shapes_file and statement not in self._shapes and not executemany:
+            self._capture_shape(statement, parameters)
+
+    def _capture_shape(self, statement: str, parameters: Any) -> None:
+        if len(self._shapes) >= MAX_CAPTURED_SHAPES or not _is_select(statement):
+            return
+        with self._lock:
+            if statement in self._shapes:
+                return
+            self._shapes.add(statement)
+        line = orjson.dumps({"statement": statement, "parameters": parameters}, default=str)
+        try:
+            with open(self.shapes_file, "ab") as f:
+                f.write(line + b"\n")
+        except OSError as e:
+            logger.warning(f"Failed to record query shape: {e}")
+
+    def _log_slow(self, conn, cursor, statement: str, parameters: Any, executemany: bool, duration: float) -> None:
+        plan = None
+        if self.explain and not executemany and _is_select(statement):
+            plan = self._explain(conn, cursor, statement, parameters)
+        log_with_context(
+            slow_query_logger, "warning", f"Slow query: {duration * 1000:.1f} ms",
+            duration_ms=round(duration * 1000, 2), statement=statement[:MAX_STATEMENT_LENGTH], plan=plan,
+        )
+
+    @staticmethod
+    def _explain(conn, cursor, statement: str, parameters: Any) -> Optional[List[str]]:
+        """Plan of ``statement``, run on a fresh DBAPI cursor so no engine events fire.
+
+        On servers where a failed statement aborts the transaction (PostgreSQL),
+        the EXPLAIN runs inside a savepoint so the request's transaction
+        survives it; SQLite and autocommit connections need none.
+        """
+        sqlite = conn.dialect.name == "sqlite"
+        prefix = "EXPLAIN QUERY PLAN " if sqlite else "EXPLAIN "
+        savepoint = not sqlite and not getattr(cursor.connection, "autocommit", False)
+        explain_cursor = cursor.connection.cursor()
+        try:
+            if savepoint:
+                explain_cursor.execute(f"SAVEPOINT {EXPLAIN_SAVEPOINT}")
+            try:
+                explain_cursor.execute(prefix + statement, parameters)
+                plan = [" | ".join(str(column) for column in row) for row in explain_cursor.fetchall()]
+            except Exception:
+                if savepoint:
+                    explain_cursor.execute(f"ROLLBACK TO SAVEPOINT {EXPLAIN_SAVEPOINT}")
+                raise
+            if savepoint:
+                explain_cursor.execute(f"RELEASE SAVEPOINT {EXPLAIN_SAVEPOINT}")
+            return plan
+        except Exception as e:
+            logger.debug(f"EXPLAIN failed: {e}")
+            return None
+        finally:
+            explain_cursor.close()
+
+
+def _is_select(statement: str) -> bool:
+    return statement.lstrip()[:6].upper() == "SELECT"
+
+
+# Shared query monitor
+query_monitor = QueryMonitor(
+    max_queries=settings.QUERY_BUDGET_COUNT,
+    max_seconds=settings.QUERY_BUDGET_SECONDS,
+    n_plus_one_threshold=settings.N_PLUS_ONE_THRESHOLD,
+    slow_seconds=settings.SLOW_QUERY_SECONDS,
+    explain=settings.SLOW_QUERY_EXPLAIN,
+    shapes_file=settings.QUERY_SHAPES_FILE,
+)
@@ -0,0 +1,248 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from .config import settings
+from .logging import get_logger
+from .security import AuthenticationManager
+
+logger = get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """A sustained rate plus the number of requests that may arrive at once."""
+    per_minute: int
+    burst: int
+
+    @property
+    def interval(self) -> float:
+        """Seconds between requests at the sustained rate."""
+        return 60.0 / self.per_minute
+
+
+@dataclass(frozen=True)
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float
+    reset_after: float
+
+    def headers(self) -> Dict[str, str]:
+        """``X-RateLimit-*`` headers, plus ``Retry-After`` for rejected requests."""
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(math.ceil(self.reset_after)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+def gcra(tat: Optional[float], now: float, limit: RateLimit) -> Tuple[Optional[float], RateLimitResult]:
+    """One step of the generic cell rate algorithm.
+
+    ``tat`` is the key's theoretical arrival time: when its bucket would be
+    empty again at the sustained rate. A request is allowed if pushing the TAT
+    one interval further keeps it within ``burst`` intervals of now. Returns the
+    new TAT (``None`` when the request is rejected and nothing changes) and the
+    result.
+    """
+    interval = limit.interval
+    window = interval * limit.burst
+    tat = now if tat is None or tat < now else tat
+    new_tat = tat + interval
+    if new_tat - now > window:
+        return None, result_from_offset(False, tat - now, limit)
+    return new_tat, result_from_offset(True, new_tat - now, limit)
+
+
+def result_from_offset(allowed: bool, offset: float, limit: RateLimit) -> RateLimitResult:
+    """Build a result from how far the key's TAT lies ahead of now."""
+    interval = limit.interval
+    window = interval * limit.burst
+    return RateLimitResult(
+        allowed=allowed,
+        limit=limit.burst,
+        remaining=max(0, int((window - offset) // interval)),
+        retry_after=0.0 if allowed else offset + interval - window,
+        reset_after=offset,
+    )
+
+
+class MemoryRateLimitBackend:
+    """Per-worker GCRA state: one float per key in an expiring LRU.
+
+    Each check is O(1). Keys whose TAT has passed are equivalent to absent ones,
+    so they are dropped from the cold end as new keys arrive, and ``max_keys``
+    bounds memory under key floods.
+    """
+
+    # Checks only take a lock, so they can run on the event loop
+    blocking = False
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._tats: "OrderedDict[str, float]" = OrderedDict()
+
+    def hit(self, key: str, limit: RateLimit) -> RateLimitResult:
+        now = time.monotonic()
+        with self._lock:
+            new_tat, result = gcra(self._tats.get(key), now, limit)
+            if new_tat is not None:
+                self._tats[key] = new_tat
+                self._tats.move_to_end(key)
+                self._evict(now)
+            return result
+
+    def _evict(self, now: float) -> None:
+        while self._tats:
+            key, tat = next(iter(self._tats.items()))
+            if tat > now and len(self._tats) <= self.max_keys:
+                break
+            del self._tats[key]
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+
+# GCRA in one atomic step on the Redis server, timed by the server clock so every
+# worker agrees. Returns {allowed, offset of the TAT from now} as strings because
+# Redis truncates Lua numbers to integers.
+GCRA_SCRIPT = """
+local interval = tonumber(ARGV[1])
+local window = interval * tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if not tat or tat < now then tat = now end
+local new_tat = tat + interval
+if new_tat - now > window then
+    return {0, tostring(tat - now)}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return {1, tostring(new_tat - now)}
+"""
+
+
+class RedisRateLimitBackend:
+    """GCRA state shared by all workers in a Redis-compatible store.
+
+    If the store is unreachable, requests are limited per worker by a local
+    fallback instead of failing or being let through unchecked.
+    """
+
+    # Every check is a round trip to the store, so callers run it in a thread
+    blocking = True
+
+    def __init__(self, client, fallback: MemoryRateLimitBackend, prefix: str = "ratelimit:"):
+        self.client = client
+        self.fallback = fallback
+        self.prefix = prefix
+        self._degraded = False
+
+    @classmethod
+    def from_url(cls, url: str, fallback: MemoryRateLimitBackend) -> "RedisRateLimitBackend":
+        import redis  # Optional dependency, only needed for multi-worker deployments
+
+        return cls(redis.Redis.from_url(url, password=settings.REDIS_PASSWORD, db=settings.REDIS_DB), fallback)
+
+    def hit(self, key: str, limit: RateLimit) -> RateLimitResult:
+        try:
+            allowed, offset = self.client.eval(
+                GCRA_SCRIPT, 1, self.prefix + key, repr(limit.interval), limit.burst
+            )
+        except Exception as e:
+            if not self._degraded:
+                logger.warning(f"Rate limit store unavailable, limiting per worker: {e}")
+                self._degraded = True
+            return self.fallback.hit(key, limit)
+        self._degraded = False
+        return result_from_offset(bool(int(allowed)), float(offset), limit)
+
+
+class RateLimiter:
+    """Maps requests to a bucket and checks it against the configured limits.
+
+    Every path gets ``default`` unless a prefix in ``route_limits`` matches
+    (longest prefix wins); a ``None`` limit exempts the route. Routes with their
+    own limit keep their own bucket, so, say, login attempts do not use up the
+    general allowance.
+    """
+
+    def __init__(self, backend, default: RateLimit, route_limits: Dict[str, Optional[RateLimit]]):
+        self.backend = backend
+        self.default = default
+        self.route_limits = sorted(route_limits.items(), key=lambda item: len(item[0]), reverse=True)
+        self.rejected = 0
+
+    @property
+    def blocking(self) -> bool:
+        """Whether :meth:`check` does network I/O and must be kept off the event loop."""
+        return self.backend.blocking
+
+    def limit_for(self, path: str) -> Tuple[str, Optional[RateLimit]]:
+        """Return the bucket name and limit for a request path."""
+        for prefix, limit in self.route_limits:
+            if path == prefix or path.startswith(prefix.rstrip("/") + "/"):
+                return prefix, limit
+        return "default", self.default
+
+    def check(self, client_key: str, path: str) -> Optional[RateLimitResult]:
+        """Count a request; ``None`` means the route is not rate limited."""
+        bucket, limit = self.limit_for(path)
+        if limit is None:
+            return None
+        result = self.backend.hit(f"{bucket}|{client_key}", limit)
+        if not result.allowed:
+            self.rejected += 1
+        return result
+
+
+def client_key(authorization: Optional[str], client_host: Optional[str]) -> str:
+    """Rate limit authenticated users per user id and everyone else per IP."""
+    if authorization and authorization[:7].lower() == "bearer ":
+        try:
+            # Verified claims come from the token cache, so this is cheap on repeat requests
+            return f"user:{AuthenticationManager().verify_token(authorization[7:])['sub']}"
+        except Exception:
+            pass
+    return f"ip:{client_host or 'unknown'}"
+
+
+# Per-route limits; None exempts a route
+ROUTE_LIMITS: Dict[str, Optional[RateLimit]] = {
+    "/health": None,
+    "/metrics": None,
+    "/docs": None,
+    "/redoc": None,
+    "/openapi.json": None,
+    "/api/v1/auth/login": RateLimit(per_minute=10, burst=5),
+    "/api/v1/auth/register": RateLimit(per_minute=5, burst=5),
+    "/api/v1/auth/refresh": RateLimit(per_minute=30, burst=10),
+}
+
+
+def create_rate_limiter() -> RateLimiter:
+    """Share limits through Redis when configured, otherwise keep them per worker."""
+    backend = MemoryRateLimitBackend(settings.RATE_LIMIT_MAX_KEYS)
+    if settings.REDIS_URL:
+        try:
+            backend = RedisRateLimitBackend.from_url(settings.REDIS_URL, backend)
+        except ImportError:
+            logger.warning("REDIS_URL is set but the redis package is not installed; "
+                           "rate limits are enforced per worker")
+        except Exception as e:
+            logger.warning(f"Could not connect to Redis for rate limiting: {e}")
+    default = RateLimit(per_minute=settings.RATE_LIMIT_PER_MINUTE, burst=settings.RATE_LIMIT_BURST)
+    return RateLimiter(backend, default, ROUTE_LIMITS)
+
+
+# Shared rate limiter
+rate_limiter = create_rate_limiter()
@@ -1,10 +1,16 @@
+import hashlib
+import json
 from fastapi import HTTPException, status, Request, Depends
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import update
 from sqlmodel import Session, select
-from typing import Dict, List, Optional, Set, Callable, Any
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Callable, Any
 from functools import wraps
 from app.models.user import User
-from app.models.role import Role
+from app.core.cache import catalog_cache, ROLES
+from app.core.config import settings
 from app.core.database import get_session
+from app.core.principal import principal_cache
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
@@ -112,6 +118,23 @@ class RolePermissions:
         }
     }
     
+    # Bit of each permission in token bitmasks. Append new permissions at the end of
+    # PERMISSIONS so the bits of existing ones never move.
+    PERMISSION_BITS = {name: 1 << index for index, name in enumerate(PERMISSIONS)}
+    
+    @classmethod
+    def to_mask(cls, permissions: Iterable[str]) -> int:
+        """Compile permission names into an integer bitmask."""
+        mask = 0
+        for permission in permissions:
+            mask |= cls.PERMISSION_BITS.get(permission, 0)
+        return mask
+    
+    @classmethod
+    def from_mask(cls, mask: int) -> Set[str]:
+        """Expand a bitmask back into permission names."""
+        return {name for name, bit in cls.PERMISSION_BITS.items() if mask & bit}
+    
     @classmethod
     def get_permissions_for_role(cls, role_name: str) -> Set[str]:
         """Get permissions for a specific role."""
@@ -132,6 +155,74 @@ class RolePermissions:
         return cls.ROLE_PERMISSIONS[role_name]["description"]
 
 
+# Digest of the permission table above, so a deploy that changes it also outdates issued claims
+_PERMISSION_TABLE_DIGEST = hashlib.blake2b(
+    json.dumps(
+        [list(RolePermissions.PERMISSION_BITS),
+         {name: sorted(role["permissions"]) for name, role in RolePermissions.ROLE_PERMISSIONS.items()}],
+        sort_keys=True
+    ).encode("utf-8"),
+    digest_size=6
+).hexdigest()
+
+
+def _versioned(counter: int) -> str:
+    return f"{_PERMISSION_TABLE_DIGEST}.{counter}"
+
+
+def permissions_version(user: User) -> str:
+    """Version of one user's permissions: the permission table plus the user's own counter."""
+    return _versioned(user.permissions_version or 0)
+
+
+def bump_permissions_version(user: User) -> None:
+    """Mark a user's access as changed so tokens carrying their old permissions must be refreshed.
+
+    Call this in the transaction that changes the user's role or active flag;
+    after committing, the caller invalidates the user in ``principal_cache``.
+    """
+    user.permissions_version = (user.permissions_version or 0) + 1
+
+
+def bump_role_members(session: Session, role_id: int) -> None:
+    """Bump the permissions version of every user holding a role that was renamed or deleted."""
+    session.execute(
+        update(User).where(User.role_id == role_id).values(permissions_version=User.permissions_version + 1)
+    )
+
+
+def claims_are_current(claims: Dict[str, Any], user_id: int, session: Session) -> bool:
+    """Check a token's permission claims against the user's current permissions version.
+
+    The version comes from memory (:meth:`PrincipalCache.access`), which is
+    only dropped when the user or a role changes, here or on another worker, so
+    this costs no query after a user's first request. A token minted by another
+    worker after a change whose invalidation has not arrived yet carries a
+    newer version; the user is reloaded once for it.
+    """
+    access = principal_cache.access(user_id, session)
+    if access is None or not access[1]:
+        return False
+    version = claims.get("rv")
+    if version == _versioned(access[0]):
+        return True
+    digest, _, counter = str(version).partition(".")
+    if digest != _PERMISSION_TABLE_DIGEST or not counter.isdigit() or int(counter) <= access[0]:
+        return False
+    principal_cache.invalidate(user_id, publish=False)
+    access = principal_cache.access(user_id, session)
+    return access is not None and access[1] and version == _versioned(access[0])
+
+
+def permission_claims(user: User, session: Session) -> Dict[str, Any]:
+    """Permission bitmask and permissions version to embed in an access token, if enabled."""
+    if not settings.TOKEN_PERMISSION_CLAIMS:
+        return {}
+    role = catalog_cache.get_by_id(ROLES, user.role_id, session) if user.role_id else None
+    permissions = RolePermissions.get_permissions_for_role(role.name) if role else set()
+    return {"perms": RolePermissions.to_mask(permissions), "rv": permissions_version(user)}
+
+
 class RBACMiddleware:
     """Role-Based Access Control middleware."""
     
@@ -150,16 +241,13 @@ class RBACMiddleware:
         """Check if user has all of the required permissions."""
         return all(perm in user_permissions for perm in required_permissions)
     
-    def get_user_permissions(self, user: User, session: Session) -> Set[str]:
+    def get_user_permissions(self, user: User, session: Session) -> FrozenSet[str]:
         """Get all permissions for a user based on their role."""
         if not user.role_id:
-            return set()
+            return frozenset()
         
-        role = session.get(Role, user.role_id)
-        if not role:
-            return set()
-        
-        return self.role_permissions.get_permissions_for_role(role.name)
+        principal = principal_cache.get(user.id, session)
+        return principal.permissions if principal else frozenset()
 
 
 class RBACDependencies:
@@ -221,13 +309,64 @@ class RBACDependencies:
             return current_user
         
         return _require_all_permissions
+    
+    def authorize(self, permission: str):
+        """Dependency factory that checks a permission against the access token alone.
+
+        Tokens carrying permission claims are checked with a single bit test
+        against the cached principal; a token issued under an older permissions
+        version of its user is rejected with 401 so the client refreshes it. Tokens without claims fall back to the
+        principal cache. Returns the verified token claims, not a ``User``.
+        """
+        if permission not in RolePermissions.PERMISSION_BITS:
+            raise ValueError(f"Unknown permission: {permission}")
+        required = RolePermissions.PERMISSION_BITS[permission]
+        
+        async def _authorize(
+            credentials: HTTPAuthorizationCredentials = Depends(security),
+            session: Session = Depends(get_session)
+        ) -> Dict[str, Any]:
+            try:
+                claims = auth_manager.verify_token(credentials.credentials)
+                user_id = int(claims["sub"])
+            except (HTTPException, KeyError, TypeError, ValueError):
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Invalid token"
+                )
+            
+            mask = claims.get("perms")
+            if mask is None:
+                principal = principal_cache.get(user_id, session)
+                if principal is None or not principal.user.is_active:
+                    raise HTTPException(
+                        status_code=status.HTTP_401_UNAUTHORIZED,
+                        detail="User not found or inactive"
+                    )
+                mask = principal.permission_mask
+            elif not claims_are_current(claims, user_id, session):
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Token permissions are out of date, refresh the token",
+                    headers={"WWW-Authenticate": 'Bearer error="invalid_token"'}
+                )
+            
+            if not mask & required:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail=f"Access denied. Required permission: {permission}"
+                )
+            
+            return claims
+        
+        return _authorize
 
 
 # Create RBAC dependencies instance
 rbac_deps = RBACDependencies()
 
-# Import the get_current_user dependency
-from app.core.dependencies import get_current_user
+# Import the authentication dependencies
+from app.core.dependencies import auth_manager, get_current_user, security
 
 # Predefined permission-based dependencies
 require_users_read = rbac_deps.require_permission("users:read")
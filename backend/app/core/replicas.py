@@ -0,0 +1,189 @@
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+
+from .logging import get_logger
+from .profiling import background_thread
+
+logger = get_logger(__name__)
+
+# Returned after a write and sent back by clients that must read their own writes
+CONSISTENCY_HEADER = "X-Consistency-Token"
+
+# Replication positions: WAL bytes on PostgreSQL, heartbeat timestamps elsewhere
+WAL = "lsn"
+HEARTBEAT = "ts"
+
+
+@contextmanager
+def on_primary(session: Session) -> Iterator[Session]:
+    """``session``, or a short-lived session on its primary if it reads from a replica.
+
+    Process-wide caches load through this: a snapshot read from a lagging
+    replica right after an invalidation would be served for the cache's TTL.
+    """
+    if getattr(session, "replica", None) is None:
+        yield session
+        return
+    with Session(session.bind) as primary:
+        yield primary
+
+
+class Replica:
+    """A read replica and what the last health check found."""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.name = repr(engine.url)  # password masked
+        self.healthy = False
+        self.position: Optional[float] = None
+        self.lag: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "healthy": self.healthy,
+            "lag_seconds": None if self.lag is None else round(self.lag, 3),
+            "position": self.position,
+            "error": self.error,
+        }
+
+
+class ReplicaSet:
+    """Picks replicas that are healthy, within the lag limit and caught up with a client's writes.
+
+    A background thread measures each replica's replay position and lag every
+    ``interval`` seconds. PostgreSQL replicas report their replayed WAL
+    position; other databases are measured with a heartbeat row the primary
+    stamps each interval, so a replica holding a heartbeat newer than a write
+    also holds the write. Heartbeats only ever increase, whichever worker's
+    clock stamps them. Reads fall back to the primary whenever no replica
+    qualifies.
+    """
+
+    def __init__(self, primary: Engine, replicas: List[Engine], max_lag: float, interval: float):
+        self.primary = primary
+        self.replicas = [Replica(engine) for engine in replicas]
+        self.max_lag = max_lag
+        self.interval = interval
+        self.kind = WAL if primary.dialect.name == "postgresql" else HEARTBEAT
+        self._next = itertools.count()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def choose(self, token: Optional[str] = None) -> Optional[Engine]:
+        """A replica engine for a read, or None to read from the primary.
+
+        With a consistency token only replicas that have replayed past it qualify.
+        """
+        minimum = self.parse_token(token) if token else None
+        candidates = [
+            replica for replica in self.replicas
+            if replica.healthy and (minimum is None or self._caught_up(replica.position, minimum))
+        ]
+        if not candidates:
+            return None
+        return candidates[next(self._next) % len(candidates)].engine
+
+    def _caught_up(self, position: Optional[float], minimum: float) -> bool:
+        if position is None:
+            return False
+        if self.kind == HEARTBEAT:
+            # Heartbeat tokens name the last beat before the write; only a later beat follows it
+            return position > minimum
+        return position >= minimum
+
+    def token_after_write(self) -> str:
+        """Consistency token for a write that has just committed on the primary."""
+        with self.primary.connect() as connection:
+            if self.kind == WAL:
+                position = connection.execute(text("SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), '0/0')")).scalar()
+                return f"{WAL}:{int(position)}"
+            # Read from the primary, not the local clock, which other workers' beats need not agree with
+            beat_at = connection.execute(text("SELECT beat_at FROM replicaheartbeat WHERE id = 1")).scalar()
+        return f"{HEARTBEAT}:{beat_at or 0:.6f}"
+
+    def parse_token(self, token: str) -> Optional[float]:
+        kind, _, value = token.partition(":")
+        if kind != self.kind:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return None
+
+    def check(self) -> None:
+        """Stamp the heartbeat if needed, then measure every replica."""
+        if self.kind == HEARTBEAT:
+            self._beat()
+        for replica in self.replicas:
+            try:
+                replica.position, replica.lag = self._measure(replica.engine)
+                replica.error = None
+                replica.healthy = replica.lag <= self.max_lag
+            except Exception as e:
+                if replica.healthy or replica.error is None:
+                    logger.warning(f"Replica {replica.name} is unavailable: {e}")
+                replica.healthy, replica.error = False, str(e)
+
+    def _beat(self) -> None:
+        # Imported here because the database module builds the replica set
+        from .database import begin_write
+        try:
+            with begin_write(self.primary) as connection:
+                # Never backwards, so a later beat always orders after an earlier token
+                stamped = connection.execute(text(
+                    "UPDATE replicaheartbeat SET beat_at = "
+                    "CASE WHEN beat_at < :now THEN :now ELSE beat_at + 0.000001 END WHERE id = 1"
+                ), {"now": time.time()})
+                if not stamped.rowcount:
+                    connection.execute(text("INSERT INTO replicaheartbeat (id, beat_at) VALUES (1, :now)"), {"now": time.time()})
+        except Exception as e:
+            logger.warning(f"Could not write the replica heartbeat: {e}")
+
+    def _measure(self, engine: Engine):
+        with engine.connect() as connection:
+            if self.kind == WAL:
+                position, lag = connection.execute(text(
+                    "SELECT pg_wal_lsn_diff(COALESCE(pg_last_wal_replay_lsn(), pg_current_wal_lsn()), '0/0'), "
+                    "CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+                )).one()
+                return float(position), float(lag or 0)
+            beat_at = connection.execute(text("SELECT beat_at FROM replicaheartbeat WHERE id = 1")).scalar()
+        if beat_at is None:
+            raise RuntimeError("no heartbeat replicated yet")
+        # A heartbeat up to one interval old is expected even with no replication delay
+        return beat_at, max(0.0, time.time() - beat_at - self.interval)
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [replica.status() for replica in self.replicas]
+
+    def start(self) -> None:
+        if not self.replicas or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = background_thread("replica-monitor", self._run)
+        self._thread.start()
+
+    def stop(self) -> None:
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+
+    def _run(self) -> None:
+        while True:
+            self.check()
+            if self._stop.wait(self.interval):
+                return
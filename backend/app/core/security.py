@@ -3,16 +3,16 @@ import hashlib
 import hmac
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any
-from fastapi import Request, HTTPException, status
+from fastapi import HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
 import jwt
 
 from .config import settings
-from .logging import get_logger, log_with_context
-from .security_utils import SecurityUtils, validate_password_security, validate_registration_data, rate_limiter
+from .logging import get_logger
+from .password_pool import PasswordPoolSaturated, password_hasher, hash_password, verify_password
+from .token_cache import token_cache
+from .security_utils import SecurityUtils, validate_password_security, validate_registration_data
 
 logger = get_logger(__name__)
 
@@ -103,7 +103,8 @@ class AuthenticationManager:
         else:
             expire = datetime.utcnow() + timedelta(minutes=settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES)
         
-        to_encode.update({"exp": expire, "type": "access"})
+        # jti keeps tokens issued within the same second distinct, so revoking one never hits another
+        to_encode.update({"exp": expire, "type": "access", "jti": secrets.token_hex(8)})
         encoded_jwt = jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
         return encoded_jwt
     
@@ -111,15 +112,19 @@ class AuthenticationManager:
         """Create a JWT refresh token."""
         to_encode = data.copy()
         expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
-        to_encode.update({"exp": expire, "type": "refresh"})
+        to_encode.update({"exp": expire, "type": "refresh", "jti": secrets.token_hex(8)})
         encoded_jwt = jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
         return encoded_jwt
     
     def verify_token(self, token: str) -> Dict[str, Any]:
-        """Verify and decode a JWT token."""
+        """Verify and decode a JWT token, reusing the claims of recently verified tokens."""
+        key = token_cache.key(token)
+        payload = token_cache.get(key)
+        if payload is not None:
+            return payload
+        
         try:
             payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
-            return payload
         except jwt.ExpiredSignatureError:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -130,17 +135,58 @@ class AuthenticationManager:
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid token"
             )
+        
+        if token_cache.is_revoked(key):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token has been revoked"
+            )
+        token_cache.put(key, payload)
+        return payload
+    
+    def revoke_token(self, token: str) -> Optional[Dict[str, Any]]:
+        """Revoke a token until it expires; returns its claims if it was valid."""
+        try:
+            payload = self.verify_token(token)
+        except HTTPException:
+            return None
+        token_cache.revoke(token_cache.key(token), payload["exp"])
+        return payload
     
     def hash_password(self, password: str) -> str:
-        """Hash a password using bcrypt."""
-        import bcrypt
-        salt = bcrypt.gensalt()
-        hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-        return hashed.decode('utf-8')
+        """Hash a password using bcrypt (blocking; use hash_password_async in handlers)."""
+        return hash_password(password, settings.BCRYPT_ROUNDS)
     
     def verify_password(self, password: str, hashed_password: str) -> bool:
-        """Verify a password against its hash."""
-        return SecurityUtils.verify_password_with_salt(password, hashed_password)
+        """Verify a password against its hash (blocking; use verify_password_async in handlers)."""
+        return verify_password(password, hashed_password)
+    
+    async def hash_password_async(self, password: str) -> str:
+        """Hash a password on the password worker pool."""
+        try:
+            return await password_hasher.hash(password)
+        except PasswordPoolSaturated:
+            raise self._password_pool_busy()
+    
+    async def verify_password_async(self, password: str, hashed_password: str) -> bool:
+        """Verify a password on the password worker pool."""
+        try:
+            return await password_hasher.verify(password, hashed_password)
+        except PasswordPoolSaturated:
+            raise self._password_pool_busy()
+    
+    def password_needs_rehash(self, hashed_password: str) -> bool:
+        """Check whether a hash was made with an outdated cost factor."""
+        return password_hasher.needs_rehash(hashed_password)
+    
+    @staticmethod
+    def _password_pool_busy() -> HTTPException:
+        logger.warning("Password hashing pool saturated, rejecting request")
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication service is busy, please retry",
+            headers={"Retry-After": "1"}
+        )
     
     def generate_api_key(self) -> str:
         """Generate a secure API key."""
@@ -155,211 +201,6 @@ class AuthenticationManager:
         return validate_registration_data(username, email, password)
 
 
-class SecurityMiddleware(BaseHTTPMiddleware):
-    """Enhanced security middleware."""
-    
-    def __init__(self, app: ASGIApp):
-        super().__init__(app)
-        self.security_config = SecurityConfig()
-    
-    async def dispatch(self, request: Request, call_next):
-        # Add security headers
-        response = await call_next(request)
-        
-        # Add security headers
-        security_headers = self.security_config.get_security_headers()
-        for header, value in security_headers.items():
-            if value:  # Only add non-empty headers
-                response.headers[header] = value
-        
-        # Add CSP header
-        csp_policy = self.security_config.get_csp_policy()
-        response.headers["Content-Security-Policy"] = csp_policy
-        
-        # Add CORS headers if not already present
-        if "Access-Control-Allow-Origin" not in response.headers:
-            cors_config = self.security_config.get_cors_config()
-            response.headers["Access-Control-Allow-Origin"] = cors_config["allow_origins"][0] if cors_config["allow_origins"] else "*"
-        
-        return response
-
-
-class RequestValidationMiddleware(BaseHTTPMiddleware):
-    """Middleware to validate and sanitize requests."""
-    
-    def __init__(self, app: ASGIApp):
-        super().__init__(app)
-    
-    async def dispatch(self, request: Request, call_next):
-        # Validate request size
-        content_length = request.headers.get("content-length")
-        if content_length and int(content_length) > settings.MAX_FILE_SIZE:
-            log_with_context(
-                logger,
-                "warning",
-                f"Request too large: {content_length} bytes",
-                client_ip=request.client.host if request.client else None,
-                url=str(request.url)
-            )
-            raise HTTPException(
-                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                detail="Request too large"
-            )
-        
-        # Validate content type for POST/PUT requests
-        if request.method in ["POST", "PUT", "PATCH"]:
-            content_type = request.headers.get("content-type", "")
-            if not content_type.startswith(("application/json", "multipart/form-data", "application/x-www-form-urlencoded")):
-                log_with_context(
-                    logger,
-                    "warning",
-                    f"Invalid content type: {content_type}",
-                    client_ip=request.client.host if request.client else None,
-                    url=str(request.url)
-                )
-                raise HTTPException(
-                    status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
-                    detail="Unsupported media type"
-                )
-        
-        response = await call_next(request)
-        return response
-
-
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Middleware to implement rate limiting."""
-    
-    def __init__(self, app: ASGIApp):
-        super().__init__(app)
-    
-    async def dispatch(self, request: Request, call_next):
-        # Get client IP for rate limiting
-        client_ip = request.client.host if request.client else "unknown"
-        
-        # Skip rate limiting for certain paths
-        skip_rate_limit_paths = ["/", "/health", "/health/db", "/docs", "/openapi.json", "/redoc"]
-        if any(request.url.path.startswith(path) for path in skip_rate_limit_paths):
-            return await call_next(request)
-        
-        # Apply rate limiting
-        if not rate_limiter.is_allowed(client_ip, max_requests=100, window_seconds=60):
-            log_with_context(
-                logger,
-                "warning",
-                f"Rate limit exceeded for IP: {client_ip}",
-                client_ip=client_ip,
-                url=str(request.url)
-            )
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail="Rate limit exceeded. Please try again later."
-            )
-        
-        response = await call_next(request)
-        
-        # Add rate limit headers
-        remaining = rate_limiter.get_remaining_requests(client_ip, max_requests=100, window_seconds=60)
-        response.headers["X-RateLimit-Remaining"] = str(remaining)
-        response.headers["X-RateLimit-Limit"] = "100"
-        response.headers["X-RateLimit-Reset"] = str(int((datetime.utcnow() + timedelta(seconds=60)).timestamp()))
-        
-        return response
-
-
-class AuthenticationMiddleware(BaseHTTPMiddleware):
-    """Middleware to handle authentication."""
-    
-    def __init__(self, app: ASGIApp):
-        super().__init__(app)
-        self.auth_manager = AuthenticationManager()
-    
-    async def dispatch(self, request: Request, call_next):
-        # Skip authentication for certain paths
-        skip_auth_paths = ["/", "/health", "/health/db", "/docs", "/openapi.json", "/redoc"]
-        if any(request.url.path.startswith(path) for path in skip_auth_paths):
-            return await call_next(request)
-        
-        # Check for authentication header
-        auth_header = request.headers.get("authorization")
-        if not auth_header:
-            # Allow unauthenticated access to public endpoints
-            if request.url.path.startswith("/api/v1/public"):
-                return await call_next(request)
-            
-            log_with_context(
-                logger,
-                "warning",
-                "Missing authorization header",
-                client_ip=request.client.host if request.client else None,
-                url=str(request.url)
-            )
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Missing authorization header"
-            )
-        
-        try:
-            # Extract token from header
-            scheme, token = auth_header.split()
-            if scheme.lower() != "bearer":
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Invalid authentication scheme"
-                )
-            
-            # Verify token
-            payload = self.auth_manager.verify_token(token)
-            request.state.user = payload
-            
-            # Create audit log for authentication
-            SecurityUtils.create_audit_log(
-                action="user_authenticated",
-                user_id=payload.get("sub"),
-                details={
-                    "ip_address": request.client.host if request.client else None,
-                    "user_agent": request.headers.get("user-agent"),
-                    "url": str(request.url)
-                }
-            )
-            
-            log_with_context(
-                logger,
-                "info",
-                "User authenticated",
-                user_id=payload.get("user_id"),
-                client_ip=request.client.host if request.client else None,
-                url=str(request.url)
-            )
-            
-        except HTTPException:
-            raise
-        except Exception as e:
-            log_with_context(
-                logger,
-                "error",
-                f"Authentication error: {str(e)}",
-                client_ip=request.client.host if request.client else None,
-                url=str(request.url)
-            )
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication credentials"
-            )
-        
-        return await call_next(request)
-
-
-def setup_security_middleware(app: ASGIApp) -> ASGIApp:
-    """Setup security middleware stack."""
-    # Note: Order matters - middleware is applied in reverse order
-    app = AuthenticationMiddleware(app)
-    app = RateLimitMiddleware(app)
-    app = RequestValidationMiddleware(app)
-    app = SecurityMiddleware(app)
-    
-    return app
-
-
 # Security utilities
 def sanitize_input(text: str) -> str:
     """Basic input sanitization."""
@@ -0,0 +1,275 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def sqlite_pragmas(
+    mmap_size: int, cache_size_kb: int, busy_timeout_ms: int, manage_checkpoints: bool
+) -> List[str]:
+    """Connection pragmas for a production SQLite database in WAL mode."""
+    pragmas = [
+        "PRAGMA journal_mode=WAL",
+        # WAL commits stay atomic and consistent; only the last transactions can be lost on power failure
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA mmap_size={mmap_size}",
+        # Negative sizes are in KiB rather than pages
+        f"PRAGMA cache_size=-{cache_size_kb}",
+        f"PRAGMA busy_timeout={busy_timeout_ms}",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA foreign_keys=ON",
+    ]
+    if manage_checkpoints:
+        # The writer checkpoints between group commits instead of whichever commit crosses 1000 pages
+        pragmas.append("PRAGMA wal_autocheckpoint=0")
+    return pragmas
+
+
+class _Ticket:
+    """A committed savepoint waiting for its group commit."""
+
+    def __init__(self):
+        self._done = threading.Event()
+        self.error: Optional[BaseException] = None
+
+    def finish(self, error: Optional[BaseException]) -> None:
+        self.error = error
+        self._done.set()
+
+    def wait(self) -> None:
+        self._done.wait()
+        if self.error is not None:
+            raise self.error
+
+
+class SQLiteWriter:
+    """Single write connection shared by every session, committing their transactions in groups.
+
+    SQLite allows one writer at a time, so instead of each session opening a
+    connection and queueing on the database lock, sessions take turns on one
+    connection. Each session's transaction runs in a savepoint inside a shared
+    outer transaction; when it commits, the savepoint is released and the
+    session waits while the writer thread commits the outer transaction once
+    for everyone who finished in the meantime. A failed session only rolls
+    back its own savepoint. Core writers outside a session join the same
+    queue through :meth:`begin`.
+
+    The writer thread also checkpoints the WAL between commits, so no request
+    pays for a checkpoint, and truncates it once it grows past
+    ``truncate_pages``.
+    """
+
+    def __init__(
+        self, engine: Engine, max_batch: int, max_delay: float, lease_timeout: float,
+        checkpoint_interval: float, truncate_pages: int,
+    ):
+        self.engine = engine
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.lease_timeout = lease_timeout
+        self.checkpoint_interval = checkpoint_interval
+        self.truncate_pages = truncate_pages
+        self._cond = threading.Condition()
+        self._connection: Optional[Connection] = None
+        self._outer = None
+        self._savepoint = None
+        self._owner: Any = None
+        self._owner_committed = False
+        self._waiting = 0
+        self._busy = False
+        self._pending: List[_Ticket] = []
+        self._first_pending_at = 0.0
+        self._last_checkpoint = time.monotonic()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {
+            "transactions": 0, "rolled_back": 0, "group_commits": 0, "largest_group": 0,
+            "checkpoints": 0, "wal_pages": 0, "lease_timeouts": 0,
+        }
+
+        # pysqlite opens transactions on its own and cannot nest savepoints in them;
+        # take over transaction control and take the write lock up front
+        @event.listens_for(engine, "connect")
+        def _autocommit_driver(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+
+        @event.listens_for(engine, "begin")
+        def _begin_immediate(connection):
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+    def acquire(self, session: Any) -> Connection:
+        """The write connection, inside a fresh savepoint for ``session``; blocks while another session writes."""
+        with self._cond:
+            if self._owner is session:
+                return self._connection
+            self._ensure_started()
+            self._waiting += 1
+            try:
+                deadline = time.monotonic() + self.lease_timeout
+                while self._owner is not None or self._busy:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["lease_timeouts"] += 1
+                        raise PoolTimeoutError(f"Timed out after {self.lease_timeout}s waiting for the SQLite writer")
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+            self._owner, self._owner_committed = session, False
+            if self._connection is None:
+                self._connection = self.engine.connect()
+            if self._outer is None:
+                self._outer = self._connection.begin()
+            self._savepoint = self._connection.begin_nested()
+            return self._connection
+
+    @contextmanager
+    def begin(self) -> Iterator[Connection]:
+        """Like ``Engine.begin()``: a Core transaction on the write connection, committed with its group."""
+        owner = object()
+        connection = self.acquire(owner)
+        savepoint = self._savepoint
+        try:
+            yield connection
+            savepoint.commit()
+            self.committed(owner)
+        except BaseException:
+            savepoint.rollback()
+            raise
+        finally:
+            ticket = self.release(owner)
+        if ticket is not None:
+            ticket.wait()
+
+    def holds(self, session: Any) -> bool:
+        return self._owner is session
+
+    def committed(self, session: Any) -> None:
+        """``session`` committed its savepoint; called before its transaction ends."""
+        with self._cond:
+            if self._owner is session:
+                self._owner_committed = True
+
+    def release(self, session: Any) -> Optional[_Ticket]:
+        """Hand the connection on; returns the ticket to wait on if the session committed."""
+        with self._cond:
+            if self._owner is not session:
+                return None
+            self._owner = None
+            ticket = None
+            if self._owner_committed:
+                ticket = _Ticket()
+                if not self._pending:
+                    self._first_pending_at = time.monotonic()
+                self._pending.append(ticket)
+                self._stats["transactions"] += 1
+            else:
+                self._stats["rolled_back"] += 1
+            self._cond.notify_all()
+            return ticket
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return dict(self._stats, pending=len(self._pending), waiting=self._waiting)
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+            self._thread.start()
+
+    def start(self) -> None:
+        with self._cond:
+            self._ensure_started()
+
+    def stop(self) -> None:
+        """Commit whatever is pending, then close the write connection."""
+        with self._cond:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+            self._cond.notify_all()
+        if thread is not None:
+            thread.join()
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _should_commit(self, now: float) -> bool:
+        if self._outer is None or self._owner is not None:
+            return False
+        # Keep the group open while more writers are queued, up to the batch and delay limits
+        return (
+            self._waiting == 0 or self._stopping or len(self._pending) >= self.max_batch
+            or now - self._first_pending_at >= self.max_delay
+        )
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    if self._should_commit(now):
+                        break
+                    if self._stopping and self._outer is None and self._owner is None:
+                        return
+                    if self._outer is None and self._owner is None and now - self._last_checkpoint >= self.checkpoint_interval:
+                        break
+                    timeout = self.checkpoint_interval
+                    if self._pending:
+                        timeout = max(0.0, self.max_delay - (now - self._first_pending_at))
+                    self._cond.wait(timeout)
+                self._busy = True
+                outer, self._outer = self._outer, None
+                batch, self._pending = self._pending, []
+
+            error: Optional[BaseException] = None
+            try:
+                if outer is not None:
+                    if batch:
+                        outer.commit()
+                    else:
+                        outer.rollback()
+            except Exception as e:
+                logger.error(f"SQLite group commit of {len(batch)} transactions failed: {e}")
+                error = e
+                try:
+                    outer.rollback()
+                except Exception:
+                    pass
+            if batch:
+                self._stats["group_commits"] += 1
+                self._stats["largest_group"] = max(self._stats["largest_group"], len(batch))
+            if time.monotonic() - self._last_checkpoint >= self.checkpoint_interval:
+                self._checkpoint()
+
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+            for ticket in batch:
+                ticket.finish(error)
+
+    def _checkpoint(self) -> None:
+        self._last_checkpoint = time.monotonic()
+        try:
+            if self._connection is None:
+                self._connection = self.engine.connect()
+            # On the driver connection: a checkpoint cannot run inside the transaction SQLAlchemy would begin
+            cursor = self._connection.connection.cursor()
+            try:
+                _, wal_pages, _ = cursor.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+                if self.truncate_pages and wal_pages > self.truncate_pages:
+                    # Only succeeds once no reader is still on the old WAL; otherwise retried next interval
+                    cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+            finally:
+                cursor.close()
+            self._stats["checkpoints"] += 1
+            self._stats["wal_pages"] = wal_pages
+        except Exception as e:
+            logger.warning(f"SQLite WAL checkpoint failed: {e}")
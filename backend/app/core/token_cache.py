@@ -0,0 +1,182 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, ContextManager, Dict, Optional, Tuple
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+
+from .config import settings
+from .logging import get_logger
+from .profiling import background_thread
+
+logger = get_logger(__name__)
+
+
+class TokenCache:
+    """Bounded LRU of verified JWT claims, keyed by a digest of the token.
+
+    A hit skips decoding and the HMAC check. Entries expire at the token's own
+    ``exp``, so a cached token can never outlive its signature. Revoked tokens
+    are purged and remembered until they would have expired anyway, so neither
+    the cache nor a fresh verification accepts them again.
+
+    Revocations are also written to the ``revokedtoken`` table. Every
+    ``sync_interval`` seconds a background thread loads the ones made by other
+    workers, so a logout takes effect everywhere within that interval.
+    """
+
+    def __init__(self, max_size: int, sync_interval: float):
+        self.max_size = max_size
+        self.sync_interval = sync_interval
+        self.engine: Optional[Engine] = None
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[bytes, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._revoked: Dict[bytes, float] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _begin(self) -> ContextManager[Connection]:
+        # Imported here so the cache can be configured before the database module loads
+        from .database import begin_write
+        return begin_write(self.engine)
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        """Digest used in place of the token, so raw tokens are never held in memory."""
+        return hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+
+    def get(self, key: bytes) -> Optional[Dict[str, Any]]:
+        """Return the claims of a previously verified, unexpired token."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            claims, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(claims)
+
+    def put(self, key: bytes, claims: Dict[str, Any]) -> None:
+        """Cache the claims of a token that just passed verification."""
+        expires_at = claims.get("exp")
+        if not self.max_size or not isinstance(expires_at, (int, float)) or expires_at <= time.time():
+            return
+        with self._lock:
+            if key in self._revoked:
+                return
+            self._entries[key] = (dict(claims), float(expires_at))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def revoke(self, key: bytes, expires_at: float) -> None:
+        """Purge a token and reject it, in every worker, until ``expires_at``."""
+        if expires_at <= time.time():
+            # Tokens past their exp are rejected by verification anyway
+            return
+        self._remember({key: expires_at})
+
+        from app.models.revoked_token import RevokedToken
+        table = RevokedToken.__table__
+        try:
+            with self._begin() as connection:
+                connection.execute(insert(table).values(
+                    token_hash=key.hex(), expires_at=datetime.utcfromtimestamp(expires_at), revoked_at=datetime.utcnow()
+                ))
+        except IntegrityError:
+            pass  # Already revoked, by this or another worker
+
+    def is_revoked(self, key: bytes) -> bool:
+        with self._lock:
+            expires_at = self._revoked.get(key)
+            if expires_at is not None and expires_at <= time.time():
+                del self._revoked[key]
+                return False
+            return expires_at is not None
+
+    def sync(self) -> int:
+        """Load tokens revoked by other workers and drop expired revocations; returns how many are active."""
+        from app.models.revoked_token import RevokedToken
+        table = RevokedToken.__table__
+        now = datetime.utcnow()
+        with self._begin() as connection:
+            connection.execute(delete(table).where(table.c.expires_at <= now))
+            rows = connection.execute(select(table.c.token_hash, table.c.expires_at)).all()
+        self._remember({
+            bytes.fromhex(token_hash): expires_at.replace(tzinfo=timezone.utc).timestamp()
+            for token_hash, expires_at in rows
+        })
+        return len(rows)
+
+    def _remember(self, revoked: Dict[bytes, float]) -> None:
+        now = time.time()
+        with self._lock:
+            for key in revoked:
+                self._entries.pop(key, None)
+            self._revoked.update(revoked)
+            for revoked_key in [k for k, exp in self._revoked.items() if exp <= now]:
+                del self._revoked[revoked_key]
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        # Load existing revocations before serving, so a restarted worker never
+        # accepts a logged-out token for the first sync interval
+        try:
+            self.sync()
+        except Exception as e:
+            logger.error(f"Token revocation sync failed: {e}")
+        self._thread = background_thread("token-revocation-sync", self._run)
+        self._thread.start()
+
+    def stop(self) -> None:
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.sync_interval):
+            try:
+                self.sync()
+            except Exception as e:
+                logger.error(f"Token revocation sync failed: {e}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._revoked.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "revoked": len(self._revoked),
+            }
+
+
+# Shared verified-token cache
+token_cache = TokenCache(settings.TOKEN_CACHE_SIZE, settings.TOKEN_REVOCATION_SYNC_SECONDS)
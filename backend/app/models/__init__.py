@@ -7,6 +7,14 @@ from .inventory_item import InventoryItem
 from .count import Count
 from .transfer import Transfer
 from .schedule import Schedule
+from .audit_log import AuditLog
+from .history_rollup import CountRollup, TransferRollup
+from .replica_heartbeat import ReplicaHeartbeat
+from .change_log import ChangeLog
+from .idempotency_key import IdempotencyKey
+from .table_stamp import TableStamp
+from .item_import_job import ItemImportJob
+from .revoked_token import RevokedToken
 
 # This ensures all models are imported and registered with SQLModel
 __all__ = [
@@ -17,5 +25,14 @@ __all__ = [
     "InventoryItem",
     "Count",
     "Transfer",
-    "Schedule"
+    "Schedule",
+    "AuditLog",
+    "CountRollup",
+    "TransferRollup",
+    "ReplicaHeartbeat",
+    "ChangeLog",
+    "IdempotencyKey",
+    "TableStamp",
+    "ItemImportJob",
+    "RevokedToken"
 ] 
\ No newline at end of file
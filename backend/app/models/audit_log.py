@@ -0,0 +1,20 @@
+from sqlmodel import SQLModel, Field, Column, JSON
+from sqlalchemy import Index
+from typing import Any, Dict, Optional
+from datetime import datetime
+
+class AuditLog(SQLModel, table=True):
+    # Queries filter by user or action over a time range, newest first
+    __table_args__ = (
+        Index("ix_auditlog_user_id_created_at", "user_id", "created_at"),
+        Index("ix_auditlog_action_created_at", "action", "created_at"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    action: str = Field(max_length=64)
+    # No foreign key: audit records outlive the users they describe
+    user_id: Optional[int] = None
+    ip_address: Optional[str] = Field(default=None, max_length=45)
+    correlation_id: Optional[str] = Field(default=None, max_length=64)
+    details: Optional[Dict[str, Any]] = Field(default=None, sa_column=Column(JSON))
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
@@ -0,0 +1,22 @@
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Index
+from typing import Optional
+from datetime import datetime
+
+class ChangeLog(SQLModel, table=True):
+    """One create, update or delete of a synced row, numbered in commit order for delta sync."""
+    __table_args__ = (
+        # Finds the entries a later change of the same row supersedes
+        Index("ix_changelog_entity_entity_id_seq", "entity", "entity_id", "seq"),
+        # Sequence numbers are cursors held by clients, so SQLite must never reuse one
+        {"sqlite_autoincrement": True},
+    )
+
+    seq: Optional[int] = Field(default=None, primary_key=True)
+    entity: str = Field(max_length=32)
+    entity_id: int
+    operation: str = Field(max_length=8)
+    # No foreign keys: tombstones outlive the rows and locations they describe
+    location_id: Optional[int] = None
+    to_location_id: Optional[int] = None
+    changed_at: datetime = Field(default_factory=datetime.utcnow)
@@ -1,8 +1,16 @@
-from sqlmodel import SQLModel, Field
+from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index
 from typing import Optional
 from datetime import datetime
 
 class Count(SQLModel, table=True):
+    # Latest counts per location, history per item and counts per user, newest first
+    __table_args__ = (
+        Index("ix_count_location_id_counted_at", "location_id", "counted_at"),
+        Index("ix_count_item_id_counted_at", "item_id", "counted_at"),
+        Index("ix_count_user_id_counted_at", "user_id", "counted_at"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     item_id: int = Field(foreign_key="inventoryitem.id")
     location_id: int = Field(foreign_key="location.id")
@@ -13,4 +21,8 @@ class Count(SQLModel, table=True):
     approved_by: Optional[int] = Field(default=None, foreign_key="user.id")
     approved_at: Optional[datetime] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow) 
\ No newline at end of file
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    item: Optional["InventoryItem"] = Relationship()
+    location: Optional["Location"] = Relationship()
+    user: Optional["User"] = Relationship(sa_relationship_kwargs={"foreign_keys": "[Count.user_id]"}) 
\ No newline at end of file
@@ -0,0 +1,34 @@
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Index
+from typing import Optional
+from datetime import date, datetime
+
+class CountRollup(SQLModel, table=True):
+    """Monthly totals per location and item for counts moved to the archive."""
+    __table_args__ = (
+        Index("ix_countrollup_location_id_month_item_id", "location_id", "month", "item_id", unique=True),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    location_id: int = Field(foreign_key="location.id")
+    item_id: int = Field(foreign_key="inventoryitem.id")
+    month: date
+    counts: int
+    total_quantity: float
+    last_quantity: float
+    last_counted_at: datetime
+
+class TransferRollup(SQLModel, table=True):
+    """Monthly totals per location pair and item for transfers moved to the archive."""
+    __table_args__ = (
+        Index("ix_transferrollup_from_location_id_month_to_location_id_item_id",
+              "from_location_id", "month", "to_location_id", "item_id", unique=True),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    from_location_id: int = Field(foreign_key="location.id")
+    to_location_id: int = Field(foreign_key="location.id")
+    item_id: int = Field(foreign_key="inventoryitem.id")
+    month: date
+    transfers: int
+    total_quantity: float
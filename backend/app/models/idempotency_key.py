@@ -0,0 +1,20 @@
+from sqlmodel import SQLModel, Field, Column, JSON
+from sqlalchemy import LargeBinary
+from typing import List, Optional
+from datetime import datetime
+
+class IdempotencyKey(SQLModel, table=True):
+    """A client-chosen key for one write request and the response it produced, replayed to retries."""
+    key: str = Field(primary_key=True, max_length=255)
+    # Hash of method, path, query and body: a key may only be retried with the same request
+    fingerprint: str = Field(max_length=64)
+    state: str = Field(max_length=16)
+    # Random token of the request holding the key; only it may complete or release the key
+    claim_token: Optional[str] = Field(default=None, max_length=32)
+    status_code: Optional[int] = None
+    headers: Optional[List[List[str]]] = Field(default=None, sa_column=Column(JSON))
+    body: Optional[bytes] = Field(default=None, sa_column=Column(LargeBinary))
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    # A request still processing past this is presumed dead and a retry may take the key over
+    locked_until: datetime
+    expires_at: datetime = Field(index=True)
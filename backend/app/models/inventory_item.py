@@ -5,7 +5,7 @@ from datetime import datetime
 class InventoryItem(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str = Field(index=True)
-    category_id: Optional[int] = Field(default=None, foreign_key="category.id")
+    category_id: Optional[int] = Field(default=None, foreign_key="category.id", index=True)
     unit: str
     par_level: Optional[float] = None
     reorder_increment: Optional[float] = None
@@ -0,0 +1,18 @@
+from sqlmodel import SQLModel, Field, Column, JSON
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+
+class ItemImportJob(SQLModel, table=True):
+    """Progress of one background item import, readable from every worker until it expires."""
+    id: str = Field(primary_key=True, max_length=32)
+    filename: str = Field(max_length=255)
+    status: str = Field(default="queued", max_length=16)
+    total_rows: Optional[int] = None
+    processed_rows: int = 0
+    created: int = 0
+    updated: int = 0
+    failed: int = 0
+    errors: List[Dict[str, Any]] = Field(default_factory=list, sa_column=Column(JSON))
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+    expires_at: datetime = Field(index=True)
@@ -0,0 +1,10 @@
+from sqlmodel import SQLModel, Field
+from typing import Optional
+
+class ReplicaHeartbeat(SQLModel, table=True):
+    """Single row the primary stamps with the time; replicas replaying it show how far behind they are.
+
+    Only used for databases without a replay position (PostgreSQL reports WAL positions instead).
+    """
+    id: Optional[int] = Field(default=None, primary_key=True)
+    beat_at: float
@@ -0,0 +1,9 @@
+from sqlmodel import SQLModel, Field
+from datetime import datetime
+
+class RevokedToken(SQLModel, table=True):
+    """A logged-out token, rejected by every worker until it would have expired anyway."""
+    # Hex digest of the token; raw tokens are never stored
+    token_hash: str = Field(primary_key=True, max_length=32)
+    expires_at: datetime = Field(index=True)
+    revoked_at: datetime = Field(default_factory=datetime.utcnow)
@@ -1,12 +1,18 @@
 from sqlmodel import SQLModel, Field
+from sqlalchemy import Index
 from typing import Optional
 from datetime import datetime
 
 class Schedule(SQLModel, table=True):
+    # Upcoming events for one location, and across all locations
+    __table_args__ = (
+        Index("ix_schedule_location_id_scheduled_for", "location_id", "scheduled_for"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     location_id: int = Field(foreign_key="location.id")
     event_type: str
-    scheduled_for: datetime
+    scheduled_for: datetime = Field(index=True)
     created_by: int = Field(foreign_key="user.id")
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow) 
\ No newline at end of file
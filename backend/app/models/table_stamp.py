@@ -0,0 +1,7 @@
+from sqlmodel import SQLModel, Field
+from datetime import datetime
+
+class TableStamp(SQLModel, table=True):
+    """When a cached reference table last changed, including deletes, which no row's updated_at records."""
+    name: str = Field(primary_key=True, max_length=32)
+    modified_at: datetime = Field(default_factory=datetime.utcnow)
@@ -1,8 +1,16 @@
 from sqlmodel import SQLModel, Field
+from sqlalchemy import Index
 from typing import Optional
 from datetime import datetime
 
 class Transfer(SQLModel, table=True):
+    # Transfers between a pair of locations, and everything arriving at one location
+    __table_args__ = (
+        Index("ix_transfer_from_location_id_to_location_id_transferred_at",
+              "from_location_id", "to_location_id", "transferred_at"),
+        Index("ix_transfer_to_location_id_transferred_at", "to_location_id", "transferred_at"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     item_id: int = Field(foreign_key="inventoryitem.id")
     from_location_id: int = Field(foreign_key="location.id")
@@ -6,14 +6,17 @@ from .inventory_item import *
 from .count import *
 from .transfer import *
 from .schedule import *
+from .audit_log import *
 
 __all__ = [
     "UserBase", "UserCreate", "UserRead", "UserUpdate",
     "RoleBase", "RoleCreate", "RoleRead", "RoleUpdate",
     "LocationBase", "LocationCreate", "LocationRead", "LocationUpdate",
     "CategoryBase", "CategoryCreate", "CategoryRead", "CategoryUpdate",
-    "InventoryItemBase", "InventoryItemCreate", "InventoryItemRead", "InventoryItemUpdate",
-    "CountBase", "CountCreate", "CountRead", "CountUpdate",
+    "InventoryItemBase", "InventoryItemCreate", "InventoryItemRead", "InventoryItemUpdate", "InventoryItemReadExpanded",
+    "ItemImportRowError", "ItemImportJobRead",
+    "CountBase", "CountCreate", "CountRead", "CountUpdate", "CountReadExpanded",
     "TransferBase", "TransferCreate", "TransferRead", "TransferUpdate",
-    "ScheduleBase", "ScheduleCreate", "ScheduleRead", "ScheduleUpdate"
+    "ScheduleBase", "ScheduleCreate", "ScheduleRead", "ScheduleUpdate",
+    "AuditLogRead"
 ] 
\ No newline at end of file
@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from typing import Any, Dict, Optional
+from datetime import datetime
+
+class AuditLogRead(BaseModel):
+    id: int
+    action: str
+    user_id: Optional[int] = None
+    ip_address: Optional[str] = None
+    correlation_id: Optional[str] = None
+    details: Optional[Dict[str, Any]] = None
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
@@ -1,6 +1,9 @@
 from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import datetime
+from .inventory_item import InventoryItemReadExpanded
+from .location import LocationRead
+from .user import UserRead
 
 class CountBase(BaseModel):
     item_id: int
@@ -25,4 +28,9 @@ class CountRead(CountBase):
     updated_at: datetime
 
     class Config:
-        orm_mode = True 
\ No newline at end of file
+        orm_mode = True 
+
+class CountReadExpanded(CountRead):
+    item: Optional[InventoryItemReadExpanded] = None
+    location: Optional[LocationRead] = None
+    user: Optional[UserRead] = None
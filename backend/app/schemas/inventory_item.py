@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
+from .category import CategoryRead
 
 class InventoryItemBase(BaseModel):
     name: str = Field(..., min_length=2, max_length=100)
@@ -29,4 +30,27 @@ class InventoryItemRead(InventoryItemBase):
     updated_at: datetime
 
     class Config:
-        orm_mode = True 
\ No newline at end of file
+        orm_mode = True 
+
+class InventoryItemReadExpanded(InventoryItemRead):
+    category: Optional[CategoryRead] = None
+
+class ItemImportRowError(BaseModel):
+    row: Optional[int] = None
+    error: str
+
+class ItemImportJobRead(BaseModel):
+    id: str
+    filename: str
+    status: str
+    total_rows: Optional[int] = None
+    processed_rows: int
+    created: int
+    updated: int
+    failed: int
+    errors: List[ItemImportRowError] = []
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
@@ -0,0 +1,406 @@
+import gzip
+import heapq
+import os
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Collection, Dict, Iterator, List, Optional, Tuple
+
+import orjson
+from sqlalchemy import delete, insert, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.sql.schema import Table
+
+from app.core.config import settings
+from app.core.database import begin_write
+from app.core.logging import get_logger
+from app.core.profiling import background_thread
+from app.models.count import Count
+from app.models.history_rollup import CountRollup, TransferRollup
+from app.models.transfer import Transfer
+
+try:
+    import fcntl
+except ImportError:  # Windows: development runs a single worker, so files go unlocked
+    fcntl = None
+
+logger = get_logger(__name__)
+
+FILE_SUFFIX = ".columns.json.gz"
+
+# PostgreSQL advisory lock held by the worker running the archive job
+ARCHIVE_LOCK_ID = 7_215_201_001
+
+# Lock file in the archive directory, for databases without advisory locks (SQLite is
+# a local file, so every worker that can reach it runs on the same host)
+JOB_LOCK_FILE = ".archive.lock"
+
+Columns = Dict[str, List[Any]]
+
+
+@dataclass(frozen=True)
+class ArchivedTable:
+    """How one OLTP table is split into archive files and summarised."""
+    name: str
+    table: Table
+    time_column: str
+    location_column: str
+    rollup: Callable[[int, date, Columns], List[Dict[str, Any]]]
+    rollup_table: Table
+
+
+def _count_rollups(location_id: int, month: date, columns: Columns) -> List[Dict[str, Any]]:
+    totals: Dict[int, Dict[str, Any]] = {}
+    for item_id, quantity, counted_at in zip(columns["item_id"], columns["quantity"], columns["counted_at"]):
+        total = totals.setdefault(item_id, {
+            "location_id": location_id, "item_id": item_id, "month": month,
+            "counts": 0, "total_quantity": 0.0, "last_quantity": quantity, "last_counted_at": counted_at,
+        })
+        total["counts"] += 1
+        total["total_quantity"] += quantity
+        if counted_at >= total["last_counted_at"]:
+            total["last_quantity"], total["last_counted_at"] = quantity, counted_at
+    return list(totals.values())
+
+
+def _transfer_rollups(location_id: int, month: date, columns: Columns) -> List[Dict[str, Any]]:
+    totals: Dict[Tuple[int, int], Dict[str, Any]] = {}
+    for to_location_id, item_id, quantity in zip(columns["to_location_id"], columns["item_id"], columns["quantity"]):
+        total = totals.setdefault((to_location_id, item_id), {
+            "from_location_id": location_id, "to_location_id": to_location_id, "item_id": item_id,
+            "month": month, "transfers": 0, "total_quantity": 0.0,
+        })
+        total["transfers"] += 1
+        total["total_quantity"] += quantity
+    return list(totals.values())
+
+
+COUNTS = ArchivedTable("count", Count.__table__, "counted_at", "location_id", _count_rollups, CountRollup.__table__)
+# Filed under the sending location; reads filtered on the receiving side scan every location's month
+TRANSFERS = ArchivedTable(
+    "transfer", Transfer.__table__, "transferred_at", "from_location_id", _transfer_rollups, TransferRollup.__table__
+)
+
+
+def utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    """Stored times are naive UTC; convert aware bounds so they compare."""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def month_start(value: datetime) -> date:
+    return date(value.year, value.month, 1)
+
+
+def next_month(value: date) -> date:
+    return date(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+class HistoryArchive:
+    """Monthly per-location archive files for rows moved out of the OLTP tables.
+
+    Each file holds one table's rows for one location and month, stored column
+    by column (a JSON array per column, gzip-compressed): values of a column
+    compress well together, and a read filters on the columns it needs before
+    materialising only the matching rows.
+
+    Every API host reads the archive, so with several hosts ``directory`` must
+    be shared storage mounted at the same path on each of them. Only one worker
+    runs :func:`archive_history` at a time, and each file is rewritten under an
+    exclusive lock.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+
+    def path(self, spec: ArchivedTable, location_id: int, month: date) -> Path:
+        return self.directory / spec.name / str(location_id) / f"{month:%Y-%m}{FILE_SUFFIX}"
+
+    def files(
+        self, spec: ArchivedTable, location_id: Optional[int] = None,
+        since: Optional[datetime] = None, until: Optional[datetime] = None,
+    ) -> Iterator[Tuple[int, date, Path]]:
+        """Archive files of ``spec`` for months overlapping ``[since, until)``."""
+        since, until = utc_naive(since), utc_naive(until)
+        root = self.directory / spec.name
+        if location_id is not None:
+            locations = [root / str(location_id)]
+        else:
+            locations = [entry for entry in root.iterdir() if entry.is_dir()] if root.is_dir() else []
+        for location in locations:
+            if not location.is_dir():
+                continue
+            for path in location.iterdir():
+                if not path.name.endswith(FILE_SUFFIX):
+                    continue
+                month = datetime.strptime(path.name[:-len(FILE_SUFFIX)], "%Y-%m").date()
+                if since is not None and next_month(month) <= since.date():
+                    continue
+                if until is not None and datetime.combine(month, datetime.min.time()) >= until:
+                    continue
+                yield int(location.name), month, path
+
+    def has_files(self, spec: ArchivedTable, **kwargs) -> bool:
+        return next(self.files(spec, **kwargs), None) is not None
+
+    def write(
+        self, spec: ArchivedTable, location_id: int, month: date, rows: List[Dict[str, Any]],
+        remove: Collection[int] = (),
+    ) -> Columns:
+        """Add ``rows`` to a month's file, replacing rows with the same id, drop ids in ``remove``, and return its columns.
+
+        Rewriting by id makes a re-run after a failed delete harmless. A file
+        left with no rows is removed.
+        """
+        path = self.path(spec, location_id, month)
+        with file_lock(path.with_suffix(".lock")):
+            merged = {row["id"]: row for row in _rows(load_columns(spec, path))} if path.exists() else {}
+            merged.update((row["id"], row) for row in rows)
+            for row_id in remove:
+                merged.pop(row_id, None)
+            ordered = sorted(merged.values(), key=lambda row: (row[spec.time_column], row["id"]))
+            columns = {column.name: [row[column.name] for row in ordered] for column in spec.table.columns}
+
+            if not ordered:
+                path.unlink(missing_ok=True)
+                return columns
+            temporary = path.with_suffix(".tmp")
+            temporary.write_bytes(gzip.compress(orjson.dumps({"rows": len(ordered), "columns": columns})))
+            os.replace(temporary, path)
+        return columns
+
+    def read(
+        self, spec: ArchivedTable, location_id: Optional[int] = None,
+        since: Optional[datetime] = None, until: Optional[datetime] = None, **equals: Any,
+    ) -> List[SimpleNamespace]:
+        """Archived rows matching the filters, newest first, as attribute objects like ORM rows."""
+        since, until = utc_naive(since), utc_naive(until)
+        equals = {name: value for name, value in equals.items() if value is not None}
+        found = []
+        for _, _, path in self.files(spec, location_id, since, until):
+            columns = load_columns(spec, path)
+            times = columns[spec.time_column]
+            selected = [
+                index for index, at in enumerate(times)
+                if (since is None or at >= since) and (until is None or at < until)
+            ]
+            for name, value in equals.items():
+                values = columns[name]
+                selected = [index for index in selected if values[index] == value]
+            names = list(columns)
+            found.extend(SimpleNamespace(**{name: columns[name][index] for name in names}) for index in selected)
+        found.sort(key=lambda row: (getattr(row, spec.time_column), row.id), reverse=True)
+        return found
+
+    def archive(self, engine: Engine, spec: ArchivedTable, cutoff: datetime, batch_size: int) -> int:
+        """Move rows older than ``cutoff`` into archive files and refresh their rollups.
+
+        Each batch is read without locks and written to its files first, so no
+        row lock is held while gzip files are rewritten. A short transaction
+        then locks the batch, deletes the rows that are unchanged since they
+        were read and rewrites the affected rollups from the written columns.
+        Rows edited or deleted in the meantime stay live and are dropped from
+        the files again. Until then, or if a run dies between the two steps,
+        readers see the row in both places and keep the live one (see
+        :func:`merge_archived`).
+        """
+        table = spec.table
+        time_column = table.c[spec.time_column]
+        moved = 0
+        while True:
+            with engine.connect() as connection:
+                rows = [
+                    dict(row._mapping) for row in connection.execute(
+                        select(table).where(time_column < cutoff).order_by(time_column, table.c.id).limit(batch_size)
+                    )
+                ]
+            if not rows:
+                return moved
+            groups: Dict[Tuple[int, date], List[Dict[str, Any]]] = defaultdict(list)
+            for row in rows:
+                groups[(row[spec.location_column], month_start(row[spec.time_column]))].append(row)
+            written = {key: self.write(spec, *key, group) for key, group in groups.items()}
+
+            with begin_write(engine) as connection:
+                current = {
+                    row.id: dict(row._mapping) for row in connection.execute(
+                        select(table).where(table.c.id.in_([row["id"] for row in rows])).with_for_update()
+                    )
+                }
+                stale = {row["id"] for row in rows if current.get(row["id"]) != row}
+                for (location_id, month), columns in written.items():
+                    self._replace_rollups(connection, spec, location_id, month, _without(columns, stale))
+                archived = [row["id"] for row in rows if row["id"] not in stale]
+                if archived:
+                    connection.execute(delete(table).where(table.c.id.in_(archived)))
+            for key, group in groups.items():
+                dropped = [row["id"] for row in group if row["id"] in stale]
+                if dropped:
+                    self.write(spec, *key, [], remove=dropped)
+            moved += len(archived)
+            if not archived:
+                # Every row changed under us; leave them for the next run rather than spin
+                return moved
+
+    def _replace_rollups(
+        self, connection: Connection, spec: ArchivedTable, location_id: int, month: date, columns: Columns
+    ) -> None:
+        # Recomputed from the whole file, so summaries stay exact however the month was archived
+        rollup = spec.rollup_table
+        connection.execute(delete(rollup).where(rollup.c[spec.location_column] == location_id, rollup.c.month == month))
+        connection.execute(insert(rollup), spec.rollup(location_id, month, columns))
+
+
+def _without(columns: Columns, ids: Collection[int]) -> Columns:
+    if not ids:
+        return columns
+    keep = [index for index, row_id in enumerate(columns["id"]) if row_id not in ids]
+    return {name: [values[index] for index in keep] for name, values in columns.items()}
+
+
+def merge_archived(
+    spec: ArchivedTable, live: List[Any], archived: List[Any], limit: int,
+    still_live: Callable[[List[int]], Collection[int]],
+) -> List[Any]:
+    """The newest ``limit`` rows of ``live`` and ``archived``, both sorted newest first, merged in order.
+
+    An archived row that is also still in the table, because a run was
+    interrupted or the row changed while it was archived, is skipped in favour
+    of the live one. ``still_live`` returns which of the given ids are in the
+    table; it is only asked about archived rows that could make the page.
+    """
+    live_ids = {row.id for row in live}
+    kept: List[Any] = []
+    position = 0
+    while len(kept) < limit and position < len(archived):
+        chunk = [row for row in archived[position:position + limit - len(kept)] if row.id not in live_ids]
+        position += limit - len(kept)
+        duplicated = set(still_live([row.id for row in chunk])) if chunk else set()
+        kept.extend(row for row in chunk if row.id not in duplicated)
+    newest_first = lambda row: (getattr(row, spec.time_column), row.id)
+    return list(heapq.merge(live, kept, key=newest_first, reverse=True))[:limit]
+
+
+def _rows(columns: Columns) -> Iterator[Dict[str, Any]]:
+    names = list(columns)
+    for values in zip(*(columns[name] for name in names)):
+        yield dict(zip(names, values))
+
+
+def load_columns(spec: ArchivedTable, path: Path) -> Columns:
+    stat = path.stat()
+    return _load_columns(spec, str(path), stat.st_mtime_ns, stat.st_size)
+
+
+# Keyed on mtime and size, so a rewritten file is decoded again
+@lru_cache(maxsize=64)
+def _load_columns(spec: ArchivedTable, path: str, mtime_ns: int, size: int) -> Columns:
+    with open(path, "rb") as f:
+        columns = orjson.loads(gzip.decompress(f.read()))["columns"]
+    # JSON has no datetime type: decode date columns once per file
+    for column in spec.table.columns:
+        if column.type.python_type is datetime:
+            columns[column.name] = [datetime.fromisoformat(value) if value else None for value in columns[column.name]]
+    return columns
+
+
+@contextmanager
+def file_lock(path: Path, blocking: bool = True) -> Iterator[bool]:
+    """Hold an exclusive ``flock`` on ``path``, yielding whether it was acquired."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if fcntl is None:
+        yield True
+        return
+    with open(path, "a") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            acquired = False
+        else:
+            acquired = True
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+@contextmanager
+def job_lock(engine: Engine, directory: Path) -> Iterator[bool]:
+    """Try to take the archive job lock, yielding whether this worker holds it.
+
+    On PostgreSQL it is a session advisory lock, so one worker on any host
+    archives at a time; elsewhere it is a lock file in the archive directory.
+    """
+    if engine.dialect.name != "postgresql":
+        with file_lock(directory / JOB_LOCK_FILE, blocking=False) as acquired:
+            yield acquired
+        return
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        acquired = connection.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": ARCHIVE_LOCK_ID}).scalar()
+        try:
+            yield bool(acquired)
+        finally:
+            if acquired:
+                connection.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": ARCHIVE_LOCK_ID})
+
+
+def archive_history(engine: Engine, older_than_days: Optional[int] = None) -> Dict[str, int]:
+    """Archive counts and transfers older than ``ARCHIVE_AFTER_DAYS``.
+
+    Returns rows moved per table, or an empty dict if another worker is already archiving.
+    """
+    days = settings.ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    moved = {}
+    with job_lock(engine, history_archive.directory) as acquired:
+        if not acquired:
+            logger.info("History archiving is already running in another worker")
+            return moved
+        for spec in (COUNTS, TRANSFERS):
+            moved[spec.name] = history_archive.archive(engine, spec, cutoff, settings.ARCHIVE_BATCH_SIZE)
+    if any(moved.values()):
+        logger.info(f"Archived history older than {cutoff.isoformat()}: {moved}")
+    return moved
+
+
+class ArchiveJob:
+    """Runs :func:`archive_history` at startup and then every ``interval`` seconds."""
+
+    def __init__(self, engine: Engine, interval: float):
+        self.engine = engine
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = background_thread("history-archive", self._run)
+        self._thread.start()
+
+    def stop(self) -> None:
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                archive_history(self.engine)
+            except Exception as e:
+                logger.error(f"History archiving failed: {e}")
+            if self._stop.wait(self.interval):
+                return
+
+
+# Shared archive of counts and transfers
+history_archive = HistoryArchive(settings.ARCHIVE_DIR)
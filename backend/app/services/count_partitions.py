@@ -0,0 +1,248 @@
+import re
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.profiling import background_thread
+
+logger = get_logger(__name__)
+
+TABLE = "count"
+
+# Rows that predate partitioning stay in the original table, attached as one partition
+LEGACY_PARTITION = "count_legacy"
+
+# Catches rows outside every monthly range (e.g. far-future timestamps) instead of failing the insert
+DEFAULT_PARTITION = "count_default"
+
+# Indexes of the partitioned table; PostgreSQL creates them on every partition
+INDEXES = [
+    ("ix_count_location_id_counted_at", ["location_id", "counted_at"]),
+    ("ix_count_item_id_counted_at", ["item_id", "counted_at"]),
+    ("ix_count_user_id_counted_at", ["user_id", "counted_at"]),
+]
+
+FOREIGN_KEYS = [
+    ("count_item_id_fkey", "item_id", "inventoryitem"),
+    ("count_location_id_fkey", "location_id", "location"),
+    ("count_user_id_fkey", "user_id", '"user"'),
+    ("count_approved_by_fkey", "approved_by", '"user"'),
+]
+
+UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+
+
+@dataclass
+class Partition:
+    name: str
+    upper: Optional[datetime]  # None for the default partition
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    month = value.month - 1 + months
+    return date(value.year + month // 12, month % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{TABLE}_y{month.year}m{month.month:02d}"
+
+
+def create_partition_sql(month: date) -> str:
+    """DDL for the partition holding ``month``, a no-op if it already exists."""
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {TABLE} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+
+def is_partitioned(connection: Connection) -> bool:
+    if connection.dialect.name != "postgresql":
+        return False
+    return bool(connection.execute(
+        text("SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = :table"),
+        {"table": TABLE},
+    ).scalar())
+
+
+def list_partitions(connection: Connection) -> List[Partition]:
+    """Attached partitions of ``count`` with their exclusive upper bounds."""
+    rows = connection.execute(text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :table ORDER BY c.relname"
+    ), {"table": TABLE}).fetchall()
+    return [Partition(name, upper_bound(bound)) for name, bound in rows]
+
+
+def upper_bound(bound: Optional[str]) -> Optional[datetime]:
+    """Exclusive upper bound of a ``pg_get_expr(relpartbound)`` range, None for ``DEFAULT``."""
+    match = UPPER_BOUND.search(bound or "")
+    return datetime.fromisoformat(match.group(1)) if match else None
+
+
+def convert_to_partitioned(connection: Connection, months_ahead: int) -> None:
+    """Turn ``count`` into a table range-partitioned by month on ``counted_at``.
+
+    Existing rows are not copied: the old table is renamed and attached as a
+    single partition covering everything up to the month after its newest row.
+    The primary key becomes ``(id, counted_at)`` because PostgreSQL requires
+    the partition key in unique constraints; ``id`` keeps its sequence, so the
+    ``Count`` model is unaffected.
+    """
+    if connection.dialect.name != "postgresql" or is_partitioned(connection):
+        return
+
+    newest = connection.execute(text(f"SELECT max(counted_at) FROM {TABLE}")).scalar()
+    first_month = add_months(month_start(max(newest.date(), date.today()) if newest else date.today()), 1)
+
+    # Index and constraint names are schema-wide, so free them for the new parent table
+    connection.execute(text(f"ALTER TABLE {TABLE} RENAME TO {LEGACY_PARTITION}"))
+    connection.execute(text(f"ALTER INDEX IF EXISTS {TABLE}_pkey RENAME TO {LEGACY_PARTITION}_pkey"))
+    for name, _ in INDEXES:
+        connection.execute(text(f"ALTER INDEX IF EXISTS {name} RENAME TO {name.replace(TABLE, LEGACY_PARTITION, 1)}"))
+    for name, _, _ in FOREIGN_KEYS:
+        connection.execute(text(
+            f"ALTER TABLE {LEGACY_PARTITION} RENAME CONSTRAINT {name} TO {name.replace(TABLE, LEGACY_PARTITION, 1)}"
+        ))
+
+    connection.execute(text(
+        f"CREATE TABLE {TABLE} (LIKE {LEGACY_PARTITION} INCLUDING DEFAULTS) PARTITION BY RANGE (counted_at)"
+    ))
+    connection.execute(text(f"ALTER SEQUENCE count_id_seq OWNED BY {TABLE}.id"))
+    connection.execute(text(f"ALTER TABLE {TABLE} ADD PRIMARY KEY (id, counted_at)"))
+    for name, column, referenced in FOREIGN_KEYS:
+        connection.execute(text(
+            f"ALTER TABLE {TABLE} ADD CONSTRAINT {name} FOREIGN KEY ({column}) REFERENCES {referenced} (id)"
+        ))
+    for name, columns in INDEXES:
+        connection.execute(text(f"CREATE INDEX {name} ON {TABLE} ({', '.join(columns)})"))
+
+    # A matching unique index lets ATTACH reuse it instead of building one under lock
+    connection.execute(text(
+        f"CREATE UNIQUE INDEX IF NOT EXISTS {LEGACY_PARTITION}_id_counted_at ON {LEGACY_PARTITION} (id, counted_at)"
+    ))
+    connection.execute(text(
+        f"ALTER TABLE {TABLE} ATTACH PARTITION {LEGACY_PARTITION} "
+        f"FOR VALUES FROM (MINVALUE) TO ('{first_month.isoformat()}')"
+    ))
+    connection.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT"))
+    ensure_partitions(connection, months_ahead, today=first_month)
+    logger.info(f"Partitioned {TABLE} by month from {first_month.isoformat()}")
+
+
+def revert_to_unpartitioned(connection: Connection) -> None:
+    """Copy every attached partition back into a plain ``count`` table.
+
+    Partitions detached into the archive schema are left where they are.
+    """
+    if not is_partitioned(connection):
+        return
+    plain = f"{TABLE}_unpartitioned"
+    connection.execute(text(f"CREATE TABLE {plain} (LIKE {TABLE} INCLUDING DEFAULTS)"))
+    connection.execute(text(f"INSERT INTO {plain} SELECT * FROM {TABLE}"))
+    connection.execute(text(f"ALTER SEQUENCE count_id_seq OWNED BY {plain}.id"))
+    connection.execute(text(f"DROP TABLE {TABLE} CASCADE"))
+    connection.execute(text(f"ALTER TABLE {plain} RENAME TO {TABLE}"))
+    connection.execute(text(f"ALTER TABLE {TABLE} ADD PRIMARY KEY (id)"))
+    for name, column, referenced in FOREIGN_KEYS:
+        connection.execute(text(
+            f"ALTER TABLE {TABLE} ADD CONSTRAINT {name} FOREIGN KEY ({column}) REFERENCES {referenced} (id)"
+        ))
+    for name, columns in INDEXES:
+        connection.execute(text(f"CREATE INDEX {name} ON {TABLE} ({', '.join(columns)})"))
+
+
+def ensure_partitions(connection: Connection, months_ahead: int, today: Optional[date] = None) -> List[str]:
+    """Create partitions from the current month through ``months_ahead`` months ahead."""
+    current = month_start(today or date.today())
+    created = []
+    existing = {partition.name for partition in list_partitions(connection)}
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if partition_name(month) not in existing:
+            connection.execute(text(create_partition_sql(month)))
+            created.append(partition_name(month))
+    return created
+
+
+def expired_partitions(partitions: List[Partition], retain_months: int, today: Optional[date] = None) -> List[Partition]:
+    """Partitions whose whole range is older than the last ``retain_months`` months; never the default."""
+    cutoff = datetime.combine(add_months(month_start(today or date.today()), -retain_months), datetime.min.time())
+    return [partition for partition in partitions if partition.upper is not None and partition.upper <= cutoff]
+
+
+def detach_old_partitions(
+    connection: Connection, retain_months: int, archive_schema: str, today: Optional[date] = None
+) -> List[str]:
+    """Detach partitions entirely older than ``retain_months`` and move them to ``archive_schema``.
+
+    Detached tables keep their rows, so they can be exported, dumped or
+    dropped later without touching the live table.
+    """
+    connection.execute(text(f"CREATE SCHEMA IF NOT EXISTS {archive_schema}"))
+    detached = []
+    for partition in expired_partitions(list_partitions(connection), retain_months, today):
+        connection.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {partition.name}"))
+        connection.execute(text(f"ALTER TABLE {partition.name} SET SCHEMA {archive_schema}"))
+        detached.append(partition.name)
+    return detached
+
+
+def maintain(engine: Engine) -> None:
+    """Create upcoming partitions and detach expired ones, if ``count`` is partitioned."""
+    with engine.begin() as connection:
+        if not is_partitioned(connection):
+            if connection.dialect.name == "postgresql" and settings.COUNT_PARTITIONING_ENABLED:
+                logger.warning("COUNT_PARTITIONING_ENABLED is set but count is not partitioned; "
+                               "run manage_partitions.py --convert")
+            return
+        created = ensure_partitions(connection, settings.COUNT_PARTITION_MONTHS_AHEAD)
+        detached = []
+        if settings.COUNT_PARTITION_RETAIN_MONTHS:
+            detached = detach_old_partitions(
+                connection, settings.COUNT_PARTITION_RETAIN_MONTHS, settings.COUNT_PARTITION_ARCHIVE_SCHEMA
+            )
+    if created or detached:
+        logger.info(f"Count partitions created: {created or 'none'}; detached: {detached or 'none'}")
+
+
+class PartitionMaintainer:
+    """Runs :func:`maintain` at startup and then every ``interval`` seconds."""
+
+    def __init__(self, engine: Engine, interval: float):
+        self.engine = engine
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = background_thread("count-partitions", self._run)
+        self._thread.start()
+
+    def stop(self) -> None:
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                maintain(self.engine)
+            except Exception as e:
+                logger.error(f"Count partition maintenance failed: {e}")
+            if self._stop.wait(self.interval):
+                return
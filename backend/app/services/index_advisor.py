@@ -0,0 +1,133 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.sql import Select
+
+from app.core.logging import get_logger
+from app.models.count import Count
+from app.models.inventory_item import InventoryItem
+from app.models.schedule import Schedule
+from app.models.transfer import Transfer
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class QueryShape:
+    """A statement in the engine's own paramstyle, with parameters to plan it with."""
+    name: str
+    statement: str
+    parameters: Any = None
+
+
+@dataclass
+class ShapeReport:
+    shape: QueryShape
+    plan: List[str] = field(default_factory=list)
+    sequential_scans: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and not self.sequential_scans
+
+
+def hot_query_shapes() -> List[Tuple[str, Select]]:
+    """The access patterns the composite indexes were built for."""
+    now = datetime.utcnow()
+    return [
+        ("latest counts per location",
+         select(Count).where(Count.location_id == 1).order_by(Count.counted_at.desc()).limit(50)),
+        ("count history per item",
+         select(Count).where(Count.item_id == 1).order_by(Count.counted_at.desc()).limit(50)),
+        ("counts by user",
+         select(Count).where(Count.user_id == 1).order_by(Count.counted_at.desc()).limit(50)),
+        ("transfers between two locations",
+         select(Transfer).where(Transfer.from_location_id == 1, Transfer.to_location_id == 2)
+         .order_by(Transfer.transferred_at.desc()).limit(50)),
+        ("transfers into a location",
+         select(Transfer).where(Transfer.to_location_id == 1).order_by(Transfer.transferred_at.desc()).limit(50)),
+        ("upcoming schedules per location",
+         select(Schedule).where(Schedule.location_id == 1, Schedule.scheduled_for >= now)
+         .order_by(Schedule.scheduled_for).limit(50)),
+        ("upcoming schedules",
+         select(Schedule).where(Schedule.scheduled_for >= now).order_by(Schedule.scheduled_for).limit(50)),
+        ("items by category",
+         select(InventoryItem).where(InventoryItem.category_id == 1)),
+    ]
+
+
+def compile_shape(name: str, query: Select, engine: Engine) -> QueryShape:
+    """Render a Core query as driver SQL and parameters for ``engine``'s dialect."""
+    compiled = query.compile(dialect=engine.dialect)
+    parameters = compiled.construct_params()
+    if compiled.positional:
+        parameters = tuple(parameters[key] for key in compiled.positiontup)
+    return QueryShape(name, str(compiled), parameters)
+
+
+def load_shapes(path: str) -> Iterator[QueryShape]:
+    """Read shapes recorded by the query monitor (``QUERY_SHAPES_FILE``)."""
+    with open(path, "rb") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            entry = orjson.loads(line)
+            parameters = entry.get("parameters")
+            # JSON turns positional parameter tuples into lists
+            if isinstance(parameters, list):
+                parameters = tuple(parameters)
+            yield QueryShape(f"{path}:{number}", entry["statement"], parameters)
+
+
+def explain(connection: Connection, shape: QueryShape) -> Tuple[List[str], List[str]]:
+    """Plan ``shape`` and return its plan lines and the tables it reads with a full scan."""
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        row = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {shape.statement}", shape.parameters or ()).scalar()
+        plan = row if isinstance(row, list) else orjson.loads(row)
+        nodes = list(_plan_nodes(plan[0]["Plan"]))
+        lines = [
+            f"{node['Node Type']}"
+            + (f" on {node['Relation Name']}" if "Relation Name" in node else "")
+            + (f" using {node['Index Name']}" if "Index Name" in node else "")
+            + f" (rows={node.get('Plan Rows')})"
+            for node in nodes
+        ]
+        scans = [node["Relation Name"] for node in nodes if node["Node Type"] == "Seq Scan"]
+        return lines, scans
+
+    if dialect == "sqlite":
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {shape.statement}", shape.parameters or ()).fetchall()
+        lines = [row[-1] for row in rows]
+        # "SCAN t" reads the whole table; "SEARCH t USING INDEX" and covering-index scans do not
+        scans = [line.split()[1] for line in lines if line.startswith("SCAN ") and " USING " not in line]
+        return lines, scans
+
+    raise ValueError(f"Index advice is not supported for {dialect}")
+
+
+def _plan_nodes(node: dict) -> Iterator[dict]:
+    yield node
+    for child in node.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def advise(engine: Engine, shapes: Iterable[QueryShape]) -> List[ShapeReport]:
+    """EXPLAIN every shape and report those that fall back to sequential scans."""
+    reports = []
+    for shape in shapes:
+        report = ShapeReport(shape)
+        # A connection per shape, so one failed EXPLAIN cannot abort the others' transaction
+        with engine.connect() as connection:
+            try:
+                report.plan, report.sequential_scans = explain(connection, shape)
+            except Exception as e:
+                report.error = str(e)
+                logger.warning(f"Could not plan {shape.name}: {e}")
+        reports.append(report)
+    return reports
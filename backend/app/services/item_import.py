@@ -0,0 +1,406 @@
+import csv
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Set, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import delete, func, insert, inspect, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import Session
+
+from app.core.cache import catalog_cache, ITEMS
+from app.core.change_log import note_changes
+from app.core.config import settings
+from app.core.database import write_session
+from app.core.logging import get_logger
+from app.models.category import Category
+from app.models.inventory_item import InventoryItem
+from app.models.item_import_job import ItemImportJob
+from app.schemas.inventory_item import InventoryItemCreate
+from app.services.search import item_search
+
+logger = get_logger(__name__)
+
+# Supported upload formats
+IMPORT_FILE_TYPES = (".csv", ".xlsx")
+
+# Rows validated and written per transaction
+IMPORT_BATCH_SIZE = 1000
+
+# Bytes copied per read while streaming an upload to disk
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Unique index created by the import migration; enables INSERT ... ON CONFLICT
+VENDOR_SKU_INDEX = "ux_inventoryitem_vendor_sku"
+
+# Only the first errors are kept so a bad file cannot grow a job without bound
+MAX_REPORTED_ERRORS = 100
+
+ITEM_COLUMNS = ("name", "unit", "par_level", "reorder_increment", "vendor", "sku")
+
+# Header spellings accepted in vendor catalogs
+HEADER_ALIASES = {
+    "item": "name",
+    "item_name": "name",
+    "category_name": "category",
+    "par": "par_level",
+    "reorder": "reorder_increment",
+    "supplier": "vendor",
+    "vendor_sku": "sku",
+}
+
+
+class ItemImportError(ValueError):
+    """Raised when an upload cannot be accepted for import."""
+
+
+class ImportFileTooLarge(ItemImportError):
+    """Raised when an upload exceeds ``MAX_FILE_SIZE``."""
+
+
+@dataclass
+class ImportJob:
+    """Progress of one background import, saved to the ``itemimportjob`` table as it runs."""
+    id: str
+    filename: str
+    status: str = "queued"
+    total_rows: Optional[int] = None
+    processed_rows: int = 0
+    created: int = 0
+    updated: int = 0
+    failed: int = 0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+
+    def add_error(self, row: int, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": message})
+
+
+def _normalize_header(value: Any) -> str:
+    header = str(value or "").strip().lower().replace(" ", "_").replace("-", "_")
+    return HEADER_ALIASES.get(header, header)
+
+
+def _clean(value: Any) -> Any:
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+
+def count_csv_rows(path: Path) -> int:
+    """Count data rows by scanning for newlines, without parsing the file."""
+    lines = 0
+    last = b"\n"
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+            lines += chunk.count(b"\n")
+            last = chunk[-1:]
+    if last != b"\n":
+        lines += 1
+    return max(lines - 1, 0)
+
+
+def iter_csv_rows(path: Path) -> Iterator[Dict[str, Any]]:
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        headers = [_normalize_header(h) for h in next(reader, [])]
+        for values in reader:
+            if any(v.strip() for v in values):
+                yield {h: _clean(v) for h, v in zip(headers, values)}
+
+
+def iter_xlsx_rows(path: Path) -> Iterator[Dict[str, Any]]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError as e:
+        raise ItemImportError("XLSX import requires the openpyxl package") from e
+
+    # Read-only mode streams rows from the sheet XML instead of loading the workbook
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        headers = [_normalize_header(h) for h in next(rows, ())]
+        for values in rows:
+            if any(v not in (None, "") for v in values):
+                yield {h: _clean(v) for h, v in zip(headers, values)}
+    finally:
+        workbook.close()
+
+
+class ItemImportService:
+    """Bulk item-master import from CSV/XLSX, run as a background job.
+
+    Uploads are streamed to ``UPLOAD_DIR``, parsed incrementally and written in
+    batches of :data:`IMPORT_BATCH_SIZE`, so memory stays bounded by the batch
+    size rather than the file size. Rows are upserted by ``(vendor, sku)``.
+    Job progress is saved after every batch, so any worker can report it,
+    and kept for ``IMPORT_JOB_TTL_SECONDS``.
+    """
+
+    def __init__(self):
+        self._upsert_support: Dict[str, bool] = {}
+
+    def save_upload(self, source: BinaryIO, filename: str) -> Path:
+        """Copy an upload to disk in chunks, enforcing ``MAX_FILE_SIZE``."""
+        suffix = Path(filename or "").suffix.lower()
+        if suffix not in IMPORT_FILE_TYPES or suffix not in settings.ALLOWED_FILE_TYPES:
+            raise ItemImportError(f"Unsupported file type '{suffix}', expected one of {', '.join(IMPORT_FILE_TYPES)}")
+
+        upload_dir = Path(settings.UPLOAD_DIR) / "imports"
+        upload_dir.mkdir(parents=True, exist_ok=True)
+        path = upload_dir / f"{uuid.uuid4().hex}{suffix}"
+
+        written = 0
+        try:
+            with open(path, "wb") as out:
+                for chunk in iter(lambda: source.read(UPLOAD_CHUNK_SIZE), b""):
+                    written += len(chunk)
+                    if written > settings.MAX_FILE_SIZE:
+                        raise ImportFileTooLarge(f"File exceeds the {settings.MAX_FILE_SIZE} byte upload limit")
+                    out.write(chunk)
+        except BaseException:
+            path.unlink(missing_ok=True)
+            raise
+        return path
+
+    def create_job(self, session: Session, filename: str) -> ImportJob:
+        job = ImportJob(id=uuid.uuid4().hex, filename=filename)
+        table = ItemImportJob.__table__
+        # Starting a job drops the expired ones, which keeps the table bounded by the TTL
+        session.execute(delete(table).where(table.c.expires_at <= job.created_at))
+        session.execute(insert(table).values(
+            **asdict(job), expires_at=job.created_at + timedelta(seconds=settings.IMPORT_JOB_TTL_SECONDS)
+        ))
+        session.commit()
+        return job
+
+    @staticmethod
+    def get_job(session: Session, job_id: str) -> Optional[ItemImportJob]:
+        job = session.get(ItemImportJob, job_id)
+        if job is None or job.expires_at <= datetime.utcnow():
+            return None
+        return job
+
+    @staticmethod
+    def _save(session: Session, job: ImportJob) -> None:
+        """Write the job's progress so every worker can report it."""
+        table = ItemImportJob.__table__
+        progress = {name: value for name, value in asdict(job).items() if name not in ("id", "filename", "created_at")}
+        session.execute(update(table).where(table.c.id == job.id).values(**progress))
+        session.commit()
+
+    def run(self, job: ImportJob, path: Path, engine: Engine) -> None:
+        """Import every row of ``path``; progress is recorded on ``job`` and saved after every batch."""
+        job.status = "running"
+        try:
+            if path.suffix == ".csv":
+                job.total_rows = count_csv_rows(path)
+                rows = iter_csv_rows(path)
+            else:
+                rows = iter_xlsx_rows(path)
+
+            with write_session(engine) as session:
+                self._save(session, job)
+                categories = self._category_ids(session)
+                use_upsert = self._supports_upsert(engine)
+
+                batch: List[Tuple[int, Dict[str, Any]]] = []
+                for row_number, row in enumerate(rows, start=2):
+                    batch.append((row_number, row))
+                    if len(batch) >= IMPORT_BATCH_SIZE:
+                        self._import_batch(session, job, batch, categories, use_upsert)
+                        self._save(session, job)
+                        batch = []
+                if batch:
+                    self._import_batch(session, job, batch, categories, use_upsert)
+
+            job.total_rows = job.processed_rows
+            job.status = "completed"
+        except (ItemImportError, SQLAlchemyError, csv.Error, UnicodeDecodeError) as e:
+            logger.error(f"Item import {job.id} failed: {e}")
+            job.status = "failed"
+            job.errors.append({"row": None, "error": str(e)})
+        except Exception as e:
+            # openpyxl raises assorted errors for corrupt workbooks
+            logger.error(f"Item import {job.id} failed: {e}")
+            job.status = "failed"
+            job.errors.append({"row": None, "error": f"Could not read file: {e}"})
+        finally:
+            job.finished_at = datetime.utcnow()
+            path.unlink(missing_ok=True)
+            try:
+                with write_session(engine) as session:
+                    self._save(session, job)
+            except SQLAlchemyError as e:
+                logger.error(f"Could not save the result of item import {job.id}: {e}")
+            if job.created or job.updated:
+                item_search.invalidate()
+                catalog_cache.invalidate(ITEMS)
+            logger.info(
+                f"Item import {job.id} {job.status}: {job.created} created, "
+                f"{job.updated} updated, {job.failed} failed"
+            )
+
+    @staticmethod
+    def _category_ids(session: Session) -> Dict[str, int]:
+        """Map lowercased category names to ids with a single query."""
+        rows = session.execute(select(Category.id, func.lower(Category.name)))
+        return {name: category_id for category_id, name in rows}
+
+    def _supports_upsert(self, engine: Engine) -> bool:
+        """Check (once per database) for the unique index ON CONFLICT needs."""
+        url = str(engine.url)
+        if url not in self._upsert_support:
+            supported = False
+            if engine.dialect.name in ("postgresql", "sqlite"):
+                try:
+                    indexes = inspect(engine).get_indexes(InventoryItem.__tablename__)
+                    supported = any(index["name"] == VENDOR_SKU_INDEX for index in indexes)
+                except SQLAlchemyError as e:
+                    logger.warning(f"Could not inspect item indexes, upserting by lookup: {e}")
+            self._upsert_support[url] = supported
+        return self._upsert_support[url]
+
+    def _import_batch(
+        self,
+        session: Session,
+        job: ImportJob,
+        batch: List[Tuple[int, Dict[str, Any]]],
+        categories: Dict[str, int],
+        use_upsert: bool,
+    ) -> None:
+        records: Dict[Tuple[Optional[str], Optional[str]], Dict[str, Any]] = {}
+        unkeyed: List[Dict[str, Any]] = []
+        category_ids = set(categories.values())
+        for row_number, row in batch:
+            record = self._validate_row(job, row_number, row, categories, category_ids)
+            if record is None:
+                continue
+            if record["sku"]:
+                # The last occurrence of a (vendor, sku) in the file wins
+                records[(record["vendor"], record["sku"])] = record
+            else:
+                unkeyed.append(record)
+
+        now = datetime.utcnow()
+        try:
+            if use_upsert:
+                keyed = [r for key, r in records.items() if key[0] is not None]
+                # NULL vendors never conflict in a unique index, so match those by lookup
+                lookup = {key: r for key, r in records.items() if key[0] is None}
+                self._upsert(session, job, keyed, now)
+            else:
+                lookup = records
+            self._insert_or_update(session, job, lookup, unkeyed, now)
+            # Bulk statements skip the ORM events that feed delta sync; every row this batch
+            # wrote carries its timestamp, and the catalog is small enough to scan for it
+            changed = session.execute(select(InventoryItem.id).where(InventoryItem.updated_at == now)).scalars()
+            note_changes(session, InventoryItem, changed)
+            session.commit()
+        except SQLAlchemyError:
+            session.rollback()
+            raise
+        job.processed_rows += len(batch)
+
+    @staticmethod
+    def _validate_row(
+        job: ImportJob,
+        row_number: int,
+        row: Dict[str, Any],
+        categories: Dict[str, int],
+        category_ids: Set[int],
+    ) -> Optional[Dict[str, Any]]:
+        data = {column: row.get(column) for column in ITEM_COLUMNS}
+        category_id = row.get("category_id")
+        if category_id is None and row.get("category") is not None:
+            category_id = categories.get(str(row["category"]).lower())
+            if category_id is None:
+                job.add_error(row_number, f"Unknown category '{row['category']}'")
+                return None
+        data["category_id"] = category_id
+        if data["sku"] is not None:
+            data["sku"] = str(data["sku"])
+
+        try:
+            item = InventoryItemCreate(**data)
+        except ValidationError as e:
+            message = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            job.add_error(row_number, message)
+            return None
+        if item.category_id not in category_ids:
+            job.add_error(row_number, f"Category {item.category_id} not found")
+            return None
+        return item.dict()
+
+    @staticmethod
+    def _upsert(session: Session, job: ImportJob, records: List[Dict[str, Any]], now: datetime) -> None:
+        if not records:
+            return
+        table = InventoryItem.__table__
+        dialect = session.get_bind().dialect.name
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+
+        # One round trip tells us which keys already exist, so created/updated can be reported
+        keys = [(r["vendor"], r["sku"]) for r in records]
+        existing = session.execute(
+            select(func.count()).where(tuple_(table.c.vendor, table.c.sku).in_(keys))
+        ).scalar_one()
+
+        rows = [dict(r, created_at=now, updated_at=now) for r in records]
+        # executemany with one statement keeps the compiled SQL cached across batches
+        statement = insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.vendor, table.c.sku],
+            set_={
+                column: statement.excluded[column]
+                for column in ("name", "unit", "category_id", "par_level", "reorder_increment", "updated_at")
+            },
+        )
+        session.execute(statement, rows)
+        job.updated += existing
+        job.created += len(records) - existing
+
+    @staticmethod
+    def _insert_or_update(
+        session: Session,
+        job: ImportJob,
+        records: Dict[Tuple[Optional[str], Optional[str]], Dict[str, Any]],
+        unkeyed: List[Dict[str, Any]],
+        now: datetime,
+    ) -> None:
+        table = InventoryItem.__table__
+        existing: Dict[Tuple[Optional[str], Optional[str]], int] = {}
+        if records:
+            skus = list({sku for _, sku in records})
+            result = session.execute(
+                select(table.c.id, table.c.vendor, table.c.sku).where(table.c.sku.in_(skus)).order_by(table.c.id)
+            )
+            for item_id, vendor, sku in result:
+                existing.setdefault((vendor, sku), item_id)
+
+        updates = []
+        inserts = [dict(r, created_at=now, updated_at=now) for r in unkeyed]
+        for key, record in records.items():
+            if key in existing:
+                updates.append(dict(record, id=existing[key], updated_at=now))
+            else:
+                inserts.append(dict(record, created_at=now, updated_at=now))
+
+        if updates:
+            session.bulk_update_mappings(InventoryItem, updates)
+        if inserts:
+            session.bulk_insert_mappings(InventoryItem, inserts)
+        job.updated += len(updates)
+        job.created += len(inserts)
+
+
+# Shared import service instance
+item_import = ItemImportService()
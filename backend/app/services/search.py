@@ -0,0 +1,289 @@
+import re
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import Session, select
+
+from app.core.logging import get_logger
+from app.models.inventory_item import InventoryItem
+
+logger = get_logger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Relative weight of a match in each searchable column
+FIELD_WEIGHTS = {"name": 10.0, "sku": 6.0, "vendor": 3.0}
+
+# Name of the SQLite FTS5 table created by the search migration
+SQLITE_FTS_TABLE = "inventoryitem_fts"
+
+# Expression indexed by the PostgreSQL GIN tsvector index; queries must use the same text
+PG_SEARCH_DOCUMENT = (
+    "to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(vendor, '') "
+    "|| ' ' || coalesce(sku, ''))"
+)
+
+
+def escape_like(value: str, escape: str = "\\") -> str:
+    """Escape LIKE wildcards in ``value`` so it matches literally; pair with ``ESCAPE``."""
+    return value.replace(escape, escape * 2).replace("%", escape + "%").replace("_", escape + "_")
+
+
+def tokenize(value: Optional[str]) -> List[str]:
+    """Split text into lowercase alphanumeric search tokens."""
+    if not value:
+        return []
+    return _TOKEN_RE.findall(value.lower())
+
+
+class PrefixIndex:
+    """In-process prefix index over item name, vendor and SKU.
+
+    Used when the database has no full-text index available. Tokens are kept in a
+    sorted list so every prefix lookup is a binary search plus a contiguous scan.
+    """
+
+    def __init__(self, rows: Sequence[Tuple[int, str, Optional[str], Optional[str], Optional[int]]]):
+        entries: List[Tuple[str, int, float]] = []
+        self.names: Dict[int, str] = {}
+        self.skus: Dict[int, str] = {}
+        self.categories: Dict[int, Optional[int]] = {}
+
+        for item_id, name, vendor, sku, category_id in rows:
+            self.names[item_id] = (name or "").lower()
+            self.skus[item_id] = (sku or "").lower()
+            self.categories[item_id] = category_id
+            for field, value in (("name", name), ("vendor", vendor), ("sku", sku)):
+                for token in tokenize(value):
+                    entries.append((token, item_id, FIELD_WEIGHTS[field]))
+
+        entries.sort()
+        self._tokens = [entry[0] for entry in entries]
+        self._postings = [(entry[1], entry[2]) for entry in entries]
+
+    def _match_token(self, query_token: str) -> Dict[int, float]:
+        """Score every item having a token that starts with ``query_token``."""
+        scores: Dict[int, float] = {}
+        position = bisect_left(self._tokens, query_token)
+        while position < len(self._tokens) and self._tokens[position].startswith(query_token):
+            item_id, weight = self._postings[position]
+            # Whole-token matches outrank prefix matches
+            score = weight * 2 if self._tokens[position] == query_token else weight
+            if score > scores.get(item_id, 0.0):
+                scores[item_id] = score
+            position += 1
+        return scores
+
+    def search(self, query: str, category_id: Optional[int] = None) -> List[int]:
+        """Return ids of items matching every query token, best match first."""
+        query_tokens = tokenize(query)
+        if not query_tokens:
+            return []
+
+        totals: Optional[Dict[int, float]] = None
+        for query_token in query_tokens:
+            matches = self._match_token(query_token)
+            if totals is None:
+                totals = matches
+            else:
+                totals = {
+                    item_id: score + matches[item_id]
+                    for item_id, score in totals.items()
+                    if item_id in matches
+                }
+            if not totals:
+                return []
+
+        lowered = query.strip().lower()
+        ranked = []
+        for item_id, score in totals.items():
+            if category_id is not None and self.categories[item_id] != category_id:
+                continue
+            if self.skus[item_id] == lowered:
+                score += 100.0
+            if self.names[item_id].startswith(lowered):
+                score += 20.0
+            ranked.append((-score, self.names[item_id], item_id))
+
+        ranked.sort()
+        return [item_id for _, _, item_id in ranked]
+
+
+class ItemSearchService:
+    """Ranked, paginated item search backed by the best index the database offers.
+
+    PostgreSQL uses the ``pg_trgm`` and tsvector GIN indexes, SQLite uses the FTS5
+    table, and anything else (or a database migrated without them) falls back to
+    an in-process :class:`PrefixIndex`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index: Optional[PrefixIndex] = None
+        self._index_signature: Optional[Tuple] = None
+        self._backends: Dict[str, str] = {}
+
+    def invalidate(self) -> None:
+        """Drop the in-process index so it is rebuilt on the next search."""
+        with self._lock:
+            self._index = None
+            self._index_signature = None
+
+    def search(
+        self,
+        session: Session,
+        query: str,
+        skip: int = 0,
+        limit: int = 20,
+        category_id: Optional[int] = None,
+    ) -> List[InventoryItem]:
+        """Search items by name, vendor and SKU, returning one ranked page."""
+        if not tokenize(query):
+            return []
+
+        backend = self._backend_for(session)
+        try:
+            if backend == "postgresql":
+                item_ids = self._search_postgresql(session, query, skip, limit, category_id)
+            elif backend == "fts5":
+                item_ids = self._search_fts5(session, query, skip, limit, category_id)
+            else:
+                item_ids = self._search_prefix_index(session, query, skip, limit, category_id)
+        except SQLAlchemyError as e:
+            logger.error(f"Item search failed on {backend} backend: {e}")
+            raise
+
+        return self._load_items(session, item_ids)
+
+    def _backend_for(self, session: Session) -> str:
+        """Detect (once per database) which search index is available."""
+        bind = session.get_bind()
+        url = str(bind.url)
+        backend = self._backends.get(url)
+        if backend is not None:
+            return backend
+
+        backend = "prefix"
+        try:
+            if bind.dialect.name == "postgresql":
+                has_trgm = session.execute(
+                    text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                ).first()
+                if has_trgm:
+                    backend = "postgresql"
+            elif bind.dialect.name == "sqlite":
+                has_fts = session.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                    {"name": SQLITE_FTS_TABLE},
+                ).first()
+                if has_fts:
+                    backend = "fts5"
+        except SQLAlchemyError as e:
+            logger.warning(f"Could not detect search index, using in-process index: {e}")
+
+        self._backends[url] = backend
+        logger.info(f"Item search using {backend} backend")
+        return backend
+
+    def _search_postgresql(
+        self, session: Session, query: str, skip: int, limit: int, category_id: Optional[int]
+    ) -> List[int]:
+        ts_query = " & ".join(f"{token}:*" for token in tokenize(query))
+        category_filter = "AND category_id = :category_id" if category_id is not None else ""
+        statement = text(
+            f"""
+            SELECT id FROM inventoryitem
+            WHERE (
+                {PG_SEARCH_DOCUMENT} @@ to_tsquery('simple', :ts_query)
+                OR name % :query
+                OR sku ILIKE :prefix ESCAPE '\\'
+            ) {category_filter}
+            ORDER BY (
+                ts_rank({PG_SEARCH_DOCUMENT}, to_tsquery('simple', :ts_query))
+                + similarity(name, :query)
+                + CASE WHEN lower(sku) = lower(:query) THEN 2 ELSE 0 END
+            ) DESC, name
+            LIMIT :limit OFFSET :skip
+            """
+        )
+        params = {
+            "ts_query": ts_query,
+            "query": query,
+            "prefix": f"{escape_like(query)}%",
+            "category_id": category_id,
+            "limit": limit,
+            "skip": skip,
+        }
+        return [row[0] for row in session.execute(statement, params)]
+
+    def _search_fts5(
+        self, session: Session, query: str, skip: int, limit: int, category_id: Optional[int]
+    ) -> List[int]:
+        # Tokens are strictly alphanumeric, so quoting them cannot break the MATCH syntax
+        match = " ".join(f'"{token}"*' for token in tokenize(query))
+        category_filter = "AND inventoryitem.category_id = :category_id" if category_id is not None else ""
+        weights = ", ".join(str(FIELD_WEIGHTS[field]) for field in ("name", "vendor", "sku"))
+        statement = text(
+            f"""
+            SELECT inventoryitem.id FROM {SQLITE_FTS_TABLE}
+            JOIN inventoryitem ON inventoryitem.id = {SQLITE_FTS_TABLE}.rowid
+            WHERE {SQLITE_FTS_TABLE} MATCH :match {category_filter}
+            ORDER BY bm25({SQLITE_FTS_TABLE}, {weights}), inventoryitem.name
+            LIMIT :limit OFFSET :skip
+            """
+        )
+        params = {"match": match, "category_id": category_id, "limit": limit, "skip": skip}
+        return [row[0] for row in session.execute(statement, params)]
+
+    def _search_prefix_index(
+        self, session: Session, query: str, skip: int, limit: int, category_id: Optional[int]
+    ) -> List[int]:
+        index = self._get_prefix_index(session)
+        return index.search(query, category_id)[skip:skip + limit]
+
+    def _get_prefix_index(self, session: Session) -> PrefixIndex:
+        """Return the prefix index, rebuilding it if the item table changed."""
+        signature = tuple(
+            session.execute(
+                select(
+                    func.count(InventoryItem.id),
+                    func.max(InventoryItem.id),
+                    func.max(InventoryItem.updated_at),
+                )
+            ).one()
+        )
+        with self._lock:
+            if self._index is not None and self._index_signature == signature:
+                return self._index
+
+        rows = session.execute(
+            select(
+                InventoryItem.id,
+                InventoryItem.name,
+                InventoryItem.vendor,
+                InventoryItem.sku,
+                InventoryItem.category_id,
+            )
+        ).all()
+        index = PrefixIndex(rows)
+
+        with self._lock:
+            self._index = index
+            self._index_signature = signature
+        return index
+
+    @staticmethod
+    def _load_items(session: Session, item_ids: List[int]) -> List[InventoryItem]:
+        """Load items by id, preserving the ranked order."""
+        if not item_ids:
+            return []
+        items = session.exec(select(InventoryItem).where(InventoryItem.id.in_(item_ids))).all()
+        by_id = {item.id: item for item in items}
+        return [by_id[item_id] for item_id in item_ids if item_id in by_id]
+
+
+# Shared search service instance
+item_search = ItemSearchService()
@@ -0,0 +1,163 @@
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, exists, func, or_, select, text
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+
+from app.core.change_log import DELETE, SEQUENCE_LOCK_KEY, SYNCED
+from app.core.database import begin_write
+from app.core.logging import get_logger
+from app.core.profiling import background_thread
+from app.core.replicas import on_primary
+from app.models.change_log import ChangeLog
+
+logger = get_logger(__name__)
+
+TABLES = {model.__tablename__: model.__table__ for model in SYNCED}
+
+
+def changes_since(session: Session, since: int, location_id: Optional[int] = None, limit: int = 1000) -> Dict[str, Any]:
+    """One page of changes after sequence number ``since``, compacted to the latest change per row.
+
+    Upserts carry the row as it is now; deletes are returned as tombstones.
+    ``next`` is the cursor for the following request. A page is cut at a
+    sequence number every earlier change is included up to, so a client that
+    stores ``next`` after applying the page never misses or repeats a change.
+
+    Filtered by location, the range ends at that location's latest change:
+    changes reaching one location are numbered in commit order. The whole log
+    is only numbered in commit order on SQLite; on PostgreSQL an unfiltered
+    sync reads from the primary and waits for writers in flight.
+    """
+    log = ChangeLog.__table__
+    matches = None
+    if location_id is not None:
+        matches = or_(log.c.location_id == location_id, log.c.to_location_id == location_id, log.c.location_id.is_(None))
+    if matches is None and session.get_bind().dialect.name == "postgresql":
+        # Only one location's changes are numbered in commit order; see the whole log as the primary settles it
+        with on_primary(session) as primary:
+            return _changes_since(primary, since, None, limit, _settled_head(primary))
+    # Fix the end of the range first: reads may not share a snapshot, and later commits wait for the next sync
+    last = select(func.max(log.c.seq))
+    if matches is not None:
+        last = last.where(matches)
+    head = session.execute(last).scalar() or 0
+    return _changes_since(session, since, matches, limit, head)
+
+
+def _settled_head(session: Session) -> int:
+    """The last sequence number with no smaller one still uncommitted, on PostgreSQL.
+
+    Taking the sequence lock exclusively waits for every change-log writer
+    in flight; it is released straight away.
+    """
+    log = ChangeLog.__table__
+    session.execute(text("SELECT pg_advisory_lock(:key)"), {"key": SEQUENCE_LOCK_KEY})
+    try:
+        return session.execute(select(func.max(log.c.seq))).scalar() or 0
+    finally:
+        session.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": SEQUENCE_LOCK_KEY})
+
+
+def _changes_since(session: Session, since: int, matches: Any, limit: int, head: int) -> Dict[str, Any]:
+    log = ChangeLog.__table__
+    if since > head:
+        # A cursor from the future means the database was restored; the client must start over
+        return {"since": since, "next": head, "has_more": False, "reset": True, "changes": [], "tombstones": []}
+
+    latest = select(func.max(log.c.seq).label("seq")).where(log.c.seq > since, log.c.seq <= head)
+    if matches is not None:
+        latest = latest.where(matches)
+    latest = latest.group_by(log.c.entity, log.c.entity_id).subquery()
+    entries = session.execute(
+        select(log.c.seq, log.c.entity, log.c.entity_id, log.c.operation)
+        .join(latest, log.c.seq == latest.c.seq)
+        .order_by(log.c.seq)
+        .limit(limit + 1)
+    ).all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    wanted: Dict[str, List[int]] = defaultdict(list)
+    for entry in entries:
+        if entry.operation != DELETE:
+            wanted[entry.entity].append(entry.entity_id)
+    rows: Dict[str, Dict[int, Dict[str, Any]]] = {}
+    for entity, ids in wanted.items():
+        table = TABLES[entity]
+        rows[entity] = {row.id: dict(row._mapping) for row in session.execute(select(table).where(table.c.id.in_(ids)))}
+
+    changes, tombstones = [], []
+    for entry in entries:
+        if entry.operation == DELETE:
+            tombstones.append({"seq": entry.seq, "entity": entry.entity, "id": entry.entity_id})
+            continue
+        data = rows[entry.entity].get(entry.entity_id)
+        # Gone since: deleted after ``head`` (the next sync brings the tombstone) or moved to the history archive
+        if data is not None:
+            changes.append({"seq": entry.seq, "entity": entry.entity, "id": entry.entity_id, "data": data})
+
+    return {
+        "since": since,
+        "next": entries[-1].seq if has_more else head,
+        "has_more": has_more,
+        "reset": False,
+        "changes": changes,
+        "tombstones": tombstones,
+    }
+
+
+def compact_change_log(engine: Engine) -> int:
+    """Delete change-log entries superseded by a later change of the same row at the same locations.
+
+    Sync only ever returns the latest change per row among the entries its
+    location filter matches, and an entry is only dropped for a later one that
+    every filter matches alike, so this never changes what a client receives;
+    tombstones are kept.
+    """
+    log = ChangeLog.__table__
+    later = log.alias("later")
+    with begin_write(engine) as connection:
+        deleted = connection.execute(delete(log).where(exists().where(
+            later.c.entity == log.c.entity, later.c.entity_id == log.c.entity_id, later.c.seq > log.c.seq,
+            later.c.location_id.is_not_distinct_from(log.c.location_id),
+            later.c.to_location_id.is_not_distinct_from(log.c.to_location_id),
+        ))).rowcount
+    if deleted:
+        logger.info(f"Compacted {deleted} superseded change-log entries")
+    return deleted
+
+
+class ChangeLogCompactor:
+    """Runs :func:`compact_change_log` every ``interval`` seconds.
+
+    The first run waits one interval, so workers restarting together do not all compact at once.
+    """
+
+    def __init__(self, engine: Engine, interval: float):
+        self.engine = engine
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = background_thread("change-log-compactor", self._run)
+        self._thread.start()
+
+    def stop(self) -> None:
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                compact_change_log(self.engine)
+            except Exception as e:
+                logger.error(f"Change-log compaction failed: {e}")
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+History archive job.
+
+Moves counts and transfers older than ARCHIVE_AFTER_DAYS out of the database
+into monthly per-location files under ARCHIVE_DIR and refreshes the monthly
+rollups. The API runs the same job in the background when ARCHIVE_ENABLED is
+set; use this from cron otherwise. Only one run archives at a time, whether
+started here or by an API worker.
+
+    python archive_history.py
+    python archive_history.py --older-than-days 730
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from app.core.database import engine
+from app.services.archive import archive_history
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--older-than-days", type=int, help="Override ARCHIVE_AFTER_DAYS")
+    args = parser.parse_args()
+
+    moved = archive_history(engine, args.older_than_days)
+    if not moved:
+        print("History archiving is already running elsewhere")
+        return 1
+    for table, rows in moved.items():
+        print(f"{table:<10} {rows} rows archived")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Item search benchmark.
+
+Seeds a scratch SQLite database with a catalog of items (5,000 by default),
+applies the search migration, then times typeahead queries through each
+search backend:
+
+  scan     unindexed substring match over name, vendor and SKU, the naive
+           way to search the catalog
+  fts5     the FTS5 table the search migration creates (the SQLite default)
+  prefix   the in-process prefix index used when no full-text index exists
+
+Every query loads its page of items, as GET /items/search does. The prefix
+index build is timed separately; it happens once per catalog change. Typeahead
+should stay within tens of milliseconds per keystroke on a 5,000-item catalog.
+
+    python benchmarks/item_search_benchmark.py --items 5000 --repeat 20
+"""
+
+import argparse
+import importlib.util
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import or_
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.core.config import settings
+from app.models.category import Category
+from app.models.inventory_item import InventoryItem
+from app.services.search import ItemSearchService
+
+WORDS = ("chicken", "wings", "hot", "sauce", "ranch", "cup", "lettuce", "tomato", "bun", "cheese", "fries",
+         "napkin", "lid", "straw", "pickle", "onion", "bacon", "mayo", "mustard", "oil", "salt", "pepper")
+VENDORS = ("Sysco", "US Foods", "Ranch Supply", "Gordon", "Performance")
+
+# What a user types, one keystroke at a time, plus a SKU lookup
+QUERIES = ("c", "ch", "chi", "chick", "chicken w", "hot sa", "ranch cup", "sysco bun", "SKU-4", "SKU-4321")
+
+
+def seed(session: Session, items: int) -> None:
+    rng = random.Random(42)
+    category = Category(name="Benchmark", description="Benchmark category")
+    session.add(category)
+    session.commit()
+    session.add_all([
+        InventoryItem(name=" ".join(rng.sample(WORDS, 3)).title() + f" {i}", unit="case", category_id=category.id,
+                      par_level=10.0, vendor=rng.choice(VENDORS), sku=f"SKU-{i}")
+        for i in range(items)
+    ])
+    session.commit()
+
+
+def migrate_search_indexes(engine) -> None:
+    """Run the search migration's upgrade against ``engine``."""
+    path = backend_dir / "alembic" / "versions" / "add_item_search_indexes.py"
+    spec = importlib.util.spec_from_file_location("add_item_search_indexes", path)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    with engine.begin() as connection:
+        with Operations.context(MigrationContext.configure(connection)):
+            migration.upgrade()
+
+
+def scan(session: Session, query: str, limit: int) -> List[InventoryItem]:
+    pattern = f"%{query}%"
+    return session.exec(
+        select(InventoryItem).where(or_(
+            InventoryItem.name.ilike(pattern), InventoryItem.vendor.ilike(pattern), InventoryItem.sku.ilike(pattern),
+        )).order_by(InventoryItem.name).limit(limit)
+    ).all()
+
+
+def backend(session: Session, name: str) -> Callable[[str, int], List[InventoryItem]]:
+    service = ItemSearchService()
+    service._backends[str(session.get_bind().url)] = name
+    return lambda query, limit: service.search(session, query, limit=limit)
+
+
+def timed(repeat: int, search: Callable[[str, int], List[InventoryItem]], limit: int) -> List[float]:
+    """Seconds per query, every query ``repeat`` times after one warm-up pass."""
+    for query in QUERIES:
+        search(query, limit)
+    samples = []
+    for _ in range(repeat):
+        for query in QUERIES:
+            started = time.perf_counter()
+            search(query, limit)
+            samples.append(time.perf_counter() - started)
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=20, help="Page size, as for typeahead")
+    args = parser.parse_args()
+
+    # Keep SQL echo out of the timings
+    settings.DEBUG = False
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{directory}/bench.db")
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            seed(session, args.items)
+        migrate_search_indexes(engine)
+
+        with Session(engine) as session:
+            prefix = ItemSearchService()
+            started = time.perf_counter()
+            prefix._get_prefix_index(session)
+            print(f"{args.items} items, {len(QUERIES)} queries x {args.repeat}, page of {args.limit}")
+            print(f"prefix index build {(time.perf_counter() - started) * 1000:7.1f} ms")
+
+            for name, search in (("scan", lambda query, limit: scan(session, query, limit)),
+                                 ("fts5", backend(session, "fts5")), ("prefix", backend(session, "prefix"))):
+                samples = sorted(timed(args.repeat, search, args.limit))
+                p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+                print(f"{name:<7} p50 {statistics.median(samples) * 1000:6.2f} ms   p95 {p95 * 1000:6.2f} ms"
+                      f"   max {samples[-1] * 1000:6.2f} ms")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+List serialization benchmark.
+
+Loads a page of items and a page of counts (plain and fully expanded) from a
+scratch SQLite database, then times turning the rows into a response body two
+ways:
+
+  validated  FastAPI's response_model path: validate every row against the
+             schema, jsonable_encoder, then json.dumps (the old behaviour)
+  trusted    RowSerializer straight to dicts, then orjson (what the list
+             endpoints now do)
+
+Database time is excluded so the numbers isolate serialization.
+
+    python benchmarks/list_serialization_benchmark.py --rows 1000 --repeat 20
+"""
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import APIRoute, serialize_response
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from main import app
+from app.api.count import count_rows
+from app.core.serialization import row_serializer
+from app.models.category import Category
+from app.models.count import Count
+from app.models.inventory_item import InventoryItem
+from app.models.location import Location
+from app.models.user import User
+from app.schemas.count import CountReadExpanded
+from app.schemas.inventory_item import InventoryItemReadExpanded
+
+COUNT_EXPAND = frozenset({"item", "category", "location", "user"})
+
+
+def response_field(path: str):
+    route = next(r for r in app.routes if isinstance(r, APIRoute) and r.path == path and "GET" in r.methods)
+    return route.response_field
+
+
+def seed(session: Session, rows: int) -> None:
+    category = Category(name="Benchmark", description="Benchmark category")
+    location = Location(name="Benchmark Store", address="1 Bench St", city="Dallas", state="TX", zip_code="75201")
+    user = User(username="bench", email="bench@example.com", hashed_password="x")
+    session.add_all([category, location, user])
+    session.commit()
+    items = [
+        InventoryItem(name=f"Item {i}", unit="case", category_id=category.id, par_level=10.0,
+                      reorder_increment=2.0, vendor="Sysco", sku=f"SKU-{i}")
+        for i in range(rows)
+    ]
+    session.add_all(items)
+    session.commit()
+    session.add_all([
+        Count(item_id=item.id, location_id=location.id, user_id=user.id, quantity=float(i))
+        for i, item in enumerate(items)
+    ])
+    session.commit()
+
+
+def timed(repeat: int, fn: Callable[[], bytes]) -> float:
+    """Mean seconds per call after one warm-up call."""
+    fn()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+
+def validated(field, rows: List) -> Callable[[], bytes]:
+    def run() -> bytes:
+        content = asyncio.run(serialize_response(
+            field=field, response_content=rows, exclude_unset=True, is_coroutine=True
+        ))
+        return JSONResponse(content).body
+    return run
+
+
+def trusted(schema, include, rows: List) -> Callable[[], bytes]:
+    serializer = row_serializer(schema, include)
+
+    def run() -> bytes:
+        return ORJSONResponse(serializer.many(rows)).body
+    return run
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{directory}/bench.db")
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            seed(session, args.rows)
+            items = session.exec(select(InventoryItem)).all()
+            plain_counts = session.exec(count_rows(frozenset())).all()
+            expanded_counts = session.exec(count_rows(COUNT_EXPAND)).all()
+
+            items_field = response_field("/api/v1/items/")
+            counts_field = response_field("/api/v1/counts/")
+            cases = [
+                ("items", validated(items_field, items), trusted(InventoryItemReadExpanded, frozenset(), items)),
+                ("counts", validated(counts_field, plain_counts),
+                 trusted(CountReadExpanded, frozenset(), plain_counts)),
+                ("counts expand", validated(counts_field, [_expanded(c) for c in expanded_counts]),
+                 trusted(CountReadExpanded, COUNT_EXPAND, expanded_counts)),
+            ]
+
+            print(f"{args.rows} rows, mean of {args.repeat} runs")
+            for name, slow, fast in cases:
+                slow_s, fast_s = timed(args.repeat, slow), timed(args.repeat, fast)
+                print(f"{name:<14} validated {slow_s * 1000:8.1f} ms   trusted {fast_s * 1000:7.1f} ms"
+                      f"   ({slow_s / fast_s:.1f}x)")
+
+
+def _expanded(count: Count) -> dict:
+    """The dict the expanded endpoint used to hand to response_model validation."""
+    return {
+        **{name: getattr(count, name) for name in CountReadExpanded.__fields__ if name not in COUNT_EXPAND},
+        "item": {**count.item.dict(), "category": count.item.category},
+        "location": count.location,
+        "user": count.user,
+    }
+
+
+if __name__ == "__main__":
+    main()
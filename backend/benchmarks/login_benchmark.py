@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Login throughput benchmark.
+
+Fires concurrent POST /api/v1/auth/login requests at the app in-process and
+reports throughput, latency percentiles and the longest event-loop stall seen
+by a 10 ms heartbeat. Run with --inline to hash on the event loop instead of
+the password worker pool and compare.
+
+    python benchmarks/login_benchmark.py --requests 200 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import httpx
+from sqlmodel import Session, SQLModel, create_engine
+
+from main import app
+from app.api import auth
+from app.core.config import settings
+from app.core.database import get_session
+from app.core.password_pool import hash_password, password_hasher
+from app.models.user import User
+
+PASSWORD = "BenchPassword123!"
+
+
+async def heartbeat(stop: asyncio.Event, stalls: list) -> None:
+    """Record how late each 10 ms tick fires; large values mean a blocked loop."""
+    interval = 0.01
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        stalls.append(time.perf_counter() - started - interval)
+
+
+async def run(requests: int, concurrency: int, username: str) -> None:
+    latencies = []
+    statuses = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login(client: httpx.AsyncClient) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post("/api/v1/auth/login", json={"username": username, "password": PASSWORD})
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    stop = asyncio.Event()
+    stalls: list = []
+    ticker = asyncio.create_task(heartbeat(stop, stalls))
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(login(client) for _ in range(requests)))
+        elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+
+    latencies.sort()
+    print(f"requests:        {requests} ({concurrency} concurrent)")
+    print(f"status codes:    {statuses}")
+    print(f"throughput:      {requests / elapsed:.1f} logins/s")
+    print(f"latency p50:     {statistics.median(latencies) * 1000:.0f} ms")
+    print(f"latency p95:     {latencies[int(len(latencies) * 0.95) - 1] * 1000:.0f} ms")
+    print(f"max loop stall:  {max(stalls, default=0) * 1000:.0f} ms")
+    print(f"pool:            {password_hasher.stats()}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=25)
+    parser.add_argument("--rounds", type=int, default=settings.BCRYPT_ROUNDS, help="bcrypt cost factor")
+    parser.add_argument("--inline", action="store_true", help="verify passwords on the event loop (old behaviour)")
+    args = parser.parse_args()
+
+    password_hasher.rounds = args.rounds
+    if args.inline:
+        async def verify_inline(password: str, hashed_password: str) -> bool:
+            return auth.auth_manager.verify_password(password, hashed_password)
+        auth.auth_manager.verify_password_async = verify_inline
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db", connect_args={"check_same_thread": False})
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            user = User(username="benchuser", email="bench@wingstop.com",
+                        hashed_password=hash_password(PASSWORD, args.rounds))
+            session.add(user)
+            session.commit()
+
+        def bench_session():
+            with Session(engine) as session:
+                yield session
+
+        app.dependency_overrides[get_session] = bench_session
+        asyncio.run(run(args.requests, args.concurrency, "benchuser"))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Middleware overhead benchmark.
+
+Serves a trivial endpoint in-process through three stacks and reports requests
+per second for each:
+
+  none       no middleware
+  layered    the same concerns as six BaseHTTPMiddleware layers (correlation ID,
+             logging, error mapping, security headers, rate limiting, request
+             validation), as the app used to be configured
+  pipeline   the single pure ASGI RequestPipeline
+
+    python benchmarks/middleware_benchmark.py --requests 5000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+import uuid
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.core.logging import set_correlation_id
+from app.core.middleware import RequestPipeline
+from app.core.rate_limit import MemoryRateLimitBackend, RateLimit, RateLimiter, client_key
+from app.core.security import SecurityConfig
+
+
+def create_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/v1/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+
+def unlimited() -> RateLimiter:
+    return RateLimiter(MemoryRateLimitBackend(10000), RateLimit(per_minute=10 ** 9, burst=10 ** 9), {})
+
+
+def add_layered_middleware(app: FastAPI) -> None:
+    """The old arrangement: one BaseHTTPMiddleware per concern."""
+    headers = SecurityConfig.get_security_headers()
+    headers["Content-Security-Policy"] = SecurityConfig.get_csp_policy()
+    limiter = unlimited()
+    logger = logging.getLogger("benchmark")
+
+    class Validation(BaseHTTPMiddleware):
+        async def dispatch(self, request: Request, call_next):
+            if int(request.headers.get("content-length") or 0) > 10 * 1024 * 1024:
+                return JSONResponse({"error": "too large"}, status_code=413)
+            return await call_next(request)
+
+    class RateLimiting(BaseHTTPMiddleware):
+        async def dispatch(self, request: Request, call_next):
+            result = limiter.check(client_key(None, request.client.host), request.url.path)
+            response = await call_next(request)
+            response.headers.update(result.headers())
+            return response
+
+    class SecurityHeaders(BaseHTTPMiddleware):
+        async def dispatch(self, request: Request, call_next):
+            response = await call_next(request)
+            for name, value in headers.items():
+                if value:
+                    response.headers[name] = value
+            return response
+
+    class ErrorHandling(BaseHTTPMiddleware):
+        async def dispatch(self, request: Request, call_next):
+            try:
+                return await call_next(request)
+            except Exception as e:
+                return JSONResponse({"error": str(e)}, status_code=500)
+
+    class Logging(BaseHTTPMiddleware):
+        async def dispatch(self, request: Request, call_next):
+            started = time.time()
+            response = await call_next(request)
+            logger.info("Request completed", extra={"duration": time.time() - started})
+            return response
+
+    class Correlation(BaseHTTPMiddleware):
+        async def dispatch(self, request: Request, call_next):
+            correlation_id = str(uuid.uuid4())
+            set_correlation_id(correlation_id)
+            response = await call_next(request)
+            response.headers["X-Correlation-ID"] = correlation_id
+            return response
+
+    for layer in (Validation, RateLimiting, SecurityHeaders, ErrorHandling, Logging, Correlation):
+        app.add_middleware(layer)
+
+
+async def measure(app: FastAPI, requests: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call(client: httpx.AsyncClient) -> None:
+        async with semaphore:
+            response = await client.get("/api/v1/ping")
+            assert response.status_code == 200
+
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        await asyncio.gather(*(call(client) for _ in range(min(requests, 200))))  # warm up
+        started = time.perf_counter()
+        await asyncio.gather(*(call(client) for _ in range(requests)))
+        return requests / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    # Measure middleware cost, not log output
+    logging.disable(logging.CRITICAL)
+
+    stacks = {"none": create_app(), "layered": create_app(), "pipeline": create_app()}
+    add_layered_middleware(stacks["layered"])
+    stacks["pipeline"].add_middleware(RequestPipeline, limiter=unlimited(), rate_limiting=True)
+
+    baseline = None
+    for name, app in stacks.items():
+        rps = asyncio.run(measure(app, args.requests, args.concurrency))
+        baseline = baseline or rps
+        print(f"{name:<10} {rps:8.0f} req/s  ({rps / baseline:.0%} of no middleware)")
+
+
+if __name__ == "__main__":
+    main()
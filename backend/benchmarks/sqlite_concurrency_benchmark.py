@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+SQLite concurrency benchmark.
+
+Runs a mixed workload from many threads against a scratch SQLite database in
+two configurations and reports throughput and latency:
+
+  shared      the development setup: one connection shared by every thread
+              (StaticPool), default pragmas
+  production  SQLITE_PRODUCTION_MODE: a pool of read connections, tuned
+              pragmas and the group-committing writer
+
+Each operation is either a read (latest 50 counts for a location) or a write
+(one count inserted and committed), like a store's count screen.
+
+    python benchmarks/sqlite_concurrency_benchmark.py --threads 16 --operations 200 --write-ratio 0.2
+"""
+
+import argparse
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlmodel import SQLModel, select
+
+from app.core.config import settings
+from app.core.database import DatabaseManager, create_database_engine, create_sqlite_writer
+from app.models.category import Category
+from app.models.count import Count
+from app.models.inventory_item import InventoryItem
+from app.models.location import Location
+from app.models.user import User
+
+LOCATIONS = 5
+
+MODES = ("shared", "production")
+
+
+def seed(manager: DatabaseManager, items: int) -> None:
+    with manager.get_session_context() as session:
+        category = Category(name="Benchmark", description="Benchmark category")
+        user = User(username="bench", email="bench@example.com", hashed_password="x")
+        locations = [
+            Location(name=f"Store {i}", address="1 Bench St", city="Dallas", state="TX", zip_code="75201")
+            for i in range(LOCATIONS)
+        ]
+        session.add_all([category, user, *locations])
+        session.flush()
+        inventory = [
+            InventoryItem(name=f"Item {i}", unit="case", category_id=category.id, par_level=10.0,
+                          reorder_increment=2.0, vendor="Sysco", sku=f"SKU-{i}")
+            for i in range(items)
+        ]
+        session.add_all(inventory)
+        session.flush()
+        session.add_all([
+            Count(item_id=item.id, location_id=location.id, user_id=user.id, quantity=1.0)
+            for item in inventory for location in locations
+        ])
+
+
+def worker(manager: DatabaseManager, operations: int, write_ratio: float, items: int, seed_value: int,
+           latencies: Dict[str, List[float]], errors: List[str]) -> None:
+    rng = random.Random(seed_value)
+    for _ in range(operations):
+        location_id = rng.randint(1, LOCATIONS)
+        write = rng.random() < write_ratio
+        started = time.perf_counter()
+        try:
+            with manager.read_session() as session:
+                if write:
+                    session.add(Count(item_id=rng.randint(1, items), location_id=location_id, user_id=1,
+                                      quantity=rng.random() * 10))
+                    session.commit()
+                else:
+                    session.exec(
+                        select(Count).where(Count.location_id == location_id)
+                        .order_by(Count.counted_at.desc()).limit(50)
+                    ).all()
+        except Exception as e:
+            errors.append(type(e).__name__)
+            continue
+        latencies["write" if write else "read"].append(time.perf_counter() - started)
+
+
+def run(mode: str, args) -> None:
+    settings.SQLITE_PRODUCTION_MODE = mode == "production"
+    with tempfile.TemporaryDirectory() as directory:
+        url = f"sqlite:///{directory}/bench.db"
+        engine = create_database_engine(url)
+        SQLModel.metadata.create_all(engine)
+        manager = DatabaseManager(engine, writer=create_sqlite_writer(url))
+        seed(manager, args.items)
+
+        latencies: Dict[str, List[float]] = {"read": [], "write": []}
+        errors: List[str] = []
+        threads = [
+            threading.Thread(target=worker, args=(manager, args.operations, args.write_ratio, args.items, i,
+                                                  latencies, errors))
+            for i in range(args.threads)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        done = len(latencies["read"]) + len(latencies["write"])
+        print(f"{mode:<11} {done / elapsed:8.0f} ops/s", end="")
+        for kind in ("read", "write"):
+            samples = sorted(latencies[kind])
+            if samples:
+                p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+                print(f"   {kind} p50 {statistics.median(samples) * 1000:6.2f} ms p99 {p99 * 1000:7.2f} ms", end="")
+        print(f"   errors {len(errors)}" + (f" ({', '.join(sorted(set(errors)))})" if errors else ""))
+        if manager.writer:
+            stats = manager.writer.stats()
+            print(f"{'':<11} {stats['transactions']} write transactions in {stats['group_commits']} commits,"
+                  f" largest group {stats['largest_group']}")
+            manager.writer.stop()
+        engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--operations", type=int, default=200, help="Operations per thread")
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--mode", choices=MODES, help="Run one configuration in this process")
+    args = parser.parse_args()
+
+    # Keep SQL echo out of the timings
+    settings.DEBUG = False
+    if args.mode:
+        run(args.mode, args)
+        return
+
+    print(f"{args.threads} threads x {args.operations} operations, {args.write_ratio:.0%} writes")
+    # One process per configuration: concurrent use of the shared connection can crash the interpreter
+    for mode in MODES:
+        result = subprocess.run([sys.executable, __file__, *sys.argv[1:], "--mode", mode], stdout=subprocess.PIPE, text=True)
+        print(result.stdout, end="")
+        if result.returncode:
+            print(f"{mode:<11} crashed with exit status {result.returncode}")
+
+
+if __name__ == "__main__":
+    main()
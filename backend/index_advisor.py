@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Index advisor.
+
+Replays query shapes with EXPLAIN against the configured database and reports
+the ones that fall back to sequential scans. By default it checks the hot
+paths the composite indexes were built for; pass a file recorded by the query
+monitor (QUERY_SHAPES_FILE) to check the shapes real traffic produced.
+
+Run it against a database with production-sized tables: on small tables the
+PostgreSQL planner rightly prefers sequential scans.
+
+    python index_advisor.py
+    python index_advisor.py --shapes ./logs/query_shapes.jsonl --verbose
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from app.core.database import engine
+from app.services.index_advisor import advise, compile_shape, hot_query_shapes, load_shapes
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shapes", help="JSON lines file written by the query monitor")
+    parser.add_argument("--verbose", action="store_true", help="Print the plan of every shape")
+    args = parser.parse_args()
+
+    if args.shapes:
+        shapes = list(load_shapes(args.shapes))
+    else:
+        shapes = [compile_shape(name, query, engine) for name, query in hot_query_shapes()]
+
+    reports = advise(engine, shapes)
+    for report in reports:
+        if report.error:
+            status = f"ERROR  {report.error}"
+        elif report.sequential_scans:
+            status = f"SCAN   {', '.join(report.sequential_scans)}"
+        else:
+            status = "OK"
+        print(f"{status:<40} {report.shape.name}")
+        if args.verbose or not report.ok:
+            print(f"    {' '.join(report.shape.statement.split())}")
+            for line in report.plan:
+                print(f"      {line}")
+
+    flagged = sum(not report.ok for report in reports)
+    print(f"\n{len(reports)} shapes, {flagged} with sequential scans or errors")
+    return 1 if flagged else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
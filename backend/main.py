@@ -1,23 +1,92 @@
 # This code creates a FastAPI web application for a Wingstop inventory management system
 
 # Import required FastAPI components
+from contextlib import asynccontextmanager
+import anyio.to_thread
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.api import all_routers
-from app.core.database import init_database, check_database_health
+from app.core.database import db_manager, engine, init_database, check_database_health
 from app.core.config import settings, config_manager
 from app.core.middleware import setup_middleware
-from app.core.security import setup_security_middleware, SecurityConfig
+from app.core.security import SecurityConfig
 from app.core.logging import get_logger
+from app.core.cache import catalog_cache
+from app.core.password_pool import password_hasher
+from app.core.audit import audit_writer
+from app.core.metrics import metrics
+from app.core.pool_monitor import pool_monitor
+from app.core.idempotency import idempotency_store
+from app.core.token_cache import token_cache
+from app.services.count_partitions import PartitionMaintainer
+from app.services.archive import ArchiveJob
+from app.services.sync import ChangeLogCompactor
+
+# Start and stop background services shared by all requests
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Threads running sync endpoints; adaptive pool sizing (DB_POOL_ADAPTIVE) assumes this many
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+    # Listen for catalog cache invalidations published by other workers
+    catalog_cache.start()
+    # Share this worker's metrics with the others through METRICS_DIR
+    metrics.start()
+    # Report database connections held past DB_POOL_LEAK_SECONDS
+    pool_monitor.start()
+    # Pick up tokens revoked by logouts on other workers
+    token_cache.start()
+    # Keep future count partitions created and detach expired ones
+    partitions = PartitionMaintainer(engine, settings.COUNT_PARTITION_CHECK_INTERVAL_SECONDS)
+    if settings.COUNT_PARTITIONING_ENABLED and engine.dialect.name == "postgresql":
+        partitions.start()
+    # Group-commit session writes and checkpoint the WAL in SQLite production mode
+    if db_manager.writer:
+        db_manager.writer.start()
+    # Measure replica health and lag so reads only go to replicas that are caught up
+    db_manager.replicas.start()
+    # Move old counts and transfers to the history archive
+    archiver = ArchiveJob(engine, settings.ARCHIVE_INTERVAL_SECONDS)
+    if settings.ARCHIVE_ENABLED:
+        archiver.start()
+    # Drop change-log entries that later changes of the same row have superseded
+    compactor = ChangeLogCompactor(engine, settings.SYNC_COMPACT_INTERVAL_SECONDS)
+    compactor.start()
+    # Delete idempotency keys older than IDEMPOTENCY_TTL_SECONDS
+    if settings.IDEMPOTENCY_ENABLED:
+        idempotency_store.start()
+    yield
+    catalog_cache.bus.close()
+    password_hasher.shutdown()
+    # Write any audit events still queued
+    audit_writer.shutdown()
+    metrics.stop()
+    pool_monitor.stop()
+    token_cache.stop()
+    partitions.stop()
+    archiver.stop()
+    compactor.stop()
+    idempotency_store.stop()
+    db_manager.replicas.stop()
+    if db_manager.writer:
+        db_manager.writer.stop()
 
 # Initialize the FastAPI application with metadata
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description="Inventory management system for Wingstop locations",
     version=settings.VERSION,
-    debug=settings.DEBUG
+    debug=settings.DEBUG,
+    lifespan=lifespan,
+    # Encode JSON responses with orjson instead of the standard library
+    default_response_class=ORJSONResponse
 )
 
+# Correlation IDs, request logging, error mapping, security headers, rate limiting and
+# request validation in one pass; added first so CORS wraps it and 429/413 responses
+# still carry CORS headers
+setup_middleware(app)
+
 # Configure CORS (Cross-Origin Resource Sharing) middleware
 # CORS is NOT the same as sending API requests - it's a security mechanism that controls
 # which domains can make requests to your API. Without CORS, browsers block requests
@@ -49,9 +118,11 @@ async def health_check():
 async def database_health_check():
     return check_database_health()
 
-# Setup middleware (must be after all routes and routers are registered)
-setup_middleware(app)
-setup_security_middleware(app)
+# Prometheus metrics for every worker, in the text exposition format
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def prometheus_metrics():
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 # Entry point to run the application server
 if __name__ == "__main__":
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Count partition maintenance.
+
+Creates the monthly partitions of the count table COUNT_PARTITION_MONTHS_AHEAD
+months ahead and, when COUNT_PARTITION_RETAIN_MONTHS is set, detaches older
+ones into COUNT_PARTITION_ARCHIVE_SCHEMA. The API runs the same job in the
+background; use this from cron when it is deployed without a long-running
+worker, or to inspect the partitions.
+
+The migration partitions the table only if COUNT_PARTITIONING_ENABLED was set
+when it ran. To enable partitioning on a database migrated without it, convert
+the table once with --convert (PostgreSQL only; it takes an exclusive lock on
+count while the old table is attached as the first partition):
+
+    python manage_partitions.py
+    python manage_partitions.py --list
+    python manage_partitions.py --convert
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from app.core.config import settings
+from app.core.database import engine
+from app.services.count_partitions import convert_to_partitioned, is_partitioned, list_partitions, maintain
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--list", action="store_true", help="Only print the attached partitions")
+    parser.add_argument("--convert", action="store_true", help="Partition an existing unpartitioned count table")
+    args = parser.parse_args()
+
+    if args.convert:
+        if engine.dialect.name != "postgresql":
+            print("Count partitioning needs PostgreSQL")
+            return 1
+        with engine.begin() as connection:
+            convert_to_partitioned(connection, settings.COUNT_PARTITION_MONTHS_AHEAD)
+
+    with engine.connect() as connection:
+        if not is_partitioned(connection):
+            print("The count table is not partitioned; run with --convert to partition it (PostgreSQL only)")
+            return 1
+
+    if not args.list:
+        maintain(engine)
+
+    with engine.connect() as connection:
+        for partition in list_partitions(connection):
+            upper = partition.upper.date().isoformat() if partition.upper else "default"
+            print(f"{partition.name:<24} up to {upper}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,6 +8,12 @@ from main import app
 from app.core.database import get_session
 from app.models import User, Role, Location, Category, InventoryItem, Count, Transfer, Schedule
 from app.core.security import AuthenticationManager
+from app.core.cache import catalog_cache
+from app.core.principal import principal_cache
+from app.core.audit import audit_writer
+from app.core.token_cache import token_cache
+from app.core.query_monitor import query_monitor
+from app.core.pool_monitor import pool_monitor
 from datetime import datetime, timedelta
 import uuid
 
@@ -30,7 +36,20 @@ def test_engine():
         poolclass=StaticPool,
     )
     SQLModel.metadata.create_all(bind=engine)
+    # Lets tests assert per-request query budgets with query_monitor.capture()
+    query_monitor.watch(engine)
+    # Lets tests check the pool statistics of the connections their requests use
+    pool_monitor.watch(engine, "test", track_leaks=False)
+    # The audit writer thread gets its own connection so it never shares the test session's
+    audit_engine = create_engine(TEST_DATABASE_URL, connect_args={"check_same_thread": False})
+    audit_writer.engine = audit_engine
+    # Revocations are shared through the database
+    token_cache.engine = audit_engine
     yield engine
+    audit_writer.shutdown()
+    audit_writer.engine = None
+    token_cache.engine = None
+    audit_engine.dispose()
     SQLModel.metadata.drop_all(bind=engine)
 
 @pytest.fixture
@@ -43,6 +62,9 @@ def client(test_session) -> Generator[TestClient, None, None]:
     def override_get_session():
         yield test_session
     app.dependency_overrides[get_session] = override_get_session
+    # Fixtures write straight to the test database, so start every test with a cold cache
+    catalog_cache.clear()
+    principal_cache.clear()
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
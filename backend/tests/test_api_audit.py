@@ -0,0 +1,136 @@
+import asyncio
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from app.core.audit import AuditWriter, audit_writer
+from app.core.password_pool import hash_password, password_hasher
+from app.core.security import AuthenticationManager
+from app.models.audit_log import AuditLog
+from app.models.role import Role
+from app.models.user import User
+
+
+class TestAuditAPI:
+    """Test cases for the audit writer and Audit API endpoints."""
+
+    def _create_admin(self, session: Session) -> User:
+        role = session.exec(select(Role).where(Role.name == "admin")).first()
+        if not role:
+            role = Role(name="admin", description="Admin")
+            session.add(role)
+            session.commit()
+            session.refresh(role)
+        user = User(
+            username=f"audit_{uuid.uuid4().hex[:8]}",
+            email=f"audit_{uuid.uuid4().hex[:8]}@wingstop.com",
+            hashed_password=hash_password("TestPassword123!", 4),
+            is_active=True,
+            role_id=role.id
+        )
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+        return user
+
+    def test_login_is_audited_and_queryable(self, client: TestClient, test_session: Session, monkeypatch):
+        """Test GET /api/v1/audit-logs finds a login by user, action and time range."""
+        monkeypatch.setattr(password_hasher, "rounds", 4)
+        admin = self._create_admin(test_session)
+        started = datetime.utcnow() - timedelta(seconds=1)
+        response = client.post("/api/v1/auth/login", json={"username": admin.username, "password": "TestPassword123!"})
+        assert response.status_code == 200
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        audit_writer.flush()
+
+        response = client.get(
+            "/api/v1/audit-logs/",
+            params={"user_id": admin.id, "action": "user_login", "since": started.isoformat()},
+            headers=headers
+        )
+        assert response.status_code == 200
+        events = response.json()
+        assert len(events) == 1
+        assert events[0]["details"]["username"] == admin.username
+
+        response = client.get(
+            "/api/v1/audit-logs/", params={"user_id": admin.id, "until": started.isoformat()}, headers=headers
+        )
+        assert response.json() == []
+
+        response = client.get(
+            "/api/v1/audit-logs/",
+            params={"since": started.isoformat(), "until": started.isoformat()},
+            headers=headers
+        )
+        assert response.status_code == 400
+
+    def test_audit_logs_require_admin(self, client: TestClient, sample_user):
+        """Test GET /api/v1/audit-logs is limited to system administrators."""
+        token = AuthenticationManager().create_access_token({"sub": str(sample_user.id)})
+        response = client.get("/api/v1/audit-logs/", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 403
+
+    def test_writer_batches_and_drains_on_shutdown(self, test_engine):
+        """Test events are bulk inserted in batches and none are lost at shutdown."""
+        writer = AuditWriter(batch_size=50, flush_interval=10, queue_limit=1000, enqueue_timeout=1)
+        writer.engine = test_engine
+        action = f"test_{uuid.uuid4().hex[:8]}"
+        for i in range(120):
+            writer.record(action, user_id=str(i), details={"i": i})
+        writer.shutdown()
+
+        stats = writer.stats()
+        assert stats["written"] == 120
+        assert stats["batches"] == 3
+        with Session(test_engine) as session:
+            rows = session.exec(select(AuditLog).where(AuditLog.action == action)).all()
+        assert len(rows) == 120
+
+    def test_writer_waits_for_room_instead_of_dropping(self):
+        """Test a full queue makes async callers wait off the event loop, then refuses with 503, never dropping."""
+        writer = AuditWriter(batch_size=1, flush_interval=0.01, queue_limit=2, enqueue_timeout=0.2)
+        release = threading.Event()
+        written = []
+
+        def slow_write(batch):
+            release.wait()
+            written.extend(batch)
+        writer._write = slow_write
+
+        async def fill_queue():
+            ticks = 0
+
+            async def tick():
+                nonlocal ticks
+                while True:
+                    ticks += 1
+                    await asyncio.sleep(0.01)
+            ticker = asyncio.create_task(tick())
+            # The writer holds one event and the queue two more; the next waits for room
+            for _ in range(3):
+                await writer.record_async("test_full_queue")
+            with pytest.raises(HTTPException) as excinfo:
+                await writer.record_async("test_full_queue")
+            ticker.cancel()
+            return excinfo.value, ticks
+
+        error, ticks = asyncio.run(fill_queue())
+        assert error.status_code == 503
+        # The event loop kept running while the caller waited
+        assert ticks >= 5
+        assert writer.stats()["rejected"] == 1
+
+        # Once the writer catches up, a waiting caller gets in rather than being refused
+        waiter = threading.Thread(target=writer.record, args=("test_full_queue",))
+        waiter.start()
+        release.set()
+        waiter.join()
+        writer.shutdown()
+        assert len(written) == 4
+        assert writer.stats()["rejected"] == 1
@@ -0,0 +1,266 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+from datetime import timedelta
+import time
+import uuid
+
+from app.models.role import Role
+from app.models.user import User
+from app.core.config import settings
+from app.core.dependencies import require_any_role, require_role
+from app.core.password_pool import hash_cost, hash_password, password_hasher
+from app.core.principal import principal_cache
+from app.core.query_monitor import query_monitor
+from app.core.rbac import RolePermissions
+from app.core.security import AuthenticationManager
+from app.core.token_cache import TokenCache, token_cache
+
+
+class TestAuthAPI:
+    """Test cases for Authentication API endpoints."""
+
+    def _create_user(self, session: Session, password: str, rounds: int, role_id: int = None) -> User:
+        user = User(
+            username=f"authuser_{uuid.uuid4().hex[:8]}",
+            email=f"auth_{uuid.uuid4().hex[:8]}@wingstop.com",
+            hashed_password=hash_password(password, rounds),
+            is_active=True,
+            role_id=role_id
+        )
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+        return user
+
+    def test_login(self, client: TestClient, test_session: Session, monkeypatch):
+        """Test POST /api/v1/auth/login returns tokens for valid credentials only."""
+        monkeypatch.setattr(password_hasher, "rounds", 4)
+        user = self._create_user(test_session, "TestPassword123!", rounds=4)
+
+        response = client.post("/api/v1/auth/login", json={"username": user.username, "password": "TestPassword123!"})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["access_token"]
+        assert data["user"]["id"] == user.id
+
+        response = client.post("/api/v1/auth/login", json={"username": user.username, "password": "WrongPassword123!"})
+        assert response.status_code == 401
+
+    def test_login_rehashes_outdated_cost(self, client: TestClient, test_session: Session, monkeypatch):
+        """Test a successful login upgrades a hash made with a different cost factor."""
+        monkeypatch.setattr(password_hasher, "rounds", 5)
+        user = self._create_user(test_session, "TestPassword123!", rounds=4)
+
+        response = client.post("/api/v1/auth/login", json={"username": user.username, "password": "TestPassword123!"})
+        assert response.status_code == 200
+
+        test_session.refresh(user)
+        assert hash_cost(user.hashed_password) == 5
+
+        # The upgraded hash still verifies
+        response = client.post("/api/v1/auth/login", json={"username": user.username, "password": "TestPassword123!"})
+        assert response.status_code == 200
+
+    def test_login_rejected_when_password_pool_saturated(
+        self, client: TestClient, test_session: Session, monkeypatch
+    ):
+        """Test logins fail fast with 503 instead of queueing when the hashing pool is full."""
+        user = self._create_user(test_session, "TestPassword123!", rounds=4)
+        monkeypatch.setattr(password_hasher, "capacity", 0)
+
+        response = client.post("/api/v1/auth/login", json={"username": user.username, "password": "TestPassword123!"})
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+
+    def test_verified_tokens_are_cached(self):
+        """Test repeated verification of a token is served from the token cache."""
+        auth_manager = AuthenticationManager()
+        token = auth_manager.create_access_token({"sub": "1"})
+        before = token_cache.stats()
+
+        first = auth_manager.verify_token(token)
+        second = auth_manager.verify_token(token)
+        after = token_cache.stats()
+        assert first == second
+        assert after["misses"] == before["misses"] + 1
+        assert after["hits"] == before["hits"] + 1
+
+        # Expired tokens are never cached
+        expired = auth_manager.create_access_token({"sub": "1"}, expires_delta=timedelta(seconds=-1))
+        with pytest.raises(HTTPException):
+            auth_manager.verify_token(expired)
+        assert token_cache.get(token_cache.key(expired)) is None
+
+    def test_logout_revokes_token(self, client: TestClient, test_session: Session, monkeypatch):
+        """Test a token stops working after logout even though it is cached."""
+        monkeypatch.setattr(password_hasher, "rounds", 4)
+        user = self._create_user(test_session, "TestPassword123!", rounds=4)
+        response = client.post("/api/v1/auth/login", json={"username": user.username, "password": "TestPassword123!"})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        assert client.get("/api/v1/auth/me", headers=headers).status_code == 200
+        assert client.post("/api/v1/auth/logout", headers=headers).status_code == 200
+        response = client.get("/api/v1/auth/me", headers=headers)
+        assert response.status_code == 401
+
+    def test_revocations_reach_other_workers(self, client: TestClient):
+        """Test a token revoked on one worker is rejected by another once it syncs, even if cached there."""
+        auth_manager = AuthenticationManager()
+        other_worker = TokenCache(max_size=100, sync_interval=60)
+        other_worker.engine = token_cache.engine
+        token = auth_manager.create_access_token({"sub": "1"})
+        claims = auth_manager.verify_token(token)
+        key = token_cache.key(token)
+        other_worker.put(key, claims)
+
+        assert auth_manager.revoke_token(token) is not None
+        assert other_worker.get(key) is not None
+        assert other_worker.sync() >= 1
+        assert other_worker.get(key) is None
+        assert other_worker.is_revoked(key)
+
+        # Revocations are forgotten once the token would have expired anyway
+        other_worker._revoked[key] = time.time() - 1
+        assert not other_worker.is_revoked(key)
+        assert key not in other_worker._revoked
+
+    def test_start_loads_existing_revocations(self, client: TestClient):
+        """Test a worker that starts after a logout rejects the token before its first periodic sync."""
+        auth_manager = AuthenticationManager()
+        token = auth_manager.create_access_token({"sub": "1"})
+        key = token_cache.key(token)
+        assert auth_manager.revoke_token(token) is not None
+
+        restarted_worker = TokenCache(max_size=100, sync_interval=3600)
+        restarted_worker.engine = token_cache.engine
+        restarted_worker.start()
+        try:
+            assert restarted_worker.is_revoked(key)
+        finally:
+            restarted_worker.stop()
+
+    @pytest.mark.parametrize("dependency", [require_role("admin"), require_any_role(["manager", "admin"])])
+    def test_role_checks_reject_deleted_users(self, test_session: Session, dependency):
+        """Test role dependencies answer 401, not 500, for a user deleted after authenticating."""
+        admin_role = self._get_role(test_session, "admin")
+        user = self._create_user(test_session, "TestPassword123!", rounds=4, role_id=admin_role.id)
+        test_session.delete(user)
+        test_session.commit()
+        principal_cache.clear()
+
+        with pytest.raises(HTTPException) as excinfo:
+            asyncio.run(dependency(current_user=user, session=test_session))
+        assert excinfo.value.status_code == 401
+
+    def _get_role(self, session: Session, name: str) -> Role:
+        role = session.exec(select(Role).where(Role.name == name)).first()
+        if not role:
+            role = Role(name=name, description=name.title())
+            session.add(role)
+            session.commit()
+            session.refresh(role)
+        return role
+
+    def test_cache_stats_requires_admin(self, client: TestClient, test_session: Session, sample_user):
+        """Test GET /api/v1/system/cache-stats is limited to system administrators."""
+        auth_manager = AuthenticationManager()
+        admin_role = self._get_role(test_session, "admin")
+        admin = self._create_user(test_session, "TestPassword123!", rounds=4, role_id=admin_role.id)
+
+        token = auth_manager.create_access_token({"sub": str(admin.id)})
+        response = client.get("/api/v1/system/cache-stats", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+        stats = response.json()
+        assert {"catalog", "tokens", "password_pool"} <= set(stats)
+        assert stats["tokens"]["hits"] + stats["tokens"]["misses"] >= 1
+        response = client.get("/api/v1/system/db-pool?held_over=0", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+        # Requests here run on the test engine, which is watched as the "test" pool
+        assert response.json()["pools"]["test"]["checkouts"] > 0
+
+        token = auth_manager.create_access_token({"sub": str(sample_user.id)})
+        response = client.get("/api/v1/system/cache-stats", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 403
+        response = client.get("/api/v1/system/db-pool", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 403
+
+    def test_authorization_is_query_free_for_hot_users(
+        self, client: TestClient, test_session: Session
+    ):
+        """Test a cached principal authorizes without queries until its user changes."""
+        auth_manager = AuthenticationManager()
+        admin = self._create_user(test_session, "TestPassword123!", rounds=4,
+                                  role_id=self._get_role(test_session, "admin").id)
+        clerk = self._create_user(test_session, "TestPassword123!", rounds=4,
+                                  role_id=self._get_role(test_session, "clerk").id)
+        admin_headers = {"Authorization": f"Bearer {auth_manager.create_access_token({'sub': str(admin.id)})}"}
+        clerk_headers = {"Authorization": f"Bearer {auth_manager.create_access_token({'sub': str(clerk.id)})}"}
+        clerk_id = clerk.id
+
+        assert client.get("/api/v1/rbac/my-permissions", headers=admin_headers).status_code == 200
+        with query_monitor.capture() as captured:
+            response = client.get("/api/v1/rbac/my-permissions", headers=admin_headers)
+        assert response.status_code == 200
+        assert "system:admin" in response.json()
+        assert captured.count == 0
+
+        # Role changes made through the rbac router apply on the next request
+        assert "users:read" not in client.get("/api/v1/rbac/my-permissions", headers=clerk_headers).json()
+        response = client.post(f"/api/v1/rbac/users/{clerk_id}/role/manager", headers=admin_headers)
+        assert response.status_code == 200
+        assert "users:read" in client.get("/api/v1/rbac/my-permissions", headers=clerk_headers).json()
+
+    def test_permission_claims_authorize_without_queries(
+        self, client: TestClient, test_session: Session, monkeypatch
+    ):
+        """Test tokens with permission claims authorize from the token until the user's permissions change."""
+        monkeypatch.setattr(settings, "TOKEN_PERMISSION_CLAIMS", True)
+        monkeypatch.setattr(password_hasher, "rounds", 4)
+        admin = self._create_user(test_session, "TestPassword123!", rounds=4,
+                                  role_id=self._get_role(test_session, "admin").id)
+        manager = self._create_user(test_session, "TestPassword123!", rounds=4,
+                                    role_id=self._get_role(test_session, "manager").id)
+        clerk = self._create_user(test_session, "TestPassword123!", rounds=4,
+                                  role_id=self._get_role(test_session, "clerk").id)
+        admin_id, manager_id, clerk_id = admin.id, manager.id, clerk.id
+        tokens = client.post("/api/v1/auth/login",
+                             json={"username": manager.username, "password": "TestPassword123!"}).json()
+        headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+        claims = AuthenticationManager().verify_token(tokens["access_token"])
+        assert RolePermissions.from_mask(claims["perms"]) == RolePermissions.get_permissions_for_role("manager")
+
+        assert client.get("/api/v1/rbac/permissions", headers=headers).status_code == 200
+        with query_monitor.capture() as captured:
+            assert client.get("/api/v1/rbac/roles/clerk", headers=headers).status_code == 200
+            assert client.get("/api/v1/system/cache-stats", headers=headers).status_code == 403
+        assert captured.count == 0
+
+        # Principals expiring from the TTL cache do not send claim checks back to the database
+        principal_cache._principals.clear()
+        with query_monitor.capture() as captured:
+            assert client.get("/api/v1/rbac/permissions", headers=headers).status_code == 200
+        assert captured.count == 0
+        # Only an invalidation, from this worker or another over the bus, drops the version
+        principal_cache.on_invalidate([f"principal:{manager_id}"])
+        assert manager_id not in principal_cache._access
+
+        # Changing another user's role leaves this token valid
+        admin_headers = {"Authorization": f"Bearer {AuthenticationManager().create_access_token({'sub': str(admin_id)})}"}
+        response = client.post(f"/api/v1/rbac/users/{clerk_id}/role/manager", headers=admin_headers)
+        assert response.status_code == 200
+        assert client.get("/api/v1/rbac/permissions", headers=headers).status_code == 200
+
+        # Changing this user's own role bumps their permissions version and forces a refresh
+        response = client.post(f"/api/v1/rbac/users/{manager_id}/role/admin", headers=admin_headers)
+        assert response.status_code == 200
+        response = client.get("/api/v1/rbac/permissions", headers=headers)
+        assert response.status_code == 401
+
+        response = client.post("/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+        assert response.status_code == 200
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        assert client.get("/api/v1/rbac/permissions", headers=headers).status_code == 200
@@ -2,7 +2,12 @@ import pytest
 from fastapi.testclient import TestClient
 from sqlmodel import Session
 import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import update
 
+from app.core.cache import catalog_cache
+from app.core.query_monitor import query_monitor
+from app.models import TableStamp
 from app.models.category import Category
 
 
@@ -144,6 +149,74 @@ class TestCategoryAPI:
         categories = response.json()
         assert len(categories) <= 5
 
+    def test_category_list_served_from_cache(self, client: TestClient, test_data):
+        """Test repeated category reads skip the database until a write invalidates them."""
+        category_id = test_data["category"].id
+        assert client.get("/api/v1/categories/?limit=1000").status_code == 200
+
+        with query_monitor.capture() as captured:
+            response = client.get("/api/v1/categories/?limit=1000")
+            assert client.get(f"/api/v1/categories/{category_id}").status_code == 200
+        assert response.status_code == 200
+        assert captured.count == 0
+
+        # A write through the router is visible on the next read
+        new_name = f"Cached_{str(uuid.uuid4())[:8]}"
+        response = client.post("/api/v1/categories/", json={"name": new_name, "color": "#123456"})
+        assert response.status_code == 201
+        names = [c["name"] for c in client.get("/api/v1/categories/?limit=1000").json()]
+        assert new_name in names
+
+    def test_category_conditional_get(self, client: TestClient, test_data):
+        """Test categories carry validators and answer If-None-Match with 304."""
+        category_id = test_data["category"].id
+        response = client.get("/api/v1/categories/?limit=1000")
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+        assert "max-age=60" in response.headers["cache-control"]
+        assert "last-modified" in response.headers
+
+        response = client.get("/api/v1/categories/?limit=1000", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+        # A different query shape gets its own validator
+        response = client.get("/api/v1/categories/?limit=5", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+
+        detail = client.get(f"/api/v1/categories/{category_id}")
+        detail_etag = detail.headers["etag"]
+        response = client.get(f"/api/v1/categories/{category_id}", headers={"If-None-Match": detail_etag})
+        assert response.status_code == 304
+
+        # Writes change both the list and the row validators
+        response = client.put(f"/api/v1/categories/{category_id}", json={"description": "Changed"})
+        assert response.status_code == 200
+        response = client.get("/api/v1/categories/?limit=1000", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        response = client.get(f"/api/v1/categories/{category_id}", headers={"If-None-Match": detail_etag})
+        assert response.status_code == 200
+
+    def test_category_delete_moves_last_modified(self, client: TestClient, test_session: Session, test_data):
+        """Test deleting a category answers If-Modified-Since with 200, not a stale 304."""
+        # Make every stamp older than HTTP dates' one-second resolution
+        an_hour_ago = datetime.utcnow() - timedelta(hours=1)
+        test_session.execute(update(Category).values(updated_at=an_hour_ago))
+        test_session.execute(update(TableStamp).values(modified_at=an_hour_ago))
+        test_session.commit()
+        catalog_cache.clear()
+
+        last_modified = client.get("/api/v1/categories/?limit=1000").headers["last-modified"]
+        response = client.get("/api/v1/categories/?limit=1000", headers={"If-Modified-Since": last_modified})
+        assert response.status_code == 304
+
+        assert client.delete(f"/api/v1/categories/{test_data['category'].id}").status_code == 204
+        response = client.get("/api/v1/categories/?limit=1000", headers={"If-Modified-Since": last_modified})
+        assert response.status_code == 200
+        assert response.headers["last-modified"] != last_modified
+
     def test_category_color_validation(self, client: TestClient):
         """Test category color validation."""
         # Test valid hex colors
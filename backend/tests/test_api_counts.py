@@ -1,12 +1,15 @@
 import pytest
 from fastapi.testclient import TestClient
-from sqlmodel import Session
+from sqlmodel import Session, select
 from datetime import date
+import json
 import uuid
 
 from app.models.count import Count
 from app.models.user import User
 from app.models.inventory_item import InventoryItem
+from app.schemas.count import CountRead, CountReadExpanded
+from app.core.query_monitor import query_monitor
 
 
 class TestCountAPI:
@@ -130,6 +133,61 @@ class TestCountAPI:
         assert "user_id" in count_data
         assert "item_id" in count_data  # Changed from inventory_item_id
 
+    def test_count_expand_uses_fixed_query_count(
+        self, client: TestClient, test_session: Session, test_data
+    ):
+        """Test ?expand embeds relations with the same number of queries for any page size."""
+        count = test_data["count"]
+        for i in range(30):
+            test_session.add(Count(
+                item_id=count.item_id,
+                location_id=count.location_id,
+                user_id=count.user_id,
+                quantity=float(i)
+            ))
+        test_session.commit()
+        item_id, user_id = count.item_id, count.user_id
+
+        def queries_for(url):
+            # Start from an empty identity map so every page loads its relations
+            test_session.expunge_all()
+            with query_monitor.capture() as captured:
+                response = client.get(url)
+            assert response.status_code == 200
+            return response.json(), captured.count
+
+        expand = "expand=item,category,location,user"
+        small_page, small_queries = queries_for(f"/api/v1/counts/?item_id={item_id}&limit=2&{expand}")
+        large_page, large_queries = queries_for(f"/api/v1/counts/?item_id={item_id}&limit=30&{expand}")
+        assert (len(small_page), len(large_page)) == (2, 30)
+        # One query for the counts plus one per embedded relation
+        assert small_queries == large_queries == 5
+
+        embedded = large_page[0]
+        assert embedded["item"]["id"] == item_id
+        assert embedded["item"]["category"]["id"] == embedded["item"]["category_id"]
+        assert embedded["location"]["id"] == embedded["location_id"]
+        assert embedded["user"]["id"] == user_id
+        assert "hashed_password" not in embedded["user"]
+
+        # Without expand no relation is loaded or returned
+        plain_page, plain_queries = queries_for(f"/api/v1/counts/?item_id={item_id}&limit=30")
+        assert plain_queries == 1
+        assert not {"item", "location", "user"} & set(plain_page[0])
+
+        response = client.get("/api/v1/counts/?expand=schedule")
+        assert response.status_code == 400
+
+    def test_list_counts_matches_response_model(self, client: TestClient, test_session: Session, test_data):
+        """Test the unvalidated fast path returns exactly what response_model validation would."""
+        expected = [json.loads(CountRead.from_orm(count).json()) for count in test_session.exec(select(Count)).all()]
+        assert client.get("/api/v1/counts/").json() == expected
+
+        response = client.get("/api/v1/counts/?expand=item,category,location,user")
+        assert response.headers["content-type"] == "application/json"
+        for data in response.json():
+            assert json.loads(CountReadExpanded.parse_obj(data).json(exclude_unset=True)) == data
+
     def test_count_by_date(self, client: TestClient, test_data):
         """Test count filtering by date."""
         today = date.today()
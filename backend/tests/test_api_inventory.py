@@ -1,10 +1,18 @@
 import pytest
 from fastapi.testclient import TestClient
 from sqlmodel import Session
+from sqlalchemy import text
+import io
 import uuid
+from openpyxl import Workbook
 
 from app.models.inventory_item import InventoryItem
 from app.models.category import Category
+from app.core.query_monitor import query_monitor
+from app.services.item_import import ItemImportService
+from app.services.search import escape_like
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 
 
 class TestInventoryAPI:
@@ -178,12 +186,77 @@ class TestInventoryAPI:
             response = client.post("/api/v1/items/", json=item_data)  # Changed from inventory-items
             assert response.status_code == 201
 
-        # Test search functionality - for now, just test that the endpoint accepts the parameter
-        response = client.get("/api/v1/items/?search=Chicken")  # Changed from inventory-items
+        # Search matches on word prefixes, case-insensitively
+        response = client.get("/api/v1/items/?search=chick")  # Changed from inventory-items
         assert response.status_code == 200
         items = response.json()
-        # Since search is simplified, we just check that the endpoint works
         assert isinstance(items, list)
+        assert len(items) >= 1
+        assert all("chicken" in item["name"].lower() for item in items)
+
+    def test_sku_prefix_wildcards_match_literally(self, test_session: Session):
+        """Test % and _ typed into a search only match themselves in the SKU prefix pattern."""
+        match = text("SELECT :sku LIKE :prefix ESCAPE '\\'")
+        prefix = f"{escape_like('AB_1%')}%"
+        assert test_session.execute(match, {"sku": "AB_1%-9", "prefix": prefix}).scalar() == 1
+        assert test_session.execute(match, {"sku": "ABC1x-9", "prefix": prefix}).scalar() == 0
+        assert escape_like("a\\b") == "a\\\\b"
+
+    def test_inventory_item_typeahead(self, client: TestClient, test_data):
+        """Test GET /api/v1/items/search ranks name and SKU matches."""
+        category = test_data["category"]
+        sku = f"TYP-{uuid.uuid4().hex[:8]}"
+        response = client.post("/api/v1/items/", json={
+            "name": "Typeahead Ranch Cup",
+            "category_id": category.id,
+            "unit": "cases",
+            "vendor": "Ranch Supply",
+            "sku": sku
+        })
+        assert response.status_code == 201
+
+        # Exact SKU lookups come back first
+        response = client.get(f"/api/v1/items/search?q={sku}")
+        assert response.status_code == 200
+        items = response.json()
+        assert items[0]["sku"] == sku
+
+        # Every query token must match, prefixes included
+        response = client.get("/api/v1/items/search?q=typea ran&limit=5")
+        assert response.status_code == 200
+        items = response.json()
+        assert 1 <= len(items) <= 5
+        assert all("typeahead" in item["name"].lower() for item in items)
+
+        response = client.get("/api/v1/items/search?q=zzzznotanitem")
+        assert response.status_code == 200
+        assert response.json() == []
+
+    def test_inventory_item_expand_category(self, client: TestClient, test_data):
+        """Test ?expand=category embeds the category only when requested."""
+        category = test_data["category"]
+        response = client.get(f"/api/v1/items/?category_id={category.id}&expand=category")
+        assert response.status_code == 200
+        items = response.json()
+        assert len(items) >= 1
+        assert all(item["category"]["id"] == category.id for item in items)
+        assert items[0]["category"]["name"] == category.name
+
+        response = client.get(f"/api/v1/items/?category_id={category.id}")
+        assert all("category" not in item for item in response.json())
+
+        response = client.get("/api/v1/items/search?q=chicken&expand=category")
+        assert response.status_code == 200
+        assert all("category" in item for item in response.json())
+
+    def test_list_items_query_budget(self, client: TestClient, test_data):
+        """Test item lists stay within their query budget and need no queries once cached."""
+        with query_monitor.capture() as captured:
+            client.get("/api/v1/items/?expand=category")
+            client.get("/api/v1/items/?expand=category")
+        # A cold cache loads the item and category snapshots (rows and table stamp) once
+        captured.assert_budget(4)
+        assert captured.requests[-1].count == 0
 
     def test_inventory_item_filtering(self, client: TestClient, test_data):
         """Test inventory item filtering by category."""
@@ -218,4 +291,85 @@ class TestInventoryAPI:
         response = client.get("/api/v1/items/?skip=0&limit=5")  # Changed from inventory-items
         assert response.status_code == 200
         items = response.json()
-        assert len(items) <= 5 
\ No newline at end of file
+        assert len(items) <= 5 
+
+    def test_import_items_csv(self, client: TestClient, test_data):
+        """Test CSV import creates new items, updates by vendor/SKU and reports bad rows."""
+        category = test_data["category"]
+        vendor = f"Import Vendor {uuid.uuid4().hex[:8]}"
+        csv_data = (
+            "Name,Category,Unit,Par Level,Vendor,SKU\n"
+            f"Imported Wings,{category.name},cases,12,{vendor},IMP-1\n"
+            f"Imported Ranch,{category.name},cases,4,{vendor},IMP-2\n"
+            f"Unknown Category Item,No Such Category,cases,1,{vendor},IMP-3\n"
+            f"X,{category.name},cases,1,{vendor},IMP-4\n"
+        )
+        response = client.post(
+            "/api/v1/items/import",
+            files={"file": ("catalog.csv", csv_data.encode(), "text/csv")},
+        )
+        assert response.status_code == 202
+        job_id = response.json()["id"]
+
+        # TestClient runs background tasks before returning the response
+        job = client.get(f"/api/v1/items/import/{job_id}").json()
+        assert job["status"] == "completed"
+        assert job["total_rows"] == 4
+        assert (job["created"], job["updated"], job["failed"]) == (2, 0, 2)
+        assert [error["row"] for error in job["errors"]] == [4, 5]
+
+        # Re-importing the same vendor/SKU updates in place
+        csv_data = f"name,category_id,unit,par_level,vendor,sku\nImported Wings XL,{category.id},cases,20,{vendor},IMP-1\n"
+        response = client.post(
+            "/api/v1/items/import",
+            files={"file": ("catalog.csv", csv_data.encode(), "text/csv")},
+        )
+        job = client.get(f"/api/v1/items/import/{response.json()['id']}").json()
+        assert (job["created"], job["updated"]) == (0, 1)
+
+        items = [item for item in client.get("/api/v1/items/?limit=1000").json() if item["vendor"] == vendor]
+        assert sorted((item["sku"], item["name"], item["par_level"]) for item in items) == [
+            ("IMP-1", "Imported Wings XL", 20.0),
+            ("IMP-2", "Imported Ranch", 4.0),
+        ]
+
+    def test_import_items_xlsx(self, client: TestClient, test_session: Session, test_data):
+        """Test XLSX import reads the first sheet and its job is visible to every worker."""
+        category = test_data["category"]
+        vendor = f"Xlsx Vendor {uuid.uuid4().hex[:8]}"
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(["Item Name", "Category", "Unit", "Par", "Supplier", "Vendor SKU"])
+        sheet.append(["Xlsx Wings", category.name, "cases", 8, vendor, 101])
+        sheet.append([None, None, None, None, None, None])
+        sheet.append(["Xlsx Ranch", category.name, "cases", None, vendor, "XR-2"])
+        upload = io.BytesIO()
+        workbook.save(upload)
+
+        response = client.post(
+            "/api/v1/items/import",
+            files={"file": ("catalog.xlsx", upload.getvalue(), XLSX_CONTENT_TYPE)},
+        )
+        assert response.status_code == 202
+        job = client.get(f"/api/v1/items/import/{response.json()['id']}").json()
+        assert job["status"] == "completed"
+        assert (job["total_rows"], job["created"], job["failed"]) == (2, 2, 0)
+
+        items = [item for item in client.get("/api/v1/items/?limit=1000").json() if item["vendor"] == vendor]
+        assert sorted((item["sku"], item["name"], item["par_level"]) for item in items) == [
+            ("101", "Xlsx Wings", 8.0),
+            ("XR-2", "Xlsx Ranch", None),
+        ]
+        # Jobs live in the database, so a service in another worker reports the same progress
+        assert ItemImportService().get_job(test_session, job["id"]).created == 2
+
+    def test_import_items_rejects_bad_uploads(self, client: TestClient):
+        """Test unsupported file types are refused and unknown jobs return 404."""
+        response = client.post(
+            "/api/v1/items/import",
+            files={"file": ("catalog.pdf", b"%PDF-1.4", "application/pdf")},
+        )
+        assert response.status_code == 415
+
+        response = client.get("/api/v1/items/import/does-not-exist")
+        assert response.status_code == 404
@@ -0,0 +1,178 @@
+import threading
+from datetime import date, datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from app.models import Count, CountRollup, Transfer, TransferRollup
+from app.services.archive import COUNTS, JOB_LOCK_FILE, TRANSFERS, archive_history, file_lock, history_archive
+
+CUTOFF = datetime(2020, 1, 1)
+
+
+@pytest.fixture
+def archive_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(history_archive, "directory", tmp_path)
+    return tmp_path
+
+
+class TestHistoryArchive:
+    """Test cases for the history archive job and the archived read path."""
+
+    def _counts(self, session: Session, item, location, user, *times_and_quantities):
+        counts = [
+            Count(item_id=item.id, location_id=location.id, user_id=user.id, quantity=quantity, counted_at=at)
+            for at, quantity in times_and_quantities
+        ]
+        session.add_all(counts)
+        session.commit()
+        return [count.id for count in counts]
+
+    def test_counts_move_to_archive_with_rollups(
+        self, client: TestClient, test_session, test_engine, archive_dir,
+        sample_inventory_item, sample_location, sample_user,
+    ):
+        """Test old counts leave the table for monthly files and rollups, and date filters still return them."""
+        nov, nov_late, dec, live = self._counts(
+            test_session, sample_inventory_item, sample_location, sample_user,
+            (datetime(2019, 11, 5, 9), 4.0), (datetime(2019, 11, 20, 9), 6.0),
+            (datetime(2019, 12, 1, 9), 8.0), (datetime(2020, 2, 1, 9), 10.0),
+        )
+
+        assert history_archive.archive(test_engine, COUNTS, CUTOFF, batch_size=2) == 3
+        assert sorted(path.name for _, _, path in history_archive.files(COUNTS, location_id=sample_location.id)) == [
+            "2019-11.columns.json.gz", "2019-12.columns.json.gz",
+        ]
+        remaining = test_session.exec(select(Count.id).where(Count.location_id == sample_location.id)).all()
+        assert remaining == [live]
+
+        rollups = test_session.exec(
+            select(CountRollup).where(CountRollup.location_id == sample_location.id).order_by(CountRollup.month)
+        ).all()
+        assert [(r.month, r.counts, r.total_quantity, r.last_quantity) for r in rollups] == [
+            (date(2019, 11, 1), 2, 10.0, 6.0), (date(2019, 12, 1), 1, 8.0, 8.0),
+        ]
+
+        url = f"/api/v1/counts/?location_id={sample_location.id}&since=2019-01-01T00:00:00"
+        assert [count["id"] for count in client.get(url).json()] == [live, dec, nov_late, nov]
+        assert [count["id"] for count in client.get(f"{url}&skip=1&limit=2").json()] == [dec, nov_late]
+        assert [count["id"] for count in client.get(f"{url}&skip=3").json()] == [nov]
+
+        by_day = client.get(f"/api/v1/counts/?location_id={sample_location.id}&count_date=2019-11-05&expand=item")
+        [archived] = by_day.json()
+        assert archived["id"] == nov
+        assert archived["counted_at"] == "2019-11-05T09:00:00"
+        assert archived["item"]["id"] == sample_inventory_item.id
+
+    def test_transfers_move_to_archive(
+        self, client: TestClient, test_session, test_engine, archive_dir,
+        sample_inventory_item, sample_location, sample_user,
+    ):
+        """Test old transfers are archived per sending location and listed by date range."""
+        transfers = [
+            Transfer(item_id=sample_inventory_item.id, from_location_id=sample_location.id,
+                     to_location_id=sample_location.id, quantity=quantity, transferred_by=sample_user.id,
+                     transferred_at=at)
+            for at, quantity in ((datetime(2019, 6, 1), 2.0), (datetime(2019, 6, 2), 3.0))
+        ]
+        test_session.add_all(transfers)
+        test_session.commit()
+        ids = [transfer.id for transfer in transfers]
+
+        assert history_archive.archive(test_engine, TRANSFERS, CUTOFF, batch_size=100) == 2
+        [rollup] = test_session.exec(
+            select(TransferRollup).where(TransferRollup.from_location_id == sample_location.id)
+        ).all()
+        assert (rollup.transfers, rollup.total_quantity) == (2, 5.0)
+
+        response = client.get(f"/api/v1/transfers/?from_location_id={sample_location.id}&until=2019-12-31T00:00:00")
+        assert response.status_code == 200
+        assert [transfer["id"] for transfer in response.json()] == ids[::-1]
+
+    def test_rows_changed_while_archiving_keep_their_latest_version(
+        self, test_session, test_engine, archive_dir, monkeypatch,
+        sample_inventory_item, sample_location, sample_user,
+    ):
+        """Test a row edited between its file write and the delete stays live, then is archived as edited."""
+        first, second = self._counts(
+            test_session, sample_inventory_item, sample_location, sample_user,
+            (datetime(2019, 5, 1, 9), 1.0), (datetime(2019, 5, 2, 9), 2.0),
+        )
+        write = history_archive.write
+        edits = []
+
+        def write_then_edit(spec, location_id, month, rows, remove=()):
+            columns = write(spec, location_id, month, rows, remove)
+            if rows and not edits:
+                edits.append(first)
+                with test_engine.begin() as connection:
+                    connection.execute(Count.__table__.update().where(Count.id == first).values(quantity=5.0))
+            return columns
+        monkeypatch.setattr(history_archive, "write", write_then_edit)
+
+        assert history_archive.archive(test_engine, COUNTS, CUTOFF, batch_size=100) == 2
+        assert test_session.exec(select(Count.id).where(Count.location_id == sample_location.id)).all() == []
+        archived = {row.id: row.quantity for row in history_archive.read(COUNTS, location_id=sample_location.id)}
+        assert archived == {first: 5.0, second: 2.0}
+        [rollup] = test_session.exec(select(CountRollup).where(CountRollup.location_id == sample_location.id)).all()
+        assert (rollup.counts, rollup.total_quantity) == (2, 7.0)
+
+    def test_reads_merge_live_and_archived_rows_in_order(
+        self, client: TestClient, test_session, test_engine, archive_dir,
+        sample_inventory_item, sample_location, sample_user,
+    ):
+        """Test archived rows interleave with older live ones, and a row in both places is listed once."""
+        archived_id, live = self._counts(
+            test_session, sample_inventory_item, sample_location, sample_user,
+            (datetime(2019, 8, 1, 9), 1.0), (datetime(2020, 2, 1, 9), 4.0),
+        )
+        assert history_archive.archive(test_engine, COUNTS, CUTOFF, batch_size=100) == 1
+        # Backdated after the run, and a row whose delete never committed
+        older, duplicated = self._counts(
+            test_session, sample_inventory_item, sample_location, sample_user,
+            (datetime(2019, 7, 1, 9), 2.0), (datetime(2019, 9, 1, 9), 3.0),
+        )
+        row = dict(test_session.get(Count, duplicated).dict())
+        history_archive.write(COUNTS, sample_location.id, date(2019, 9, 1), [row])
+
+        url = f"/api/v1/counts/?location_id={sample_location.id}&since=2019-01-01T00:00:00"
+        assert [count["id"] for count in client.get(url).json()] == [live, duplicated, archived_id, older]
+        assert [count["id"] for count in client.get(f"{url}&skip=2&limit=1").json()] == [archived_id]
+
+    def _row(self, id: int, quantity: float = 1.0):
+        return {
+            "id": id, "item_id": 1, "location_id": 7, "user_id": 1, "quantity": quantity,
+            "counted_at": datetime(2019, 3, 4), "approved": False, "approved_by": None, "approved_at": None,
+            "created_at": datetime(2019, 3, 4), "updated_at": datetime(2019, 3, 4),
+        }
+
+    def test_rewriting_a_month_replaces_rows_by_id(self, archive_dir):
+        """Test re-archiving rows after an interrupted run does not duplicate them."""
+        row = self._row(1)
+        history_archive.write(COUNTS, 7, date(2019, 3, 1), [row])
+        columns = history_archive.write(COUNTS, 7, date(2019, 3, 1), [dict(row, quantity=2.0)])
+        assert columns["quantity"] == [2.0]
+        assert [found.quantity for found in history_archive.read(COUNTS, location_id=7)] == [2.0]
+
+    def test_concurrent_writers_do_not_lose_rows(self, archive_dir):
+        """Test simultaneous rewrites of one month's file keep every writer's rows."""
+        barrier = threading.Barrier(8)
+
+        def write(id):
+            barrier.wait()
+            history_archive.write(COUNTS, 7, date(2019, 3, 1), [self._row(id)])
+
+        threads = [threading.Thread(target=write, args=(id,)) for id in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(found.id for found in history_archive.read(COUNTS, location_id=7)) == list(range(8))
+
+    def test_only_one_worker_archives_at_a_time(self, test_engine, archive_dir):
+        """Test a run is skipped while another worker holds the archive job lock."""
+        with file_lock(archive_dir / JOB_LOCK_FILE, blocking=False) as acquired:
+            assert acquired
+            assert archive_history(test_engine, older_than_days=3650) == {}
+        assert set(archive_history(test_engine, older_than_days=3650)) == {"count", "transfer"}
@@ -0,0 +1,38 @@
+from datetime import date, datetime
+
+from app.services.count_partitions import (
+    Partition, add_months, create_partition_sql, expired_partitions, is_partitioned, maintain, upper_bound,
+)
+
+
+class TestCountPartitions:
+    """Test cases for monthly partitioning of the count table."""
+
+    def test_monthly_partition_ddl(self):
+        """Test partitions are named per month and cover exactly one month, across year ends."""
+        assert add_months(date(2025, 11, 1), 2) == date(2026, 1, 1)
+        assert add_months(date(2025, 1, 1), -1) == date(2024, 12, 1)
+        assert create_partition_sql(date(2025, 12, 1)) == (
+            "CREATE TABLE IF NOT EXISTS count_y2025m12 PARTITION OF count "
+            "FOR VALUES FROM ('2025-12-01') TO ('2026-01-01')"
+        )
+
+    def test_expired_partitions(self):
+        """Test only partitions entirely older than the retention window are detached."""
+        partitions = [
+            Partition("count_legacy", upper_bound("FOR VALUES FROM (MINVALUE) TO ('2025-03-01 00:00:00')")),
+            Partition("count_y2025m03", upper_bound("FOR VALUES FROM ('2025-03-01 00:00:00') TO ('2025-04-01 00:00:00')")),
+            Partition("count_y2025m04", upper_bound("FOR VALUES FROM ('2025-04-01 00:00:00') TO ('2025-05-01 00:00:00')")),
+            Partition("count_default", upper_bound("DEFAULT")),
+        ]
+        assert partitions[1].upper == datetime(2025, 4, 1)
+        assert partitions[3].upper is None
+
+        expired = expired_partitions(partitions, retain_months=3, today=date(2025, 7, 15))
+        assert [partition.name for partition in expired] == ["count_legacy", "count_y2025m03"]
+
+    def test_not_applied_outside_postgresql(self, test_engine):
+        """Test SQLite databases are never treated as partitioned and maintenance does nothing."""
+        with test_engine.connect() as connection:
+            assert not is_partitioned(connection)
+        maintain(test_engine)
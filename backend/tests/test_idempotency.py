@@ -0,0 +1,146 @@
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, update
+from sqlmodel import Session, SQLModel, func, select
+
+from app.core.idempotency import (
+    CLAIMED, IN_PROGRESS, MISMATCH, REPLAY, IdempotencyStore, StoredResponse, idempotency_store, should_store,
+)
+from app.models import Count, IdempotencyKey
+
+
+def make_store(engine, **options) -> IdempotencyStore:
+    settings = {"ttl": 60, "lock_seconds": 30, "wait_seconds": 1, "max_response_bytes": 1024, "purge_interval": 60}
+    store = IdempotencyStore(**{**settings, **options})
+    store.engine = engine
+    return store
+
+
+class TestIdempotencyStore:
+    """Test cases for claiming, completing and expiring idempotency keys."""
+
+    @pytest.fixture
+    def engine(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'keys.db'}", connect_args={"check_same_thread": False})
+        SQLModel.metadata.create_all(engine, tables=[IdempotencyKey.__table__])
+        yield engine
+        engine.dispose()
+
+    def test_claim_complete_and_replay(self, engine):
+        """Test the first claim wins, duplicates wait, and the stored response is replayed."""
+        store = make_store(engine)
+        assert store.claim("k", "a", "first") == (CLAIMED, None)
+        assert store.claim("k", "a", "second") == (IN_PROGRESS, None)
+        assert store.claim("k", "b", "third") == (MISMATCH, None)
+
+        assert store.complete("k", "first", StoredResponse(201, [(b"content-type", b"application/json")], b'{"id": 1}'))
+        outcome, stored = store.claim("k", "a", "fourth")
+        assert outcome == REPLAY
+        assert (stored.status_code, stored.headers, stored.body) == (201, [(b"content-type", b"application/json")], b'{"id": 1}')
+
+        # A released key runs again
+        assert store.claim("other", "a", "first")[0] == CLAIMED
+        assert store.release("other", "first")
+        assert store.claim("other", "a", "second")[0] == CLAIMED
+
+    def test_concurrent_duplicates_are_claimed_once(self, engine):
+        """Test only one of many simultaneous requests with the same key gets to run."""
+        store = make_store(engine)
+        barrier = threading.Barrier(8)
+        outcomes = []
+
+        def claim(claim_token):
+            barrier.wait()
+            outcomes.append(store.claim("k", "a", claim_token)[0])
+
+        threads = [threading.Thread(target=claim, args=(str(i),)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(outcomes) == [CLAIMED] + [IN_PROGRESS] * 7
+
+    def test_stale_locks_and_expired_keys(self, engine):
+        """Test an abandoned key can be taken over and expired keys are purged."""
+        store = make_store(engine, lock_seconds=0)
+        assert store.claim("abandoned", "a", "slow")[0] == CLAIMED
+        assert store.claim("abandoned", "a", "retry")[0] == CLAIMED
+        # The slow first owner can no longer settle the key the retry now holds
+        assert not store.complete("abandoned", "slow", StoredResponse(200, [], b"{}"))
+        assert not store.release("abandoned", "slow")
+        assert store.complete("abandoned", "retry", StoredResponse(201, [], b"{}"))
+        assert store.claim("abandoned", "a", "later")[1].status_code == 201
+
+        store.claim("done", "a", "first")
+        store.complete("done", "first", StoredResponse(200, [], b"{}"))
+        with engine.begin() as connection:
+            connection.execute(update(IdempotencyKey.__table__).values(expires_at=datetime.utcnow() - timedelta(seconds=1)))
+        assert store.purge() == 2
+        assert store.claim("done", "b", "second")[0] == CLAIMED
+
+
+class TestIdempotentRequests:
+    """Test cases for the Idempotency-Key header on write endpoints."""
+
+    @pytest.fixture(autouse=True)
+    def store(self, test_engine):
+        # Its own connection, so claiming a key never commits the test session's transaction
+        engine = create_engine(test_engine.url, connect_args={"check_same_thread": False})
+        previous = idempotency_store.engine, idempotency_store.wait_seconds
+        idempotency_store.engine = engine
+        yield idempotency_store
+        idempotency_store.engine, idempotency_store.wait_seconds = previous
+        engine.dispose()
+
+    def _post_count(self, client: TestClient, test_data, key: str, quantity: float = 4.0):
+        return client.post("/api/v1/counts/", headers={"Idempotency-Key": key}, json={
+            "item_id": test_data["inventory_item"].id,
+            "user_id": test_data["user"].id,
+            "location_id": test_data["location"].id,
+            "quantity": quantity,
+            "counted_at": "2025-08-01T10:00:00",
+        })
+
+    def test_retries_replay_the_first_response(self, client: TestClient, test_session: Session, test_data):
+        """Test a retried write runs once and gets the original response back."""
+        before = test_session.exec(select(func.count()).select_from(Count)).one()
+        key = str(uuid.uuid4())
+        first = self._post_count(client, test_data, key)
+        retry = self._post_count(client, test_data, key)
+
+        assert first.status_code == retry.status_code == 201
+        assert retry.content == first.content
+        assert retry.headers["idempotent-replayed"] == "true"
+        assert "idempotent-replayed" not in first.headers
+        assert retry.headers["x-correlation-id"] != first.headers["x-correlation-id"]
+        assert test_session.exec(select(func.count()).select_from(Count)).one() == before + 1
+
+        # Reusing the key for a different request is an error, not a replay
+        response = self._post_count(client, test_data, key, quantity=5.0)
+        assert response.status_code == 422
+        assert response.json()["error"]["code"] == "IDEMPOTENCY_KEY_REUSED"
+
+    def test_in_progress_and_unstored_responses(self, client: TestClient, test_data, store):
+        """Test duplicates of a running request get 409 and only repeatable responses are stored."""
+        key = str(uuid.uuid4())
+        assert self._post_count(client, test_data, key).status_code == 201
+        # As if the first request were still running
+        with store.engine.begin() as connection:
+            connection.execute(update(IdempotencyKey.__table__).where(IdempotencyKey.key.endswith(key)).values(state=IN_PROGRESS))
+        store.wait_seconds = 0
+        response = self._post_count(client, test_data, key)
+        assert response.status_code == 409
+        assert response.json()["error"]["code"] == "IDEMPOTENCY_KEY_IN_PROGRESS"
+        assert response.headers["retry-after"] == "1"
+        assert self._post_count(client, test_data, "not a key!").status_code == 400
+
+        # A 404 is what a retry would get too, so it is replayed
+        key = str(uuid.uuid4())
+        assert client.delete("/api/v1/counts/0", headers={"Idempotency-Key": key}).status_code == 404
+        assert client.delete("/api/v1/counts/0", headers={"Idempotency-Key": key}).headers["idempotent-replayed"] == "true"
+        # Server errors and throttling may succeed next time, so their keys are released
+        assert (should_store(500), should_store(503), should_store(429), should_store(422)) == (False, False, False, True)
@@ -0,0 +1,36 @@
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.pool import StaticPool
+
+from app.core.query_monitor import QueryMonitor
+from app.models.count import Count
+from app.services.index_advisor import advise, compile_shape, hot_query_shapes, load_shapes
+
+
+class TestIndexAdvisor:
+    """Test cases for the composite indexes and the index advisor."""
+
+    def test_hot_paths_use_indexes(self, test_engine):
+        """Test every hot query shape is served by an index, and an unindexed filter is flagged."""
+        shapes = [compile_shape(name, query, test_engine) for name, query in hot_query_shapes()]
+        shapes.append(compile_shape("counts by quantity", select(Count).where(Count.quantity > 5), test_engine))
+
+        reports = advise(test_engine, shapes)
+        flagged = {report.shape.name: report.sequential_scans for report in reports if not report.ok}
+        assert flagged == {"counts by quantity": ["count"]}
+
+    def test_replays_shapes_captured_by_query_monitor(self, tmp_path):
+        """Test shapes recorded from live queries are replayed once each with their parameters."""
+        shapes_file = tmp_path / "shapes.jsonl"
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        QueryMonitor(0, 0, 0, 0, False, shapes_file=str(shapes_file)).watch(engine)
+        with engine.begin() as connection:
+            connection.execute(text("CREATE TABLE note (id INTEGER PRIMARY KEY, owner INTEGER, body TEXT)"))
+            connection.execute(text("CREATE INDEX ix_note_owner ON note (owner)"))
+            for owner in (1, 2):
+                connection.execute(text("SELECT id FROM note WHERE owner = :owner"), {"owner": owner})
+            connection.execute(text("SELECT id FROM note WHERE body = :body"), {"body": "x"})
+
+        shapes = list(load_shapes(str(shapes_file)))
+        assert [shape.parameters for shape in shapes] == [(1,), ("x",)]
+        reports = advise(engine, shapes)
+        assert [report.sequential_scans for report in reports] == [[], ["note"]]
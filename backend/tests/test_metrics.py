@@ -0,0 +1,74 @@
+import os
+import subprocess
+import sys
+
+import orjson
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from app.core.metrics import HTTP_REQUESTS, MetricsRegistry, instrument_engine, metrics
+from app.core.middleware import RequestPipeline
+
+
+def sample(exposition: str, series: str) -> float:
+    """Value of one series line in a text exposition."""
+    for line in exposition.splitlines():
+        if line.startswith(series + " "):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{series} not found in:\n{exposition}")
+
+
+class TestMetrics:
+    """Test cases for the metrics registry, its collectors and exposition."""
+
+    def test_requests_and_queries_are_recorded_per_route(self):
+        """Test requests and their SQL are labelled with the route template, not the raw path."""
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        instrument_engine(engine)
+        app = FastAPI()
+
+        @app.get("/things/{thing_id}")
+        def get_thing(thing_id: int):
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+                connection.execute(text("SELECT 2"))
+            return {"id": thing_id}
+
+        metrics.reset()
+        client = TestClient(RequestPipeline(app, rate_limiting=False))
+        assert client.get("/things/1").status_code == 200
+        assert client.get("/things/2").status_code == 200
+        assert client.get("/nowhere").status_code == 404
+
+        exposition = metrics.render()
+        route = 'route="/things/{thing_id}"'
+        assert sample(exposition, f'http_requests_total{{method="GET",{route},status="200"}}') == 2
+        assert sample(exposition, 'http_requests_total{method="GET",route="unmatched",status="404"}') == 1
+        assert sample(exposition, f'http_request_duration_seconds_count{{method="GET",{route}}}') == 2
+        assert sample(exposition, f'http_request_duration_seconds_bucket{{method="GET",{route},le="+Inf"}}') == 2
+        assert sample(exposition, f"db_queries_total{{{route}}}") == 4
+        assert sample(exposition, f"db_query_duration_seconds_count{{{route}}}") == 4
+        assert sample(exposition, "http_requests_in_flight") == 0
+        assert sample(exposition, "db_pool_checkout_wait_seconds_count") >= 1
+        assert "# TYPE http_request_duration_seconds histogram" in exposition
+        assert 'cache_hits_total{cache="catalog"}' in exposition
+
+    def test_workers_aggregate_through_shared_directory(self, tmp_path):
+        """Test one worker's scrape sums every worker's counters and drops gauges of exited ones."""
+        worker = MetricsRegistry(directory=str(tmp_path))
+        worker.inc(HTTP_REQUESTS, ("GET", "/items", "200"), 3)
+
+        exited = subprocess.Popen([sys.executable, "-c", "pass"])
+        exited.wait()
+        other = MetricsRegistry(directory=str(tmp_path))
+        other.inc(HTTP_REQUESTS, ("GET", "/items", "200"), 2)
+        other.in_flight = 7
+        snapshot = {**other.snapshot(), "pid": exited.pid}
+        (tmp_path / f"metrics-{exited.pid}.json").write_bytes(orjson.dumps(snapshot))
+
+        exposition = worker.render()
+        assert sample(exposition, 'http_requests_total{method="GET",route="/items",status="200"}') == 5
+        assert sample(exposition, "http_requests_in_flight") == 0
+        assert (tmp_path / f"metrics-{os.getpid()}.json").exists()
@@ -0,0 +1,116 @@
+import json
+import logging
+import queue
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.exceptions import NotFoundError
+from app.core import logging as app_logging
+from app.core.logging import CorrelationFilter, DroppingQueueHandler, StructuredFormatter, set_correlation_id
+from app.core.middleware import RequestPipeline
+from app.core.profiling import BACKGROUND_THREAD_PREFIX
+
+
+class TestRequestPipeline:
+    """Test cases for the ASGI request pipeline."""
+
+    def _client(self, **options) -> TestClient:
+        app = FastAPI()
+
+        @app.post("/api/v1/items")
+        def create_item():
+            return {"created": True}
+
+        @app.get("/api/v1/items/missing")
+        def missing_item():
+            raise NotFoundError("Item", "7")
+
+        @app.get("/api/v1/broken")
+        def broken():
+            raise RuntimeError("boom")
+
+        headers = {"X-Frame-Options": "DENY", "Content-Security-Policy": "default-src 'self'", "Strict-Transport-Security": ""}
+        app.add_middleware(RequestPipeline, security_headers=headers, rate_limiting=False, **options)
+        return TestClient(app)
+
+    def test_headers_and_correlation_ids(self):
+        """Test every response carries security headers and a correlation ID, reusing a valid incoming one."""
+        client = self._client()
+        response = client.post("/api/v1/items", json={})
+        assert response.status_code == 200
+        assert response.headers["x-frame-options"] == "DENY"
+        assert response.headers["content-security-policy"] == "default-src 'self'"
+        assert "strict-transport-security" not in response.headers
+        assert len(response.headers["x-correlation-id"]) == 32
+
+        response = client.post("/api/v1/items", json={}, headers={"X-Correlation-ID": "req-123"})
+        assert response.headers["x-correlation-id"] == "req-123"
+        response = client.post("/api/v1/items", json={}, headers={"X-Correlation-ID": "bad id\n"})
+        assert response.headers["x-correlation-id"] != "bad id\n"
+
+        # Swagger UI loads from a CDN, so docs pages are served without the CSP
+        response = client.get("/docs")
+        assert response.status_code == 200
+        assert "content-security-policy" not in response.headers
+        assert response.headers["x-frame-options"] == "DENY"
+
+    def test_validation_and_error_mapping(self):
+        """Test bad bodies are rejected up front and escaped exceptions become the error envelope."""
+        client = self._client(max_body_size=100)
+        assert client.post("/api/v1/items").status_code == 200
+        response = client.post("/api/v1/items", content="x=1", headers={"Content-Type": "text/plain"})
+        assert response.status_code == 415
+        response = client.post("/api/v1/items", json={"name": "x" * 200})
+        assert response.status_code == 413
+        assert response.json()["error"]["code"] == "REQUEST_TOO_LARGE"
+
+        response = client.get("/api/v1/items/missing")
+        assert response.status_code == 404
+        assert response.json()["error"]["code"] == "NOT_FOUND_ERROR"
+
+        response = client.get("/api/v1/broken", headers={"X-Correlation-ID": "req-500"})
+        assert response.status_code == 500
+        assert response.json()["error"]["correlation_id"] == "req-500"
+        assert response.headers["x-correlation-id"] == "req-500"
+
+    def test_successful_request_logs_are_sampled(self, caplog, monkeypatch):
+        """Test LOG_SAMPLE_RATE_2XX thins out 2xx request logs but never error logs."""
+        monkeypatch.setattr(settings, "LOG_SAMPLE_RATE_2XX", 0.0)
+        client = self._client()
+        with caplog.at_level(logging.INFO, logger="app.core.middleware"):
+            client.post("/api/v1/items", json={})
+            client.get("/api/v1/items/missing")
+            client.get("/api/v1/broken")
+        statuses = [record.extra_fields["status_code"] for record in caplog.records
+                    if record.getMessage() == "Request completed"]
+        assert statuses == [404, 500]
+
+    def test_queue_handler_prepares_records_for_the_writer_thread(self):
+        """Test queued records keep their correlation ID and traceback, and overflow is dropped."""
+        handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+        handler.addFilter(CorrelationFilter())
+        logger = logging.getLogger("test.queue_handler")
+        logger.propagate = False
+        logger.addHandler(handler)
+        try:
+            set_correlation_id("req-log")
+            try:
+                raise ValueError("bad value")
+            except ValueError:
+                logger.exception("Failed %s", "import", extra={"extra_fields": {"rows": 3}})
+            logger.error("overflow")
+        finally:
+            logger.removeHandler(handler)
+            set_correlation_id("")
+
+        assert handler.dropped == 1
+        record = handler.queue.get_nowait()
+        entry = json.loads(StructuredFormatter().format(record))
+        assert entry["message"] == "Failed import"
+        assert entry["correlation_id"] == "req-log"
+        assert entry["rows"] == 3
+        assert "ValueError: bad value" in entry["exception"]
+        # The writer thread is a background thread, so profiles leave it out
+        assert app_logging._listener._thread.name.startswith(BACKGROUND_THREAD_PREFIX)
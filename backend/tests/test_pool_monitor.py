@@ -0,0 +1,122 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from app.core.config import Settings
+from app.core.engine_hooks import engine_hooks
+from app.core.metrics import instrument_engine
+from app.core.pool_monitor import PoolMonitor
+from app.core.query_monitor import QueryMonitor
+
+
+def leak_connection(engine):
+    """Check a connection out and never return it."""
+    return engine.connect()
+
+
+class TestPoolMonitor:
+    """Test cases for pool configuration, checkout telemetry and leak detection."""
+
+    @pytest.fixture
+    def engine(self, tmp_path):
+        engine = create_engine(
+            f"sqlite:///{tmp_path / 'pool.db'}", connect_args={"check_same_thread": False},
+            poolclass=QueuePool, pool_size=1, max_overflow=1, pool_timeout=0.05,
+        )
+        yield engine
+        engine.dispose()
+
+    def test_pool_settings_and_adaptive_sizing(self):
+        """Test DB_POOL_* settings override the environment defaults and adaptive sizing caps them."""
+        config = Settings(ENVIRONMENT="production").get_database_config()
+        assert (config["pool_size"], config["max_overflow"], config["pool_recycle"]) == (20, 30, 3600)
+
+        config = Settings(DB_POOL_SIZE=7, DB_MAX_OVERFLOW=3, DB_POOL_TIMEOUT_SECONDS=2, DB_POOL_RECYCLE_SECONDS=60).get_database_config()
+        assert config == {"pool_size": 7, "max_overflow": 3, "pool_recycle": 60, "pool_timeout": 2, "pool_pre_ping": True}
+
+        # 4 workers share 100 server connections: 25 each, of which 20 stay open
+        config = Settings(ENVIRONMENT="production", DB_POOL_ADAPTIVE=True, WEB_CONCURRENCY=4).get_database_config()
+        assert (config["pool_size"], config["max_overflow"]) == (20, 5)
+        # 8 threads can never use more than 8 connections plus the background jobs
+        config = Settings(ENVIRONMENT="production", DB_POOL_ADAPTIVE=True, THREADPOOL_SIZE=8).get_database_config()
+        assert (config["pool_size"], config["max_overflow"]) == (12, 0)
+        # Each optional background job started adds its connections
+        config = Settings(
+            ENVIRONMENT="production", DB_POOL_ADAPTIVE=True, THREADPOOL_SIZE=8, DATABASE_URL="postgresql://db/inventory",
+            ARCHIVE_ENABLED=True, COUNT_PARTITIONING_ENABLED=True, IDEMPOTENCY_ENABLED=False,
+        ).get_database_config()
+        assert (config["pool_size"], config["max_overflow"]) == (14, 0)
+
+    def test_checkouts_waits_and_timeouts_are_counted(self, engine, caplog):
+        """Test checkouts, overflow peaks and pool timeouts, which log the longest holders' stacks."""
+        monitor = PoolMonitor(leak_seconds=30, capture_stacks=True)
+        monitor.watch(engine, "primary")
+
+        first, second = engine.connect(), leak_connection(engine)
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+
+        pool = monitor.stats(min_held_seconds=0)["pools"]["primary"]
+        assert pool["config"]["size"] == 1 and pool["config"]["max_overflow"] == 1
+        assert (pool["checked_out"], pool["overflow"], pool["peak_overflow"]) == (2, 1, 1)
+        assert (pool["checkouts"], pool["timeouts"]) == (2, 1)
+        assert pool["wait_seconds_max"] >= 0.05
+        assert len(pool["held_over_threshold"]) == 2
+        assert "Timed out waiting for a connection from pool primary" in caplog.text
+        assert "leak_connection" in caplog.text
+
+        first.close()
+        second.close()
+        samples = {(metric.name, labels): value for metric, labels, value in monitor.collect()}
+        assert samples[("db_pool_checkouts_total", ("primary",))] == 2
+        assert samples[("db_pool_timeouts_total", ("primary",))] == 1
+        assert samples[("db_pool_held_too_long", ("primary",))] == 0
+
+    def test_long_held_connections_are_reported_with_their_stack(self, engine, caplog):
+        """Test connections past the threshold are reported once while held and counted when returned."""
+        monitor = PoolMonitor(leak_seconds=0.01, capture_stacks=True)
+        monitor.watch(engine, "primary")
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
+        leaked = leak_connection(engine)
+        monitor._stop.wait(0.02)
+        found = monitor.check()
+        assert [name for name, _ in found] == ["primary"]
+        assert "leak_connection" in found[0][1].format_stack()
+        assert "sqlalchemy" not in found[0][1].format_stack()
+        assert "Possible connection leak" in caplog.text
+        assert monitor.check() == []
+
+        held = monitor.stats()["pools"]["primary"]["held_over_threshold"]
+        assert len(held) == 1 and held[0]["held_seconds"] >= 0.01
+        leaked.close()
+        pool = monitor.stats()["pools"]["primary"]
+        assert (pool["long_holds"], pool["held_over_threshold"]) == (1, [])
+
+    def test_untracked_pools_are_not_reported(self, engine):
+        """Test pools that hold connections on purpose are counted but never reported as leaking."""
+        monitor = PoolMonitor(leak_seconds=0.01, capture_stacks=True)
+        monitor.watch(engine, "sqlite-writer", track_leaks=False)
+        connection = engine.connect()
+        monitor._stop.wait(0.02)
+        assert monitor.check() == []
+        assert monitor.stats()["pools"]["sqlite-writer"]["checkouts"] == 1
+        connection.close()
+
+    def test_monitors_share_one_set_of_listeners(self, engine):
+        """Test metrics, the query monitor and the pool monitor time each statement and checkout once."""
+        instrument_engine(engine, "primary")
+        QueryMonitor(max_queries=0, max_seconds=0, n_plus_one_threshold=0, slow_seconds=0, explain=False).watch(engine)
+        monitor = PoolMonitor(leak_seconds=0, capture_stacks=False)
+        monitor.watch(engine, "primary")
+
+        hooks = engine_hooks(engine)
+        assert (len(hooks.query_observers), len(hooks.connect_observers), len(hooks.checkout_observers)) == (2, 2, 1)
+        assert len(engine.dispatch.before_cursor_execute) == 1
+        assert len(engine.pool.dispatch.checkout) == 1
+
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        assert monitor.stats()["pools"]["primary"]["checkouts"] == 1
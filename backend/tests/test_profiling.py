@@ -0,0 +1,93 @@
+import os
+import threading
+import time
+
+import orjson
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import profiling
+from app.core.config import settings
+from app.core.middleware import RequestPipeline
+from app.core.profiling import Profiler, background_thread, can_profile
+
+
+def busy_work(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+class TestProfiling:
+    """Test cases for the opt-in request profiler."""
+
+    def _client(self, profiler: Profiler, monkeypatch) -> TestClient:
+        # Handlers defined here live outside the app package, so count this directory as ours
+        monkeypatch.setattr(profiling, "APP_DIR", os.path.dirname(os.path.abspath(__file__)))
+        app = FastAPI()
+
+        @app.get("/api/v1/reports/{report_id}")
+        def report(report_id: int):
+            busy_work(0.05)
+            return {"id": report_id}
+
+        app.add_middleware(RequestPipeline, rate_limiting=False, profiler=profiler)
+        return TestClient(app)
+
+    def test_profile_header_writes_flamegraph(self, tmp_path, monkeypatch):
+        """Test X-Profile: 1 writes a collapsed-stack profile and returns its path."""
+        client = self._client(Profiler(True, str(tmp_path), "collapsed", 0.001, 0), monkeypatch)
+
+        assert "X-Profile-Path" not in client.get("/api/v1/reports/1").headers
+        response = client.get("/api/v1/reports/1", headers={"X-Profile": "1"})
+        assert response.status_code == 200
+        path = response.headers["X-Profile-Path"]
+        with open(path) as f:
+            lines = f.read().splitlines()
+        assert lines and all(line.startswith("GET /api/v1/reports/{report_id};") for line in lines)
+        assert any("busy_work (" in line for line in lines)
+
+    def test_background_threads_are_left_out(self, tmp_path, monkeypatch):
+        """Test threads started with background_thread() never show up in request profiles."""
+        client = self._client(Profiler(True, str(tmp_path), "collapsed", 0.001, 0), monkeypatch)
+        stop = threading.Event()
+
+        def compact_in_background():
+            while not stop.is_set():
+                busy_work(0.001)
+
+        thread = background_thread("test-compactor", compact_in_background)
+        thread.start()
+        try:
+            path = client.get("/api/v1/reports/1", headers={"X-Profile": "1"}).headers["X-Profile-Path"]
+        finally:
+            stop.set()
+            thread.join()
+        assert thread.name == "background:test-compactor" and thread.daemon
+        with open(path) as f:
+            profile = f.read()
+        assert "busy_work (" in profile
+        assert "compact_in_background" not in profile
+
+    def test_speedscope_output_and_aggregate_sampling(self, tmp_path, monkeypatch):
+        """Test speedscope files are well formed and 1 in N requests feed the aggregate profile."""
+        client = self._client(Profiler(True, str(tmp_path), "speedscope", 0.001, 2), monkeypatch)
+
+        path = client.get("/api/v1/reports/1", headers={"X-Profile": "1"}).headers["X-Profile-Path"]
+        with open(path, "rb") as f:
+            document = orjson.loads(f.read())
+        profile = document["profiles"][0]
+        assert profile["type"] == "sampled" and len(profile["samples"]) == len(profile["weights"]) > 0
+        assert any(frame["name"] == "busy_work" for frame in document["shared"]["frames"])
+
+        client.get("/api/v1/reports/2")
+        with open(tmp_path / f"aggregate-{os.getpid()}.folded") as f:
+            assert "busy_work (" in f.read()
+
+    def test_production_requires_admin(self, monkeypatch):
+        """Test only system:admin may profile in production."""
+        monkeypatch.setattr(settings, "ENVIRONMENT", "production")
+        assert not can_profile(None)
+        assert not can_profile("Bearer not-a-token")
+        monkeypatch.setattr(settings, "ENVIRONMENT", "development")
+        assert can_profile(None)
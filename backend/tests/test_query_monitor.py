@@ -0,0 +1,127 @@
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from app.core.middleware import RequestPipeline
+from app.core.query_monitor import QueryMonitor
+
+
+def warnings_from(caplog, name: str):
+    return [record for record in caplog.records if record.name == name and record.levelno == logging.WARNING]
+
+
+class TestQueryMonitor:
+    """Test cases for per-request query budgets, N+1 detection and the slow-query log."""
+
+    def _client(self, monitor: QueryMonitor) -> TestClient:
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        with engine.begin() as connection:
+            connection.execute(text("CREATE TABLE item (id INTEGER PRIMARY KEY, name TEXT)"))
+            connection.execute(text("INSERT INTO item (id, name) VALUES (1, 'a'), (2, 'b'), (3, 'c')"))
+        monitor.watch(engine)
+        app = FastAPI()
+
+        @app.get("/items/{item_id}")
+        def get_item(item_id: int):
+            with engine.connect() as connection:
+                return {"name": connection.execute(text("SELECT name FROM item WHERE id = :id"), {"id": item_id}).scalar()}
+
+        @app.get("/items")
+        def list_items():
+            # One query per row: the N+1 shape
+            with engine.connect() as connection:
+                ids = [row.id for row in connection.execute(text("SELECT id FROM item"))]
+                return [
+                    connection.execute(text("SELECT name FROM item WHERE id = :id"), {"id": i}).scalar()
+                    for i in ids
+                ]
+
+        app.add_middleware(RequestPipeline, rate_limiting=False, monitor=monitor)
+        return TestClient(app)
+
+    def test_budget_and_n_plus_one_warnings(self, caplog):
+        """Test requests over budget or repeating a statement per row are flagged with their correlation ID."""
+        monitor = QueryMonitor(max_queries=3, max_seconds=0, n_plus_one_threshold=3, slow_seconds=0, explain=False)
+        client = self._client(monitor)
+
+        with caplog.at_level(logging.WARNING, logger="app.core.query_monitor"):
+            client.get("/items/1")
+            assert not warnings_from(caplog, "app.core.query_monitor")
+
+            client.get("/items", headers={"X-Correlation-ID": "n-plus-one-check"})
+        messages = {record.getMessage(): record for record in warnings_from(caplog, "app.core.query_monitor")}
+        assert "Query budget exceeded on /items" in messages
+        n_plus_one = messages["Possible N+1 on /items: statement ran 3 times"]
+        assert n_plus_one.correlation_id == "n-plus-one-check"
+        assert "WHERE id" in n_plus_one.extra_fields["statement"]
+
+    def test_capture_asserts_budgets(self):
+        """Test the capture helper passes within budget and lists the statements when over it."""
+        monitor = QueryMonitor(max_queries=0, max_seconds=0, n_plus_one_threshold=0, slow_seconds=0, explain=False)
+        client = self._client(monitor)
+
+        with monitor.capture() as captured:
+            client.get("/items/1")
+        assert captured.count == 1
+        captured.assert_budget(1)
+
+        with monitor.capture() as captured:
+            client.get("/items")
+        with pytest.raises(AssertionError, match=r"/items: 4 queries .*\n  3x SELECT name FROM item"):
+            captured.assert_budget(2)
+
+    def test_slow_queries_are_logged_with_plan(self, caplog):
+        """Test statements over the threshold go to the slow-query log with their EXPLAIN output."""
+        monitor = QueryMonitor(max_queries=0, max_seconds=0, n_plus_one_threshold=0, slow_seconds=1e-9, explain=True)
+        client = self._client(monitor)
+
+        with caplog.at_level(logging.WARNING, logger="app.slow_queries"):
+            assert client.get("/items/2").json() == {"name": "b"}
+        slow = warnings_from(caplog, "app.slow_queries")
+        assert slow
+        fields = slow[-1].extra_fields
+        assert fields["statement"].startswith("SELECT name FROM item")
+        assert any("item" in line for line in fields["plan"])
+
+    def test_failed_explain_is_rolled_back_to_a_savepoint(self):
+        """Test a failing EXPLAIN on a transactional server cannot abort the request's transaction."""
+
+        class Cursor:
+            def __init__(self, executed):
+                self.executed = executed
+
+            def execute(self, sql, parameters=None):
+                self.executed.append(sql.split()[0] if sql.startswith("EXPLAIN") else sql)
+                if sql.startswith("EXPLAIN"):
+                    raise RuntimeError("permission denied")
+
+            def close(self):
+                pass
+
+        class Connection:
+            autocommit = False
+
+            def __init__(self):
+                self.executed = []
+
+            def cursor(self):
+                return Cursor(self.executed)
+
+        class Dialect:
+            name = "postgresql"
+
+        raw = Connection()
+        conn = type("Conn", (), {"dialect": Dialect()})()
+        cursor = type("DBAPICursor", (), {"connection": raw})()
+        assert QueryMonitor._explain(conn, cursor, "SELECT 1", {}) is None
+        assert raw.executed == [
+            "SAVEPOINT query_monitor_explain", "EXPLAIN", "ROLLBACK TO SAVEPOINT query_monitor_explain",
+        ]
+
+        raw.autocommit, raw.executed[:] = True, []
+        assert QueryMonitor._explain(conn, cursor, "SELECT 1", {}) is None
+        assert raw.executed == ["EXPLAIN"]
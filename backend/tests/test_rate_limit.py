@@ -0,0 +1,153 @@
+import threading
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.middleware import RequestPipeline
+from app.core.security import AuthenticationManager
+from app.core.rate_limit import (
+    GCRA_SCRIPT, MemoryRateLimitBackend, RateLimit, RateLimiter, RedisRateLimitBackend, gcra
+)
+
+
+class FakeRedis:
+    """In-memory stand-in for the part of the Redis API the limiter uses.
+
+    ``eval`` runs the GCRA script's steps against a dict with PX expiry and, like
+    Redis, returns numbers as the strings the script produces.
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.calls = 0
+        self.down = False
+        self.threads = set()
+
+    def eval(self, script, numkeys, key, interval, burst):
+        assert script == GCRA_SCRIPT and numkeys == 1
+        if self.down:
+            raise ConnectionError("connection refused")
+        self.calls += 1
+        self.threads.add(threading.get_ident())
+        now = time.time()
+        value, expires_at = self.values.get(key, (None, 0))
+        tat = float(value) if value is not None and expires_at > now else now
+        tat = max(tat, now)
+        new_tat = tat + float(interval)
+        if new_tat - now > float(interval) * int(burst):
+            return [0, str(tat - now)]
+        self.values[key] = (str(new_tat), new_tat)
+        return [1, str(new_tat - now)]
+
+
+class TestRateLimit:
+    """Test cases for the GCRA rate limiter and its middleware."""
+
+    def test_gcra_allows_burst_then_sustained_rate(self):
+        """Test a key gets `burst` requests at once, then one per interval."""
+        limit = RateLimit(per_minute=60, burst=3)
+        tat, now = None, 1000.0
+        for expected_remaining in (2, 1, 0):
+            tat, result = gcra(tat, now, limit)
+            assert result.allowed and result.remaining == expected_remaining
+
+        rejected_tat, result = gcra(tat, now, limit)
+        assert rejected_tat is None
+        assert not result.allowed
+        assert result.retry_after == 1.0
+        assert result.headers()["Retry-After"] == "1"
+
+        _, result = gcra(tat, now + 1.0, limit)
+        assert result.allowed
+
+    def test_memory_backend_is_bounded(self):
+        """Test the in-process backend never tracks more than max_keys clients."""
+        backend = MemoryRateLimitBackend(max_keys=100)
+        limit = RateLimit(per_minute=60, burst=5)
+        for client in range(1000):
+            assert backend.hit(f"ip:{client}", limit).allowed
+        assert len(backend) == 100
+
+        # Recently seen keys survive eviction and keep their state
+        for _ in range(4):
+            backend.hit("ip:999", limit)
+        assert not backend.hit("ip:999", limit).allowed
+
+    def test_redis_backend_shares_limits_across_workers(self):
+        """Test two limiters on one store enforce a single budget, and fall back when it is down."""
+        store = FakeRedis()
+        limit = RateLimit(per_minute=60, burst=4)
+        workers = [
+            RateLimiter(RedisRateLimitBackend(store, MemoryRateLimitBackend(100)), limit, {})
+            for _ in range(2)
+        ]
+
+        results = [workers[i % 2].check("user:1", "/api/v1/items") for i in range(6)]
+        assert [r.allowed for r in results] == [True, True, True, True, False, False]
+        assert store.calls == 6
+        assert all(key.startswith("ratelimit:default|") for key in store.values)
+
+        # Unreachable store: the worker keeps limiting locally instead of failing
+        store.down = True
+        assert workers[0].check("user:2", "/api/v1/items").allowed
+
+    def test_middleware_limits_per_route(self):
+        """Test the middleware returns 429 with headers, and login has its own bucket."""
+        app = FastAPI()
+
+        @app.get("/api/v1/items")
+        def items():
+            return []
+
+        @app.post("/api/v1/auth/login")
+        def login():
+            return {}
+
+        @app.get("/health")
+        def health():
+            return {}
+
+        limiter = RateLimiter(
+            MemoryRateLimitBackend(100),
+            RateLimit(per_minute=60, burst=2),
+            {"/health": None, "/api/v1/auth/login": RateLimit(per_minute=10, burst=1)}
+        )
+        client = TestClient(RequestPipeline(app, limiter=limiter, rate_limiting=True))
+
+        assert client.get("/api/v1/items").headers["X-RateLimit-Remaining"] == "1"
+        assert client.get("/api/v1/items").status_code == 200
+        response = client.get("/api/v1/items")
+        assert response.status_code == 429
+        assert response.json()["error"]["code"] == "RATE_LIMIT_ERROR"
+        assert int(response.headers["Retry-After"]) >= 1
+
+        assert client.post("/api/v1/auth/login").status_code == 200
+        assert client.post("/api/v1/auth/login").status_code == 429
+        assert all(client.get("/health").status_code == 200 for _ in range(5))
+
+        # Authenticated users are limited per user, not per IP; bad tokens count against the IP
+        token = AuthenticationManager().create_access_token({"sub": "42"})
+        assert client.get("/api/v1/items", headers={"Authorization": f"Bearer {token}"}).status_code == 200
+        assert client.get("/api/v1/items", headers={"Authorization": "Bearer not-a-token"}).status_code == 429
+
+    def test_shared_store_is_called_off_the_event_loop(self):
+        """Test the middleware runs Redis round trips in a worker thread, not on the event loop."""
+        app = FastAPI()
+        loop_threads = set()
+
+        @app.get("/api/v1/items")
+        async def items():
+            loop_threads.add(threading.get_ident())
+            return []
+
+        store = FakeRedis()
+        limiter = RateLimiter(
+            RedisRateLimitBackend(store, MemoryRateLimitBackend(100)), RateLimit(per_minute=60, burst=2), {}
+        )
+        assert limiter.blocking and not RateLimiter(MemoryRateLimitBackend(100), RateLimit(60, 2), {}).blocking
+        client = TestClient(RequestPipeline(app, limiter=limiter, rate_limiting=True))
+
+        assert client.get("/api/v1/items").status_code == 200
+        assert store.calls == 1
+        assert loop_threads and not loop_threads & store.threads
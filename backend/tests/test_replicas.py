@@ -0,0 +1,106 @@
+import sqlite3
+
+from fastapi import Depends, FastAPI, Request, Response
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.core import database
+from app.core.cache import CATEGORIES, CatalogCache
+from app.core.database import DatabaseManager
+from app.core.replicas import CONSISTENCY_HEADER, ReplicaSet
+from app.models import Category
+
+
+class TestReadReplicas:
+    """Test cases for replica routing with two SQLite files standing in for primary and replica."""
+
+    def _setup(self, tmp_path):
+        self.primary_path, self.replica_path = tmp_path / "primary.db", tmp_path / "replica.db"
+        primary = create_engine(f"sqlite:///{self.primary_path}", connect_args={"check_same_thread": False})
+        replica = create_engine(f"sqlite:///{self.replica_path}", connect_args={"check_same_thread": False})
+        SQLModel.metadata.create_all(primary)
+        self.replicate()
+        self.primary = primary
+        self.manager = DatabaseManager(primary, ReplicaSet(primary, [replica], max_lag=5, interval=1))
+
+        app = FastAPI()
+
+        def get_session(request: Request, response: Response):
+            yield from self.manager.get_session(request, response)
+
+        @app.get("/names")
+        def names(session: Session = Depends(get_session)):
+            return session.exec(select(Category.name).order_by(Category.id)).all()
+
+        @app.post("/names")
+        def add_name(name: str, session: Session = Depends(get_session)):
+            session.add(Category(name=name, color="#000000"))
+            session.commit()
+            # Read back in the same request: pinned to the primary after the write
+            return session.exec(select(Category.name).order_by(Category.id)).all()
+
+        return TestClient(app)
+
+    def replicate(self):
+        with sqlite3.connect(self.primary_path) as source, sqlite3.connect(self.replica_path) as target:
+            source.backup(target)
+
+    def write_on_primary(self, name: str):
+        with Session(self.primary) as session:
+            session.add(Category(name=name, color="#000000"))
+            session.commit()
+
+    def test_reads_follow_replica_health_and_consistency_tokens(self, tmp_path):
+        """Test reads use caught-up replicas, writes pin to the primary and tokens guarantee read-your-writes."""
+        client = self._setup(tmp_path)
+        self.write_on_primary("unreplicated")
+        # No health check yet: replicas are not trusted
+        assert client.get("/names").json() == ["unreplicated"]
+
+        self.manager.replicas.check()
+        assert self.manager.replicas.status()[0]["error"] == "no heartbeat replicated yet"
+        self.replicate()
+        self.manager.replicas.check()
+        assert self.manager.replicas.status()[0]["healthy"]
+        self.write_on_primary("primary only")
+        assert client.get("/names").json() == ["unreplicated"]
+
+        created = client.post("/names", params={"name": "mine"})
+        assert created.json() == ["unreplicated", "primary only", "mine"]
+        token = created.headers[CONSISTENCY_HEADER]
+        # The replica has not caught up with the write: the token sends the read to the primary
+        assert client.get("/names", headers={CONSISTENCY_HEADER: token}).json()[-1] == "mine"
+        assert client.get("/names").json() == ["unreplicated"]
+
+        # A heartbeat stamped after the write reaches the replica along with it
+        self.manager.replicas.check()
+        self.replicate()
+        self.manager.replicas.check()
+        self.write_on_primary("later")
+        assert client.get("/names", headers={CONSISTENCY_HEADER: token}).json() == ["unreplicated", "primary only", "mine"]
+
+    def test_shared_caches_load_from_the_primary(self, tmp_path):
+        """Test a replica-bound session never fills the catalog cache with a snapshot older than the primary."""
+        self._setup(tmp_path)
+        self.manager.replicas.check()
+        self.replicate()
+        self.manager.replicas.check()
+        self.write_on_primary("unreplicated")
+        cache = CatalogCache(ttl_seconds=300)
+
+        with self.manager.read_session() as session:
+            assert session.replica is not None
+            assert session.exec(select(Category.name)).all() == []
+            assert [row.name for row in cache.get(CATEGORIES, session).rows] == ["unreplicated"]
+
+    def test_health_reports_unavailable_replicas(self, tmp_path, monkeypatch):
+        """Test /health/db is degraded while a replica cannot be read."""
+        self._setup(tmp_path)
+        self.replica_path.unlink()
+        self.manager.replicas.check()
+        monkeypatch.setattr(database, "db_manager", self.manager)
+
+        health = database.check_database_health()
+        assert health["status"] == "degraded"
+        [replica] = health["replicas"]
+        assert not replica["healthy"] and replica["error"]
@@ -0,0 +1,138 @@
+import threading
+import time
+
+import pytest
+from sqlmodel import SQLModel, select
+
+from app.core import database
+from app.core.config import settings
+from app.core.database import DatabaseManager, create_database_engine, create_sqlite_writer
+from app.models import Category
+
+
+def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.005)
+
+
+class TestSQLiteProductionMode:
+    """Test cases for the SQLite read pool, tuned pragmas and the group-committing writer."""
+
+    @pytest.fixture
+    def manager(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "SQLITE_PRODUCTION_MODE", True)
+        # Long enough that only the queue, never the clock, closes a group in these tests
+        monkeypatch.setattr(settings, "SQLITE_GROUP_COMMIT_MAX_DELAY_MS", 10000)
+        monkeypatch.setattr(settings, "SQLITE_CHECKPOINT_INTERVAL_SECONDS", 0.05)
+        monkeypatch.setattr(settings, "SQLITE_CHECKPOINT_TRUNCATE_PAGES", 1)
+        url = f"sqlite:///{tmp_path / 'store.db'}"
+        engine = create_database_engine(url)
+        SQLModel.metadata.create_all(engine)
+        manager = DatabaseManager(engine, writer=create_sqlite_writer(url))
+        yield manager
+        manager.writer.stop()
+        engine.dispose()
+
+    def _add(self, manager: DatabaseManager, name: str, commit: bool = True) -> None:
+        with manager.read_session() as session:
+            session.add(Category(name=name, color="#000000"))
+            session.flush()
+            if commit:
+                session.commit()
+            else:
+                session.rollback()
+
+    def _names(self, manager: DatabaseManager):
+        with manager.read_session() as session:
+            return session.exec(select(Category.name).order_by(Category.name)).all()
+
+    def test_connections_are_tuned(self, manager):
+        """Test read connections come from a pool with the production pragmas."""
+        assert manager.engine.pool.size() == settings.SQLITE_READ_POOL_SIZE
+        with manager.engine.connect() as connection:
+            pragma = lambda name: connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+            assert pragma("journal_mode") == "wal"
+            assert pragma("synchronous") == 1  # NORMAL
+            assert pragma("busy_timeout") == settings.SQLITE_BUSY_TIMEOUT_MS
+            assert pragma("temp_store") == 2  # MEMORY
+            assert pragma("cache_size") == -settings.SQLITE_CACHE_SIZE_MB * 1024
+            assert pragma("wal_autocheckpoint") == 0
+
+    def test_concurrent_transactions_share_one_commit(self, manager):
+        """Test writers queued behind an open transaction are committed together, rollbacks excluded."""
+        writer = manager.writer
+        first = manager.read_session()
+        first.add(Category(name="first", color="#000000"))
+        first.flush()
+
+        threads = [threading.Thread(target=self._add, args=(manager, f"queued {i}")) for i in range(4)]
+        threads.append(threading.Thread(target=self._add, args=(manager, "abandoned", False)))
+        for thread in threads:
+            thread.start()
+        wait_for(lambda: writer.stats()["waiting"] == 5)
+        # Reads use the pool and only see committed rows, even while the writer is busy
+        assert self._names(manager) == []
+
+        first.commit()
+        first.close()
+        for thread in threads:
+            thread.join()
+
+        stats = writer.stats()
+        assert (stats["transactions"], stats["rolled_back"]) == (5, 1)
+        assert (stats["group_commits"], stats["largest_group"]) == (1, 5)
+        assert self._names(manager) == ["first", "queued 0", "queued 1", "queued 2", "queued 3"]
+
+    def test_core_writers_share_the_writer_with_sessions(self, manager, monkeypatch):
+        """Test Core writes outside sessions queue and group commit with session writes, without locking errors."""
+        monkeypatch.setattr(database, "engine", manager.engine)
+        monkeypatch.setattr(database, "sqlite_writer", manager.writer)
+        table = Category.__table__
+        errors = []
+
+        def core_add(name: str, fail: bool = False) -> None:
+            try:
+                with database.begin_write() as connection:
+                    connection.execute(table.insert().values(name=name, color="#000000"))
+                    if fail:
+                        raise RuntimeError("abandoned")
+            except RuntimeError:
+                pass
+            except Exception as e:
+                errors.append(e)
+
+        first = manager.read_session()
+        first.add(Category(name="first", color="#000000"))
+        first.flush()
+
+        threads = [threading.Thread(target=core_add, args=(f"core {i}",)) for i in range(3)]
+        threads.append(threading.Thread(target=core_add, args=("core abandoned", True)))
+        threads += [threading.Thread(target=self._add, args=(manager, f"session {i}")) for i in range(3)]
+        for thread in threads:
+            thread.start()
+        wait_for(lambda: manager.writer.stats()["waiting"] == 7)
+
+        first.commit()
+        first.close()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        stats = manager.writer.stats()
+        assert (stats["transactions"], stats["rolled_back"]) == (7, 1)
+        assert stats["group_commits"] == 1
+        assert self._names(manager) == ["core 0", "core 1", "core 2", "first", "session 0", "session 1", "session 2"]
+
+    def test_session_reads_its_own_writes_and_wal_is_checkpointed(self, manager, tmp_path):
+        """Test a writing session reads through the writer, and the WAL is truncated between commits."""
+        with manager.read_session() as session:
+            session.add(Category(name="pending", color="#000000"))
+            session.flush()
+            assert session.exec(select(Category.name)).all() == ["pending"]
+            session.commit()
+
+        wait_for(lambda: manager.writer.stats()["checkpoints"] >= 1)
+        wait_for(lambda: (tmp_path / "store.db-wal").stat().st_size == 0)
+        assert self._names(manager) == ["pending"]
@@ -0,0 +1,161 @@
+import uuid
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from app.core.change_log import DELETE, LOCATION_LOCK_CLASS, SEQUENCE_LOCK_KEY, UPSERT, _lock_sequence
+from app.models import Category, ChangeLog, Count, Location
+from app.services.sync import compact_change_log
+
+
+class RecordingSession:
+    """Stands in for a PostgreSQL session, recording the advisory locks taken."""
+
+    def __init__(self):
+        self.locks = []
+
+    def execute(self, statement, parameters):
+        self.locks.append((str(statement).split("(")[0].split()[-1], *parameters.values()))
+
+
+def head(session: Session) -> int:
+    return session.exec(select(func.max(ChangeLog.seq))).one() or 0
+
+
+class TestDeltaSync:
+    """Test cases for the change log and GET /api/v1/sync."""
+
+    def _count(self, client: TestClient, test_data, location_id: int, quantity: float) -> dict:
+        response = client.post("/api/v1/counts/", json={
+            "item_id": test_data["inventory_item"].id,
+            "user_id": test_data["user"].id,
+            "location_id": location_id,
+            "quantity": quantity,
+            "counted_at": "2025-08-01T10:00:00",
+        })
+        assert response.status_code == 201
+        return response.json()
+
+    def _sync_all(self, client: TestClient, since: int, **params) -> dict:
+        """Follow ``next`` until ``has_more`` is false, collecting every page."""
+        changes, tombstones = [], []
+        while True:
+            page = client.get("/api/v1/sync/", params={"since": since, **params}).json()
+            changes += page["changes"]
+            tombstones += page["tombstones"]
+            since = page["next"]
+            if not page["has_more"]:
+                return {"next": since, "changes": changes, "tombstones": tombstones}
+
+    def test_changes_are_compacted_and_deletes_become_tombstones(
+        self, client: TestClient, test_session: Session, test_data
+    ):
+        """Test each row is returned once with its current data, and deleted rows as tombstones."""
+        cursor = head(test_session)
+        location = test_data["location"]
+        other = Location(name=f"Other {uuid.uuid4()}", address="1 Main", city="Dallas", state="TX", zip_code="75201")
+        category = Category(name=f"Retired {uuid.uuid4()}", color="#000000")
+        test_session.add_all([other, category])
+        test_session.commit()
+
+        count = self._count(client, test_data, location.id, 4.0)
+        assert client.put(f"/api/v1/counts/{count['id']}", json={"quantity": 6.0}).status_code == 200
+        other_count = self._count(client, test_data, other.id, 1.0)
+        assert client.delete(f"/api/v1/categories/{category.id}").status_code == 204
+
+        page = client.get("/api/v1/sync/", params={"since": cursor}).json()
+        assert page["has_more"] is False and page["reset"] is False
+        assert page["next"] == head(test_session)
+        counts = [change for change in page["changes"] if change["entity"] == "count"]
+        assert [change["id"] for change in counts] == [count["id"], other_count["id"]]
+        assert counts[0]["data"]["quantity"] == 6.0
+        assert page["tombstones"] == [{"seq": page["next"], "entity": "category", "id": category.id}]
+
+        # A store's devices get that store's rows plus catalog changes
+        page = client.get("/api/v1/sync/", params={"since": cursor, "location_id": location.id}).json()
+        assert [change["id"] for change in page["changes"] if change["entity"] == "count"] == [count["id"]]
+        assert [tombstone["id"] for tombstone in page["tombstones"]] == [category.id]
+
+        # Nothing new since the returned cursor
+        page = client.get("/api/v1/sync/", params={"since": page["next"]}).json()
+        assert (page["changes"], page["tombstones"]) == ([], [])
+
+    def test_pages_cover_every_change_once(self, client: TestClient, test_session: Session, test_data):
+        """Test paging with a small limit returns the same rows as one large page, with no repeats."""
+        cursor = head(test_session)
+        for quantity in range(5):
+            self._count(client, test_data, test_data["location"].id, quantity)
+
+        page = client.get("/api/v1/sync/", params={"since": cursor, "limit": 2}).json()
+        assert page["has_more"] is True and len(page["changes"]) == 2
+        paged = self._sync_all(client, cursor, limit=2)
+        whole = self._sync_all(client, cursor, limit=1000)
+        assert [change["id"] for change in paged["changes"]] == [change["id"] for change in whole["changes"]]
+        assert len({change["id"] for change in paged["changes"]}) == 5
+        assert paged["next"] == whole["next"] == head(test_session)
+
+    def test_log_shares_the_writing_transaction(self, client: TestClient, test_session: Session, test_data, test_engine):
+        """Test rolled-back writes leave no entries and compaction keeps what sync returns."""
+        cursor = head(test_session)
+        test_session.add(Category(name=f"Never {uuid.uuid4()}", color="#000000"))
+        test_session.flush()
+        test_session.rollback()
+        assert head(test_session) == cursor
+
+        count = self._count(client, test_data, test_data["location"].id, 1.0)
+        for quantity in (2.0, 3.0):
+            assert client.put(f"/api/v1/counts/{count['id']}", json={"quantity": quantity}).status_code == 200
+        before = self._sync_all(client, cursor)
+        assert compact_change_log(test_engine) >= 2
+        test_session.expire_all()
+        assert test_session.exec(select(func.count()).select_from(ChangeLog).where(
+            ChangeLog.entity == "count", ChangeLog.entity_id == count["id"]
+        )).one() == 1
+        assert self._sync_all(client, cursor) == before
+
+    def test_moved_rows_are_tombstoned_for_their_old_location(
+        self, client: TestClient, test_session: Session, test_data, test_engine
+    ):
+        """Test a row moved to another location is deleted for the old one, even after compaction."""
+        location = test_data["location"]
+        other = Location(name=f"Other {uuid.uuid4()}", address="1 Main", city="Dallas", state="TX", zip_code="75201")
+        test_session.add(other)
+        test_session.commit()
+        count_id = self._count(client, test_data, location.id, 4.0)["id"]
+        cursor = head(test_session)
+
+        count = test_session.get(Count, count_id)
+        count.location_id = other.id
+        test_session.commit()
+        compact_change_log(test_engine)
+
+        page = self._sync_all(client, cursor, location_id=location.id)
+        assert [tombstone["id"] for tombstone in page["tombstones"] if tombstone["entity"] == "count"] == [count_id]
+        assert [change for change in page["changes"] if change["entity"] == "count"] == []
+        page = self._sync_all(client, cursor, location_id=other.id)
+        assert [change["id"] for change in page["changes"] if change["entity"] == "count"] == [count_id]
+        assert page["tombstones"] == []
+        # Unfiltered, the row simply has its new location
+        page = self._sync_all(client, cursor)
+        assert [change["data"]["location_id"] for change in page["changes"]] == [other.id]
+        assert page["tombstones"] == []
+
+    def test_writes_lock_only_the_locations_they_touch(self):
+        """Test location writes share the sequence lock and lock their locations in order; catalog writes take it alone."""
+        session = RecordingSession()
+        _lock_sequence(session, [("transfer", 1, UPSERT, 9, 4), ("count", 2, DELETE, 4, None)])
+        assert session.locks == [
+            ("pg_advisory_xact_lock_shared", SEQUENCE_LOCK_KEY),
+            ("pg_advisory_xact_lock", LOCATION_LOCK_CLASS, 4),
+            ("pg_advisory_xact_lock", LOCATION_LOCK_CLASS, 9),
+        ]
+
+        session = RecordingSession()
+        _lock_sequence(session, [("count", 2, UPSERT, 4, None), ("category", 3, UPSERT, None, None)])
+        assert session.locks == [("pg_advisory_xact_lock", SEQUENCE_LOCK_KEY)]
+
+    def test_unknown_cursor_requires_reset(self, client: TestClient, test_session: Session):
+        """Test a cursor past the end of the log (a restored database) asks the client to start over."""
+        page = client.get("/api/v1/sync/", params={"since": head(test_session) + 100}).json()
+        assert page["reset"] is True and page["next"] == head(test_session)